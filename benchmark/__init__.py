@@ -0,0 +1,11 @@
+"""
+BENCHMARK PACKAGE
+
+    Performance tracking of MESSpy across versions on synthetic study cases generated offline (no PVGIS access is needed).
+        synthetic.py: generator of study cases scaling number of locations, techs per location, timestep and simulation years
+        benchmark.py: measurement of construction, simulation, save and NPV time and peak memory, saved in a .json history
+
+    Run from the MESSpy folder, e.g.:
+        python -m benchmark --locations 1 10 --techs 3 --timestep 60 15 --years 1 --label "new battery model"
+        python -m benchmark --compare                     (last run compared with the previous runs of the same cases)
+"""
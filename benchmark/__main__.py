@@ -0,0 +1,28 @@
+"""
+Command line of the benchmark (see benchmark/__init__.py)
+
+    every combination of the given locations, techs, timestep and years is run
+"""
+
+import argparse
+import itertools
+from benchmark import benchmark
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m benchmark',description='MESSpy benchmark on synthetic study cases')
+    parser.add_argument('--locations',type=int,nargs='+',default=[1,10],help='number of locations of the REC')
+    parser.add_argument('--techs',type=int,nargs='+',default=[3],choices=[1,2,3,4,5],help='techs per location: 1 PV, 2 + battery, 3 + wind, 4 + heatpump, 5 hydrogen chain')
+    parser.add_argument('--timestep',type=int,nargs='+',default=[60],help='simulation timestep [min] (e.g. 60 15 1)')
+    parser.add_argument('--years',type=int,nargs='+',default=[1],help='simulation years')
+    parser.add_argument('--history',default='results/benchmark/history.json',help='.json history of the runs')
+    parser.add_argument('--workdir',default='results/benchmark/cases',help='folder where the synthetic study cases are generated and run')
+    parser.add_argument('--label',default=None,help='name of the run in the history')
+    parser.add_argument('--compare',action='store_true',help='only compare the last run with the previous runs of the history')
+    args = parser.parse_args()
+
+    if not args.compare:
+        cases = [{'locations': locations, 'techs': techs, 'timestep': timestep, 'years': years}
+                 for locations,techs,timestep,years in itertools.product(args.locations,args.techs,args.timestep,args.years)]
+        benchmark.run(cases,args.history,args.workdir,args.label)
+    if len(benchmark.load_history(args.history)) > 1:
+        benchmark.compare(args.history)
@@ -0,0 +1,198 @@
+"""
+BENCHMARK MODULE
+
+    Performance of MESSpy on synthetic study cases (see synthetic.py), tracked across versions.
+
+    Each case (number of locations, techs per location, timestep, simulation years) is run in a new process, so that its peak memory
+    is measured alone and previous cases (e.g. series cache) do not affect it. Measured for each case:
+        - construction [s]: creation of the REC object (weather, demand and production series, technologies)
+        - simulation [s] and steps/s: REC_power_simulation
+        - save [s]: tech_cost and save of the studycase results ('pkl')
+        - NPV [s]: economics.NPV comparing studycase and refcase
+        - peak RSS [MB]: peak resident memory of the process
+    Results are appended to a .json history (a list of runs), so runs of different versions can be compared (see compare).
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+import multiprocessing
+from datetime import datetime
+import numpy as np
+
+try:
+    import resource     # peak memory, not available on Windows
+except ImportError:
+    resource = None
+
+from benchmark import synthetic
+
+metrics = ['construction [s]','simulation [s]','steps/s','save [s]','NPV [s]','peak RSS [MB]'] # compared by compare()
+
+
+def peak_rss():
+    """
+    Peak resident memory of the current process [MB] (None if not available)
+    """
+    if resource is None:
+        return(None)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return(peak/1024**2 if sys.platform == 'darwin' else peak/1024) # bytes on macOS, kB on Linux
+
+def measure(case,folder):
+    """
+    Generate and run a synthetic study case in the current process
+
+    case: dictionary {'locations': int, 'techs': int, 'timestep': int, 'years': int} (see synthetic.generate)
+    folder: str working directory of the case (input files, previous_simulation and results are written here)
+
+    output: dictionary case and measured metrics, 'errors': {phase: message} of the phases that failed
+    """
+    os.chdir(folder)
+    if synthetic.root not in sys.path: sys.path.insert(0,synthetic.root) # MESSpy modules are imported from any working directory
+    from core import rec
+    from core import economics as eco
+    from core import constants as c
+    path = 'input'
+    inputs = synthetic.generate(path,case['locations'],case['techs'],case['timestep'],case['years'])
+    if not os.path.exists('results/pkl'): os.makedirs('results/pkl')
+    if not os.path.exists('Results'):
+        try:
+            os.symlink('results','Results')     # economics.NPV reads some files from 'Results/pkl' (case sensitive file systems)
+        except OSError:
+            pass
+
+    result = dict(case)
+    result['errors'] = {}
+
+    start = time.perf_counter()
+    sim = rec.REC(inputs['studycase'],inputs['general'],'studycase','general',path) # create REC object
+    result['construction [s]'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sim.REC_power_simulation() # simulate REC power balances
+    result['simulation [s]'] = time.perf_counter() - start
+    result['steps'] = sim.context.timestep_number
+    result['steps/s'] = result['steps']/result['simulation [s]']
+
+    start = time.perf_counter()
+    sim.tech_cost(inputs['tech_cost']) # calculate the cost of all technologies
+    sim.save('studycase','pkl')
+    result['save [s]'] = time.perf_counter() - start
+
+    sim0 = rec.REC(inputs['refcase'],inputs['general'],'refcase','general',path) # refcase, not measured
+    sim0.REC_power_simulation()
+    sim0.tech_cost(inputs['tech_cost'])
+    sim0.save('refcase','pkl')
+
+    start = time.perf_counter()
+    try:
+        with c.activate(sim.context):
+            eco.NPV('studycase','refcase','studycase','refcase',inputs['energy_market'],path,'benchmark','pkl')
+        result['NPV [s]'] = time.perf_counter() - start
+    except Exception as error:  # e.g. configurations not supported by economics.NPV, recorded without stopping the benchmark
+        result['NPV [s]'] = None
+        result['errors']['NPV'] = f"{type(error).__name__}: {error}"
+
+    result['peak RSS [MB]'] = peak_rss()
+    return(result)
+
+def run_case(case,folder):
+    """
+    Run measure in a new process (spawn), so that peak memory and caches belong to this case only
+    """
+    if not os.path.exists(folder): os.makedirs(folder)
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return(pool.apply(measure,(case,os.path.abspath(folder))))
+
+def version():
+    """
+    Git commit of MESSpy (None if not available)
+    """
+    try:
+        return(subprocess.run(['git','rev-parse','--short','HEAD'],cwd=synthetic.root,capture_output=True,text=True,check=True).stdout.strip())
+    except (OSError,subprocess.CalledProcessError):
+        return(None)
+
+def run(cases,history='results/benchmark/history.json',workdir='results/benchmark/cases',label=None):
+    """
+    Run the benchmark and append its results to the history
+
+    cases: list of dictionaries {'locations': int, 'techs': int, 'timestep': int, 'years': int}
+           e.g. [{'locations': n, 'techs': 3, 'timestep': 60, 'years': 1} for n in [1,10,100]]
+    history: str .json file of the history (created if it doesn't exist)
+    workdir: str folder where each case is generated and run (workdir/case name)
+    label: str optional name of the run (e.g. the change being measured)
+
+    output: dictionary of the run {'date', 'label', 'version', 'python', 'numpy', 'platform', 'cases': [results of measure]}
+    """
+    entry = {'date': datetime.now().isoformat(timespec='seconds'), 'label': label, 'version': version(),
+             'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(), 'cases': []}
+
+    for case in cases:
+        name = f"{case['locations']}loc_{case['techs']}techs_{case['timestep']}min_{case['years']}y"
+        print(f"Benchmark {name}")
+        entry['cases'].append(run_case(case,os.path.join(workdir,name)))
+
+    runs = load_history(history)
+    runs.append(entry)
+    if os.path.dirname(history) and not os.path.exists(os.path.dirname(history)): os.makedirs(os.path.dirname(history))
+    with open(history,'w') as f:
+        json.dump(runs,f,indent=1)
+    return(entry)
+
+def load_history(history):
+    """
+    Runs saved in the history .json file (empty list if it doesn't exist)
+    """
+    if not os.path.exists(history):
+        return([])
+    with open(history,'r') as f:
+        return(json.load(f))
+
+def compare(history='results/benchmark/history.json',new=-1,old=None,print_=True):
+    """
+    Compare two runs of the history case by case
+
+    history: str .json file of the history
+    new: int index of the run in the history (default: last run)
+    old: int index of the run compared with new (default: each case is compared with the latest previous run including it)
+    print_: bool print the comparison table
+
+    output: list of dictionaries, one for each case of new run previously: case, 'old' (date and label or version of the old run)
+            and {metric: (old value, new value, new/old)}
+    """
+    runs = load_history(history)
+    if len(runs) < 2:
+        raise ValueError(f"Warning! At least two runs are needed in {history} to compare them")
+    new = new % len(runs)
+    key = lambda result: (result['locations'],result['techs'],result['timestep'],result['years'])
+    name = lambda run: f"{run['label'] or run['version']} ({run['date']})"
+
+    old_cases = {}  # case key: (old run, result)
+    for run in (runs[:new] if old is None else [runs[old]]):
+        for result in run['cases']:
+            old_cases[key(result)] = (run,result)   # later runs replace earlier ones
+
+    comparison = []
+    for result in runs[new]['cases']:
+        if key(result) not in old_cases:
+            continue
+        run,old_result = old_cases[key(result)]
+        row = {'case': dict(zip(['locations','techs','timestep','years'],key(result))), 'old': name(run)}
+        for metric in metrics:
+            a,b = old_result.get(metric),result.get(metric)
+            row[metric] = (a,b,b/a if a and b is not None else None)
+        comparison.append(row)
+
+    if print_:
+        print(f"{name(runs[new])} compared with the previous runs (new/old)")
+        print(f"{'case':<28}" + ''.join(f"{metric:>18}" for metric in metrics) + '   old run')
+        for row in comparison:
+            case = row['case']
+            case_name = f"{case['locations']}loc {case['techs']}techs {case['timestep']}min {case['years']}y"
+            print(f"{case_name:<28}" + ''.join(f"{'-' if row[metric][2] is None else format(row[metric][2],'.2f')+'x':>18}" for metric in metrics) + f"   {row['old']}")
+    return(comparison)
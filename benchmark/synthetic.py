@@ -0,0 +1,201 @@
+"""
+SYNTHETIC MODULE
+
+    Synthetic study cases of any size for the benchmark (see benchmark.py), generated without PVGIS access.
+
+    Technology parameters are copied from the test study cases (input_test_1, input_test_2, input_test_3), so the synthetic
+    study cases follow the same schemas of studycase.json, refcase.json, tech_cost.json and energy_market.json.
+    Weather, demand and production series are generated offline:
+        - weather/TMY_general.csv: hourly typical year (clear sky irradiance with random daily clearness, temperature, wind speed)
+        - production/PV.csv, production/wind.csv: production [kW/kWp] at the simulation timestep, used as custom PV and wind 'serie'
+        - loads/location_carrier.csv: demand at the simulation timestep with daily and seasonal profiles,
+                                      scaled to the mean of the corresponding test series
+    previous_simulation/general.pkl is written in the working directory, so REC reads the synthetic weather instead of downloading it.
+"""
+
+import os
+import json
+import pickle
+import numpy as np
+import pandas as pd
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # MESSpy folder, containing the test study cases
+
+prosumer    = ('input_test_1','prosumer')               # household with PV, wind and battery
+heating     = ('input_test_2','prosumer')               # household with heatpump
+industrial  = ('input_test_3','industrial_facility')    # hydrogen production chain
+
+levels = {  # techs per location: (studycase techs in order of priority, refcase location)
+    1: ([(prosumer,'electricity demand'),(prosumer,'PV'),(prosumer,'electricity grid')],prosumer),
+    2: ([(prosumer,'electricity demand'),(prosumer,'PV'),(prosumer,'battery'),(prosumer,'electricity grid')],prosumer),
+    3: ([(prosumer,'electricity demand'),(prosumer,'PV'),(prosumer,'wind'),(prosumer,'battery'),(prosumer,'electricity grid')],prosumer),
+    4: ([(prosumer,'electricity demand'),(heating,'heating water demand'),(heating,'heatpump'),(prosumer,'PV'),(prosumer,'wind'),
+         (prosumer,'battery'),(prosumer,'electricity grid')],heating),
+    5: ([(industrial,tech_name) for tech_name in ['hydrogen demand','electricity demand','wind','PV','electrolyzer','fuel cell','mechanical compressor',
+                                                 'H tank','water grid','hydrogen grid','electricity grid','oxygen grid']],industrial)
+    }
+
+profiles = {    # carrier: (daily amplitude, seasonal amplitude, noise) of the synthetic demand, relative to its mean
+    'electricity':      (0.5,0.2,0.3),
+    'heating water':    (0.3,1.0,0.2),
+    'gas':              (0.3,0.8,0.2),
+    'hydrogen':         (0.,0.,0.),     # constant as in input_test_3
+    }
+
+
+def read_json(folder,file):
+    """
+    Read a .json file of a test study case
+    """
+    with open(os.path.join(root,folder,f"{file}.json"),'r') as f:
+        return(json.load(f))
+
+def weather(latitude,rng):
+    """
+    Synthetic hourly typical year
+
+    latitude: float [°]
+    rng: numpy random generator
+
+    output: pd.DataFrame with the same columns of the TMY downloaded from PVGIS (see REC.weather_generation)
+    """
+    hours = np.arange(8760)
+    day = hours // 24
+    declination = np.radians(23.45)*np.sin(2*np.pi*(284+day)/365)
+    hour_angle = np.radians(15*(hours % 24 + 0.5 - 12))
+    lat = np.radians(latitude)
+    elevation = np.maximum(np.sin(lat)*np.sin(declination) + np.cos(lat)*np.cos(declination)*np.cos(hour_angle),0) # sine of solar elevation
+    clearness = np.repeat(rng.uniform(0.3,1.,365),24)   # random clearness of each day
+
+    dni = 900*clearness*(elevation > 0.05)
+    dhi = 120*elevation*(1.3-clearness)
+    ghi = dni*elevation + dhi
+    season = -np.cos(2*np.pi*(day-15)/365)              # -1 in winter, 1 in summer
+    temp_air = 15 + 10*season + 5*np.sin(2*np.pi*(hours % 24 - 9)/24) + rng.normal(0,1.5,8760)
+    wind_speed = 6*rng.weibull(2.,8760)
+
+    return(pd.DataFrame({'temp_air': temp_air.round(2),
+                         'relative_humidity': np.clip(70 - 15*season + rng.normal(0,5,8760),10,100).round(2),
+                         'ghi': ghi.round(2),
+                         'dni': dni.round(2),
+                         'dhi': dhi.round(2),
+                         'IR(h)': (300 + 3*temp_air).round(2),
+                         'wind_speed': wind_speed.round(2),
+                         'wind_direction': rng.uniform(0,360,8760).round(0),
+                         'pressure': np.full(8760,101325.)}))
+
+def wind_power(speed,parameters):
+    """
+    Production [kW/kWp] of a wind turbine from the wind speed with the power curve parameters of the template
+
+    speed: array [m/s]
+    parameters: dictionary wind parameters (see studycase.json)
+    """
+    cutin,rated,cutoff = parameters['WScutin'],parameters['WSrated'],parameters['WScutoff']
+    power = np.clip((speed**3 - cutin**3)/(rated**3 - cutin**3),0,1)
+    power[speed >= cutoff] = 0
+    return(power)
+
+def demand(mean,carrier,timestep,rng):
+    """
+    Synthetic demand of one year at the simulation timestep
+
+    mean: float mean value of the demand [kW] [kg/s] [Sm^3/s]
+    carrier: str energy carrier (see profiles)
+    timestep: int [min]
+    rng: numpy random generator
+
+    output: array of 8760*60/timestep values with mean value mean
+    """
+    daily,seasonal,noise = profiles.get(carrier,profiles['electricity'])
+    hours = np.arange(int(8760*60/timestep))*timestep/60
+    serie = (1 + daily*np.sin(2*np.pi*(hours % 24 - 9)/24)) * (1 + seasonal*np.cos(2*np.pi*hours/8760)) * (1 + noise*rng.standard_normal(len(hours)))
+    serie = np.maximum(serie,0)
+    return(serie*mean/serie.mean())
+
+def synthetic_parameters(parameters,tech_name,test,location_name,means):
+    """
+    Parameters of a tech of the synthetic study case: demand, PV and wind series are replaced with synthetic series
+
+    parameters: dictionary parameters of the tech in the test study case (not modified)
+    tech_name: str
+    test: str input folder of the test study case
+    location_name: str location of the synthetic study case
+    means: dictionary demand file: (mean value, carrier) of the synthetic demands to be written (updated)
+
+    output: dictionary parameters
+    """
+    parameters = dict(parameters)
+    if tech_name.endswith(' demand') and parameters.get('series',False) != False:
+        file = f"{location_name.replace(' ','_')}_{tech_name.replace(' ','_')}.csv"
+        means[file] = (pd.read_csv(os.path.join(root,test,'loads',parameters['series'])).iloc[:,1].mean(),tech_name[:-len(' demand')])
+        parameters['series'] = file
+    if tech_name in ['PV','wind']:
+        parameters.update({'serie': f"{tech_name}.csv", 'ageing': False})  # custom production series [kW/kWp]
+    return(parameters)
+
+def generate(folder,locations,techs,timestep,years,seed=0):
+    """
+    Write the input files of a synthetic study case
+
+    folder: str input folder of the study case (path of REC)
+    locations: int number of locations of the REC
+    techs: int 1-5 technologies of each location (see levels)
+        1 PV, 2 PV and battery, 3 PV, wind and battery, 4 PV, wind, battery and heatpump, 5 hydrogen chain of input_test_3
+    timestep: int simulation timestep [min] (e.g. 60, 15, 1)
+    years: int simulation years
+    seed: int seed of the random series, the same inputs give the same study case
+
+    output: dictionary with studycase, refcase, general, tech_cost and energy_market, also written as .json files in folder
+            (file names as in the test study cases: 'studycase', 'refcase', 'general', ...)
+    """
+    rng = np.random.default_rng(seed)
+    for subfolder in ['weather','loads','production']:
+        if not os.path.exists(os.path.join(folder,subfolder)): os.makedirs(os.path.join(folder,subfolder))
+
+    general = read_json(prosumer[0],'general')
+    general.update({'simulation years': years, 'timestep': timestep, 'weather': 'TMY'})
+    steps = int(60/timestep) if timestep < 60 else 1
+
+    tmy = weather(general['latitude'],rng)
+    tmy.to_csv(os.path.join(folder,'weather','TMY_general.csv'))
+    if not os.path.exists('previous_simulation'): os.makedirs('previous_simulation')
+    with open("previous_simulation/general.pkl",'wb') as f: pickle.dump(general,f) # synthetic weather is read instead of being downloaded
+
+    studycase_techs,(refcase_test,refcase_template) = levels[techs]
+    templates = {}  # (input folder, location): location of the test studycase
+    for template,tech_name in studycase_techs:
+        if template not in templates:
+            templates[template] = read_json(template[0],'studycase')[template[1]]
+    refcase_location = read_json(refcase_test,'refcase')[refcase_template]
+
+    studycase,refcase = {},{}
+    means = {}      # demand file: (mean value of the test series, carrier)
+    for i in range(1,locations+1):
+        location_name = f"location {i}"
+        studycase[location_name] = {}
+        for priority,(template,tech_name) in enumerate(studycase_techs,start=1):
+            parameters = synthetic_parameters(templates[template][tech_name],tech_name,template[0],location_name,means)
+            parameters['priority'] = priority   # techs of different templates in the order of levels
+            studycase[location_name][tech_name] = parameters
+        refcase[location_name] = {tech_name: synthetic_parameters(refcase_location[tech_name],tech_name,refcase_test,location_name,means) for tech_name in refcase_location}
+
+    for file,(mean,carrier) in means.items():
+        unit = {'hydrogen': 'kg/s', 'process steam': 'kg/s', 'gas': 'Sm3/s'}.get(carrier,'kW')
+        pd.DataFrame({unit: demand(mean,carrier,timestep,rng)}).to_csv(os.path.join(folder,'loads',file))
+
+    # production [kW/kWp] at the simulation timestep, custom series of PV (losses are applied by PV) and wind
+    pd.DataFrame({'P': np.repeat(tmy['ghi'].to_numpy()/1000,steps)}).to_csv(os.path.join(folder,'production','PV.csv'))
+    test,template = industrial if techs == 5 else prosumer
+    wind_template = read_json(test,'studycase')[template]['wind']   # power curve of the wind turbine
+    pd.DataFrame({'P': np.repeat(wind_power(tmy['wind_speed'].to_numpy(),wind_template),steps)}).to_csv(os.path.join(folder,'production','wind.csv'))
+
+    tech_cost = read_json(industrial[0],'tech_cost')    # costs of all the techs of the levels
+    energy_market = read_json(industrial[0],'energy_market')
+    energy_market['investment years'] = max(energy_market['investment years']//years,1)*years   # multiple of simulation years (see economics.NPV)
+
+    case = {'studycase': studycase, 'refcase': refcase, 'general': general, 'tech_cost': tech_cost, 'energy_market': energy_market}
+    for file in case:
+        with open(os.path.join(folder,f"{file}.json"),'w') as f:
+            json.dump(case[file],f,indent=1)
+    return(case)
@@ -0,0 +1,43 @@
+"""
+Shared fixtures of the tests: RECs of the input_test folders simulated in a temporary working directory
+"""
+
+import os
+import json
+import pickle
+import pytest
+
+root = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def make_rec(tmp_path,monkeypatch):
+    """
+    Factory of REC objects of an input folder, created in a temporary working directory as run.py does
+    (previous_simulation is written so that weather and PV/wind series are read from the input folder instead of PVgis)
+
+    case: str input folder (e.g. 'input_test_1')
+    file_structure: str studycase file
+    structure: dict (optional) structure used instead of the studycase file (e.g. with changed parameters)
+    build: callable (optional) built object instead of rec.REC, called with structure, general, file_structure, file_general, path
+    general: changes to general.json, spaces of the keys written as underscores (e.g. simulation_years=3)
+    """
+    monkeypatch.chdir(tmp_path)
+    from core import rec
+
+    def factory(case='input_test_1',file_structure='studycase',file_general='general',structure=None,build=None,**general):
+        path = os.path.join(root,case)
+        with open(f"{path}/{file_general}.json") as f: general_data = json.load(f)
+        if structure is None:
+            with open(f"{path}/{file_structure}.json") as f: structure = json.load(f)
+        os.makedirs('previous_simulation',exist_ok=True)
+        for name in [file_general,f"{file_general}_{file_structure}"]:
+            with open(f"previous_simulation/{name}.pkl",'wb') as f: pickle.dump(general_data,f)
+        for location_name in structure:
+            for tech_name,prefix in (('PV','pv'),('wind','wind')):
+                if tech_name in structure[location_name]:
+                    with open(f"previous_simulation/{prefix}_{file_structure}_{location_name}.pkl",'wb') as f: pickle.dump(structure[location_name][tech_name],f)
+        general_data.update({name.replace('_',' '): value for name,value in general.items()})
+        return((build or rec.REC)(structure,general_data,file_structure,file_general,path))
+
+    return(factory)
@@ -0,0 +1,203 @@
+"""
+BALANCES MODULE
+
+    This module contains the containers used by locations and REC to record their time series:
+            - flow_allocation: sparse record of the energy exchanged between technologies (location.consumption and location.production)
+            - balance_tensor: contiguous storage of location and REC power balances (location.power_balance and REC.power_balance),
+                              optionally backed by an on-disk store for the chunked simulation (see REC.REC_power_simulation_chunked)
+
+    Containers behave like the nested dictionaries used in the rest of the code, so REC.save, economics and postprocess are not affected
+    Arrays are allocated in the scratch store of the simulation if defined ('scratch' in general.json, see scratch.py)
+"""
+
+import numpy as np
+from core import constants as c
+from core import scratch
+
+
+class flow_series(dict):
+
+    def __init__(self,length,dtype='float64'):
+        """
+        Dictionary of the flows exchanged by a single technology with the other technologies of the location
+
+        length: int number of timesteps of the simulation
+        dtype: dtype of the arrays (see 'precision' in general.json)
+
+        Arrays are allocated only when a value is assigned for the first time: self[tech][step] = value
+        Reading a flow that has never been assigned does not allocate anything: use .get(tech) or 'tech' in self
+        """
+        super().__init__()
+        self.length = length
+        self.dtype = dtype
+
+    def __missing__(self,tech_name):
+        self[tech_name] = scratch.zeros(self.length,self.dtype)     # array allocated at the first assignment
+        return(self[tech_name])
+
+
+class flow_allocation(dict):
+
+    def __init__(self,carriers,techs,length,dtype='float64'):
+        """
+        Sparse flow-allocation store: carrier -> tech -> tech -> array
+
+        carriers: iterable of str energy carriers
+        techs: iterable of str technologies of the location, ordered by priority
+        length: int number of timesteps of the simulation
+        dtype: dtype of the arrays (see 'precision' in general.json)
+
+        Only the carrier/tech pairs that actually exchange energy during the simulation allocate an array.
+        Technologies keep the priority order of the location, which is the order in which flows are allocated.
+        """
+        super().__init__()
+        self.techs = list(techs)
+        self.length = length
+        self.dtype = dtype
+        for carrier in carriers:
+            self[carrier] = {tech_name: flow_series(length,dtype) for tech_name in techs}
+
+    def clean(self):
+        """
+        Remove the empty flows and add the total for each technology
+
+        output: nested dictionary {carrier: {tech: {tech: array, 'Tot': array}}} of the non-zero flows only
+        """
+        cleaned = {}
+        for carrier in self:
+            cleaned[carrier] = {}
+            for tech_name in self[carrier]:
+                flows = self[carrier][tech_name]
+                cleaned_tech = {tech: flows[tech] for tech in self.techs if tech != tech_name and tech in flows and flows[tech].any()}
+                if cleaned_tech:
+                    cleaned_tech['Tot'] = scratch.zeros(self.length,self.dtype)
+                    for tech in list(cleaned_tech):
+                        if tech != 'Tot':
+                            cleaned_tech['Tot'] += cleaned_tech[tech]
+                    cleaned[carrier][tech_name] = cleaned_tech
+
+            # Remove carrier if not present in the analysis
+            if not cleaned[carrier]:
+                del cleaned[carrier]
+
+        return(cleaned)
+
+
+class balance_tensor:
+
+    def __init__(self,balances,length):
+        """
+        Contiguous struct-of-arrays storage of the power balances of a location or of the REC
+
+        balances: nested dictionary {carrier: {tech: array or None}}
+            arrays already defined (e.g. demand series) are copied into the tensor, None channels are initialised to zero
+        length: int number of timesteps of the simulation
+
+        output : balance_tensor object:
+            .data       2-D array, rows = carrier/tech channels, columns = timesteps
+            .channels   list of (carrier,tech) channels ordered as the rows of .data
+            .index      dictionary (carrier,tech): row
+            .carriers   dictionary carrier: slice of the (contiguous) rows of the carrier
+
+        The arrays of balances[carrier][tech] are replaced with zero-copy views of the corresponding rows,
+        so the dictionary interface used in the rest of the code (balances[carrier][tech][step]) is unchanged.
+        """
+        self.balances = balances
+        self.channels = [(carrier,tech) for carrier in balances for tech in balances[carrier]]
+        self.index = {channel: row for row,channel in enumerate(self.channels)}
+        self.carriers = {}
+        self.data = scratch.zeros((len(self.channels),length))
+        self.file = None    # on-disk store file (see to_store)
+
+        row = 0
+        for carrier in balances:
+            first_row = row
+            for tech in balances[carrier]:
+                if balances[carrier][tech] is not None:
+                    self.data[row] = balances[carrier][tech]    # e.g. demand series read from file
+                balances[carrier][tech] = self.data[row]        # zero-copy view
+                row += 1
+            self.carriers[carrier] = slice(first_row,row)
+
+    def __setstate__(self,state):
+        """
+        Restore the zero-copy views after unpickling (e.g. locations simulated by worker processes), as pickle copies each view separately
+        """
+        self.__dict__.update(state)
+        for (carrier,tech),row in self.index.items():
+            self.balances[carrier][tech] = self.data[row]
+
+    def to_store(self,file):
+        """
+        Move the tensor to an on-disk store: .data becomes a memory-mapped binary file (channels, timesteps) of float64
+        
+        file: str path of the binary file (created or overwritten)
+        
+        The rows of balances are replaced with views of the memory-mapped file, 
+        references to the previous rows (e.g. location.dispatch_plan) must be resolved again
+        """
+        data = np.memmap(file,dtype=self.data.dtype,mode='w+',shape=self.data.shape)
+        data[:] = self.data
+        self.data = data
+        self.file = file
+        for (carrier,tech),row in self.index.items():
+            self.balances[carrier][tech] = self.data[row]
+            
+    def astype(self,dtype):
+        """
+        Convert the tensor to dtype at the end of the simulation (e.g. float32 reporting precision, see 'precision' in general.json)
+        
+        Balances are read back by the step handlers during the simulation, so they are simulated in float64 and converted only once finished.
+        On-disk tensors (see to_store) are not converted, tensors of the scratch store are converted into it (see scratch.zeros).
+        References to the previous rows (e.g. location.dispatch_plan) must be resolved again
+        """
+        if self.file is not None or self.data.dtype == dtype:
+            return
+        data = scratch.zeros(self.data.shape,dtype)
+        data[...] = self.data
+        self.data = data
+        for (carrier,tech),row in self.index.items():
+            self.balances[carrier][tech] = self.data[row]
+            
+    def release(self,first_step,last_step):
+        """
+        Flush the timesteps [first_step,last_step) of an on-disk tensor (see to_store) and release their memory
+        
+        Pages are dropped from the process memory once written to disk (where supported by the OS) and are read again only if accessed,
+        so memory used by the balances depends on the released chunk length instead of the simulation length
+        """
+        scratch.release([self.data],first_step,last_step)
+
+    def row(self,carrier,tech):
+        """
+        Zero-copy view of a single channel
+        """
+        return(self.data[self.index[(carrier,tech)]])
+
+    def totals(self):
+        """
+        Sum of every channel over the whole simulation in a single vectorized operation
+
+        output: nested dictionary {carrier: {tech: float}}
+        """
+        sums = self.data.sum(axis=1)
+        return({carrier: {tech: sums[self.index[(carrier,tech)]] for tech in self.balances[carrier]} for carrier in self.balances})
+
+    def periods(self,first_steps):
+        """
+        Sum of every channel over consecutive periods (e.g. years or months) in a single vectorized operation
+
+        first_steps: list of int first step of each period (the last period ends with the simulation)
+
+        output: 2-D array, rows = channels (see .channels), columns = periods
+        """
+        return(np.add.reduceat(self.data,first_steps,axis=1))
+
+    def years(self):
+        """
+        Annual sums of every channel
+
+        output: 2-D array, rows = channels (see .channels), columns = simulation years
+        """
+        steps_year = int(c.HOURS_YEAR*c.MINUTES_HOUR/c.timestep)
+        return(self.periods(list(range(0,self.data.shape[1],steps_year))))
@@ -0,0 +1,346 @@
+"""
+BUDGET MODULE
+
+    Memory and runtime estimate of a simulation before creating the REC (dry run): only studycase.json and general.json are read,
+    no technology is created and no array is allocated, so a simulation that would not fit in memory can be refused before starting.
+
+    Projected arrays (number and bytes), as allocated by:
+            - location.__init__: power balances (one row for each demand, grid and technology balance, see balances.balance_tensor),
+                                 flows exchanged between technologies and their totals (upper bound, see balances.flow_allocation)
+            - technologies: time series arrays of each object (e.g. battery and tank LOC, PV production,
+                            electrolyzer and fuel cell tracking arrays and per-module stack arrays with ageing)
+            - REC: power balances, weather and input series read from files (see series.py)
+
+    Runtime is estimated with a per-tech cost model: seconds per simulated step of each step handler (see location.compile_dispatch_plan),
+    calibrated with profiler reports (see profiler.py and calibrate).
+
+    A memory budget [MB] can be set in general.json ("memory budget"): REC refuses to create simulations exceeding it.
+    Arrays backed by the scratch store ("scratch" in general.json, see scratch.py) are on disk and are not counted in the budget.
+"""
+
+import json
+
+itemsize = {'float64': 8, 'float32': 4, 'int32': 4, 'int8': 1, 'bool': 1}    # [bytes] of the time series, reporting series follow 'precision' in general.json, state arrays are float64
+
+balance_channels = {    # tech_name: carriers of the power balance rows created by location.__init__ (demands and grids: one row of their carrier)
+    'chp_gt':                   ['process steam','electricity','hydrogen'],
+    'chp':                      ['Thermal Output','electricity','Fuel','process heat','process hot water','process cold water'], # carriers of parameters 'Thermal Output' and 'Fuel'
+    'absorber':                 ['process heat','process hot water','process cold water'],
+    'heatpump':                 ['electricity','heating water','heating water'],   # heatpump and inertial TES
+    'boiler_el':                ['electricity','heating water'],
+    'boiler_ng':                ['gas','heating water'],
+    'boiler_h2':                ['hydrogen','heating water'],
+    'PV':                       ['electricity'],
+    'inverter':                 ['electricity'],
+    'wind':                     ['electricity'],
+    'battery':                  ['electricity'],
+    'electrolyzer':             ['electricity','oxygen','water','hydrogen'],
+    'fuel cell':                ['electricity','hydrogen','heating water'],
+    'SMR':                      ['hydrogen','gas'],
+    'mhhc compressor':          ['hydrogen','gas'],
+    'H tank':                   ['hydrogen'],
+    'HPH tank':                 ['HP hydrogen'],
+    'O2 tank':                  ['oxygen'],
+    'mechanical compressor':    ['electricity','hydrogen','HP hydrogen','cooling water'],
+    }
+
+cost_model = {  # [s/step] cost of each step handler, calibrated with calibrate() on profiler reports of the benchmark study cases (see benchmark/),
+                # profiling overhead is included, so estimates are conservative
+    'demand':                   4.4e-6,
+    'grid':                     4.8e-6,
+    'PV':                       5.3e-6,
+    'wind':                     6.2e-6,
+    'battery':                  1.2e-5,
+    'heatpump':                 6.6e-5,
+    'electrolyzer':             2.2e-4,
+    'mechanical compressor':    1.4e-4,
+    'fuel cell':                2.3e-5,
+    'H tank':                   1.0e-5,
+    'location':                 1.2e-5,     # loc_power_simulation without its handlers (balance checks)
+    'REC':                      2.0e-6,     # REC_step without the locations (collective self consumption)
+    'horizon':                  2.5e-7,     # each location of a REC made of stateless locations (see REC.REC_power_simulation_horizon)
+    # techs not included in the benchmark study cases: not calibrated
+    'HPH tank':                 1.0e-5,
+    'O2 tank':                  1.0e-5,
+    'inverter':                 1.0e-5,
+    'boiler_el':                1.0e-5,
+    'boiler_ng':                1.0e-5,
+    'boiler_h2':                1.0e-5,
+    'SMR':                      2.0e-5,
+    'mhhc compressor':          1.0e-4,
+    'chp':                      1.0e-4,
+    'chp_gt':                   1.0e-4,
+    'absorber':                 2.0e-5,
+    'other':                    5.0e-5,     # technologies not in the cost model
+    }
+
+
+def tech_series(tech_name,parameters,n,timestep):
+    """
+    Time series arrays allocated by a technology object
+
+    tech_name: str name of the technology (e.g. 'electrolyzer')
+    parameters: dictionary parameters of the technology in studycase.json
+    n: int number of timesteps of the simulation
+    timestep: int [min]
+
+    output: list of tuples (arrays, number of arrays, length, reporting, backed): reporting True for the series stored with the reporting precision,
+            False for float64 series or the dtype of the series (e.g. 'bool'), backed True for the series allocated in the scratch store if defined (see scratch.py)
+    """
+    if tech_name in ['PV','wind']:
+        return([('production',1,n,False,False)])
+    if tech_name == 'battery':
+        return([('LOC',1,n+1,False,True),('SOH, SOH_cal, SOH_cyc, D_cal, D_cyc, D_tot',6,int(n/(7*60*24/timestep))+1,False,False)])  # state of health every 7 days
+    if tech_name in ['H tank','HPH tank','O2 tank']:
+        return([('LOC',1,n+1,False,True)])
+    if tech_name == 'inverter':
+        return([('eta_story',1,n,False,False)])
+    if tech_name == 'heatpump':
+        return([('i_TES_story, satisfaction_story, cop_story',3,n,True,True)])
+    if tech_name == 'mechanical compressor':
+        return([('hyd',1,n,False,True)])
+    if tech_name == 'mhhc compressor':
+        return([('n_compressors_used, ETA_Polytropic',2,n,False,True)])
+    if tech_name == 'chp':
+        return([('load, q_th, w_el, m_fuel, l_bound, u_bound, steam, hot_w, shutdown, performances',11,n,False,True)])
+    if tech_name == 'chp_gt':
+        return([('wel, mH2CHP, minprod, maxprod, steam_chp, steam_miss',6,n,False,False)])
+    if tech_name == 'absorber':
+        return([('q_cool, q_used',2,n,False,False)])
+    if tech_name == 'electrolyzer':
+        series = [('operational_state',1,n,'int8',True)]
+        if parameters.get('stack model') == 'simple':
+            series.append(('n_modules_used, EFF, EFF_last_module',3,n,True,True))
+        else:
+            series.append(('EFF, wat_cons, EFF_last_module, wat_cons_last_module, n_modules_used, cell_currdens',6,n,True,True))
+        if parameters.get('stack model') == 'Alkaline' and parameters.get('ageing',False):   # upper bound: module histories are allocated at the first activation of each module (see history.py)
+            modules = parameters.get('number of modules',1)
+            resolution = parameters.get('stack history','full')
+            interval = 1 if resolution == 'full' else max(int(parameters.get('stack history step',1440)/timestep),1)
+            length = -(-n//interval)
+            series.append(('stack: Activation of each module',modules,n,'bool',True))
+            if resolution != 'none':
+                series.append(('stack: T, hydrogen_production, I_op, V_op of each module',4*modules,length,False,True))
+                series.append(('stack: Conversion_factor_op, Conversion_factor_rated of each module',2*modules,length,True,True))
+            if resolution == 'summary':
+                series.append(('stack: number of values of each summary interval of each module',6*modules,length,'int32',True))
+        return(series)
+    if tech_name == 'fuel cell':
+        series = [('operational_state',1,n,'int8',True)]
+        if parameters.get('stack model') == 'PEM General':
+            series.append(('VOLT, CURR_DENS',2,n,False,True))
+            series.append(('EFF, EFF_last_module, n_modules_used',3,n,True,True))
+            if parameters.get('ageing',False):
+                series.append(('stack: Activation, i_op, v_op',3,n,False,True))
+                series.append(('stack: Conversion_ratio_op, Conversion_ratio_rated, hydrogen_consumption',3,n,True,True))
+        elif parameters.get('stack model') == 'SOFC':
+            series.append(('EFF, EFF_last_module, n_modules_used',3,n,True,True))
+        return(series)
+    return([])
+
+def location_channels(system):
+    """
+    Power balance rows created by location.__init__
+
+    system: dictionary location of studycase.json
+
+    output: list of tuples (carrier, tech_name)
+    """
+    channels = []
+    for tech_name in system:
+        if tech_name.endswith(' demand'):
+            channels.append((tech_name[:-len(' demand')],tech_name))
+        elif tech_name.endswith(' grid'):
+            channels.append((tech_name[:-len(' grid')],tech_name))
+        for carrier in balance_channels.get(tech_name,[]):
+            if carrier in ['Thermal Output','Fuel']:
+                carrier = system[tech_name].get(carrier,carrier)    # chp carriers defined by its parameters
+            channels.append((carrier,tech_name))
+    channels.append(('electricity','collective self consumption'))
+    return(channels)
+
+def cost_key(tech_name):
+    """
+    Key of the cost model of a technology (demands and grids of every carrier have the same cost)
+    """
+    if tech_name.endswith(' demand'):
+        return('demand')
+    if tech_name.endswith(' grid'):
+        return('grid')
+    return(tech_name if tech_name in cost_model else 'other')
+
+def estimate(structure,general,model=None):
+    """
+    Dry run: projected arrays and runtime of a simulation, without creating the REC
+
+    structure: dictionary studycase.json
+    general: dictionary general.json
+    model: dictionary cost model [s/step] (default: cost_model, see calibrate)
+
+    output: dictionary
+        'timestep_number': int number of simulated steps
+        'arrays': int number of projected time series arrays
+        'bytes': int projected memory of the arrays [bytes] (heap arrays only)
+        'scratch bytes': int projected size of the arrays backed by the scratch store [bytes] (0 without 'scratch' in general.json)
+        'runtime [s]': float estimated simulation time of REC_power_simulation (step by step, single process)
+        'items': list of dictionaries {'location', 'tech', 'arrays' (description), 'number', 'length', 'bytes', 'scratch' (True if backed by the scratch store)}
+    """
+    model = dict(cost_model,**(model or {}))
+    timestep = int(general['timestep'])
+    n = int(general['simulation years']*365*24*60/timestep)
+    items = []
+
+    reporting_itemsize = itemsize.get(general.get('precision','float64'),itemsize['float64'])   # invalid values are reported by constants.simulation_context
+
+    scratch = bool(general.get('scratch',False))
+
+    def add(location_name,tech_name,arrays,number,length,reporting=True,backed=True):
+        size = itemsize[reporting] if isinstance(reporting,str) else reporting_itemsize if reporting else itemsize['float64']
+        items.append({'location': location_name, 'tech': tech_name, 'arrays': arrays, 'number': number, 'length': length, 'bytes': number*length*size, 'scratch': scratch and backed})
+
+    files = set()       # input series read once per process (see series.read_series)
+    stateless = True    # every location stateless: REC simulated over the whole horizon at once
+    runtime = 0.
+    for location_name in structure:
+        system = structure[location_name]
+        channels = location_channels(system)
+        add(location_name,'power balances','balance tensor rows',len(channels),n,False)   # float64 during the simulation (see REC.reporting_precision)
+
+        carriers = {}
+        for carrier,tech_name in channels:
+            if tech_name != 'collective self consumption':
+                carriers.setdefault(carrier,set()).add(tech_name)
+        flows = sum(len(techs)*(len(techs)-1) + 2*len(techs) for techs in carriers.values())   # at most one consumption and one production array for each pair of techs of the same carrier
+        add(location_name,'flows','consumption and production with totals (upper bound)',flows,n)                   # and their totals (see flow_allocation.clean)
+
+        for tech_name in system:
+            for arrays,number,length,reporting,backed in tech_series(tech_name,system[tech_name],n,timestep):
+                add(location_name,tech_name,arrays,number,length,reporting,backed)
+            if isinstance(system[tech_name],dict):
+                if system[tech_name].get('series',False) not in [False,None]:
+                    files.add(system[tech_name]['series'])
+                if tech_name in ['PV','wind']:
+                    files.add((tech_name,location_name,str(system[tech_name].get('serie'))))
+            if not (tech_name in ['PV','wind'] or tech_name.endswith(' demand') or tech_name.endswith(' grid')):
+                stateless = False
+            runtime += model[cost_key(tech_name)]
+        runtime += model['location']
+
+    add('REC','power balances','from grid, into grid, collective self consumption',3,n,False)
+    add('REC','weather','weather columns of one year (see series.weather_series)',9,8760,False,False)
+    add('REC','input series','demand and production series of one year (see series.read_series)',len(files),int(n/general['simulation years']),False,False)
+
+    if stateless:
+        runtime = model['horizon']*len(structure)*n
+    else:
+        runtime = (runtime + model['REC'])*n
+
+    return({'timestep_number': n,
+            'arrays': sum(item['number'] for item in items),
+            'bytes': sum(item['bytes'] for item in items if not item['scratch']),
+            'scratch bytes': sum(item['bytes'] for item in items if item['scratch']),
+            'runtime [s]': runtime,
+            'items': items})
+
+def report(projection):
+    """
+    Text report of an estimate (see estimate)
+    """
+    lines = [f"{'location':<24}{'tech':<24}{'arrays':>8}{'length':>12}{'MB':>12}  description (* scratch store)"]
+    for item in sorted(projection['items'],key=lambda item: -item['bytes']):
+        if item['number'] == 0:
+            continue
+        lines.append(f"{item['location']:<24}{item['tech']:<24}{item['number']:>8}{item['length']:>12}{item['bytes']/1024**2:>12.1f}  {'* ' if item['scratch'] else ''}{item['arrays']}")
+    lines.append(f"Total: {projection['arrays']} arrays, {projection['bytes']/1024**2:.1f} MB" + (f" + {projection['scratch bytes']/1024**2:.1f} MB in the scratch store" if projection['scratch bytes'] else '') +
+                 f", {projection['timestep_number']} steps, estimated simulation time {projection['runtime [s]']:.0f} s")
+    return('\n'.join(lines))
+
+def check(projection,budget):
+    """
+    Refuse a simulation exceeding the memory budget
+
+    projection: dictionary estimate of the simulation (see estimate)
+    budget: float memory budget [MB]
+    """
+    if projection['bytes'] > budget*1024**2:
+        raise MemoryError(f"Warning! The simulation would allocate {projection['bytes']/1024**2:.0f} MB of time series arrays, exceeding the memory budget of {budget:.0f} MB.\n\
+        Options to fix the problem: \n\
+            (a) - Reduce 'simulation years' or increase 'timestep' in general.json\n\
+            (b) - Reduce the number of locations or electrolyzer modules with ageing in studycase.json\n\
+            (c) - Set 'scratch' in general.json: time series are backed by files of the scratch folder instead of memory\n\
+            (d) - Increase 'memory budget' in general.json")
+
+def available_memory(meminfo='/proc/meminfo'):
+    """
+    Memory currently available for new allocations [MB]: MemAvailable of /proc/meminfo, i.e. free memory plus the page cache and
+    other memory the kernel can reclaim (None if not available on this platform, e.g. Windows and macOS: no budget is applied)
+
+    meminfo: str path of the meminfo file
+    """
+    try:
+        with open(meminfo,'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return(int(line.split()[1])/1024)      # [kB]
+    except OSError:
+        pass
+    return(None)
+
+def dry_run(structure,general,budget=None,model=None,print_=True):
+    """
+    Estimate a simulation and refuse it if it exceeds the memory budget, without creating the REC
+
+    structure: dictionary studycase.json
+    general: dictionary general.json
+    budget: float memory budget [MB] (default: general['memory budget'] if defined, otherwise the available memory, see available_memory)
+    model: dictionary cost model [s/step] (see estimate)
+    print_: bool print the report
+
+    output: dictionary estimate (see estimate), MemoryError if the budget is exceeded
+    """
+    projection = estimate(structure,general,model)
+    if print_:
+        print(report(projection))
+    if budget is None:
+        budget = general.get('memory budget',available_memory())
+    if budget is not None:
+        check(projection,budget)
+    return(projection)
+
+def calibrate(report_file,locations=1):
+    """
+    Cost model [s/step] calibrated with a profiler report (see profiler.py, REC.REC_power_simulation(profile='report.json'))
+
+    report_file: str .json profiler report, e.g. of a benchmark study case (see benchmark/)
+    locations: int number of locations of the profiled REC, used only for REC_power_simulation_horizon
+
+    output: dictionary cost model to be passed to estimate (techs not profiled keep the default cost)
+    """
+    with open(report_file,'r') as f:
+        profile = json.load(f)
+    steps = profile['steps']
+    samples = {}    # cost key: list of [s/step]
+    handlers = {}   # location: time of its handlers [s]
+    locations_time = 0.
+    for record in profile['records']:
+        if record['kind'] == 'handler':
+            name = record['name']
+            if '(' in name:
+                tech_name = name[name.index('(')+1:-1]                  # e.g. 'demand_step (electricity demand)'
+            else:
+                tech_name = name[:-len('_step')].replace('_',' ')       # e.g. 'fuel_cell_step'
+                tech_name = {'boiler el': 'boiler_el', 'boiler ng': 'boiler_ng', 'boiler h2': 'boiler_h2', 'chp gt': 'chp_gt'}.get(tech_name,tech_name)
+            samples.setdefault(cost_key(tech_name),[]).append(record['time [s]']/steps)
+            handlers[record['location']] = handlers.get(record['location'],0.) + record['time [s]']
+    for record in profile['records']:
+        if record['name'] == 'loc_power_simulation':
+            samples.setdefault('location',[]).append((record['time [s]']-handlers.get(record['location'],0.))/steps)
+            locations_time += record['time [s]']
+    for record in profile['records']:
+        if record['name'] == 'REC_step':
+            samples['REC'] = [(record['time [s]']-locations_time)/steps]
+        elif record['name'] == 'REC_power_simulation_horizon':
+            samples['horizon'] = [record['time [s]']/steps/locations]
+
+    samples.pop('other',None)
+    return({key: max(sum(values)/len(values),0.) for key,values in samples.items()})
@@ -0,0 +1,164 @@
+"""
+CHECKPOINT MODULE
+
+    Checkpoints of long simulations (see REC.REC_power_simulation): the simulation state is saved periodically in a folder
+    and the simulation can be resumed from the latest checkpoint (e.g. after a crash).
+
+    Folder content:
+        - state.pkl: step index, locations (technologies included) and REC power balances,
+                     time series arrays (last dimension = simulation steps) are replaced by references to .npy files
+        - series/key_0.npy, series/key_1.npy: two binary files for each time series array, written alternately
+
+    Checkpoints are incremental: time series are split in blocks of steps and only the blocks changed since the last time
+    the file was written (e.g. the steps simulated since the previous checkpoint) are written again.
+    state.pkl is replaced only when all the files have been written, and it never refers to the file being written,
+    so the latest checkpoint is always consistent.
+"""
+
+import os
+import zlib
+import pickle
+import numpy as np
+from core import constants as c
+
+
+class store_pickler(pickle.Pickler):
+
+    def __init__(self,file,store):
+        """
+        Pickler writing time series arrays to the .npy files of the checkpoint store instead of state.pkl
+        """
+        super().__init__(file,protocol=pickle.HIGHEST_PROTOCOL)
+        self.store = store
+
+    def persistent_id(self,obj):
+        if not isinstance(obj,np.ndarray) or obj.ndim == 0 or obj.shape[-1] not in self.store.lengths or obj.dtype.hasobject:
+            return(None)    # pickled as usual
+        base = obj.base
+        if isinstance(base,np.ndarray) and obj.ndim == 1 and base.ndim == 2 and base.flags.c_contiguous and base.shape[1] == obj.shape[0] and obj.strides[0] == base.strides[1]:
+            offset = obj.__array_interface__['data'][0] - base.__array_interface__['data'][0]
+            if offset % base.strides[0] == 0 and 0 <= offset // base.strides[0] < base.shape[0]:
+                return(('row',) + self.store.write(base) + (offset // base.strides[0],))    # row of a balance tensor: zero-copy view restored
+        return(('series',) + self.store.write(obj))
+
+
+class store_unpickler(pickle.Unpickler):
+
+    def __init__(self,file,folder):
+        """
+        Unpickler reading time series arrays from the .npy files of the checkpoint store
+        """
+        super().__init__(file)
+        self.folder = folder
+        self.arrays = {}    # key: array, arrays referenced several times are loaded once (shared references are preserved)
+
+    def persistent_load(self,pid):
+        key,generation = pid[1],pid[2]
+        if key not in self.arrays:
+            self.arrays[key] = np.load(f"{self.folder}/series/{key}_{generation}.npy")
+        if pid[0] == 'row':
+            return(self.arrays[key][pid[3]])
+        return(self.arrays[key])
+
+
+class checkpoint_store:
+
+    def __init__(self,folder,block):
+        """
+        Checkpoint store of a simulation
+
+        folder: str folder of the checkpoints
+        block: int number of steps of the blocks compared and written incrementally (e.g. the steps between two checkpoints)
+
+        output : checkpoint_store object able to:
+            save the simulation state .save(state,step)
+            resume the latest checkpoint load_checkpoint(folder) (module function)
+        """
+        self.folder = folder
+        self.block = block
+        self.lengths = (c.timestep_number,c.timestep_number+1)  # length of time series arrays (e.g. LOC arrays have an additional step)
+        self.arrays = {}    # id(array): {'array', 'key', 'generation' (file referenced by state.pkl), 'crc': [crc of the blocks of file 0, of file 1]}
+        self.written = {}   # id(array): (key,generation) of the arrays written by the current save
+        self.next_key = 0
+        if not os.path.exists(f"{folder}/series"): os.makedirs(f"{folder}/series")
+
+    def blocks(self,array):
+        """
+        Checksum of each block of steps of a time series array
+        """
+        return([zlib.crc32(np.ascontiguousarray(array[...,first_step:first_step+self.block])) for first_step in range(0,array.shape[-1],self.block)])
+
+    def write(self,array):
+        """
+        Write the changed blocks of a time series array into the file not referenced by the current state.pkl
+
+        output: tuple (key,generation) of the file
+        """
+        if id(array) in self.written:
+            return(self.written[id(array)])
+        if id(array) not in self.arrays:
+            self.arrays[id(array)] = {'array': array, 'key': self.next_key, 'generation': 1, 'crc': [None,None]} # the array is kept referenced, so its id is not reused
+            self.next_key += 1
+        entry = self.arrays[id(array)]
+        generation = 1 - entry['generation']
+        file = f"{self.folder}/series/{entry['key']}_{generation}.npy"
+
+        crc = self.blocks(array)
+        if entry['crc'][generation] is None or not os.path.exists(file):   # first write: whole array
+            data = np.lib.format.open_memmap(file,mode='w+',dtype=array.dtype,shape=array.shape)
+            data[:] = array
+        else:
+            data = np.lib.format.open_memmap(file,mode='r+')
+            for i,first_step in enumerate(range(0,array.shape[-1],self.block)):
+                if crc[i] != entry['crc'][generation][i]:
+                    data[...,first_step:first_step+self.block] = array[...,first_step:first_step+self.block]
+        data.flush()
+        del data
+
+        entry['crc'][generation] = crc
+        self.written[id(array)] = (entry['key'],generation)
+        return(self.written[id(array)])
+
+    def save(self,state,step):
+        """
+        Save a checkpoint
+
+        state: dictionary of the objects to be saved (e.g. locations and REC power balances)
+        step: int first step still to be simulated
+        """
+        self.written = {}
+        with open(f"{self.folder}/state.tmp",'wb') as f:
+            store_pickler(f,self).dump({'step': step, 'state': state})
+            pickle.dump({'block': self.block, 'crc': {entry['key']: (entry['crc'],self.written[array_id][1]) for array_id,entry in self.arrays.items() if array_id in self.written}},f) # checksums of the files, to resume incremental checkpoints
+        os.replace(f"{self.folder}/state.tmp",f"{self.folder}/state.pkl") # state.pkl refers to the files just written
+        for array_id in self.written:
+            self.arrays[array_id]['generation'] = self.written[array_id][1]
+
+
+def load_checkpoint(folder,block=None):
+    """
+    Load the latest checkpoint
+
+    folder: str folder of the checkpoints
+    block: int number of steps of the blocks of the checkpoint store to be continued (None: the store is not continued)
+
+    output: tuple (step,state,store)
+        step: int first step still to be simulated
+        state: dictionary of the saved objects
+        store: checkpoint_store of folder ready for the next checkpoints (None if block is None)
+    """
+    with open(f"{folder}/state.pkl",'rb') as f:
+        unpickler = store_unpickler(f,folder)
+        saved = unpickler.load()
+        manifest = pickle.load(f)
+
+    store = None
+    if block is not None:
+        store = checkpoint_store(folder,block)
+        for key,array in unpickler.arrays.items():
+            crc,generation = manifest['crc'][key]
+            if block != manifest['block']:
+                crc = [None,None]   # different blocks: files are written again
+            store.arrays[id(array)] = {'array': array, 'key': key, 'generation': generation, 'crc': crc}
+        store.next_key = max(manifest['crc'],default=-1) + 1
+    return(saved['step'],saved['state'],store)
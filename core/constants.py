@@ -4,12 +4,17 @@ COSTANTS MODULE
     This module contains:
             - Main phisical constants
             - Fluid properties
+            - Simulation context: variables of each simulation (timestep, timestep_number, P2E, ...) defined in general.json
             
     For the sake of non-ambiguity, all technologies implement the same values by referring to this module
             
 """
 #%%
 
+import sys
+import types
+import contextlib
+import contextvars
 #from CoolProp.CoolProp import PropsSI
 
 #%%
@@ -106,3 +111,80 @@ MINUTES_MONTH   = 60*24*30                # [min/month] Number of minutes in one
 HOURS_YEAR      = 8760                    # [h/year]    Number of hours in one year
 MINUTES_YEAR    = MINUTES_HOUR*HOURS_YEAR # [min/year]  Number of minutes in one year 
 
+
+#%%
+
+'SIMULATION CONTEXT'
+
+# The following variables depend on general.json, so they are specific to each simulation (REC) and they are stored in a simulation_context object.
+# Technologies read them as the other constants (c.timestep, c.P2E...) and get the values of the context active in the current thread (see activate),
+# so that RECs with different general.json can coexist and run concurrently in the same process.
+# Values assigned directly to the module (c.timestep = 60) are only used as a fallback when no context is active (e.g. postprocess),
+# economics.py activates the context saved with the assessed results (see economics.in_results_context).
+
+CONTEXT_VARIABLES = ['timestep','timestep_number','simulation_years','P2E','latitude','longitude','UTC','DST','reporting_dtype','scratch','curve_cache']
+
+class simulation_context:
+    
+    def __init__(self,general):
+        """
+        Variables of a single simulation
+        
+        general: dictionary general.json (see rec.py)
+        """
+        self.timestep          = int(general['timestep'])                                       # [min] timestep 
+        self.timestep_number   = int( general['simulation years']* 365*24*60 / self.timestep )  # [-] number of timestep 
+        self.simulation_years  = general['simulation years']
+        self.P2E               = self.timestep*60                                               # conversion factor from kW to kJ or from kg/s to kg
+        self.latitude          = general['latitude']
+        self.longitude         = general["longitude"]
+        self.UTC               = general["UTC time zone"]   # int 0,1,2 [UTC] es. Italy is in UTC+1 time zone EUROPEAN DATABASE
+        self.DST               = general["DST"]             # boolean, Daily saving time (fusorario)
+        self.reporting_dtype   = general.get('precision','float64')     # dtype of reporting series: power balances, flows, efficiency and performance histories
+                                                                        # state arrays (storage LOC, ageing accumulators, values read back by the models) are always float64
+        self.scratch           = None                                   # scratch_store backing the time series with files ('scratch' in general.json, created by REC, see scratch.py)
+        self.curve_cache       = general.get('curve cache',None)        # folder of the performance curves of the technologies stored on disk and reused by later constructions (see curves.cached)
+        if self.reporting_dtype not in ['float64','float32']:
+            raise ValueError(f"Warning! 'precision' in general.json is {self.reporting_dtype} \n\
+            Options to fix the problem: \n\
+                (a) - Set 'precision': 'float64' (default) or 'float32' (reporting series take half the memory, precision ~1e-7 relative)")
+
+active_context = contextvars.ContextVar('active_context',default=None)  # context of the simulation running in the current thread
+
+@contextlib.contextmanager
+def activate(context):
+    """
+    Make context the active simulation context of the current thread within a with statement
+    
+    context: simulation_context object
+    """
+    token = active_context.set(context)
+    try:
+        yield context
+    finally:
+        active_context.reset(token)
+
+def context_variable(name):
+    """
+    Module property reading name from the active simulation context, or from the fallback value if no context is active
+    """
+    def get(module):
+        context = active_context.get()
+        if context is not None:
+            return(getattr(context,name))
+        try:
+            return(module.__dict__['fallback'][name])
+        except KeyError:
+            raise AttributeError(f"module 'core.constants' has no attribute '{name}' (no simulation context is active)")
+    def set(module,value):
+        module.__dict__['fallback'][name] = value
+    return(property(get,set))
+
+class constants_module(types.ModuleType):
+    pass
+
+for name in CONTEXT_VARIABLES:
+    setattr(constants_module,name,context_variable(name))
+
+fallback = {'reporting_dtype': 'float64', 'scratch': None, 'curve_cache': None}   # compatibility fallback of the context variables (assigned as c.timestep = 60)
+sys.modules[__name__].__class__ = constants_module
@@ -0,0 +1,253 @@
+"""
+CURVES MODULE
+
+    Lookup tables of the performance curves of the technologies (e.g. electrolyzer polarization, production and efficiency curves)
+
+    Curves are computed at construction as lists of points that are not evenly spaced (e.g. hydrogen production vs power input),
+    and interpolating them with scipy interp1d costs a search and the validation of the input at each call.
+    lookup_table indexes the curve on a uniform grid once: each cell of the grid stores the few segments of the curve it overlaps,
+    so that each evaluation is an index, a search among those segments and a linear interpolation, for scalars (the simulation step) and arrays alike.
+    Values are interpolated on the original points with the same segments and formula of interp1d (linear), so results are the same of interp1d
+    also where a uniform resampling of the values would be inaccurate (e.g. steep curves at low load, repeated points).
+    Outside the range of the points the curve is extrapolated from its first and last segments as interp1d(fill_value='extrapolate'),
+    or it returns nan as interp1d(bounds_error=False).
+
+    Tables are checked against interp1d at construction, curves failing the check keep interp1d (see interpolator).
+
+    Curves only depend on a few parameters of the technology (e.g. module nominal power), but they are computed again at every construction
+    (every REC, sweep case, optimization candidate...). If 'curve cache' is set in general.json, cached stores the curves and their
+    interpolating functions in a folder after their first computation, in a file named after a hash of the parameters and of the code
+    computing them: later constructions with the same parameters load the file instead, also in other processes and simulations.
+    Files only contain arrays (numpy .npz, read without pickle) and a json description of the attributes: interpolating functions are stored
+    as their points and options and built again when loaded (see encode and decode).
+"""
+
+import os
+import json
+import hashlib
+import zipfile
+import inspect
+import tempfile
+from bisect import bisect_left
+import numpy as np
+import scipy
+from scipy.interpolate import interp1d
+from core import constants as c
+
+density = 1     # [-] grid cells per point of the curve
+
+sources = {}    # file: sha256 of the source files computing the curves, read once per process (see digest)
+
+
+class lookup_table:
+
+    def __init__(self,x,y,extrapolate=True):
+        """
+        Linear interpolation of the curve y(x) indexed on a uniform grid
+
+        x: array or list of the points of the curve (sorted at construction, as interp1d)
+        y: array or list of the values of the curve
+        extrapolate: bool True to extrapolate linearly outside the range of x, False to return nan
+
+        output : lookup_table object able to:
+            evaluate the curve at scalars (float) and arrays (array of the same shape) lookup_table(x)
+        """
+        self.reference = interp1d(x,y,bounds_error=False,fill_value='extrapolate' if extrapolate else np.nan)   # sorts the points
+        self.extrapolate = extrapolate
+        x = np.asarray(self.reference.x,dtype=float)
+        y = np.asarray(self.reference.y,dtype=float)
+        self.n = len(x)
+
+        with np.errstate(divide='ignore',invalid='ignore'):     # repeated points give inf or nan slopes, as in interp1d
+            slope = np.diff(y)/np.diff(x)
+
+        # python lists: faster than numpy arrays when indexed with scalars
+        self.x = x.tolist()
+        self.y = y.tolist()
+        self.slope = slope.tolist()
+        self.x0 = self.x[0]             # range of the curve
+        self.x1 = self.x[-1]
+
+        # uniform grid: cell k covers [x0 + k/scale, x0 + (k+1)/scale), the search is limited to the points between the edges of the
+        # previous and next cells (margin for rounding errors in the cell index)
+        if self.x1 > self.x0:
+            self.cells = max(density*self.n,1)
+            self.scale = self.cells/(self.x1-self.x0)      # [1/unit of x] cells per unit of x
+            k = np.arange(self.cells)
+            self.lo = np.searchsorted(x,self.x0 + (k-1)/self.scale,side='left').tolist()    # first point that may follow x in each cell
+            self.hi = np.searchsorted(x,self.x0 + (k+2)/self.scale,side='right').tolist()   # last point that may follow x in each cell
+        else:                       # single point: one cell
+            self.cells,self.scale = 1,0.
+            self.lo,self.hi = [0],[self.n]
+
+    def __call__(self,x):
+        if isinstance(x,(float,int)):   # scalars: python arithmetic, no numpy overhead
+            if x < self.x0:
+                if not self.extrapolate:
+                    return(np.nan)
+                j = 0
+            elif x > self.x1:
+                if not self.extrapolate:
+                    return(np.nan)
+                j = self.n-2
+            elif x != x:                # nan
+                return(np.nan)
+            else:
+                k = int((x-self.x0)*self.scale)
+                if k >= self.cells:
+                    k = self.cells-1
+                i = bisect_left(self.x,x,self.lo[k],self.hi[k])     # as interp1d: first point not lower than x is the end of the segment
+                j = min(max(i,1),self.n-1)-1
+            return(self.slope[j]*(x-self.x[j]) + self.y[j])
+
+        x = np.asarray(x,dtype=float)
+        j = np.clip(np.searchsorted(self.reference.x,x,side='left'),1,self.n-1)-1
+        with np.errstate(invalid='ignore'):
+            y = np.asarray(self.slope)[j]*(x-self.reference.x[j]) + self.reference.y[j]
+        if not self.extrapolate:
+            y = np.where((x < self.x0) | (x > self.x1),np.nan,y)
+        return(y)
+
+    def error(self,x):
+        """
+        Maximum absolute difference between the table and interp1d at the points of the curve, at the midpoints between them
+        and outside the range of the curve, evaluated both with scalars and arrays (inf if they differ in nan values)
+        """
+        x = np.unique(np.asarray(x,dtype=float))
+        span = x[-1]-x[0] if len(x) > 1 else 1.
+        check = np.concatenate([x,(x[1:]+x[:-1])/2,[x[0]-span,x[-1]+span]])
+        reference = self.reference(check)
+        table = self(check)
+        scalars = np.array([self(float(value)) for value in check])
+        if np.any(np.isnan(table) != np.isnan(reference)) or np.any(np.isnan(scalars) != np.isnan(reference)):
+            return(np.inf)
+        if np.all(np.isnan(reference)):
+            return(0.)
+        return(max(np.nanmax(np.abs(table-reference)),np.nanmax(np.abs(scalars-reference))))
+
+
+def interpolator(x,y,extrapolate=True):
+    """
+    Interpolating function of the curve y(x) used by the technologies instead of interp1d (linear)
+
+    x: array or list of the points of the curve
+    y: array or list of the values of the curve
+    extrapolate: bool True as interp1d(bounds_error=False,fill_value='extrapolate'), False as interp1d(bounds_error=False)
+
+    output: lookup_table if it gives the same values of interp1d (see lookup_table.error), interp1d otherwise
+    """
+    table = lookup_table(x,y,extrapolate)
+    with np.errstate(all='ignore'):
+        if table.error(x) > 0:
+            return(table.reference)
+    return(table)
+
+def encode(value,arrays):
+    """
+    Description of an attribute set by the curves that can be written in json, its arrays added to arrays (name: array)
+
+    Python scalars and strings are written as they are, numpy scalars with their dtype, lists, tuples and dictionaries item by item,
+    lookup_table and interp1d as their points and options. Other values (e.g. object arrays, other functions) raise TypeError
+
+    output : json-serializable description of value (see decode)
+    """
+    if value is None or isinstance(value,(bool,int,float,str)) and not isinstance(value,np.generic):
+        return(value)
+    if isinstance(value,np.generic):
+        return({'scalar': [value.dtype.str,value.item()]})
+    if isinstance(value,np.ndarray) and not value.dtype.hasobject:
+        name = f"a{len(arrays)}"
+        arrays[name] = value
+        return({'array': name})
+    if isinstance(value,(list,tuple)):
+        return({type(value).__name__: [encode(item,arrays) for item in value]})
+    if isinstance(value,dict) and all(isinstance(name,str) for name in value):
+        return({'dict': {name: encode(item,arrays) for name,item in value.items()}})
+    if isinstance(value,lookup_table):
+        return({'lookup_table': {'x': encode(value.reference.x,arrays), 'y': encode(value.reference.y,arrays), 'extrapolate': value.extrapolate}})
+    if type(value) is interp1d:
+        kind = value._kind if value._kind != 'spline' else {0: 'zero', 1: 'slinear', 2: 'quadratic', 3: 'cubic'}[value._spline.k]
+        return({'interp1d': {'x': encode(value.x,arrays), 'y': encode(value.y,arrays), 'kind': kind, 'axis': value.axis,
+                             'bounds_error': value.bounds_error, 'fill_value': encode(value.fill_value,arrays)}})
+    raise TypeError(f"{type(value).__name__} can't be stored in the curve cache")
+
+def decode(description,arrays):
+    """
+    Attribute described by encode, its arrays read from arrays (e.g. the NpzFile of the cache file)
+    """
+    if not isinstance(description,dict):
+        return(description)
+    (tag,content), = description.items()
+    if tag == 'scalar':
+        return(np.dtype(content[0]).type(content[1]))
+    if tag == 'array':
+        return(arrays[content])
+    if tag == 'list':
+        return([decode(item,arrays) for item in content])
+    if tag == 'tuple':
+        return(tuple(decode(item,arrays) for item in content))
+    if tag == 'dict':
+        return({name: decode(item,arrays) for name,item in content.items()})
+    if tag == 'lookup_table':
+        return(lookup_table(decode(content['x'],arrays),decode(content['y'],arrays),content['extrapolate']))
+    if tag == 'interp1d':       # points are already sorted
+        return(interp1d(decode(content['x'],arrays),decode(content['y'],arrays),kind=content['kind'],axis=content['axis'],copy=False,
+                        bounds_error=content['bounds_error'],fill_value=decode(content['fill_value'],arrays),assume_sorted=True))
+    raise ValueError(f"Warning! Unknown item {tag} in the curve cache")
+
+def digest(build,key):
+    """
+    Hash of the curves computed by build with parameters key: changes with the parameters, the code of build and of the constants
+    it reads, and the versions of numpy and scipy (interpolating functions built again from their options)
+    """
+    files = [inspect.getsourcefile(build),c.__file__]
+    for file in files:
+        if file not in sources:
+            with open(file,'rb') as f:
+                sources[file] = hashlib.sha256(f.read()).hexdigest()
+    content = [build.__module__,build.__qualname__,key,[sources[file] for file in files],np.__version__,scipy.__version__]
+    return(hashlib.sha256(json.dumps(content,sort_keys=True,default=str).encode()).hexdigest())
+
+def cached(obj,build,key):
+    """
+    Compute the curves of obj with build(obj), or load them from the curve cache ('curve cache' in general.json) if already computed
+    with the same key
+
+    obj: technology object (e.g. electrolyzer)
+    build: function setting the attributes of obj with its curves and interpolating functions (e.g. electrolyzer.curves_Alkaline),
+           it must only depend on the parameters in key and on constants
+    key: dictionary of the parameters of obj read by build (e.g. {'Npower': 1000})
+
+    The attributes set or changed by build are stored in the cache folder (only arrays and their json description, see encode);
+    missing or unreadable files are computed and written again, curves with attributes that can't be stored are computed at every construction
+    """
+    folder = c.curve_cache
+    if folder is None:
+        build(obj)
+        return
+    file = os.path.join(folder,f"{build.__qualname__}_{digest(build,key)[:32]}.npz")
+    try:
+        with np.load(file,allow_pickle=False) as arrays:
+            description = json.loads(str(arrays['attributes']))
+            obj.__dict__.update({name: decode(item,arrays) for name,item in description.items()})
+        return
+    except (FileNotFoundError,EOFError,zipfile.BadZipFile,ValueError,KeyError):     # missing, truncated or written by another version
+        pass
+    before = dict(obj.__dict__)
+    build(obj)
+    arrays = {}
+    try:
+        description = {name: encode(value,arrays) for name,value in obj.__dict__.items() if name not in before or value is not before[name]}
+        description = json.dumps(description)
+    except TypeError:
+        return
+    os.makedirs(folder,exist_ok=True)
+    handle,temporary = tempfile.mkstemp(dir=folder,suffix='.tmp')     # written aside and renamed: concurrent constructions never read a partial file
+    try:
+        with os.fdopen(handle,'wb') as f:
+            np.savez(f,attributes=np.array(description),**arrays)
+        os.replace(temporary,file)
+    except Exception:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
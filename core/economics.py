@@ -3,10 +3,62 @@ import pandas as pd
 import pickle
 import os
 import json
+import inspect
+import functools
 import matplotlib.pyplot as plt
 import matplotlib.font_manager as fm
 from core import constants as c
 
+def upcast(results):
+    """
+    Results of REC.save with float32 series converted to float64 (simulations with 'precision': 'float32' in general.json),
+    so that economic assessments are computed in double precision whatever the precision of the simulation
+    
+    results: nested dictionary of arrays (e.g. balances, consumption, production) updated in place
+    
+    output: results
+    """
+    for key,value in results.items():
+        if isinstance(value,dict):
+            upcast(value)
+        elif isinstance(value,np.ndarray) and value.dtype == np.float32:
+            results[key] = value.astype(float)
+    return(results)
+
+def results_context(name_studycase,folder='results'):
+    """
+    Simulation context of saved results (see constants.py): rebuilt from the general.json saved by REC.save with the results
+    
+    name_studycase: str name of the results (simulation_name of REC.save)
+    folder: str results folder
+    
+    output: simulation_context object, None if the results have been saved without it (e.g. by previous versions)
+    """
+    file = f"{folder}/pkl/general_{name_studycase}.pkl"
+    if not os.path.exists(file):
+        return(None)
+    with open(file,'rb') as f: general = pickle.load(f)
+    return(c.simulation_context(general))
+
+def in_results_context(assessment):
+    """
+    Decorator of the economic assessments: the assessment is executed with the simulation context of the assessed results active, 
+    so that timestep, simulation years... are the ones of the simulation of name_studycase and not of the last REC created.
+    The context can be given with the keyword argument context (e.g. REC.context), otherwise it is the one saved with the results
+    of name_studycase (see results_context). Results saved without context are assessed with the module fallback (see constants.py)
+    """
+    signature = inspect.signature(assessment)
+    @functools.wraps(assessment)
+    def wrapper(*args,context=None,**kwargs):
+        if context is None:
+            context = results_context(signature.bind(*args,**kwargs).arguments['name_studycase'])
+        if context is None:
+            return(assessment(*args,**kwargs))
+        with c.activate(context):
+            return(assessment(*args,**kwargs))
+    return(wrapper)
+
+@in_results_context
 def NPV(file_studycase,
         file_refcase,
         name_studycase,
@@ -36,6 +88,8 @@ def NPV(file_studycase,
         'interest rate': 0-1 [rate/year]
         'inflation rate': -1-1 [rate/year] cost evolution of each carrier
         'investment year': time horizon for which to evaluate the economic analysis (must be a multiple of simulation_year in general.json)
+    
+    context: simulation_context (optional keyword) of the results, by default the one saved with name_studycase (see in_results_context)
                         
     output: NPV of each location in 'economic_assessment.pkl'
         
@@ -54,12 +108,12 @@ def NPV(file_studycase,
     with open('Results/pkl/tech_cost_'+name_refcase+'.pkl', 'rb')       as f:        tc0    = pickle.load(f)
     
     # open energy balances of study and reference case
-    with open('Results/pkl/balances_'+name_studycase+'.pkl', 'rb')  as f:        balances   = pickle.load(f)        
-    with open('Results/pkl/balances_'+name_refcase+'.pkl', 'rb')    as f:        balances0  = pickle.load(f)
+    with open('Results/pkl/balances_'+name_studycase+'.pkl', 'rb')  as f:        balances   = upcast(pickle.load(f))        
+    with open('Results/pkl/balances_'+name_refcase+'.pkl', 'rb')    as f:        balances0  = upcast(pickle.load(f))
     
     # open detailed production balances of study and reference case
-    with open('results/pkl/production_'+name_studycase+'.pkl', 'rb')           as f: production  = pickle.load(f)
-    with open('results/pkl/production_'+name_refcase+'.pkl', 'rb')           as f: production0  = pickle.load(f)
+    with open('results/pkl/production_'+name_studycase+'.pkl', 'rb')           as f: production  = upcast(pickle.load(f))
+    with open('results/pkl/production_'+name_refcase+'.pkl', 'rb')           as f: production0  = upcast(pickle.load(f))
                  
     # check energy balances timestep and transforms the series into hourly values because the energy price is always given either on a hourly basis (electricity) or per unit of mass (gas and hydrogen)
     if c.timestep != 60:
@@ -573,6 +627,7 @@ def NPV(file_studycase,
         df3.to_csv('results/csv/NPV_'+name_economic+'.csv',index=False,sep=sep,decimal=dec)
         
                 
+@in_results_context
 def LCOH (location_name,
           structure,    
           name_studycase, 
@@ -608,6 +663,8 @@ def LCOH (location_name,
     revenues: list/tuple of str/bool defining if generated revenues from excess energy streams have to be included in the calculation. In case the carrier name(s) is/are specified. Default = False
     
     refund: boolean value defining refund cash flows have to be included in the calculation. Default = False
+    
+    context: simulation_context (optional keyword) of the results, by default the one saved with name_studycase (see in_results_context)
                         
     output:  [€/kgH2] float value of LCOH for the considered configuration
 
@@ -625,8 +682,8 @@ def LCOH (location_name,
     # open cost of componenets of studycase
     with open('results/pkl/tech_cost_'+name_studycase+'.pkl', 'rb') as f:       tc = pickle.load(f)   # !!! to be double-checked for sensitivity analysis  
     
-    with open('results/pkl/consumption_'+name_studycase+'.pkl', 'rb')           as f: consumption  = pickle.load(f) 
-    with open('results/pkl/production_'+name_studycase+'.pkl', 'rb')           as f: production  = pickle.load(f)
+    with open('results/pkl/consumption_'+name_studycase+'.pkl', 'rb')           as f: consumption  = upcast(pickle.load(f)) 
+    with open('results/pkl/production_'+name_studycase+'.pkl', 'rb')           as f: production  = upcast(pickle.load(f))
     # check for hydrogen carrier to be included in location balances
     if len(production[location_name]['hydrogen']['electrolyzer']['Tot']) != 0:    # if hydrogen dictionary has values for the considered location
         pass
@@ -1052,6 +1109,7 @@ def LCOH (location_name,
     return(LCOH)                                      
                 
 
+@in_results_context
 def LCOE (location_name,
          structure,
          name_studycase,
@@ -1102,6 +1160,8 @@ def LCOE (location_name,
                                                                 
     
     VALCOE: boolean, put True if you want to calculate the Value-Adjusted Levelized Cost of Electricity
+    
+    context: simulation_context (optional keyword) of the results, by default the one saved with name_studycase (see in_results_context)
                     
     output:  [€/kWh] float value of LCOE for the considered configuration
     """
@@ -1129,8 +1189,8 @@ def LCOE (location_name,
     with open('results/pkl/tech_cost_'+name_studycase+'.pkl', 'rb') as f:       tc = pickle.load(f)   
     
     # check for hydrogen carrier to be included in location balances
-    with open('results/pkl/consumption_'+name_studycase+'.pkl', 'rb')           as f: consumption  = pickle.load(f) 
-    with open('results/pkl/production_'+name_studycase+'.pkl', 'rb')           as f: production  = pickle.load(f)
+    with open('results/pkl/consumption_'+name_studycase+'.pkl', 'rb')           as f: consumption  = upcast(pickle.load(f)) 
+    with open('results/pkl/production_'+name_studycase+'.pkl', 'rb')           as f: production  = upcast(pickle.load(f))
 
                 
     # check for electricity carrier to be included in location balances
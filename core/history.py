@@ -0,0 +1,141 @@
+"""
+HISTORY MODULE
+
+    Per-module histories of the stacks of technologies with ageing (e.g. electrolyzer.stack)
+
+    A stack of many modules simulated for years at short timesteps would allocate several full-horizon arrays for each module,
+    written at every step also by the modules that never operate. module_history keeps instead:
+            - the state read back by the ageing model: values of the series (temperature, current, voltage...) at the current and previous step
+            - 'Activation[-]' as a bool array, allocated at the first activation of the module
+            - the recorded series (diagnostics), allocated at the first activation of the module with the resolution set by 'stack history':
+                    'full':      value at every step (default)
+                    'subsample': value at the first step of every interval
+                    'summary':   mean of the values of every interval
+                    'none':      not recorded
+              steps before the first activation of the module are not recorded (zero)
+            - 'Activation[-]' and the recorded series are always present: zero-length arrays until the first activation of the module,
+              the recorded series also after it with 'none'. Element k of a recorded series refers to step k*interval
+              (resolution and interval are attributes of the history, saved with it by REC.save)
+
+    Histories behave like the dictionaries of the modules used in the rest of the code (e.g. stack[module]['V_op[V]'], REC.save)
+    Arrays are allocated in the scratch store of the simulation if defined ('scratch' in general.json, see scratch.py)
+"""
+
+import numpy as np
+from core import scratch
+
+resolutions = ['full','subsample','summary','none']
+
+
+class module_history(dict):
+
+    def __init__(self,length,series,resolution='full',interval=1,items={}):
+        """
+        History of a single module of a stack
+
+        length: int number of timesteps of the simulation
+        series: dictionary {name: dtype} series written at each step by the model (e.g. {'I_op[A]': 'float64'})
+        resolution: str 'full', 'subsample', 'summary' or 'none' resolution of the recorded series
+        interval: int [steps] length of the intervals of 'subsample' and 'summary'
+        items: dictionary other entries of the module (e.g. 'Pol_curve_history': [])
+
+        Series are written with .set(name,step,value) and read back with .value(name,step) (current or previous step only),
+        the module is activated with .activate(step,value)
+        """
+        super().__init__(items)
+        self.length = length
+        self.types = {name: np.dtype(dtype).type for name,dtype in series.items()}
+        self.resolution = resolution
+        self.interval = interval if resolution in ['subsample','summary'] else 1
+        self.active = False     # True once the module has been activated: Activation[-] and recorded series allocated
+        self.step = -1          # last step written
+        self.now = {}           # name: value of the series written at self.step
+        self.before = {}        # name: value of the series written at self.step-1
+        self.counts = {}        # name: number of values averaged in each interval ('summary')
+        self['Activation[-]'] = np.zeros(0,dtype=bool)          # zero-length until allocated
+        for name,dtype in self.types.items():
+            self[name] = np.zeros(0,dtype=dtype)
+
+    def value(self,name,step):
+        """
+        Value of a series at step, as read from a full-resolution array (zero if not written at step)
+
+        step: int current step (self.step) or previous step (self.step-1), later steps have not been written yet
+        """
+        if step == self.step:
+            return(self.now.get(name,0.))
+        if step == self.step-1:
+            return(self.before.get(name,0.))
+        if step > self.step:
+            return(0.)
+        raise ValueError(f"Warning! Value of {name} at step {step} requested after step {self.step}: only the current and previous steps are kept in the module history")
+
+    def set(self,name,step,value):
+        """
+        Write the value of a series at step (steps are written in increasing order, a step can be written more than once)
+        """
+        if step != self.step:
+            self.before = self.now if step == self.step+1 else {}
+            self.now = {}
+            self.step = step
+        value = self.types[name](value)
+        if self.active:
+            self.record(name,step,value,name in self.now)
+        self.now[name] = value
+
+    def record(self,name,step,value,replace):
+        """
+        Record the value of a series at step with the resolution of the history
+
+        replace: bool True if a value of the same series has already been recorded at step
+        """
+        if self.resolution == 'full':
+            self[name][step] = value
+        elif self.resolution == 'subsample':
+            if step % self.interval == 0:
+                self[name][step//self.interval] = value
+        elif self.resolution == 'summary':     # running mean of the interval
+            k = step//self.interval
+            if replace:
+                self[name][k] += (value-self.now[name])/self.counts[name][k]
+            else:
+                self.counts[name][k] += 1
+                self[name][k] += (value-self[name][k])/self.counts[name][k]
+
+    def activate(self,step,value):
+        """
+        Set the activation of the module at step, allocating Activation[-] and the recorded series at the first activation
+
+        value: 1 (or True) on, 0 (or False) off
+
+        output: int change of the number of steps with the module activated (-1, 0 or 1)
+        """
+        if not self.active:
+            if not value:
+                return(0)
+            self.allocate(step)
+        previous = bool(self['Activation[-]'][step])
+        self['Activation[-]'][step] = bool(value)
+        return(int(bool(value)) - int(previous))
+
+    def activated(self,step):
+        """
+        True if the module is activated at step
+        """
+        return(self.active and bool(self['Activation[-]'][step]))
+
+    def allocate(self,step):
+        """
+        Allocate Activation[-] and the recorded series, recording the values already written at step
+        """
+        self.active = True
+        self['Activation[-]'] = scratch.zeros(self.length,dtype=bool)
+        if self.resolution == 'none':
+            return
+        length = -(-self.length//self.interval)     # intervals of the simulation
+        for name,dtype in self.types.items():
+            self[name] = scratch.zeros(length,dtype=dtype)
+            if self.resolution == 'summary':
+                self.counts[name] = scratch.zeros(length,dtype='int32')
+        for name,value in self.now.items():
+            self.record(name,step,value,False)
@@ -1,7 +1,10 @@
 import numpy as np
 import pandas as pd
+from functools import partial
 from techs import (heatpump, boiler_el, boiler_ng, boiler_h2, PV, wind, battery, H_tank, HPH_tank, O2_tank, fuel_cell, electrolyzer, inverter, chp_gt, Chp, Absorber, mhhc_compressor, Compressor, SMR)
 from core import constants as c
+from core.balances import flow_allocation, balance_tensor
+from core.series import read_series
 
 class location:
     
@@ -96,15 +99,12 @@ class location:
                                 'gas'                    : {},  # [Sm^3/s]
                                 'water'                  : {}}  # [m^3/s]
         
-        for carrier in self.consumption:
-                self.consumption[carrier] = {tech: {tech: np.zeros(c.timestep_number) for tech in self.system} for tech in self.system}
-                for tech in self.consumption[carrier]:
-                    self.consumption[carrier][tech]['Aux'] = np.zeros(c.timestep_number)
-                
-        for carrier in self.production:
-                self.production[carrier] = {tech: {tech: np.zeros(c.timestep_number) for tech in self.system} for tech in self.system}
-                for tech in self.production[carrier]:
-                    self.production[carrier][tech]['Aux'] = np.zeros(c.timestep_number)
+        # flows exchanged between technologies: arrays are allocated only for the carrier/tech pairs that actually exchange energy (see balances.py)
+        self.consumption    = flow_allocation(self.consumption,self.system,c.timestep_number,c.reporting_dtype)
+        self.production     = flow_allocation(self.production,self.system,c.timestep_number,c.reporting_dtype)
+        self.consumption_aux = {carrier: {} for carrier in self.consumption}  # energy still required by each tech in the current step
+        self.production_aux  = {carrier: {} for carrier in self.production}   # energy still available from each tech in the current step
+        
         # create the objects of present technologies and add them to the technologies dictionary
         # initialise power balance and add them to the power_balance dictionary
         
@@ -123,15 +123,15 @@ class location:
                     elif self.system[carrier+' demand']['strategy'] == 'supply-led':            # if selected strategy is supply-led and a demand series is not provided (as it should be the case) 
                         self.power_balance[carrier][carrier+' demand'] =  np.zeros(c.timestep_number)    # no demand is considered in the simulation - the system is investigated in order to assess how much hydrogen it can produce    
                     elif self.system[carrier+' demand']['strategy'] == 'demand-led':
-                        self.power_balance[carrier][carrier+' demand'] = - pd.read_csv(path+'/loads/'+system[f"{carrier} demand"]['series'])['kg/s'].to_numpy() 
+                        self.power_balance[carrier][carrier+' demand'] = - read_series(path+'/loads/'+system[f"{carrier} demand"]['series'],'kg/s') 
                 
                 # checking input files, different units for different energy carriers
                 elif carrier == 'process steam':    # [kg/s]
-                    self.power_balance[carrier][carrier+' demand']   = - pd.read_csv(path+'/loads/'+system[f"{carrier} demand"]['series'])['kg/s'].to_numpy() 
+                    self.power_balance[carrier][carrier+' demand']   = - read_series(path+'/loads/'+system[f"{carrier} demand"]['series'],'kg/s') 
                 elif carrier == 'gas':              # [Sm3/s]
-                    self.power_balance[carrier][carrier+' demand']   = - pd.read_csv(path+'/loads/'+system[f"{carrier} demand"]['series'])['Sm3/s'].to_numpy() 
+                    self.power_balance[carrier][carrier+' demand']   = - read_series(path+'/loads/'+system[f"{carrier} demand"]['series'],'Sm3/s') 
                 else:                               # [kW]
-                    self.power_balance[carrier][carrier+' demand']   = - pd.read_csv(path+'/loads/'+system[f"{carrier} demand"]['series'])['kW'].to_numpy() 
+                    self.power_balance[carrier][carrier+' demand']   = - read_series(path+'/loads/'+system[f"{carrier} demand"]['series'],'kW') 
                      
                 ### check demand series length
                 if len(self.power_balance[carrier][carrier+' demand']) == c.timestep_number:             # if demand series has the length of the entire simulation (for all years considered)
@@ -294,23 +294,60 @@ class location:
         self.power_balance['electricity']['collective self consumption']   = np.zeros(c.timestep_number) # array contribution to collective-self-consumption as producer (-) or as consumer (+)
         #self.power_balance['heating water']['collective self consumption'] = np.zeros(c.timestep_number) # array contribution to collective-self-consumption as producer (-) or as consumer (+)---heat----mio!!!
         #self.power_balance['process steam']['collective self consumption'] = np.zeros(c.timestep_number) # array contribution to collective-self-consumption as producer (-) or as consumer (+)---heat----mio!!!
+        
+        # all the power balances are stored in a single contiguous 2-D array (rows = carrier/tech channels, columns = timesteps)
+        # self.power_balance[carrier][tech] becomes a zero-copy view of the corresponding row (see balances.py)
+        self.balance_tensor = balance_tensor(self.power_balance,c.timestep_number)
+        
+        self.dispatch_plan = self.compile_dispatch_plan() # list of step handlers of present technologies ordered by priority
+        self.stateless = all(tech_name in ['PV','wind'] or tech_name in [f"{carrier} demand" for carrier in self.power_balance]+[f"{carrier} grid" for carrier in self.power_balance] for tech_name in self.system) # True if no technology has a state (storage, ageing, conversion): the whole horizon can be simulated at once (see loc_power_simulation_horizon)
    
+    def __getstate__(self):
+        """
+        Locations are pickled without their dispatch plan, which holds references to the balance arrays (see REC.REC_power_simulation_parallel)
+        """
+        state = self.__dict__.copy()
+        state.pop('dispatch_plan',None)
+        return(state)
+    
+    def __setstate__(self,state):
+        self.__dict__.update(state)
+        self.dispatch_plan = self.compile_dispatch_plan() # balance arrays are resolved again on the unpickled object
+    
+    def to_store(self,file):
+        """
+        Move the location power balances to an on-disk store (see balance_tensor.to_store and REC.REC_power_simulation_chunked)
+        
+        file: str path of the binary file
+        """
+        self.balance_tensor.to_store(file)
+        self.dispatch_plan = self.compile_dispatch_plan() # balance arrays are resolved again on the memory-mapped rows
+    
+    def reporting_precision(self):
+        """
+        Convert the power balances to the reporting precision at the end of the simulation ('precision' in general.json, see balance_tensor.astype)
+        """
+        self.balance_tensor.astype(c.reporting_dtype)
+        self.dispatch_plan = self.compile_dispatch_plan() # balance arrays are resolved again on the converted rows
+    
     ### Function to address where the energy produced is used, and vice versa
             
     def consumption_logic(self,carrier,tech_name,step):
         
         if self.power_balance[carrier][tech_name][step] < 0:   # energy consumption
-            self.consumption[carrier][tech_name][tech_name][step] = - self.power_balance[carrier][tech_name][step]    
-            self.consumption[carrier][tech_name]['Aux'][step] = - self.power_balance[carrier][tech_name][step]       # save an auxiliar variable to be updated 
+            consumption_aux = self.consumption_aux[carrier]
+            production_aux  = self.production_aux[carrier]
+            consumption_aux[tech_name] = - self.power_balance[carrier][tech_name][step]       # save an auxiliar variable to be updated 
             
             required_energy = - self.power_balance[carrier][tech_name][step]       
             for tech in self.production[carrier]:                                      
-                if self.production[carrier][tech]['Aux'][step] > 0:                     # if some tech with higher priority has available energy
-                    self.production[carrier][tech][tech_name][step] = min(required_energy,self.production[carrier][tech]['Aux'][step])     # calculate how much energy this tech can take from the higher priority one
-                    required_energy -= self.production[carrier][tech][tech_name][step]                                                     # see if there is still energy to take
-                    self.consumption[carrier][tech_name]['Aux'][step] -= self.production[carrier][tech][tech_name][step]                   # update auxiliar variable
-                    self.consumption[carrier][tech_name][tech][step] = self.production[carrier][tech][tech_name][step]                     # update consumption from the higher priority tech
-                    self.production[carrier][tech]['Aux'][step] -= self.production[carrier][tech][tech_name][step]                         # update the auxiliar variable of higher priority tech (less energy to give) 
+                if production_aux.get(tech,0) > 0:                                      # if some tech with higher priority has available energy
+                    flow = min(required_energy,production_aux[tech])                    # calculate how much energy this tech can take from the higher priority one
+                    self.production[carrier][tech][tech_name][step] = flow
+                    required_energy -= flow                                             # see if there is still energy to take
+                    consumption_aux[tech_name] -= flow                                  # update auxiliar variable
+                    self.consumption[carrier][tech_name][tech][step] = flow             # update consumption from the higher priority tech
+                    production_aux[tech] -= flow                                        # update the auxiliar variable of higher priority tech (less energy to give) 
                     
         else:
             pass
@@ -318,17 +355,19 @@ class location:
     def production_logic(self,carrier,tech_name,step):
         
         if self.power_balance[carrier][tech_name][step] > 0:   # energy production
-            self.production[carrier][tech_name][tech_name][step] = self.power_balance[carrier][tech_name][step]
-            self.production[carrier][tech_name]['Aux'][step] = self.power_balance[carrier][tech_name][step]         # save an auxiliar variable to be updated
+            consumption_aux = self.consumption_aux[carrier]
+            production_aux  = self.production_aux[carrier]
+            production_aux[tech_name] = self.power_balance[carrier][tech_name][step]         # save an auxiliar variable to be updated
             available_energy = self.power_balance[carrier][tech_name][step]
             
             for tech in self.consumption[carrier]:
-                if self.consumption[carrier][tech]['Aux'][step] > 0:                   # if some tech with higher priority has required energy     
-                    self.consumption[carrier][tech][tech_name][step] = min(available_energy,self.consumption[carrier][tech]['Aux'][step])  # calculate how much energy this tech can give to the higher priority one
-                    available_energy -= self.consumption[carrier][tech][tech_name][step]                                                   # see if there is still energy to give    
-                    self.consumption[carrier][tech]['Aux'][step] -= self.consumption[carrier][tech][tech_name][step]                       # update the auxiliar variable of higher priority tech (less energy to take)
-                    self.production[carrier][tech_name]['Aux'][step] -= self.consumption[carrier][tech][tech_name][step]                   # update production to the higher priority tech
-                    self.production[carrier][tech_name][tech][step] = self.consumption[carrier][tech][tech_name][step]                     # update auxiliar variable
+                if consumption_aux.get(tech,0) > 0:                                     # if some tech with higher priority has required energy     
+                    flow = min(available_energy,consumption_aux[tech])                  # calculate how much energy this tech can give to the higher priority one
+                    self.consumption[carrier][tech][tech_name][step] = flow
+                    available_energy -= flow                                            # see if there is still energy to give    
+                    consumption_aux[tech] -= flow                                       # update the auxiliar variable of higher priority tech (less energy to take)
+                    production_aux[tech_name] -= flow                                   # update production to the higher priority tech
+                    self.production[carrier][tech_name][tech][step] = flow              # update auxiliar variable
         
         else:
             pass
@@ -368,6 +407,31 @@ class location:
             
         return(available_hyd, producible_hyd)
     
+    def compile_dispatch_plan(self):
+        """
+        Compile the priority-ordered system into a dispatch plan, once when the location is created
+        
+        output : list of step handlers (bound methods) called by loc_power_simulation every step
+            only the technologies present in the location are included and array references are resolved here,
+            so that no string matching is needed inside the simulation loop
+        """
+        plan = []
+        for tech_name in self.system: # (which is ordered py priority)
+            if tech_name in ['PV','wind','inverter']:
+                plan.append(partial(getattr(self,tech_name+'_step'),balance=self.power_balance['electricity'][tech_name]))
+            elif hasattr(self,tech_name.replace(' ','_')+'_step'): # e.g. 'fuel cell' --> self.fuel_cell_step
+                plan.append(getattr(self,tech_name.replace(' ','_')+'_step'))
+            else:
+                ### demand and grid   
+                for carrier in self.power_balance: # for each energy carrier
+                    if tech_name == f"{carrier} demand":
+                        plan.append(partial(self.demand_step,carrier=carrier,tech_name=tech_name,balance=self.power_balance[carrier][tech_name]))
+                        break
+                    if tech_name == f"{carrier} grid":
+                        plan.append(partial(self.grid_step,carrier=carrier,tech_name=tech_name,balance=self.power_balance[carrier][tech_name],feed=self.system[tech_name]['feed'],draw=self.system[tech_name]['draw']))
+                        break
+        return(plan)
+    
     def loc_power_simulation(self,step,weather):
         """
         Simulate the location
@@ -377,527 +441,15 @@ class location:
         output : updating of location power balances
         """
         
-        pb = {} # power balance [kW] [kg/s] [Sm^3/s]
+        pb = dict.fromkeys(self.power_balance,0) # initialise power balances [kW] [kg/s] [Sm^3/s]
         
-        for carrier in self.power_balance:
-           pb[carrier] = 0 # initialise power balances 
-            
-        for tech_name in self.system: # (which is ordered py priority)
-            
-            available_hyd,producible_hyd = self.hydrogen_available_producible(step,pb)                                                                             
-        
-            if tech_name == 'PV': 
-                self.power_balance['electricity']['PV'][step] = self.technologies['PV'].use(step) # electricity produced from PV
-                pb['electricity'] += self.power_balance['electricity']['PV'][step] # elecricity balance update: + electricity produced from PV
-                self.production_logic('electricity', 'PV', step)    
-            if tech_name == 'wind': 
-                self.power_balance['electricity']['wind'][step] = self.technologies['wind'].use(step) # electricity produced from wind
-                pb['electricity'] += self.power_balance['electricity']['wind'][step] # elecricity balance update: + electricity produced from wind
-                self.production_logic('electricity', 'wind', step)                        
-            if tech_name == 'boiler_el': 
-                self.power_balance['electricity']['boiler_el'][step],\
-                self.power_balance['heating water']['boiler_el'][step] = self.technologies['boiler_el'].use(step,pb['heating water']) # elctricity consumed and heat produced from boiler_el
-                pb['electricity']   += self.power_balance['electricity']['boiler_el'][step]     # [kW] elecricity balance update: - electricity consumed by boiler_el
-                pb['heating water'] += self.power_balance['heating water']['boiler_el'][step]   # [kW] heat balance update: + heat produced by boiler_el
-                self.consumption_logic('electricity', 'boiler_el', step)
-                self.production_logic('heating water', 'boiler_el', step)
-            if tech_name == 'boiler_ng': 
-                self.power_balance['gas']['boiler_ng'][step],\
-                self.power_balance['heating water']['boiler_ng'][step] = self.technologies['boiler_ng'].use(step,pb['heating water']) # ng consumed and heat produced from boiler_ng
-                pb['gas']           += self.power_balance['gas']['boiler_ng'][step]             # [Sm3/s] gas balance update: - gas consumed by boiler_ng
-                pb['heating water'] += self.power_balance['heating water']['boiler_ng'][step]   # [kW] heat balance update: + heat produced by boiler_ng
-                self.consumption_logic('gas', 'boiler_ng', step)
-                self.production_logic('heating water', 'boiler_ng', step)
-                          
-            if tech_name == 'boiler_h2':                                                                                                                                   
-                self.power_balance['hydrogen']['boiler_h2'][step],\
-                self.power_balance['heating water']['boiler_h2'][step]        = self.technologies['boiler_h2'].use(step,pb['heating water'],available_hyd) # h2 consumed from boiler_h2 and heat produced by boiler_h2
-
-                pb['hydrogen']      += self.power_balance['hydrogen']['boiler_h2'][step]            # [kg/s] hydrogen balance update: - hydrogen consumed by boiler_h2
-                pb['heating water'] += self.power_balance['heating water']['boiler_h2'][step]       # [kW] heat balance update: + heat produced by boiler_h2                        
-                self.consumption_logic('hydrogen', 'boiler_h2', step)
-                self.production_logic('heating water', 'boiler_h2', step)
-            if tech_name == 'heatpump':     
-                self.power_balance['electricity']['heatpump'][step], self.power_balance['heating water']['heatpump'][step], self.power_balance['heating water']['inertial TES'][step] = self.technologies['heatpump'].use(weather['temp_air'][step],pb['heating water'],pb['electricity'],step) 
-             
-                pb['electricity'] += self.power_balance['electricity']['heatpump'][step] # electricity absorbed by heatpump
-                self.consumption_logic('electricity', 'heatpump', step)                                                       
-                self.power_balance['electricity']['electricity demand'][step] += self.power_balance['electricity']['heatpump'][step] # add heatpump demand to 'electricity demand'
-                pb['heating water'] += self.power_balance['heating water']['inertial TES'][step] + self.power_balance['electricity']['heatpump'][step] # heat or cool supplied by HP or inertial TES
-                self.production_logic('heating water', 'heatpump', step)
-                
-            if tech_name == 'battery':
-                if self.technologies['battery'].collective == 0: 
-                    self.power_balance['electricity']['battery'][step] = self.technologies['battery'].use(step,pb['electricity']) # electricity absorbed(-) or supplied(+) by battery
-                    pb['electricity'] += self.power_balance['electricity']['battery'][step]  # electricity balance update: +- electricity absorbed or supplied by battery
-                    self.battery_available_electricity = max(0,(self.technologies['battery'].LOC[step+1]+self.technologies['battery'].max_capacity*(1-self.technologies['battery'].DoD)-self.technologies['battery'].used_capacity) / c.P2E)  # electricity available in the battery
-                    if self.power_balance['electricity']['battery'][step] >= 0:
-                        self.production_logic('electricity', 'battery', step)
-                    elif self.power_balance['electricity']['battery'][step] <= 0:
-                        self.consumption_logic('electricity', 'battery', step)
-                        
-            if tech_name == 'chp_gt':
-                if available_hyd > 0:
-                    use = self.technologies['chp_gt'].use(step,weather['temp_air'][step],pb['process steam'],available_hyd)     # saving chp_gt working parameters for the current timeframe
-                    self.power_balance['process steam']['chp_gt'][step] = use[0]   # produced steam (+)
-                    self.power_balance['electricity']['chp_gt'][step] =   use[1]   # produced electricity (+)
-                    self.power_balance['hydrogen']['chp_gt'][step] =      use[2]   # hydrogen required by chp system to run (-)  
-    
-                pb['hydrogen'] += self.power_balance['hydrogen']['chp_gt'][step]            
-                pb['process steam'] += self.power_balance['process steam']['chp_gt'][step]    
-                pb['electricity'] += self.power_balance['electricity']['chp_gt'][step] 
-                self.consumption_logic('hydrogen', 'chp_gt', step)
-                self.production_logic('electricity', 'chp_gt', step)
-                self.production_logic('process steam', 'chp_gt',step)           
-            if tech_name == 'chp':
-                strategy    = self.technologies['chp'].strategy     # thermal-load follow or electric-load follow 
-                coproduct   = self.technologies['chp'].coproduct    # process co-product depending on the  approache chosen above 
-                if self.system['chp']['Fuel'] == 'hydrogen':
-                    use = self.technologies['chp'].use(step,weather['temp_air'][step],pb[strategy],pb[coproduct], available_hyd)     # saving chp working parameters for the current timeframe
-                else:
-                    use = self.technologies['chp'].use(step,weather['temp_air'][step],pb[strategy],pb[coproduct])                    # saving chp working parameters for the current timeframe
-                
-                self.power_balance[self.technologies['chp'].th_out]['chp'][step]  = use[0]   # produced thermal output (+) (steam/hot water)
-                self.power_balance['electricity']['chp'][step]                    = use[1]   # produced electricity (+)
-                self.power_balance[self.technologies['chp'].fuel]['chp'][step]    = use[2]   # fuel required by chp system to run (-)  
-                self.power_balance['process heat']['chp'][step]                   = use[3]   # process heat produced by chp system (+)  
-                self.power_balance['process hot water']['chp'][step]              = use[4]   # process heat produced by chp system (+)  
-
-                pb[self.technologies['chp'].fuel] += self.power_balance[self.technologies['chp'].fuel]['chp'][step]            
-                pb[self.technologies['chp'].th_out] += self.power_balance[self.technologies['chp'].th_out]['chp'][step]    
-                pb['electricity'] += self.power_balance['electricity']['chp'][step] 
-                pb['process heat'] += self.power_balance['process heat']['chp'][step]             
-                self.consumption_logic(self.technologies['chp'].fuel, 'chp', step)
-                self.production_logic(self.technologies['chp'].th_out, 'chp', step)
-                self.production_logic('electricity', 'chp', step)
-                self.production_logic('electricity', 'process heat', step)                                                                                  
-            if tech_name == 'absorber':  
-                self.power_balance['process cold water']['absorber'][step],self.power_balance['process heat']['absorber'][step] = self.technologies['absorber'].use(step,pb['process heat'])  # cold energy produced via the absorption cycle (+)
-                pb['process heat'] += self.power_balance['process heat']['absorber'][step]             
-                pb['process cold water'] += self.power_balance['process cold water']['absorber'][step]
-                self.consumption_logic('process heat', 'absorber', step)
-                self.production_logic('process cold water', 'absorber', step)                                                                          
-                
-            if tech_name == 'electrolyzer':
-                
-                if step == 0:
-                    self.battery_available_electricity = 0
-                    
-                if 'battery' in self.system and 'hydrogen demand' in self.system:
-                    hyd_dem_to_be_satisfied = pb['hydrogen']
-                    n_modules_necessary = int(-hyd_dem_to_be_satisfied/self.technologies['electrolyzer'].maxh2prod)+1
-                    El_Power_necessary = self.technologies['electrolyzer'].Npower*n_modules_necessary
-                    El_available_bat = self.battery_available_electricity*self.technologies['battery'].etaD
-                    if pb['electricity'] >= El_Power_necessary:
-                        el_input = pb['electricity']
-                    else:
-                        if (pb['electricity'] + El_available_bat) < El_Power_necessary:
-                            el_input = pb['electricity'] + El_available_bat
-                        else:
-                            El_from_battery = El_Power_necessary - pb['electricity']
-                            el_input = pb['electricity'] + El_from_battery 
-                else:
-                    el_input = pb['electricity'] 
-                if self.technologies['electrolyzer'].strategy == 'hydrogen-first' and self.technologies['electrolyzer'].only_renewables == True: # electrolyzer activated when renewable energy is available
-                    if pb['electricity'] > 0: # electrolyzer activated only when renewable energy is available
-                        if producible_hyd > 0:
-                        
-                            self.power_balance['hydrogen']['electrolyzer'][step],   \
-                            self.power_balance['electricity']['electrolyzer'][step],\
-                            self.power_balance['oxygen']['electrolyzer'][step],     \
-                            self.power_balance['water']['electrolyzer'][step]        = self.technologies['electrolyzer'].use(step,storable_hydrogen=producible_hyd,p=el_input,Text=weather['temp_air'][step])      # [:2] # hydrogen supplied by electrolyzer(+) # electricity absorbed by the electorlyzer(-) 
-                            
-                            pb['hydrogen']      += self.power_balance['hydrogen']['electrolyzer'][step]
-                            pb['electricity']   += self.power_balance['electricity']['electrolyzer'][step]
-                            pb['oxygen']        += self.power_balance['oxygen']['electrolyzer'][step]
-                            pb['water']         += self.power_balance['water']['electrolyzer'][step]
-                            
-                elif self.technologies['electrolyzer'].strategy == 'hydrogen-first' and self.technologies['electrolyzer'].only_renewables == False: # electrolyzer working both with energy from renewables and from grid, but giving precedence to electricity from renewables
-
-                    if producible_hyd > 0:
-                        self.power_balance['hydrogen']['electrolyzer'][step],   \
-                        self.power_balance['electricity']['electrolyzer'][step],\
-                        self.power_balance['oxygen']['electrolyzer'][step],     \
-                        self.power_balance['water']['electrolyzer'][step]        = self.technologies['electrolyzer'].use(step,storable_hydrogen=producible_hyd,p=el_input,Text=weather['temp_air'][step])      # hydrogen [kg/s] and oxygen [kg/s] produced by the electrolyzer (+) electricity [kW] and water absorbed [m^3/s] (-) 
-
-                    # evaluating need for grid interaction based on available hydrogen
-                    if (available_hyd/(c.timestep*60) + self.power_balance['hydrogen']['electrolyzer'][step]) < -pb['hydrogen']:    # if hydrogen produced from electrolyzer with only renewables and the tank is not sufficient to cover the hydrogen demand in this timestep --> need for grid interaction
-                        hyd_from_ele = (-pb['hydrogen']) - available_hyd/(c.timestep*60)                                            # [kg/s] the electrolyzer is required to produce the amount of hydrogen the tank can't cover (thus using also grid electricity) 
-                        self.power_balance['hydrogen']['electrolyzer'][step],   \
-                        self.power_balance['electricity']['electrolyzer'][step],\
-                        self.power_balance['oxygen']['electrolyzer'][step],     \
-                        self.power_balance['water']['electrolyzer'][step]        = self.technologies['electrolyzer'].use(step,hydrog=hyd_from_ele,Text=weather['temp_air'][step])      # hydrogen [kg/s] and oxygen [kg/s] produced by the electrolyzer (+) electricity [kW] and water absorbed [m^3/s] (-) 
-
-                        # Evaluating the need for grid interaction based on the minimum load of each module: If the electrolyzer operates below its minimum load, it won’t produce hydrogen, and the tank won’t meet the demand. Therefore, the electrolyzer must reach its minimum load, thus the tank won't be completely emptied.
-                        if self.power_balance['hydrogen']['electrolyzer'][step] == 0: # no hydrogen has been produced
-                            self.power_balance['hydrogen']['electrolyzer'][step],   \
-                            self.power_balance['electricity']['electrolyzer'][step],\
-                            self.power_balance['oxygen']['electrolyzer'][step],     \
-                            self.power_balance['water']['electrolyzer'][step]        = self.technologies['electrolyzer'].use(step,storable_hydrogen=producible_hyd,p=self.technologies['electrolyzer'].MinInputPower,Text=weather['temp_air'][step])      # hydrogen [kg/s] and oxygen [kg/s] produced by the electrolyzer (+) electricity [kW] and water absorbed [m^3/s] (-)                                                                                                                                                                                                                                                                                                                                                       
-                    # evaluating need for grid interaction based on imposed constant minimum operational load. Lower functoning boundary
-                    if self.system['electrolyzer']['minimum_load'] and abs(self.power_balance['electricity']['electrolyzer'][step]) < self.technologies['electrolyzer'].min_partial_load:
-                        self.power_balance['hydrogen']['electrolyzer'][step],   \
-                        self.power_balance['electricity']['electrolyzer'][step],\
-                        self.power_balance['oxygen']['electrolyzer'][step],     \
-                        self.power_balance['water']['electrolyzer'][step]        = self.technologies['electrolyzer'].use(step,storable_hydrogen=producible_hyd,p=self.technologies['electrolyzer'].min_partial_load,Text=weather['temp_air'][step])      # [:2] # hydrogen supplied by electrolyzer(+) # electricity absorbed by the electorlyzer(-) 
-
-                    pb['hydrogen']      += self.power_balance['hydrogen']['electrolyzer'][step]
-                    pb['electricity']   += self.power_balance['electricity']['electrolyzer'][step]
-                    pb['oxygen']        += self.power_balance['oxygen']['electrolyzer'][step]
-                    pb['water']         += self.power_balance['water']['electrolyzer'][step]
-                
-                elif self.technologies['electrolyzer'].strategy == 'full-time': # electrolyzer working continuously at each time step of the simulation
-                                                                                                                                                                       
-                    self.power_balance['hydrogen']['electrolyzer'][step],     \
-                    self.power_balance['electricity']['electrolyzer'][step],  \
-                    self.power_balance['oxygen']['electrolyzer'][step],       \
-                    self.power_balance['water']['electrolyzer'][step]         = self.technologies['electrolyzer'].use(step,storable_hydrogen=producible_hyd,Text=weather['temp_air'][step])      # [:2] # hydrogen supplied by electrolyzer(+) # electricity absorbed by the electorlyzer(-) 
-                
-                    pb['hydrogen']      += self.power_balance['hydrogen']['electrolyzer'][step]
-                    pb['electricity']   += self.power_balance['electricity']['electrolyzer'][step]
-                    pb['oxygen']        += self.power_balance['oxygen']['electrolyzer'][step]
-                    pb['water']         += self.power_balance['water']['electrolyzer'][step]
-                        
-                if 'mechanical compressor' in self.system:
-                    pass                                         #if there is mechanical compressor the electrolyzer is updated there
-                else:                        
-                    self.consumption_logic('electricity', 'electrolyzer', step)
-                    self.consumption_logic('water', 'electrolyzer', step)
-                    self.production_logic('hydrogen', 'electrolyzer', step) 
-                    self.production_logic('oxygen', 'electrolyzer', step)                                                                      
-   
-                if step == (c.timestep_number - 1) and ('hydrogen demand' in self.system or 'HP hydrogen demand' in self.system):
-                    if self.system[self.hydrogen_demand+' demand']['strategy'] == 'supply-led':  # activates only at the final step of simulation
-                        self.constant_flow = sum(self.power_balance['hydrogen']['electrolyzer'])/c.timestep_number # [kg/s] constant hydrogen output based on the total production
-                    
-            if tech_name == 'mhhc compressor':   #!!! WIP to be modified by Andrea
-                if self.power_balance['hydrogen']['electrolyzer'][step] > 0:
-                    storable_hydrogen = producible_hyd                
-                    if storable_hydrogen>self.technologies['H tank'].max_capacity*0.00001:
-                        self.power_balance['hydrogen']['mhhc compressor'][step], self.power_balance['gas']['mhhc compressor'][step] = self.technologies['mhhc compressor'].use(step,self.power_balance['hydrogen']['electrolyzer'][step],storable_hydrogen) # hydrogen compressed by the compressor (+) and heat requested to make it work expressed as heating water need (-) 
-                        pb['gas'] += self.power_balance['gas']['mhhc compressor'][step]
-                        #pb['hydrogen']=...self.power_balance['hydrogen']['mhhc compressor'][step]?? come ne tengo conto di quanto comprimo? in linea teorica ne dovrei sempre comprimere esattamente quanto me ne entra perchè il controllo sullo sotrable hydrogen lho gia fatto nell'elettrolizzatore'
-            
-                        self.consumption_logic('gas', 'mhhc compressor', step)                                                                              
-            if tech_name == 'mechanical compressor':   
-                if 'HPH tank' not in self.system:
-                    if 'O2 tank' not in self.system:
-                        if "electricity grid" in self.system and self.system["electricity grid"]["draw"] and self.technologies['mechanical compressor'].only_renewables == False:
-                            if 'hydrogen demand' in self.system:
-                                massflow = np.max(0,self.power_balance['hydrogen']['electrolyzer'][step] + self.power_balance['hydrogen']['hydrogen demand'][step])
-                            else:
-                                massflow = np.max(0,self.power_balance['hydrogen']['electrolyzer'][step])
-                            self.power_balance['hydrogen']['mechanical compressor'][step], \
-                            self.power_balance['electricity']['mechanical compressor'][step] = self.technologies['mechanical compressor'].use(step,massflowrate= massflow)[:2] # hydrogen compressed by the compressor (+) and electricity consumption (-) 
-                            
-                            pb['electricity']   += self.power_balance['electricity']['mechanical compressor'][step]
-                            self.consumption_logic('electricity', 'electrolyzer', step)
-                            self.consumption_logic('water', 'electrolyzer', step)
-                            self.production_logic('hydrogen', 'electrolyzer', step) 
-                            self.production_logic('oxygen', 'electrolyzer', step)
-                            
-                            self.consumption_logic('electricity', 'mechanical compressor', step)                                                                                             
-
-                        elif "electricity grid" not in self.system or self.technologies['mechanical compressor'].only_renewables == True:  #self.system["electricity grid"]["draw"] == False:   # if the system is configurated as fully off-grid, relying only on RES production
-                            if self.power_balance['hydrogen']['electrolyzer'][step] > 0 :  # if hydrogen has been produced by the electrolyzer and electricity is available in the system
-                                if 'hydrogen demand' in self.system:
-                                    demand = self.power_balance['hydrogen']['hydrogen demand'][step] # hydrogen demand at timestep h
-                                    massflow = np.max([0,self.power_balance['hydrogen']['electrolyzer'][step] + demand] )  # hydrogen mass flow rate to be compressed and stored in hydrogen tank
-                                else:           # no hydrogen demand
-                                    demand = 0  # hydrogen demand at timestep h
-                                    massflow = self.power_balance['hydrogen']['electrolyzer'][step]  # in case no hydrogen demand is present all produced hydrogen is compressed and flows through the hydrogne tank
-                                a = self.technologies['mechanical compressor'].use(step,massflowrate= massflow)[1] # [kW] compressor energy consumption for a certain h2 mass flow rate
-                                if abs(a) <=pb['electricity'] or a == 0:     # there is enough renewable electricity to power the compressor 
-                                    self.power_balance['hydrogen']['mechanical compressor'][step],    \
-                                    self.power_balance['electricity']['mechanical compressor'][step], \
-                                    self.power_balance['cooling water']['mechanical compressor'][step]= self.technologies['mechanical compressor'].use(step,massflowrate= massflow) # hydrogen compressed by the compressor (+) and electricity consumption (-) 
-                                    
-                                    pb['electricity']   += self.power_balance['electricity']['mechanical compressor'][step]
-                                    
-                                    self.consumption_logic('electricity', 'electrolyzer', step)
-                                    self.consumption_logic('water', 'electrolyzer', step)
-                                    self.production_logic('hydrogen', 'electrolyzer', step) 
-                                    self.production_logic('oxygen', 'electrolyzer', step)
-                                    self.consumption_logic('electricity', 'mechanical compressor', step)                                                                                                     
-                                elif abs(a) >pb['electricity']:    # if available electricity in the system is not enough to power the compression system - enter the loop to reallocate the energy among the components
-                                    a1  = 1     # % of available electricity fed to the electrolyzer
-                                    a11 = 0     # % of available electricity fed to the compressor
-                                    en  =pb['electricity'] + abs(self.power_balance['electricity']['electrolyzer'][step]) # [kW] electric energy available at time h before entering the electorlyzer
-                                    el  = self.power_balance['electricity']['electrolyzer'][step]
-                                    hy  = self.power_balance['hydrogen']['electrolyzer'][step]
-                                    ox  = self.power_balance['oxygen']['electrolyzer'][step]
-                                    wa  = self.power_balance['water']['electrolyzer'][step]
-                                    
-                                    # Iteration parameters
-                                    i   = 0             # initializing iteration count
-                                    maxiter = 10000     # max number of iterations allowed
-                                    abs_err = 0.00001   # absolute error allowed
-                                    
-                                    while a1 >= 0:       # while loop necessary to iterate in the redistribution of renewable electricity to satisfy both electrolyzer and compressor demand
-                                        hydrogen_ele,  \
-                                        electricity_ele = self.technologies['electrolyzer'].use(step,storable_hydrogen=producible_hyd,p=a1*en)[:2]  # [kg] of produced H2 and [kW] of consumed electricity for the given energy input  
-                                        massflow = np.max([0, hydrogen_ele + demand])
-                                        a = -self.technologies['mechanical compressor'].use(step,massflowrate= massflow)[1] # [kW] compressor energy consumption for a certain h2 mass flow rate
-                                        b1 = a/en
-                                        a11 = 1-b1
-                                        i += 1      # updating iteration count
-                                    
-                                        if abs(a1-a11) < abs_err or i > maxiter:    # strict tolerance for convergence 
-                                            break
-                                        else: 
-                                            a1=a11  
-                                            
-                                    # Electorlyzer balances update and overwriting
-                                    self.power_balance['hydrogen']['electrolyzer'][step],   \
-                                    self.power_balance['electricity']['electrolyzer'][step],\
-                                    self.power_balance['oxygen']['electrolyzer'][step],     \
-                                    self.power_balance['water']['electrolyzer'][step]        = self.technologies['electrolyzer'].use(step,storable_hydrogen=producible_hyd,p=a1*en)      # [:2] # hydrogen supplied by electrolyzer(+) # electricity absorbed by the electorlyzer(-) 
-                                    
-                                    pb['hydrogen']      += self.power_balance['hydrogen']['electrolyzer'][step]    - hy
-                                    pb['electricity']   += self.power_balance['electricity']['electrolyzer'][step] - el
-                                    pb['oxygen']        += self.power_balance['oxygen']['electrolyzer'][step]      - ox
-                                    pb['water']         += self.power_balance['water']['electrolyzer'][step]       + wa
-    
-                                    self.consumption_logic('electricity', 'electrolyzer', step)
-                                    self.consumption_logic('water', 'electrolyzer', step)
-                                    self.production_logic('hydrogen', 'electrolyzer', step) 
-                                    self.production_logic('oxygen', 'electrolyzer', step)                                                                                     
-                                    # Compressor balances update and overwriting
-                                    self.power_balance['hydrogen']['mechanical compressor'][step],    \
-                                    self.power_balance['electricity']['mechanical compressor'][step], \
-                                    self.power_balance['cooling water']['mechanical compressor'][step]   = self.technologies['mechanical compressor'].use(step,massflowrate= massflow) # hydrogen compressed by the compressor (+) and electricity consumption (-) 
-    
-                                    pb['electricity']   += self.power_balance['electricity']['mechanical compressor'][step]
-                                    self.consumption_logic('electricity', 'mechanical compressor', step)
-                                else:  # if no hydrogen has been produced at time h
-                                    self.power_balance['hydrogen']['mechanical compressor'][step]     = 0
-                                    self.power_balance['electricity']['mechanical compressor'][step]  = 0
-                                    
-                    elif 'O2 tank' in self.system:   # simplified approach for oxygen compression. To be updated
-                        massflow_tot = (self.power_balance['hydrogen']['electrolyzer'][step])+(self.power_balance['oxygen']['electrolyzer'][step])
-                        if "electricity grid" in self.system and self.system["electricity grid"]["draw"]:
-                            self.power_balance['hydrogen']['mechanical compressor'][step], \
-                            self.power_balance['electricity']['mechanical compressor'][step] = self.technologies['mechanical compressor'].use(step,massflowrate = massflow_tot )[:2] # hydrogen compressed by the compressor (+) and electricity consumption (-) 
-                            
-                            pb['electricity']   += self.power_balance['electricity']['mechanical compressor'][step]
-                            self.consumption_logic('electricity', 'electrolyzer', step)
-                            self.consumption_logic('water', 'electrolyzer', step)
-                            self.production_logic('hydrogen', 'electrolyzer', step) 
-                            self.production_logic('oxygen', 'electrolyzer', step)
-                            self.consumption_logic('electricity', 'mechanical compressor', step)                                                                           
-                    
-                        elif "electricity grid" not in self.system or self.system["electricity grid"]["draw"] == False:   # if the system is configurated as fully off-grid, relying only on RES production
-                            if self.power_balance['hydrogen']['electrolyzer'][step] > 0 :  # if hydrogen has been produced by the electrolyzer and electricity is available in the system
-                                a = self.technologies['mechanical compressor'].use(step,massflowrate = massflow_tot)[1] # [kW] compressor energy consumption for a certain h2 mass flow rate
-                                if abs(a) <=pb['electricity'] or a == 0:    # there is enough renewable electricity to power the compressor 
-                                    self.power_balance['hydrogen']['mechanical compressor'][step],    \
-                                    self.power_balance['electricity']['mechanical compressor'][step], \
-                                    self.power_balance['cooling water']['mechanical compressor'][step]= self.technologies['mechanical compressor'].use(step,massflowrate= massflow_tot) # hydrogen compressed by the compressor (+) and electricity consumption (-) 
-                                    
-                                    pb['electricity']   += self.power_balance['electricity']['mechanical compressor'][step]
-                                    self.consumption_logic('electricity', 'electrolyzer', step)
-                                    self.consumption_logic('water', 'electrolyzer', step)
-                                    self.production_logic('hydrogen', 'electrolyzer', step) 
-                                    self.production_logic('oxygen', 'electrolyzer', step)
-                                    self.consumption_logic('electricity', 'mechanical compressor', step)                                                                 
-                                    
-                                elif abs(a) >pb['electricity']:    # if available electricity in the system is not enough to power the compression system - enter the loop to reallocate the energy among the components
-                                    a1  = 1     # % of available electricity fed to the electrolyzer
-                                    a11 = 0     # % of available electricity fed to the compressor
-                                    en  =pb['electricity'] + abs(self.power_balance['electricity']['electrolyzer'][step]) # [kW] electric energy available at time h before entering the electorlyzer
-                                    el  = self.power_balance['electricity']['electrolyzer'][step]
-                                    hy  = self.power_balance['hydrogen']['electrolyzer'][step]
-                                    ox  = self.power_balance['oxygen']['electrolyzer'][step]
-                                    wa  = self.power_balance['water']['electrolyzer'][step]
-                                    
-                                    # Iteration parameters
-                                    i   = 0             # initializing iteration count
-                                    maxiter = 10000     # max number of iterations allowed
-                                    abs_err = 0.00001   # absolute error allowed
-                                    
-                                    while a1 >= 0:       # while loop necessary to iterate in the redistribution of renewable electricity to satisfy both electrolyzer and compressor demand
-                                        hydrogen_ele,  \
-                                        electricity_ele = self.technologies['electrolyzer'].use(step,a1*en,producible_hyd)[:2]  # [kg] of produced H2 and [kW] of consumed electricity for the given energy input  
-                                        a = -self.technologies['mechanical compressor'].use(step,massflowrate= hydrogen_ele + hydrogen_ele*7.93)[1] # [kW] compressor energy consumption for a certain h2 mass flow rate
-                                        b1 = a/en
-                                        a11 = 1-b1
-                                        i += 1      # updating iteration count
-                                    
-                                        if abs(a1-a11) < abs_err or i > maxiter:    # strict tolerance for convergence 
-                                            break
-                                        else: 
-                                            a1=a11    
-                                    
-                                    # Electorlyzer balances update and overwriting
-                                    self.power_balance['hydrogen']['electrolyzer'][step],   \
-                                    self.power_balance['electricity']['electrolyzer'][step],\
-                                    self.power_balance['oxygen']['electrolyzer'][step],     \
-                                    self.power_balance['water']['electrolyzer'][step]        = self.technologies['electrolyzer'].use(step,a1*en,producible_hyd)      # [:2] # hydrogen supplied by electrolyzer(+) # electricity absorbed by the electorlyzer(-) 
-                                    
-                                    pb['hydrogen']      += self.power_balance['hydrogen']['electrolyzer'][step]    - hy
-                                    pb['electricity']   += self.power_balance['electricity']['electrolyzer'][step] - el
-                                    pb['oxygen']        += self.power_balance['oxygen']['electrolyzer'][step]      - ox
-                                    pb['water']         += self.power_balance['water']['electrolyzer'][step]       + wa
-    
-                                    self.consumption_logic('electricity', 'electrolyzer', step)
-                                    self.consumption_logic('water', 'electrolyzer', step)
-                                    self.production_logic('hydrogen', 'electrolyzer', step) 
-                                    self.production_logic('oxygen', 'electrolyzer', step)                                                   
-                                    # Compressor balances update and overwriting
-                                    self.power_balance['hydrogen']['mechanical compressor'][step],    \
-                                    self.power_balance['electricity']['mechanical compressor'][step], \
-                                    self.power_balance['cooling water']['mechanical compressor'][step]   = self.technologies['mechanical compressor'].use(step,massflowrate= massflow) # hydrogen compressed by the compressor (+) and electricity consumption (-) 
-    
-                                    pb['electricity']   += self.power_balance['electricity']['mechanical compressor'][step]
-                                    self.consumption_logic('electricity', 'mechanical compressor', step)
-                                 
-                                else:  # if no hydrogen has been produced at time h
-                                    self.power_balance['hydrogen']['mechanical compressor'][step]     = 0
-                                    self.power_balance['electricity']['mechanical compressor'][step]  = 0
-                        
-                             
-                
-                if 'H tank' in self.system and 'HPH tank' in self.system:
-                    # self.power_balance['hydrogen']['H tank'][step] = self.technologies['H tank'].use(h,pb['hydrogen'])
-                    #pb['hydrogen'] += self.power_balance['hydrogen']['H tank'][step]
-                    available_hyd_lp = self.technologies['H tank'].LOC[step] + self.technologies['H tank'].max_capacity - self.technologies['H tank'].used_capacity
-                    storable_hydrogen_hp = self.technologies['HPH tank'].max_capacity-self.technologies['HPH tank'].LOC[step]
-                    
-                    if self.technologies['HPH tank'].LOC[step] == self.technologies['HPH tank'].max_capacity:  # if High-Pressure-Tank is full 
-                        self.power_balance['HP hydrogen']['mechanical compressor'][step]      = 0     
-                        self.power_balance['electricity']['mechanical compressor'][step]      = 0    
-                        self.power_balance['cooling water']['mechanical compressor'][step]    = 0
-                        self.power_balance['hydrogen']['mechanical compressor'][step]         = 0
-                        
-                        pb['HP hydrogen']    += 0
-                        pb['electricity']    += 0   # compressor not working
-                        pb['hydrogen']       += 0   # compressor not working
-                        self.consumption_logic('electricity', 'electrolyzer', step)
-                        self.consumption_logic('water', 'electrolyzer', step)
-                        self.production_logic('hydrogen', 'electrolyzer', step) 
-                        self.production_logic('oxygen', 'electrolyzer', step)                                                               
-                    else:  # if there is enough room available in the High Pressure Tank, the compressor is activated
-                        self.power_balance['HP hydrogen']['mechanical compressor'][step],     \
-                        self.power_balance['electricity']['mechanical compressor'][step],     \
-                        self.power_balance['cooling water']['mechanical compressor'][step]    = self.technologies['mechanical compressor'].use(step, available_hyd_lp=available_hyd_lp ,storable_hydrogen_hp=storable_hydrogen_hp) # hydrogen supplied by H tank (+) and electricity absorbed(-) 
-                        self.power_balance['hydrogen']['mechanical compressor'][step] = - self.power_balance['HP hydrogen']['mechanical compressor'][step]
-                        
-                        pb['HP hydrogen'] += self.power_balance['HP hydrogen']['mechanical compressor'][step]
-                        pb['hydrogen']    += self.power_balance['hydrogen']['mechanical compressor'][step]
-                        pb['electricity'] += self.power_balance['electricity']['mechanical compressor'][step]
-                        self.consumption_logic('electricity', 'electrolyzer', step)
-                        self.consumption_logic('water', 'electrolyzer', step)
-                        self.production_logic('hydrogen', 'electrolyzer', step) 
-                        self.production_logic('oxygen', 'electrolyzer', step)
-                        
-                        self.consumption_logic('hydrogen', 'mechanical compressor', step)
-                        self.consumption_logic('electricity', 'mechanical compressor', step)
-                        self.production_logic('HP hydrogen', 'mechanical compressor', step)                                                                         
-
-            if tech_name == 'fuel cell':
-                if pb['electricity'] < 0: #? this condition must be solved if you want to produce electricity to be fed into the gird
-                    available_hyd = available_hyd - (-pb['hydrogen'])*c.timestep*60
-                    if available_hyd > 0:
-                        use = self.technologies['fuel cell'].use(step,pb['electricity'],available_hyd)     # saving fuel cell working parameters for the current timeframe
-                        self.power_balance['hydrogen']['fuel cell'][step] =    use[0] # hydrogen absorbed by fuel cell(-)
-                        self.power_balance['electricity']['fuel cell'][step] = use[1] # electricity supplied(+) 
-        
-                        if use[2] < -pb['heating water']: #all of the heat producted by FC is used      
-                            self.power_balance['heating water']['fuel cell'][step]=use[2] # heat loss of fuel cell
-                        else:
-                            self.power_balance['heating water']['fuel cell'][step]=-pb['heating water'] # heat loss of fuel cell- demand
-
-                        pb['hydrogen'] += self.power_balance['hydrogen']['fuel cell'][step]
-                        pb['electricity'] += self.power_balance['electricity']['fuel cell'][step]
-                        pb['heating water'] += self.power_balance['heating water']['fuel cell'][step] 
-                        self.production_logic('electricity', 'fuel cell', step)
-                        self.consumption_logic('hydrogen','fuel cell', step)
-                        self.production_logic('heating water', 'fuel cell', step)                                                                       
-            
-            if tech_name == 'SMR':
-                if pb['hydrogen'] < 0:      # currently activated only in presence of hydrogen demand
-                    self.power_balance['gas']['SMR'][step], self.power_balance['hydrogen']['SMR'][step] = self.technologies['SMR'].use(pb['hydrogen']) # NG consumed and hydrogen produced from SMR
-                    pb['gas']       += self.power_balance['gas']['SMR'][step]       # gas balance update: - gas consumed by SMR
-                    pb['hydrogen']  += self.power_balance['hydrogen']['SMR'][step]  # hydrogen balance update: + hydrogen produced by SMR                   
-                
-                    self.production_logic('hydrogen', 'SMR', step)
-                    self.consumption_logic('gas', 'SMR', step)                                              
-
-            # if tech_name in ['H tank','HPH tank']:     #versione buona 
-            #     if self.system['hydrogen demand']['strategy'] != 'supply-led':
-            #         self.power_balance[self.tank_stream[tech_name]][tech_name][step] = self.technologies[tech_name].use(h,pb[self.tank_stream[tech_name]])
-            #        pb[self.tank_stream[tech_name]] += self.power_balance[self.tank_stream[tech_name]][tech_name][step]
-            #     elif self.system['hydrogen demand']['strategy'] == 'supply-led' and h == (c.timestep_number - 1):
-            #         prod = self.power_balance['hydrogen']['electrolyzer']
-            #         for h in range(c.timestep_number):
-            #             self.power_balance[self.tank_stream[tech_name]][tech_name][step] = self.technologies[tech_name].use(h,prod[step],constant_demand=self.constant_flow )                        
-            #     else:
-            #         pass
-        
-            if tech_name == 'H tank':
-                if 'HPH tank' not in self.system and ('hydrogen demand' in self.system or 'HP hydrogen demand' in self.system):
-                    if self.system[self.hydrogen_demand+' demand']['strategy'] == 'demand-led':
-                        self.power_balance['hydrogen']['H tank'][step] = self.technologies['H tank'].use(step,pb['hydrogen'])
-                        pb['hydrogen'] += self.power_balance['hydrogen']['H tank'][step]
-                    elif self.system[self.hydrogen_demand+' demand']['strategy'] == 'supply-led' and step == (c.timestep_number - 1):
-                        prod = self.power_balance['hydrogen']['electrolyzer']
-                        for step in range(c.timestep_number):
-                            self.power_balance['hydrogen']['H tank'][step] = self.technologies['H tank'].use(step,prod[step],constant_demand=self.constant_flow )                        
-                    # else:
-                        # pass
-                else:
-                    self.power_balance['hydrogen']['H tank'][step] = self.technologies['H tank'].use(step,pb['hydrogen'])
-                    pb['hydrogen'] += self.power_balance['hydrogen']['H tank'][step]
-                if self.power_balance['hydrogen']['H tank'][step] >= 0:
-                    self.production_logic('hydrogen', 'H tank', step)
-                elif self.power_balance['hydrogen']['H tank'][step] <= 0:
-                    self.consumption_logic('hydrogen', 'H tank', step)                                                              
+        for carrier in pb:
+           self.consumption_aux[carrier].clear() # auxiliar variables of consumption and production logic only refer to the current step
+           self.production_aux[carrier].clear()
             
-            if tech_name == 'HPH tank':
-                self.power_balance['HP hydrogen']['HPH tank'][step] = self.technologies['HPH tank'].use(step,pb['HP hydrogen'])
-                pb['HP hydrogen'] += self.power_balance['HP hydrogen']['HPH tank'][step]
-                
-                if self.power_balance['hydrogen']['HPH tank'][step] >= 0:
-                    self.production_logic('hydrogen', 'HPH tank', step)
-                elif self.power_balance['hydrogen']['HPH tank'][step] <= 0:
-                    self.consumption_logic('hydrogen', 'HPH tank', step)                                                          
-            if tech_name == 'O2 tank':
-                if 'oxygen demand' in self.system and self.system['oxygen demand']['strategy'] != 'supply-led':
-                    self.power_balance['oxygen']['O2 tank'][step] = self.technologies['O2 tank'].use(step,pb['oxygen'])
-                    pb['oxygen'] += self.power_balance['oxygen']['O2 tank'][step]
-                elif self.system['hydrogen demand']['strategy'] == 'supply-led' and step == (c.timestep_number - 1):
-                    self.technologies['O2 tank'].sizing(self.technologies['H tank'].max_capacity)
-                else:
-                    pass
-                if self.power_balance['oxygen']['O2 tank'][step] >= 0:
-                    self.production_logic('oxygen', 'O2 tank', step)
-                elif self.power_balance['oxygen']['O2 tank'][step] <= 0:
-                    self.consumption_logic('oxygen', 'O2 tank', step)                                                       
+        for handler in self.dispatch_plan: # (which is ordered py priority)
+            handler(step,pb,weather)
             
-            if tech_name == 'inverter':
-                self.power_balance['electricity']['inverter'][step] = self.technologies['inverter'].use(step,pb['electricity']) # electricity lost in conversion by the inverter
-                pb['electricity'] += self.power_balance['electricity']['inverter'][step] # electricity balance update: - electricity lost in conversion by the invertert
-                self.consumption_logic('electricity', 'inverter', step)
-            ### demand and grid   
-            for carrier in pb: # for each energy carrier
-                if tech_name == f"{carrier} demand":                
-                    pb[carrier] += self.power_balance[carrier][tech_name][step]    # power balance update: energy demand(-)
-                    if self.power_balance[carrier][tech_name][step] >= 0:
-                        self.production_logic(carrier, tech_name, step)
-                    elif self.power_balance[carrier][tech_name][step] <= 0:
-                        self.consumption_logic(carrier, tech_name, step)                                                
-                    break
-                
-                if tech_name == f"{carrier} grid":
-                    if pb[carrier] > 0 and self.system[f"{carrier} grid"]['feed'] or pb[carrier] < 0 and self.system[f"{carrier} grid"]['draw']:
-                        self.power_balance[carrier][tech_name][step] = -pb[carrier] # energy from grid(+) or into grid(-) 
-                        pb[carrier] += self.power_balance[carrier][tech_name][step]  # electricity balance update
-                        if self.power_balance[carrier][tech_name][step] >= 0:
-                            self.production_logic(carrier, tech_name, step)
-                        elif self.power_balance[carrier][tech_name][step] <= 0:
-                            self.consumption_logic(carrier, tech_name, step)                                            
-                        break
-                    
 #%%            
         ### Global check on power balances at the end of every timestep
         for carrier in pb:
@@ -905,10 +457,7 @@ class location:
                 continue
             tol = 0.0001  # [-] tolerance on error
             if pb[carrier] != 0:
-                maxvalues = []
-                for arr in self.power_balance[carrier]:
-                    maxvalues.append(np.max(self.power_balance[carrier][arr]))
-                m = np.max(np.array(maxvalues))
+                m = np.max(self.balance_tensor.data[self.balance_tensor.carriers[carrier]])   # max value among all the carrier balances
                 if abs(pb[carrier]) > abs(m*tol):
                     if pb[carrier] >0:  sign = 'positive'
                     else:               sign = 'negative'
@@ -921,70 +470,744 @@ class location:
 #%%
         #### Cleaning of production and consumption dictionaries at the last timestep
         if step == (c.timestep_number - 1):
-            cleaned_consumption = {}
-            
-            for carrier in self.consumption:
-                cleaned_consumption[carrier] = {}
-                
-                for tech_name in self.consumption[carrier]:
-                    cleaned_tech = {
-                        tech: value for tech, value in self.consumption[carrier][tech_name].items()
-                        if not all(x == 0 for x in value)
-                    }
-                    if cleaned_tech:
-                        # Remove tech name and aux variable
-                        cleaned_tech.pop(tech_name, None)
-                        cleaned_tech.pop('Aux', None)
-                        
-                        if cleaned_tech:
-                            cleaned_consumption[carrier][tech_name] = cleaned_tech
-                    
-                
-                # Remove carrier if not present in the analysis
-                if not cleaned_consumption[carrier]:
-                    del cleaned_consumption[carrier]
-            
-            self.consumption = cleaned_consumption
-            
-            # Adding total consumption for each technology
-            
-            for carrier in self.consumption:
-                for tech_name in self.consumption[carrier]:
-                    self.consumption[carrier][tech_name]['Tot'] = np.zeros(c.timestep_number)
-                    for tech in self.consumption[carrier][tech_name]:
-                        if tech != 'Tot':  
-                            self.consumption[carrier][tech_name]['Tot'] += self.consumption[carrier][tech_name][tech]
-                
-        if step == (c.timestep_number - 1):
-            cleaned_production = {}
-            
-            for carrier in self.production:
-                cleaned_production[carrier] = {}
-                
-                for tech_name in self.production[carrier]:
-                    cleaned_tech = {
-                        tech: value for tech, value in self.production[carrier][tech_name].items()
-                        if not all(x == 0 for x in value)
-                    }
-                    if cleaned_tech:
-                        # Remove tech name and aux variable
-                        cleaned_tech.pop(tech_name, None)
-                        cleaned_tech.pop('Aux', None)
-                        
-                        if cleaned_tech:
-                            cleaned_production[carrier][tech_name] = cleaned_tech
-                
-               # Remove carrier if not present in the analysis
-                if not cleaned_production[carrier]:
-                    del cleaned_production[carrier]
-            
-            self.production = cleaned_production
-            
-            # Adding total production for each technology
+            self.consumption    = self.consumption.clean()  # only non-zero flows are kept and total consumption for each technology is added
+            self.production     = self.production.clean()   # only non-zero flows are kept and total production for each technology is added
+
+    ### Vectorized simulation of stateless locations
+    
+    def consumption_logic_horizon(self,carrier,tech_name,balance,flows):
+        """
+        consumption_logic applied to every step of the horizon at once
+        
+        balance: array power balance of tech_name over the whole horizon
+        flows: dictionary of the flow containers of the vectorized simulation (see loc_power_simulation_horizon)
+        """
+        mask = balance < 0      # steps of energy consumption
+        if not mask.any():
+            return
+        consumption_aux = flows['consumption_aux'][carrier]
+        production_aux  = flows['production_aux'][carrier]
+        aux = consumption_aux.setdefault(tech_name,np.zeros(len(balance)))
+        aux[mask] = - balance[mask]                                                     # save an auxiliar variable to be updated
+        
+        required_energy = np.where(mask,-balance,0.)
+        for tech in flows['production'][carrier]:
+            if tech in production_aux:
+                m = mask & (production_aux[tech] > 0)                                   # steps in which some tech with higher priority has available energy
+                if m.any():
+                    flow = np.where(production_aux[tech][m] < required_energy[m],production_aux[tech][m],required_energy[m])       # calculate how much energy this tech can take from the higher priority one
+                    flows['production'][carrier][tech][tech_name][m] = flow
+                    required_energy[m] -= flow                                          # see if there is still energy to take
+                    aux[m] -= flow                                                      # update auxiliar variable
+                    flows['consumption'][carrier][tech_name][tech][m] = flow            # update consumption from the higher priority tech
+                    production_aux[tech][m] -= flow                                     # update the auxiliar variable of higher priority tech (less energy to give)
+        
+    def production_logic_horizon(self,carrier,tech_name,balance,flows):
+        """
+        production_logic applied to every step of the horizon at once
+        
+        balance: array power balance of tech_name over the whole horizon
+        flows: dictionary of the flow containers of the vectorized simulation (see loc_power_simulation_horizon)
+        """
+        mask = balance > 0      # steps of energy production
+        if not mask.any():
+            return
+        consumption_aux = flows['consumption_aux'][carrier]
+        production_aux  = flows['production_aux'][carrier]
+        aux = production_aux.setdefault(tech_name,np.zeros(len(balance)))
+        aux[mask] = balance[mask]                                                       # save an auxiliar variable to be updated
+        
+        available_energy = np.where(mask,balance,0.)
+        for tech in flows['consumption'][carrier]:
+            if tech in consumption_aux:
+                m = mask & (consumption_aux[tech] > 0)                                  # steps in which some tech with higher priority has required energy
+                if m.any():
+                    flow = np.where(consumption_aux[tech][m] < available_energy[m],consumption_aux[tech][m],available_energy[m])     # calculate how much energy this tech can give to the higher priority one
+                    flows['consumption'][carrier][tech][tech_name][m] = flow
+                    available_energy[m] -= flow                                         # see if there is still energy to give
+                    consumption_aux[tech][m] -= flow                                    # update the auxiliar variable of higher priority tech (less energy to take)
+                    aux[m] -= flow                                                      # update production to the higher priority tech
+                    flows['production'][carrier][tech_name][tech][m] = flow             # update auxiliar variable
+    
+    def loc_power_simulation_horizon(self):
+        """
+        Simulate the whole horizon of a stateless location (only PV, wind, demands and grids) in a single vectorized pass
+        
+        output : dictionary balances {(carrier,tech_name): array} ordered by priority, to be applied with .apply_horizon_solution()
+                 None if any carrier is not balanced at some step: the location has to be simulated step by step, 
+                 so that loc_power_simulation can apply the tolerance check and raise its error
+                 
+        The location is not modified, so that the REC can still fall back to the step by step simulation
+        """
+        if not self.stateless:
+            return(None)
+        
+        n = c.timestep_number
+        pb = {carrier: np.zeros(n) for carrier in self.power_balance} # power balances [kW] [kg/s] [Sm^3/s] of every step
+        balances = {}
+        
+        for tech_name in self.system: # (which is ordered py priority)
+            if tech_name in ['PV','wind']:
+                balance = np.array(self.technologies[tech_name].production[:n],dtype=float) # electricity produced from PV or wind
+                pb['electricity'] += balance
+                balances[('electricity',tech_name)] = balance
+                continue
             
-            for carrier in self.production:
-                for tech_name in self.production[carrier]:
-                    self.production[carrier][tech_name]['Tot'] = np.zeros(c.timestep_number)
-                    for tech in self.production[carrier][tech_name]:
-                        if tech != 'Tot':  
-                            self.production[carrier][tech_name]['Tot'] += self.production[carrier][tech_name][tech]
\ No newline at end of file
+            for carrier in self.power_balance:
+                if tech_name == f"{carrier} demand":
+                    balance = self.power_balance[carrier][tech_name]
+                    pb[carrier] += balance                                      # power balance update: energy demand(-)
+                    balances[(carrier,tech_name)] = balance
+                    break
+                if tech_name == f"{carrier} grid":
+                    mask = (pb[carrier] > 0) & self.system[tech_name]['feed'] | (pb[carrier] < 0) & self.system[tech_name]['draw']
+                    balance = np.zeros(n)
+                    balance[mask] = - pb[carrier][mask]                         # energy from grid(+) or into grid(-)
+                    pb[carrier][mask] += balance[mask]                          # balance update
+                    balances[(carrier,tech_name)] = balance
+                    break
+        
+        ### Global check on power balances
+        for carrier in pb:
+            if carrier != 'heating water' and pb[carrier].any():
+                return(None)
+        
+        return(balances)
+    
+    def horizon_flows(self,balances):
+        """
+        Flows exchanged between technologies over the whole horizon, given the power balances of all the steps
+        
+        balances: dictionary {(carrier,tech_name): array} ordered by priority
+        
+        output : dictionary of the flow containers {'consumption','production','consumption_aux','production_aux'}
+        """
+        n = c.timestep_number
+        flows = {'consumption':     flow_allocation(self.power_balance,self.system,n,c.reporting_dtype),
+                 'production':      flow_allocation(self.power_balance,self.system,n,c.reporting_dtype),
+                 'consumption_aux': {carrier: {} for carrier in self.power_balance},
+                 'production_aux':  {carrier: {} for carrier in self.power_balance}}
+        
+        for (carrier,tech_name),balance in balances.items():  # (which is ordered py priority)
+            self.production_logic_horizon(carrier,tech_name,balance,flows)
+            self.consumption_logic_horizon(carrier,tech_name,balance,flows)
+        return(flows)
+    
+    def apply_horizon_solution(self,balances):
+        """
+        Update location power balances, consumption and production with the output of loc_power_simulation_horizon()
+        
+        balances: dictionary {(carrier,tech_name): array} ordered by priority
+        """
+        for (carrier,tech_name),balance in balances.items():
+            self.power_balance[carrier][tech_name][:] = balance
+        flows = self.horizon_flows(balances)
+        self.consumption    = flows['consumption'].clean()  # only non-zero flows are kept and total consumption for each technology is added
+        self.production     = flows['production'].clean()   # only non-zero flows are kept and total production for each technology is added
+
+    ### Dispatch plan handlers: one method for each technology, called every step in order of priority (see compile_dispatch_plan)
+    
+    def PV_step(self,step,pb,weather,balance):
+        """
+        Electricity produced by PV
+        balance: array self.power_balance['electricity']['PV'] resolved when the dispatch plan is compiled
+        """
+        balance[step] = self.technologies['PV'].use(step) # electricity produced from PV
+        pb['electricity'] += balance[step] # elecricity balance update: + electricity produced from PV
+        self.production_logic('electricity', 'PV', step)
+
+    def wind_step(self,step,pb,weather,balance):
+        """
+        Electricity produced by wind turbines
+        balance: array self.power_balance['electricity']['wind'] resolved when the dispatch plan is compiled
+        """
+        balance[step] = self.technologies['wind'].use(step) # electricity produced from wind
+        pb['electricity'] += balance[step] # elecricity balance update: + electricity produced from wind
+        self.production_logic('electricity', 'wind', step)
+
+    def boiler_el_step(self,step,pb,weather):
+        """
+        Electricity consumed and heat produced by boiler_el
+        """
+        self.power_balance['electricity']['boiler_el'][step],\
+        self.power_balance['heating water']['boiler_el'][step] = self.technologies['boiler_el'].use(step,pb['heating water']) # elctricity consumed and heat produced from boiler_el
+        pb['electricity']   += self.power_balance['electricity']['boiler_el'][step]     # [kW] elecricity balance update: - electricity consumed by boiler_el
+        pb['heating water'] += self.power_balance['heating water']['boiler_el'][step]   # [kW] heat balance update: + heat produced by boiler_el
+        self.consumption_logic('electricity', 'boiler_el', step)
+        self.production_logic('heating water', 'boiler_el', step)
+
+    def boiler_ng_step(self,step,pb,weather):
+        """
+        Gas consumed and heat produced by boiler_ng
+        """
+        self.power_balance['gas']['boiler_ng'][step],\
+        self.power_balance['heating water']['boiler_ng'][step] = self.technologies['boiler_ng'].use(step,pb['heating water']) # ng consumed and heat produced from boiler_ng
+        pb['gas']           += self.power_balance['gas']['boiler_ng'][step]             # [Sm3/s] gas balance update: - gas consumed by boiler_ng
+        pb['heating water'] += self.power_balance['heating water']['boiler_ng'][step]   # [kW] heat balance update: + heat produced by boiler_ng
+        self.consumption_logic('gas', 'boiler_ng', step)
+        self.production_logic('heating water', 'boiler_ng', step)
+
+    def boiler_h2_step(self,step,pb,weather):
+        """
+        Hydrogen consumed and heat produced by boiler_h2
+        """
+        available_hyd,producible_hyd = self.hydrogen_available_producible(step,pb)
+
+        self.power_balance['hydrogen']['boiler_h2'][step],\
+        self.power_balance['heating water']['boiler_h2'][step]        = self.technologies['boiler_h2'].use(step,pb['heating water'],available_hyd) # h2 consumed from boiler_h2 and heat produced by boiler_h2
+
+        pb['hydrogen']      += self.power_balance['hydrogen']['boiler_h2'][step]            # [kg/s] hydrogen balance update: - hydrogen consumed by boiler_h2
+        pb['heating water'] += self.power_balance['heating water']['boiler_h2'][step]       # [kW] heat balance update: + heat produced by boiler_h2
+        self.consumption_logic('hydrogen', 'boiler_h2', step)
+        self.production_logic('heating water', 'boiler_h2', step)
+
+    def heatpump_step(self,step,pb,weather):
+        """
+        Electricity consumed and heat produced by heatpump and inertial TES
+        """
+        self.power_balance['electricity']['heatpump'][step], self.power_balance['heating water']['heatpump'][step], self.power_balance['heating water']['inertial TES'][step] = self.technologies['heatpump'].use(weather['temp_air'][step],pb['heating water'],pb['electricity'],step)
+
+        pb['electricity'] += self.power_balance['electricity']['heatpump'][step] # electricity absorbed by heatpump
+        self.consumption_logic('electricity', 'heatpump', step)
+        self.power_balance['electricity']['electricity demand'][step] += self.power_balance['electricity']['heatpump'][step] # add heatpump demand to 'electricity demand'
+        pb['heating water'] += self.power_balance['heating water']['inertial TES'][step] + self.power_balance['electricity']['heatpump'][step] # heat or cool supplied by HP or inertial TES
+        self.production_logic('heating water', 'heatpump', step)
+
+    def battery_step(self,step,pb,weather):
+        """
+        Electricity absorbed or supplied by battery
+        """
+        if self.technologies['battery'].collective == 0:
+            self.power_balance['electricity']['battery'][step] = self.technologies['battery'].use(step,pb['electricity']) # electricity absorbed(-) or supplied(+) by battery
+            pb['electricity'] += self.power_balance['electricity']['battery'][step]  # electricity balance update: +- electricity absorbed or supplied by battery
+            self.battery_available_electricity = max(0,(self.technologies['battery'].LOC[step+1]+self.technologies['battery'].max_capacity*(1-self.technologies['battery'].DoD)-self.technologies['battery'].used_capacity) / c.P2E)  # electricity available in the battery
+            if self.power_balance['electricity']['battery'][step] >= 0:
+                self.production_logic('electricity', 'battery', step)
+            elif self.power_balance['electricity']['battery'][step] <= 0:
+                self.consumption_logic('electricity', 'battery', step)
+
+    def chp_gt_step(self,step,pb,weather):
+        """
+        Steam and electricity produced by chp_gt
+        """
+        available_hyd,producible_hyd = self.hydrogen_available_producible(step,pb)
+
+        if available_hyd > 0:
+            use = self.technologies['chp_gt'].use(step,weather['temp_air'][step],pb['process steam'],available_hyd)     # saving chp_gt working parameters for the current timeframe
+            self.power_balance['process steam']['chp_gt'][step] = use[0]   # produced steam (+)
+            self.power_balance['electricity']['chp_gt'][step] =   use[1]   # produced electricity (+)
+            self.power_balance['hydrogen']['chp_gt'][step] =      use[2]   # hydrogen required by chp system to run (-)
+
+        pb['hydrogen'] += self.power_balance['hydrogen']['chp_gt'][step]
+        pb['process steam'] += self.power_balance['process steam']['chp_gt'][step]
+        pb['electricity'] += self.power_balance['electricity']['chp_gt'][step]
+        self.consumption_logic('hydrogen', 'chp_gt', step)
+        self.production_logic('electricity', 'chp_gt', step)
+        self.production_logic('process steam', 'chp_gt',step)
+
+    def chp_step(self,step,pb,weather):
+        """
+        Thermal output and electricity produced by chp
+        """
+        available_hyd,producible_hyd = self.hydrogen_available_producible(step,pb)
+
+        strategy    = self.technologies['chp'].strategy     # thermal-load follow or electric-load follow
+        coproduct   = self.technologies['chp'].coproduct    # process co-product depending on the  approache chosen above
+        if self.system['chp']['Fuel'] == 'hydrogen':
+            use = self.technologies['chp'].use(step,weather['temp_air'][step],pb[strategy],pb[coproduct], available_hyd)     # saving chp working parameters for the current timeframe
+        else:
+            use = self.technologies['chp'].use(step,weather['temp_air'][step],pb[strategy],pb[coproduct])                    # saving chp working parameters for the current timeframe
+
+        self.power_balance[self.technologies['chp'].th_out]['chp'][step]  = use[0]   # produced thermal output (+) (steam/hot water)
+        self.power_balance['electricity']['chp'][step]                    = use[1]   # produced electricity (+)
+        self.power_balance[self.technologies['chp'].fuel]['chp'][step]    = use[2]   # fuel required by chp system to run (-)
+        self.power_balance['process heat']['chp'][step]                   = use[3]   # process heat produced by chp system (+)
+        self.power_balance['process hot water']['chp'][step]              = use[4]   # process heat produced by chp system (+)
+
+        pb[self.technologies['chp'].fuel] += self.power_balance[self.technologies['chp'].fuel]['chp'][step]
+        pb[self.technologies['chp'].th_out] += self.power_balance[self.technologies['chp'].th_out]['chp'][step]
+        pb['electricity'] += self.power_balance['electricity']['chp'][step]
+        pb['process heat'] += self.power_balance['process heat']['chp'][step]
+        self.consumption_logic(self.technologies['chp'].fuel, 'chp', step)
+        self.production_logic(self.technologies['chp'].th_out, 'chp', step)
+        self.production_logic('electricity', 'chp', step)
+        self.production_logic('electricity', 'process heat', step)
+
+    def absorber_step(self,step,pb,weather):
+        """
+        Cold produced by absorber
+        """
+        self.power_balance['process cold water']['absorber'][step],self.power_balance['process heat']['absorber'][step] = self.technologies['absorber'].use(step,pb['process heat'])  # cold energy produced via the absorption cycle (+)
+        pb['process heat'] += self.power_balance['process heat']['absorber'][step]
+        pb['process cold water'] += self.power_balance['process cold water']['absorber'][step]
+        self.consumption_logic('process heat', 'absorber', step)
+        self.production_logic('process cold water', 'absorber', step)
+
+    def electrolyzer_step(self,step,pb,weather):
+        """
+        Hydrogen produced by electrolyzer
+        """
+        available_hyd,producible_hyd = self.hydrogen_available_producible(step,pb)
+
+        if step == 0:
+            self.battery_available_electricity = 0
+
+        if 'battery' in self.system and 'hydrogen demand' in self.system:
+            hyd_dem_to_be_satisfied = pb['hydrogen']
+            n_modules_necessary = int(-hyd_dem_to_be_satisfied/self.technologies['electrolyzer'].maxh2prod)+1
+            El_Power_necessary = self.technologies['electrolyzer'].Npower*n_modules_necessary
+            El_available_bat = self.battery_available_electricity*self.technologies['battery'].etaD
+            if pb['electricity'] >= El_Power_necessary:
+                el_input = pb['electricity']
+            else:
+                if (pb['electricity'] + El_available_bat) < El_Power_necessary:
+                    el_input = pb['electricity'] + El_available_bat
+                else:
+                    El_from_battery = El_Power_necessary - pb['electricity']
+                    el_input = pb['electricity'] + El_from_battery
+        else:
+            el_input = pb['electricity']
+        if self.technologies['electrolyzer'].strategy == 'hydrogen-first' and self.technologies['electrolyzer'].only_renewables == True: # electrolyzer activated when renewable energy is available
+            if pb['electricity'] > 0: # electrolyzer activated only when renewable energy is available
+                if producible_hyd > 0:
+
+                    self.power_balance['hydrogen']['electrolyzer'][step],   \
+                    self.power_balance['electricity']['electrolyzer'][step],\
+                    self.power_balance['oxygen']['electrolyzer'][step],     \
+                    self.power_balance['water']['electrolyzer'][step]        = self.technologies['electrolyzer'].use(step,storable_hydrogen=producible_hyd,p=el_input,Text=weather['temp_air'][step])      # [:2] # hydrogen supplied by electrolyzer(+) # electricity absorbed by the electorlyzer(-)
+
+                    pb['hydrogen']      += self.power_balance['hydrogen']['electrolyzer'][step]
+                    pb['electricity']   += self.power_balance['electricity']['electrolyzer'][step]
+                    pb['oxygen']        += self.power_balance['oxygen']['electrolyzer'][step]
+                    pb['water']         += self.power_balance['water']['electrolyzer'][step]
+
+        elif self.technologies['electrolyzer'].strategy == 'hydrogen-first' and self.technologies['electrolyzer'].only_renewables == False: # electrolyzer working both with energy from renewables and from grid, but giving precedence to electricity from renewables
+
+            if producible_hyd > 0:
+                self.power_balance['hydrogen']['electrolyzer'][step],   \
+                self.power_balance['electricity']['electrolyzer'][step],\
+                self.power_balance['oxygen']['electrolyzer'][step],     \
+                self.power_balance['water']['electrolyzer'][step]        = self.technologies['electrolyzer'].use(step,storable_hydrogen=producible_hyd,p=el_input,Text=weather['temp_air'][step])      # hydrogen [kg/s] and oxygen [kg/s] produced by the electrolyzer (+) electricity [kW] and water absorbed [m^3/s] (-)
+
+            # evaluating need for grid interaction based on available hydrogen
+            if (available_hyd/(c.timestep*60) + self.power_balance['hydrogen']['electrolyzer'][step]) < -pb['hydrogen']:    # if hydrogen produced from electrolyzer with only renewables and the tank is not sufficient to cover the hydrogen demand in this timestep --> need for grid interaction
+                hyd_from_ele = (-pb['hydrogen']) - available_hyd/(c.timestep*60)                                            # [kg/s] the electrolyzer is required to produce the amount of hydrogen the tank can't cover (thus using also grid electricity)
+                self.power_balance['hydrogen']['electrolyzer'][step],   \
+                self.power_balance['electricity']['electrolyzer'][step],\
+                self.power_balance['oxygen']['electrolyzer'][step],     \
+                self.power_balance['water']['electrolyzer'][step]        = self.technologies['electrolyzer'].use(step,hydrog=hyd_from_ele,Text=weather['temp_air'][step])      # hydrogen [kg/s] and oxygen [kg/s] produced by the electrolyzer (+) electricity [kW] and water absorbed [m^3/s] (-)
+
+                # Evaluating the need for grid interaction based on the minimum load of each module: If the electrolyzer operates below its minimum load, it won’t produce hydrogen, and the tank won’t meet the demand. Therefore, the electrolyzer must reach its minimum load, thus the tank won't be completely emptied.
+                if self.power_balance['hydrogen']['electrolyzer'][step] == 0: # no hydrogen has been produced
+                    self.power_balance['hydrogen']['electrolyzer'][step],   \
+                    self.power_balance['electricity']['electrolyzer'][step],\
+                    self.power_balance['oxygen']['electrolyzer'][step],     \
+                    self.power_balance['water']['electrolyzer'][step]        = self.technologies['electrolyzer'].use(step,storable_hydrogen=producible_hyd,p=self.technologies['electrolyzer'].MinInputPower,Text=weather['temp_air'][step])      # hydrogen [kg/s] and oxygen [kg/s] produced by the electrolyzer (+) electricity [kW] and water absorbed [m^3/s] (-)
+            # evaluating need for grid interaction based on imposed constant minimum operational load. Lower functoning boundary
+            if self.system['electrolyzer']['minimum_load'] and abs(self.power_balance['electricity']['electrolyzer'][step]) < self.technologies['electrolyzer'].min_partial_load:
+                self.power_balance['hydrogen']['electrolyzer'][step],   \
+                self.power_balance['electricity']['electrolyzer'][step],\
+                self.power_balance['oxygen']['electrolyzer'][step],     \
+                self.power_balance['water']['electrolyzer'][step]        = self.technologies['electrolyzer'].use(step,storable_hydrogen=producible_hyd,p=self.technologies['electrolyzer'].min_partial_load,Text=weather['temp_air'][step])      # [:2] # hydrogen supplied by electrolyzer(+) # electricity absorbed by the electorlyzer(-)
+
+            pb['hydrogen']      += self.power_balance['hydrogen']['electrolyzer'][step]
+            pb['electricity']   += self.power_balance['electricity']['electrolyzer'][step]
+            pb['oxygen']        += self.power_balance['oxygen']['electrolyzer'][step]
+            pb['water']         += self.power_balance['water']['electrolyzer'][step]
+
+        elif self.technologies['electrolyzer'].strategy == 'full-time': # electrolyzer working continuously at each time step of the simulation
+
+            self.power_balance['hydrogen']['electrolyzer'][step],     \
+            self.power_balance['electricity']['electrolyzer'][step],  \
+            self.power_balance['oxygen']['electrolyzer'][step],       \
+            self.power_balance['water']['electrolyzer'][step]         = self.technologies['electrolyzer'].use(step,storable_hydrogen=producible_hyd,Text=weather['temp_air'][step])      # [:2] # hydrogen supplied by electrolyzer(+) # electricity absorbed by the electorlyzer(-)
+
+            pb['hydrogen']      += self.power_balance['hydrogen']['electrolyzer'][step]
+            pb['electricity']   += self.power_balance['electricity']['electrolyzer'][step]
+            pb['oxygen']        += self.power_balance['oxygen']['electrolyzer'][step]
+            pb['water']         += self.power_balance['water']['electrolyzer'][step]
+
+        if 'mechanical compressor' in self.system:
+            pass                                         #if there is mechanical compressor the electrolyzer is updated there
+        else:
+            self.consumption_logic('electricity', 'electrolyzer', step)
+            self.consumption_logic('water', 'electrolyzer', step)
+            self.production_logic('hydrogen', 'electrolyzer', step)
+            self.production_logic('oxygen', 'electrolyzer', step)
+
+        if step == (c.timestep_number - 1) and ('hydrogen demand' in self.system or 'HP hydrogen demand' in self.system):
+            if self.system[self.hydrogen_demand+' demand']['strategy'] == 'supply-led':  # activates only at the final step of simulation
+                self.constant_flow = sum(self.power_balance['hydrogen']['electrolyzer'])/c.timestep_number # [kg/s] constant hydrogen output based on the total production
+
+    def mhhc_compressor_step(self,step,pb,weather):
+        """
+        Hydrogen compressed by mhhc compressor
+        """
+        #!!! WIP to be modified by Andrea
+        available_hyd,producible_hyd = self.hydrogen_available_producible(step,pb)
+
+        if self.power_balance['hydrogen']['electrolyzer'][step] > 0:
+            storable_hydrogen = producible_hyd
+            if storable_hydrogen>self.technologies['H tank'].max_capacity*0.00001:
+                self.power_balance['hydrogen']['mhhc compressor'][step], self.power_balance['gas']['mhhc compressor'][step] = self.technologies['mhhc compressor'].use(step,self.power_balance['hydrogen']['electrolyzer'][step],storable_hydrogen) # hydrogen compressed by the compressor (+) and heat requested to make it work expressed as heating water need (-)
+                pb['gas'] += self.power_balance['gas']['mhhc compressor'][step]
+                #pb['hydrogen']=...self.power_balance['hydrogen']['mhhc compressor'][step]?? come ne tengo conto di quanto comprimo? in linea teorica ne dovrei sempre comprimere esattamente quanto me ne entra perchè il controllo sullo sotrable hydrogen lho gia fatto nell'elettrolizzatore'
+
+                self.consumption_logic('gas', 'mhhc compressor', step)
+
+    def mechanical_compressor_step(self,step,pb,weather):
+        """
+        Hydrogen compressed by mechanical compressor
+        """
+        available_hyd,producible_hyd = self.hydrogen_available_producible(step,pb)
+
+        if 'HPH tank' not in self.system:
+            if 'O2 tank' not in self.system:
+                if "electricity grid" in self.system and self.system["electricity grid"]["draw"] and self.technologies['mechanical compressor'].only_renewables == False:
+                    if 'hydrogen demand' in self.system:
+                        massflow = np.max(0,self.power_balance['hydrogen']['electrolyzer'][step] + self.power_balance['hydrogen']['hydrogen demand'][step])
+                    else:
+                        massflow = np.max(0,self.power_balance['hydrogen']['electrolyzer'][step])
+                    self.power_balance['hydrogen']['mechanical compressor'][step], \
+                    self.power_balance['electricity']['mechanical compressor'][step] = self.technologies['mechanical compressor'].use(step,massflowrate= massflow)[:2] # hydrogen compressed by the compressor (+) and electricity consumption (-)
+
+                    pb['electricity']   += self.power_balance['electricity']['mechanical compressor'][step]
+                    self.consumption_logic('electricity', 'electrolyzer', step)
+                    self.consumption_logic('water', 'electrolyzer', step)
+                    self.production_logic('hydrogen', 'electrolyzer', step)
+                    self.production_logic('oxygen', 'electrolyzer', step)
+
+                    self.consumption_logic('electricity', 'mechanical compressor', step)
+
+                elif "electricity grid" not in self.system or self.technologies['mechanical compressor'].only_renewables == True:  #self.system["electricity grid"]["draw"] == False:   # if the system is configurated as fully off-grid, relying only on RES production
+                    if self.power_balance['hydrogen']['electrolyzer'][step] > 0 :  # if hydrogen has been produced by the electrolyzer and electricity is available in the system
+                        if 'hydrogen demand' in self.system:
+                            demand = self.power_balance['hydrogen']['hydrogen demand'][step] # hydrogen demand at timestep h
+                            massflow = np.max([0,self.power_balance['hydrogen']['electrolyzer'][step] + demand] )  # hydrogen mass flow rate to be compressed and stored in hydrogen tank
+                        else:           # no hydrogen demand
+                            demand = 0  # hydrogen demand at timestep h
+                            massflow = self.power_balance['hydrogen']['electrolyzer'][step]  # in case no hydrogen demand is present all produced hydrogen is compressed and flows through the hydrogne tank
+                        a = self.technologies['mechanical compressor'].use(step,massflowrate= massflow)[1] # [kW] compressor energy consumption for a certain h2 mass flow rate
+                        if abs(a) <=pb['electricity'] or a == 0:     # there is enough renewable electricity to power the compressor
+                            self.power_balance['hydrogen']['mechanical compressor'][step],    \
+                            self.power_balance['electricity']['mechanical compressor'][step], \
+                            self.power_balance['cooling water']['mechanical compressor'][step]= self.technologies['mechanical compressor'].use(step,massflowrate= massflow) # hydrogen compressed by the compressor (+) and electricity consumption (-)
+
+                            pb['electricity']   += self.power_balance['electricity']['mechanical compressor'][step]
+
+                            self.consumption_logic('electricity', 'electrolyzer', step)
+                            self.consumption_logic('water', 'electrolyzer', step)
+                            self.production_logic('hydrogen', 'electrolyzer', step)
+                            self.production_logic('oxygen', 'electrolyzer', step)
+                            self.consumption_logic('electricity', 'mechanical compressor', step)
+                        elif abs(a) >pb['electricity']:    # if available electricity in the system is not enough to power the compression system - enter the loop to reallocate the energy among the components
+                            a1  = 1     # % of available electricity fed to the electrolyzer
+                            a11 = 0     # % of available electricity fed to the compressor
+                            en  =pb['electricity'] + abs(self.power_balance['electricity']['electrolyzer'][step]) # [kW] electric energy available at time h before entering the electorlyzer
+                            el  = self.power_balance['electricity']['electrolyzer'][step]
+                            hy  = self.power_balance['hydrogen']['electrolyzer'][step]
+                            ox  = self.power_balance['oxygen']['electrolyzer'][step]
+                            wa  = self.power_balance['water']['electrolyzer'][step]
+
+                            # Iteration parameters
+                            i   = 0             # initializing iteration count
+                            maxiter = 10000     # max number of iterations allowed
+                            abs_err = 0.00001   # absolute error allowed
+
+                            while a1 >= 0:       # while loop necessary to iterate in the redistribution of renewable electricity to satisfy both electrolyzer and compressor demand
+                                hydrogen_ele,  \
+                                electricity_ele = self.technologies['electrolyzer'].use(step,storable_hydrogen=producible_hyd,p=a1*en)[:2]  # [kg] of produced H2 and [kW] of consumed electricity for the given energy input
+                                massflow = np.max([0, hydrogen_ele + demand])
+                                a = -self.technologies['mechanical compressor'].use(step,massflowrate= massflow)[1] # [kW] compressor energy consumption for a certain h2 mass flow rate
+                                b1 = a/en
+                                a11 = 1-b1
+                                i += 1      # updating iteration count
+
+                                if abs(a1-a11) < abs_err or i > maxiter:    # strict tolerance for convergence
+                                    break
+                                else:
+                                    a1=a11
+
+                            # Electorlyzer balances update and overwriting
+                            self.power_balance['hydrogen']['electrolyzer'][step],   \
+                            self.power_balance['electricity']['electrolyzer'][step],\
+                            self.power_balance['oxygen']['electrolyzer'][step],     \
+                            self.power_balance['water']['electrolyzer'][step]        = self.technologies['electrolyzer'].use(step,storable_hydrogen=producible_hyd,p=a1*en)      # [:2] # hydrogen supplied by electrolyzer(+) # electricity absorbed by the electorlyzer(-)
+
+                            pb['hydrogen']      += self.power_balance['hydrogen']['electrolyzer'][step]    - hy
+                            pb['electricity']   += self.power_balance['electricity']['electrolyzer'][step] - el
+                            pb['oxygen']        += self.power_balance['oxygen']['electrolyzer'][step]      - ox
+                            pb['water']         += self.power_balance['water']['electrolyzer'][step]       + wa
+
+                            self.consumption_logic('electricity', 'electrolyzer', step)
+                            self.consumption_logic('water', 'electrolyzer', step)
+                            self.production_logic('hydrogen', 'electrolyzer', step)
+                            self.production_logic('oxygen', 'electrolyzer', step)
+                            # Compressor balances update and overwriting
+                            self.power_balance['hydrogen']['mechanical compressor'][step],    \
+                            self.power_balance['electricity']['mechanical compressor'][step], \
+                            self.power_balance['cooling water']['mechanical compressor'][step]   = self.technologies['mechanical compressor'].use(step,massflowrate= massflow) # hydrogen compressed by the compressor (+) and electricity consumption (-)
+
+                            pb['electricity']   += self.power_balance['electricity']['mechanical compressor'][step]
+                            self.consumption_logic('electricity', 'mechanical compressor', step)
+                        else:  # if no hydrogen has been produced at time h
+                            self.power_balance['hydrogen']['mechanical compressor'][step]     = 0
+                            self.power_balance['electricity']['mechanical compressor'][step]  = 0
+
+            elif 'O2 tank' in self.system:   # simplified approach for oxygen compression. To be updated
+                massflow_tot = (self.power_balance['hydrogen']['electrolyzer'][step])+(self.power_balance['oxygen']['electrolyzer'][step])
+                if "electricity grid" in self.system and self.system["electricity grid"]["draw"]:
+                    self.power_balance['hydrogen']['mechanical compressor'][step], \
+                    self.power_balance['electricity']['mechanical compressor'][step] = self.technologies['mechanical compressor'].use(step,massflowrate = massflow_tot )[:2] # hydrogen compressed by the compressor (+) and electricity consumption (-)
+
+                    pb['electricity']   += self.power_balance['electricity']['mechanical compressor'][step]
+                    self.consumption_logic('electricity', 'electrolyzer', step)
+                    self.consumption_logic('water', 'electrolyzer', step)
+                    self.production_logic('hydrogen', 'electrolyzer', step)
+                    self.production_logic('oxygen', 'electrolyzer', step)
+                    self.consumption_logic('electricity', 'mechanical compressor', step)
+
+                elif "electricity grid" not in self.system or self.system["electricity grid"]["draw"] == False:   # if the system is configurated as fully off-grid, relying only on RES production
+                    if self.power_balance['hydrogen']['electrolyzer'][step] > 0 :  # if hydrogen has been produced by the electrolyzer and electricity is available in the system
+                        a = self.technologies['mechanical compressor'].use(step,massflowrate = massflow_tot)[1] # [kW] compressor energy consumption for a certain h2 mass flow rate
+                        if abs(a) <=pb['electricity'] or a == 0:    # there is enough renewable electricity to power the compressor
+                            self.power_balance['hydrogen']['mechanical compressor'][step],    \
+                            self.power_balance['electricity']['mechanical compressor'][step], \
+                            self.power_balance['cooling water']['mechanical compressor'][step]= self.technologies['mechanical compressor'].use(step,massflowrate= massflow_tot) # hydrogen compressed by the compressor (+) and electricity consumption (-)
+
+                            pb['electricity']   += self.power_balance['electricity']['mechanical compressor'][step]
+                            self.consumption_logic('electricity', 'electrolyzer', step)
+                            self.consumption_logic('water', 'electrolyzer', step)
+                            self.production_logic('hydrogen', 'electrolyzer', step)
+                            self.production_logic('oxygen', 'electrolyzer', step)
+                            self.consumption_logic('electricity', 'mechanical compressor', step)
+
+                        elif abs(a) >pb['electricity']:    # if available electricity in the system is not enough to power the compression system - enter the loop to reallocate the energy among the components
+                            a1  = 1     # % of available electricity fed to the electrolyzer
+                            a11 = 0     # % of available electricity fed to the compressor
+                            en  =pb['electricity'] + abs(self.power_balance['electricity']['electrolyzer'][step]) # [kW] electric energy available at time h before entering the electorlyzer
+                            el  = self.power_balance['electricity']['electrolyzer'][step]
+                            hy  = self.power_balance['hydrogen']['electrolyzer'][step]
+                            ox  = self.power_balance['oxygen']['electrolyzer'][step]
+                            wa  = self.power_balance['water']['electrolyzer'][step]
+
+                            # Iteration parameters
+                            i   = 0             # initializing iteration count
+                            maxiter = 10000     # max number of iterations allowed
+                            abs_err = 0.00001   # absolute error allowed
+
+                            while a1 >= 0:       # while loop necessary to iterate in the redistribution of renewable electricity to satisfy both electrolyzer and compressor demand
+                                hydrogen_ele,  \
+                                electricity_ele = self.technologies['electrolyzer'].use(step,a1*en,producible_hyd)[:2]  # [kg] of produced H2 and [kW] of consumed electricity for the given energy input
+                                a = -self.technologies['mechanical compressor'].use(step,massflowrate= hydrogen_ele + hydrogen_ele*7.93)[1] # [kW] compressor energy consumption for a certain h2 mass flow rate
+                                b1 = a/en
+                                a11 = 1-b1
+                                i += 1      # updating iteration count
+
+                                if abs(a1-a11) < abs_err or i > maxiter:    # strict tolerance for convergence
+                                    break
+                                else:
+                                    a1=a11
+
+                            # Electorlyzer balances update and overwriting
+                            self.power_balance['hydrogen']['electrolyzer'][step],   \
+                            self.power_balance['electricity']['electrolyzer'][step],\
+                            self.power_balance['oxygen']['electrolyzer'][step],     \
+                            self.power_balance['water']['electrolyzer'][step]        = self.technologies['electrolyzer'].use(step,a1*en,producible_hyd)      # [:2] # hydrogen supplied by electrolyzer(+) # electricity absorbed by the electorlyzer(-)
+
+                            pb['hydrogen']      += self.power_balance['hydrogen']['electrolyzer'][step]    - hy
+                            pb['electricity']   += self.power_balance['electricity']['electrolyzer'][step] - el
+                            pb['oxygen']        += self.power_balance['oxygen']['electrolyzer'][step]      - ox
+                            pb['water']         += self.power_balance['water']['electrolyzer'][step]       + wa
+
+                            self.consumption_logic('electricity', 'electrolyzer', step)
+                            self.consumption_logic('water', 'electrolyzer', step)
+                            self.production_logic('hydrogen', 'electrolyzer', step)
+                            self.production_logic('oxygen', 'electrolyzer', step)
+                            # Compressor balances update and overwriting
+                            self.power_balance['hydrogen']['mechanical compressor'][step],    \
+                            self.power_balance['electricity']['mechanical compressor'][step], \
+                            self.power_balance['cooling water']['mechanical compressor'][step]   = self.technologies['mechanical compressor'].use(step,massflowrate= massflow) # hydrogen compressed by the compressor (+) and electricity consumption (-)
+
+                            pb['electricity']   += self.power_balance['electricity']['mechanical compressor'][step]
+                            self.consumption_logic('electricity', 'mechanical compressor', step)
+
+                        else:  # if no hydrogen has been produced at time h
+                            self.power_balance['hydrogen']['mechanical compressor'][step]     = 0
+                            self.power_balance['electricity']['mechanical compressor'][step]  = 0
+
+
+
+        if 'H tank' in self.system and 'HPH tank' in self.system:
+            # self.power_balance['hydrogen']['H tank'][step] = self.technologies['H tank'].use(h,pb['hydrogen'])
+            #pb['hydrogen'] += self.power_balance['hydrogen']['H tank'][step]
+            available_hyd_lp = self.technologies['H tank'].LOC[step] + self.technologies['H tank'].max_capacity - self.technologies['H tank'].used_capacity
+            storable_hydrogen_hp = self.technologies['HPH tank'].max_capacity-self.technologies['HPH tank'].LOC[step]
+
+            if self.technologies['HPH tank'].LOC[step] == self.technologies['HPH tank'].max_capacity:  # if High-Pressure-Tank is full
+                self.power_balance['HP hydrogen']['mechanical compressor'][step]      = 0
+                self.power_balance['electricity']['mechanical compressor'][step]      = 0
+                self.power_balance['cooling water']['mechanical compressor'][step]    = 0
+                self.power_balance['hydrogen']['mechanical compressor'][step]         = 0
+
+                pb['HP hydrogen']    += 0
+                pb['electricity']    += 0   # compressor not working
+                pb['hydrogen']       += 0   # compressor not working
+                self.consumption_logic('electricity', 'electrolyzer', step)
+                self.consumption_logic('water', 'electrolyzer', step)
+                self.production_logic('hydrogen', 'electrolyzer', step)
+                self.production_logic('oxygen', 'electrolyzer', step)
+            else:  # if there is enough room available in the High Pressure Tank, the compressor is activated
+                self.power_balance['HP hydrogen']['mechanical compressor'][step],     \
+                self.power_balance['electricity']['mechanical compressor'][step],     \
+                self.power_balance['cooling water']['mechanical compressor'][step]    = self.technologies['mechanical compressor'].use(step, available_hyd_lp=available_hyd_lp ,storable_hydrogen_hp=storable_hydrogen_hp) # hydrogen supplied by H tank (+) and electricity absorbed(-)
+                self.power_balance['hydrogen']['mechanical compressor'][step] = - self.power_balance['HP hydrogen']['mechanical compressor'][step]
+
+                pb['HP hydrogen'] += self.power_balance['HP hydrogen']['mechanical compressor'][step]
+                pb['hydrogen']    += self.power_balance['hydrogen']['mechanical compressor'][step]
+                pb['electricity'] += self.power_balance['electricity']['mechanical compressor'][step]
+                self.consumption_logic('electricity', 'electrolyzer', step)
+                self.consumption_logic('water', 'electrolyzer', step)
+                self.production_logic('hydrogen', 'electrolyzer', step)
+                self.production_logic('oxygen', 'electrolyzer', step)
+
+                self.consumption_logic('hydrogen', 'mechanical compressor', step)
+                self.consumption_logic('electricity', 'mechanical compressor', step)
+                self.production_logic('HP hydrogen', 'mechanical compressor', step)
+
+    def fuel_cell_step(self,step,pb,weather):
+        """
+        Electricity and heat produced by fuel cell
+        """
+        available_hyd,producible_hyd = self.hydrogen_available_producible(step,pb)
+
+        if pb['electricity'] < 0: #? this condition must be solved if you want to produce electricity to be fed into the gird
+            available_hyd = available_hyd - (-pb['hydrogen'])*c.timestep*60
+            if available_hyd > 0:
+                use = self.technologies['fuel cell'].use(step,pb['electricity'],available_hyd)     # saving fuel cell working parameters for the current timeframe
+                self.power_balance['hydrogen']['fuel cell'][step] =    use[0] # hydrogen absorbed by fuel cell(-)
+                self.power_balance['electricity']['fuel cell'][step] = use[1] # electricity supplied(+)
+
+                if use[2] < -pb['heating water']: #all of the heat producted by FC is used
+                    self.power_balance['heating water']['fuel cell'][step]=use[2] # heat loss of fuel cell
+                else:
+                    self.power_balance['heating water']['fuel cell'][step]=-pb['heating water'] # heat loss of fuel cell- demand
+
+                pb['hydrogen'] += self.power_balance['hydrogen']['fuel cell'][step]
+                pb['electricity'] += self.power_balance['electricity']['fuel cell'][step]
+                pb['heating water'] += self.power_balance['heating water']['fuel cell'][step]
+                self.production_logic('electricity', 'fuel cell', step)
+                self.consumption_logic('hydrogen','fuel cell', step)
+                self.production_logic('heating water', 'fuel cell', step)
+
+    def SMR_step(self,step,pb,weather):
+        """
+        Hydrogen produced by steam methane reformer
+        """
+        if pb['hydrogen'] < 0:      # currently activated only in presence of hydrogen demand
+            self.power_balance['gas']['SMR'][step], self.power_balance['hydrogen']['SMR'][step] = self.technologies['SMR'].use(pb['hydrogen']) # NG consumed and hydrogen produced from SMR
+            pb['gas']       += self.power_balance['gas']['SMR'][step]       # gas balance update: - gas consumed by SMR
+            pb['hydrogen']  += self.power_balance['hydrogen']['SMR'][step]  # hydrogen balance update: + hydrogen produced by SMR
+
+            self.production_logic('hydrogen', 'SMR', step)
+            self.consumption_logic('gas', 'SMR', step)
+
+
+    # if tech_name in ['H tank','HPH tank']:     #versione buona
+    #     if self.system['hydrogen demand']['strategy'] != 'supply-led':
+    #         self.power_balance[self.tank_stream[tech_name]][tech_name][step] = self.technologies[tech_name].use(h,pb[self.tank_stream[tech_name]])
+    #        pb[self.tank_stream[tech_name]] += self.power_balance[self.tank_stream[tech_name]][tech_name][step]
+    #     elif self.system['hydrogen demand']['strategy'] == 'supply-led' and h == (c.timestep_number - 1):
+    #         prod = self.power_balance['hydrogen']['electrolyzer']
+    #         for h in range(c.timestep_number):
+    #             self.power_balance[self.tank_stream[tech_name]][tech_name][step] = self.technologies[tech_name].use(h,prod[step],constant_demand=self.constant_flow )
+    #     else:
+    #         pass
+
+    def H_tank_step(self,step,pb,weather):
+        """
+        Hydrogen stored or supplied by H tank
+        """
+        if 'HPH tank' not in self.system and ('hydrogen demand' in self.system or 'HP hydrogen demand' in self.system):
+            if self.system[self.hydrogen_demand+' demand']['strategy'] == 'demand-led':
+                self.power_balance['hydrogen']['H tank'][step] = self.technologies['H tank'].use(step,pb['hydrogen'])
+                pb['hydrogen'] += self.power_balance['hydrogen']['H tank'][step]
+            elif self.system[self.hydrogen_demand+' demand']['strategy'] == 'supply-led' and step == (c.timestep_number - 1):
+                prod = self.power_balance['hydrogen']['electrolyzer']
+                for step in range(c.timestep_number):
+                    self.power_balance['hydrogen']['H tank'][step] = self.technologies['H tank'].use(step,prod[step],constant_demand=self.constant_flow )
+            # else:
+                # pass
+        else:
+            self.power_balance['hydrogen']['H tank'][step] = self.technologies['H tank'].use(step,pb['hydrogen'])
+            pb['hydrogen'] += self.power_balance['hydrogen']['H tank'][step]
+        if self.power_balance['hydrogen']['H tank'][step] >= 0:
+            self.production_logic('hydrogen', 'H tank', step)
+        elif self.power_balance['hydrogen']['H tank'][step] <= 0:
+            self.consumption_logic('hydrogen', 'H tank', step)
+
+    def HPH_tank_step(self,step,pb,weather):
+        """
+        Hydrogen stored or supplied by HPH tank
+        """
+        self.power_balance['HP hydrogen']['HPH tank'][step] = self.technologies['HPH tank'].use(step,pb['HP hydrogen'])
+        pb['HP hydrogen'] += self.power_balance['HP hydrogen']['HPH tank'][step]
+
+        if self.power_balance['hydrogen']['HPH tank'][step] >= 0:
+            self.production_logic('hydrogen', 'HPH tank', step)
+        elif self.power_balance['hydrogen']['HPH tank'][step] <= 0:
+            self.consumption_logic('hydrogen', 'HPH tank', step)
+
+    def O2_tank_step(self,step,pb,weather):
+        """
+        Oxygen stored or supplied by O2 tank
+        """
+        if 'oxygen demand' in self.system and self.system['oxygen demand']['strategy'] != 'supply-led':
+            self.power_balance['oxygen']['O2 tank'][step] = self.technologies['O2 tank'].use(step,pb['oxygen'])
+            pb['oxygen'] += self.power_balance['oxygen']['O2 tank'][step]
+        elif self.system['hydrogen demand']['strategy'] == 'supply-led' and step == (c.timestep_number - 1):
+            self.technologies['O2 tank'].sizing(self.technologies['H tank'].max_capacity)
+        else:
+            pass
+        if self.power_balance['oxygen']['O2 tank'][step] >= 0:
+            self.production_logic('oxygen', 'O2 tank', step)
+        elif self.power_balance['oxygen']['O2 tank'][step] <= 0:
+            self.consumption_logic('oxygen', 'O2 tank', step)
+
+    def inverter_step(self,step,pb,weather,balance):
+        """
+        Electricity lost in conversion by the inverter
+        balance: array self.power_balance['electricity']['inverter'] resolved when the dispatch plan is compiled
+        """
+        balance[step] = self.technologies['inverter'].use(step,pb['electricity']) # electricity lost in conversion by the inverter
+        pb['electricity'] += balance[step] # electricity balance update: - electricity lost in conversion by the invertert
+        self.consumption_logic('electricity', 'inverter', step)
+
+    def demand_step(self,step,pb,weather,carrier,tech_name,balance):
+        """
+        Energy/material stream demand
+        carrier: str energy carrier
+        tech_name: str f"{carrier} demand"
+        balance: array self.power_balance[carrier][tech_name] resolved when the dispatch plan is compiled
+        """
+        pb[carrier] += balance[step]    # power balance update: energy demand(-)
+        if balance[step] >= 0:
+            self.production_logic(carrier, tech_name, step)
+        elif balance[step] <= 0:
+            self.consumption_logic(carrier, tech_name, step)
+
+    def grid_step(self,step,pb,weather,carrier,tech_name,balance,feed,draw):
+        """
+        Energy/material stream exchanged with the grid
+        carrier: str energy carrier
+        tech_name: str f"{carrier} grid"
+        balance: array self.power_balance[carrier][tech_name] resolved when the dispatch plan is compiled
+        feed, draw: bool self.system[tech_name]['feed'] and self.system[tech_name]['draw']
+        """
+        if pb[carrier] > 0 and feed or pb[carrier] < 0 and draw:
+            balance[step] = -pb[carrier] # energy from grid(+) or into grid(-)
+            pb[carrier] += balance[step]  # electricity balance update
+            if balance[step] >= 0:
+                self.production_logic(carrier, tech_name, step)
+            elif balance[step] <= 0:
+                self.consumption_logic(carrier, tech_name, step)
@@ -0,0 +1,144 @@
+"""
+PROFILER MODULE
+
+    Opt-in instrumentation of the REC simulation (see REC.REC_power_simulation(profile=...)).
+    Cumulative wall time and number of calls are recorded for:
+            - each step handler of the dispatch plan of each location (e.g. electrolyzer_step, demand_step (electricity demand))
+            - the use method of each technology (e.g. electrolyzer.use, mechanical compressor.use, battery.use)
+            - consumption_logic and production_logic of each location
+            - loc_power_simulation of each location
+            - the REC phases (e.g. REC_step, REC_csc_post_pass, REC_power_simulation_horizon)
+
+    Methods are wrapped on the simulated objects only while profiling and restored at the end,
+    so nothing changes in the simulation when profiling is disabled.
+    Times are cumulative: the time of a handler includes the time of the technology use method and of the logic it calls.
+"""
+
+import csv
+import json
+import time
+from functools import partial
+
+
+class timed_call:
+
+    def __init__(self,function,record):
+        """
+        Callable recording number of calls and cumulative wall time of function
+
+        function: callable to be timed
+        record: list [calls, seconds] updated at each call
+        """
+        self.function = function
+        self.record = record
+
+    def __call__(self,*args,**kwargs):
+        start = time.perf_counter()
+        try:
+            return(self.function(*args,**kwargs))
+        finally:
+            self.record[0] += 1
+            self.record[1] += time.perf_counter() - start
+
+    def __reduce__(self):
+        return(self.function.__reduce__()) # pickled as the original function (e.g. checkpoints), instrumentation is not saved
+
+
+class profiler:
+
+    def __init__(self):
+        """
+        Profiler of a REC simulation
+
+        output : profiler object able to:
+            instrument a REC and its locations .instrument_rec(rec)
+            restore them .remove()
+            write the report .write(file,seconds,steps)
+        """
+        self.records = {}   # (location, kind, name): [calls, seconds]
+        self.wrapped = []   # (object, attribute) instrumented, restored by remove()
+        self.locations = [] # instrumented locations, their dispatch plan is compiled again by remove()
+
+    def timed(self,key,function):
+        """
+        Wrap function recording its calls under key (location, kind, name)
+        """
+        return(timed_call(function,self.records.setdefault(key,[0,0.])))
+
+    def instrument(self,obj,attribute,key):
+        """
+        Replace the method obj.attribute with its timed version (instance attribute, removed by remove())
+        """
+        setattr(obj,attribute,self.timed(key,getattr(obj,attribute)))
+        self.wrapped.append((obj,attribute))
+
+    def instrument_location(self,loc):
+        """
+        Instrument step handlers, technologies use methods, consumption and production logic of a location
+        """
+        for tech_name in loc.technologies:
+            if callable(getattr(loc.technologies[tech_name],'use',None)):
+                self.instrument(loc.technologies[tech_name],'use',(loc.name,'technology',f"{tech_name}.use"))
+        self.instrument(loc,'consumption_logic',(loc.name,'logic','consumption_logic'))
+        self.instrument(loc,'production_logic',(loc.name,'logic','production_logic'))
+        self.instrument(loc,'loc_power_simulation',(loc.name,'location','loc_power_simulation'))
+
+        plan = []
+        for handler in loc.dispatch_plan:
+            if isinstance(handler,partial):
+                name = handler.func.__name__ + (f" ({handler.keywords['tech_name']})" if 'tech_name' in handler.keywords else '')
+            else:
+                name = handler.__name__
+            plan.append(self.timed((loc.name,'handler',name),handler))
+        loc.dispatch_plan = plan
+        self.locations.append(loc)
+
+    def instrument_rec(self,rec):
+        """
+        Instrument the REC phases and every location of the REC
+        """
+        for method in ['REC_step','REC_csc_post_pass','REC_power_simulation_horizon','REC_power_simulation_parallel','collective_battery_step']:
+            self.instrument(rec,method,('REC','phase',method))
+        for location_name in rec.locations:
+            self.instrument_location(rec.locations[location_name])
+
+    def remove(self):
+        """
+        Restore the instrumented methods and dispatch plans
+        """
+        for obj,attribute in self.wrapped:
+            obj.__dict__.pop(attribute,None)
+        for loc in self.locations:
+            loc.dispatch_plan = loc.compile_dispatch_plan()
+        self.wrapped = []
+        self.locations = []
+
+    def write(self,file,seconds,steps):
+        """
+        Write the profiling report
+
+        file: str .csv (rows sorted by cumulative time) or .json file
+        seconds: float wall time of the whole simulation [s]
+        steps: int number of simulated steps
+
+        output: file with location, kind (handler, technology, logic, location, phase), name, calls, cumulative time [s],
+                mean time per call [us], share of the simulation time [%] and steps per second of each location
+        """
+        rows = []
+        for (location_name,kind,name),(calls,cumulative) in sorted(self.records.items(),key=lambda item: -item[1][1]):
+            if calls == 0:
+                continue
+            rows.append({'location': location_name, 'kind': kind, 'name': name, 'calls': calls, 'time [s]': cumulative,
+                         'mean [us]': cumulative/calls*1e6, 'share [%]': cumulative/seconds*100 if seconds > 0 else 0.,
+                         'steps/s': steps/cumulative if kind == 'location' and cumulative > 0 else None})
+
+        if file.endswith('.json'):
+            with open(file,'w') as f:
+                json.dump({'steps': steps, 'time [s]': seconds, 'steps/s': steps/seconds if seconds > 0 else None, 'records': rows},f,indent=1)
+        else:
+            with open(file,'w',newline='') as f:
+                writer = csv.DictWriter(f,fieldnames=['location','kind','name','calls','time [s]','mean [us]','share [%]','steps/s'])
+                writer.writeheader()
+                writer.writerow({'location': 'REC', 'kind': 'simulation', 'name': 'REC_power_simulation', 'calls': 1, 'time [s]': seconds,
+                                 'mean [us]': seconds*1e6, 'share [%]': 100., 'steps/s': steps/seconds if seconds > 0 else None})
+                writer.writerows(rows)
@@ -2,14 +2,75 @@ import numpy as np
 import pickle
 import csv
 import os
+import json
+import gc
+import time
+import tempfile
 import pandas as pd
+import multiprocessing
+import functools
 import pvlib #https://github.com/pvlib
 from core import location
 from core import constants as c
+from core.balances import balance_tensor
+from core.series import weather_series
+from core.checkpoint import checkpoint_store, load_checkpoint
+from core import steadystate
+from core.profiler import profiler
+from core import budget
+from core import scratch
+
+def set_context(context):
+    """
+    Activate the simulation context of the REC in a worker process (see REC.REC_power_simulation_parallel)
+    
+    context: simulation_context object of the REC (see constants.py)
+    """
+    c.active_context.set(context)
+
+def in_context(method):
+    """
+    Decorator of REC methods: the method is executed with the simulation context of the REC active (see constants.py),
+    so that technologies read the timestep, P2E... of this REC even if other RECs exist in the same process
+    """
+    @functools.wraps(method)
+    def wrapper(self,*args,**kwargs):
+        with c.activate(self.context):
+            return(method(self,*args,**kwargs))
+    return(wrapper)
+
+def location_worker(connection,context,locations,weather):
+    """
+    Worker process of REC.REC_power_simulation_parallel: simulates a group of locations chunk by chunk, as requested by the REC
+    
+    connection: multiprocessing connection to the REC, receives (first_step,last_step) for each chunk and None at the end
+    context: bytes pickled simulation_context of the REC (see constants.py)
+    locations: bytes locations pickled with scratch.share_pickler: their time series are shared with the REC
+    weather: weather_series REC weather (see series.py)
+    
+    output (sent to the REC): None at the end of each chunk, the simulated locations pickled with scratch.share_pickler at the end
+                              or the exception raised by the simulation
+    """
+    try:
+        set_context(pickle.loads(context))  # the scratch store of the worker creates its own block files (see scratch_store.__getstate__)
+        locations = pickle.loads(locations)
+        while True:
+            request = connection.recv()
+            if request is None:
+                break
+            first_step,last_step = request
+            for step in range(first_step,last_step):
+                for location_name in locations:
+                    locations[location_name].loc_power_simulation(step,weather)
+            scratch.release(steadystate.series_arrays(locations),first_step,last_step) # chunk completed: pages released from the worker memory
+            connection.send(None)
+        connection.send(scratch.dumps_shared(locations,c.scratch))
+    except Exception as error:
+        connection.send(error)
 
 class REC:
     
-    def __init__(self,structure,general,file_structure,file_general,path):
+    def __init__(self,structure,general,file_structure,file_general,path,weather=None):
         """
         Create a Renewable Energy Comunity object composed of several locations (producers, consumers, prosumers)
     
@@ -29,7 +90,17 @@ class REC:
             'weather': if "TMY" weather database based on typical meteorological year is used
                 if "filename.csv" a different database can be used (upload it in input/weather)
                 in this case 'latitude' and 'longitude' are ignored
+            'memory budget': float (optional) [MB] the REC is not created if its projected arrays exceed it (see budget.py)
+            'scratch': str (optional) scratch folder: location and tech time series are backed by memory-mapped files instead of the heap (see scratch.py)
+            'precision': str (optional) 'float64' (default) or 'float32' dtype of reporting series: flows, efficiency and performance histories
+                and power balances (simulated in float64 and converted at the end of the simulation, see reporting_precision).
+                State arrays (storage LOC, ageing accumulators, values read back by the models) are always float64
+            'curve cache': str (optional) folder where the performance curves of electrolyzers and fuel cells are stored after their first computation
+                and loaded by later constructions with the same parameters, also by other simulations (see curves.cached)
                         
+        weather: weather_series (optional) weather already generated by a previous REC with the same general (e.g. .weather, see series.py),
+            if given neither weather nor previous_simulation files are read or written (see sweep.py)
+        
         output : REC object able to:
             simulate the power flows of each present locations .REC_simulation
             record REC power balances (electricity, heat, gas and hydrogen) 
@@ -38,125 +109,494 @@ class REC:
         otherwise they are downloaded from PVgis considering the typical meteorological year.
         
         """
-        ### Add global variables to constants.py as c, to make them known to the other modules.
-        c.timestep          = int(general['timestep'])                                           # [min] timestep 
-        c.timestep_number   = int( general['simulation years']* 365*24*60 / c.timestep )    # [-] number of timestep 
-        c.simulation_years  = general['simulation years']
-        c.P2E               = c.timestep*60                                                 # conversion factor from kW to kJ or from kg/s to kg
-        c.latitude          = general['latitude']
-        c.longitude         = general["longitude"]
-        c.UTC               = general["UTC time zone"] # int 0,1,2 [UTC] es. Italy is in UTC+1 time zone EUROPEAN DATABASE
-        c.DST               = general["DST"] # boolean, Daily saving time (fusorario)
+        ### Memory budget: simulations exceeding it are refused before allocating anything (see budget.py)
+        if general.get('memory budget',False):
+            budget.check(budget.estimate(structure,general),general['memory budget'])
 
-        ##############################################################################################
-        ### Check if new input files have to been downloaded from PV gis 
-        check = True # Used to check if TMY have to been downloaded from PVgis or the old one can be used
-        check_pv = True # Used to check if PV_production series have to been downloaded from PVgis or the old one can be used
-        directory = './previous_simulation'
-        if not os.path.exists(directory): os.makedirs(directory)
+        ### Simulation context: global variables of this simulation made known to the other modules through constants.py as c (see constants.py)
+        self.context = c.simulation_context(general)
+        self.file_structure = file_structure
+        self.general = general    # saved with the results, to assess them with the context of this simulation (see economics.in_results_context)
+        for name in c.CONTEXT_VARIABLES:
+            setattr(c,name,getattr(self.context,name)) # compatibility fallback, used when no simulation is running (e.g. postprocess)
+        if general.get('scratch',False):
+            self.context.scratch = scratch.scratch_store(general['scratch'],prefix=f"{file_structure}_") # time series of this REC are allocated in its own scratch subfolder
+        
+        with c.activate(self.context):
+            ##############################################################################################
+            if weather is not None: # weather and series of a previous REC are used
+                self.weather = weather
+                check_pv = True
+            else:
+                ### Check if new input files have to been downloaded from PV gis 
+                check = True # Used to check if TMY have to been downloaded from PVgis or the old one can be used
+                check_pv = True # Used to check if PV_production series have to been downloaded from PVgis or the old one can be used
+                directory = './previous_simulation'
+                if not os.path.exists(directory): os.makedirs(directory)
 
-        if os.path.exists(f"previous_simulation/{file_general}.pkl"):
-            with open(f"previous_simulation/{file_general}.pkl", 'rb') as f: ps_general = pickle.load(f) # previous simulation general
-            par_to_check = ['latitude','longitude','UTC time zone','DST']
-            for par in par_to_check:
-                if ps_general[par] != general[par]:
-                    check = False          
-        else:
-            check = False 
-        if os.path.exists(f"previous_simulation/{file_general}_{file_structure}.pkl"):
-            with open(f"previous_simulation/{file_general}_{file_structure}.pkl", 'rb') as f: ps_general = pickle.load(f) # previous simulation general
-            par_to_check = ['latitude','longitude','UTC time zone','DST']
-            for par in par_to_check:
-                if ps_general[par] != general[par]:
-                    check_pv = False          
-        else:
-            check_pv = False
-        self.weather = self.weather_generation(general,path,check,file_general) # check if metereological data have to been downloaded from PVgis or has already been done in a previous simulation
-        self.weather = pd.concat([self.weather] * c.simulation_years, ignore_index = True)
-        if check == False:
-            with open(f"previous_simulation/{file_general}.pkl", 'wb') as f: pickle.dump(general, f)
-        if check_pv == False:
-            with open(f"previous_simulation/{file_general}_{file_structure}.pkl", 'wb') as f: pickle.dump(general, f)
-        ##############################################################################################
+                if os.path.exists(f"previous_simulation/{file_general}.pkl"):
+                    with open(f"previous_simulation/{file_general}.pkl", 'rb') as f: ps_general = pickle.load(f) # previous simulation general
+                    par_to_check = ['latitude','longitude','UTC time zone','DST']
+                    for par in par_to_check:
+                        if ps_general[par] != general[par]:
+                            check = False          
+                else:
+                    check = False 
+                if os.path.exists(f"previous_simulation/{file_general}_{file_structure}.pkl"):
+                    with open(f"previous_simulation/{file_general}_{file_structure}.pkl", 'rb') as f: ps_general = pickle.load(f) # previous simulation general
+                    par_to_check = ['latitude','longitude','UTC time zone','DST']
+                    for par in par_to_check:
+                        if ps_general[par] != general[par]:
+                            check_pv = False          
+                else:
+                    check_pv = False
+                weather = self.weather_generation(general,path,check,file_general) # check if metereological data have to been downloaded from PVgis or has already been done in a previous simulation
+                # weather columns stored as contiguous arrays of one year, expanded to the simulation timestep and years by index arithmetic (see series.py)
+                self.weather = weather_series({column: weather[column].to_numpy() for column in weather},int(60/c.timestep) if c.timestep < 60 else 1,c.timestep_number)
+                if check == False:
+                    with open(f"previous_simulation/{file_general}.pkl", 'wb') as f: pickle.dump(general, f)
+                if check_pv == False:
+                    with open(f"previous_simulation/{file_general}_{file_structure}.pkl", 'wb') as f: pickle.dump(general, f)
+            ##############################################################################################
 
 
-        self.locations = {} # initialise REC locations dictionary
-        self.power_balance = {'electricity': {}, 'heating water': {}, 'cooling water': {}, 'hydrogen': {}, 'gas': {}, 'process steam': {}} # initialise power balances dictionaries
-        ### create location objects and add them to the REC locations dictionary
-        for location_name in structure: # location_name are the keys of 'structure' dictionary and will be used as keys of REC 'locations' dictionary too
-            self.locations[location_name] = location.location(structure[location_name],location_name,path,check_pv,file_structure,file_general) # create location object and add it to REC 'locations' dictionary                     
+            self.locations = {} # initialise REC locations dictionary
+            self.power_balance = {'electricity': {}, 'heating water': {}, 'cooling water': {}, 'hydrogen': {}, 'gas': {}, 'process steam': {}} # initialise power balances dictionaries
+            ### create location objects and add them to the REC locations dictionary
+            for location_name in structure: # location_name are the keys of 'structure' dictionary and will be used as keys of REC 'locations' dictionary too
+                self.locations[location_name] = location.location(structure[location_name],location_name,path,check_pv,file_structure,file_general) # create location object and add it to REC 'locations' dictionary                     
+
+    @in_context
+    def initialise_power_balance(self):
+        """
+        Initialise REC electricity balances before the simulation
+        """
+        self.power_balance['electricity']['from electricity grid'] = None # array of electricity withdrawn from the grid from the whole rec
+        self.power_balance['electricity']['into electricity grid'] = None # array of electricity withdrawn from the grid
+        self.power_balance['electricity']['collective self consumption'] = None # array of collective self consumed electricity from the whole rec
+        self.balance_tensor = balance_tensor(self.power_balance,c.timestep_number) # REC balances stored in a single contiguous 2-D array, self.power_balance[carrier][tech] are zero-copy views of its rows (see balances.py)
+        self.count = []
 
-    def REC_power_simulation(self):
+    @in_context
+    def REC_power_simulation(self,vectorized=True,processes=1,chunk=None,store=None,checkpoint=None,resume_from=None,steady_state=False,profile=None):
         """
         Simulate the REC every hour
         
+        vectorized: bool if True (default) stateless RECs are simulated with REC_power_simulation_horizon() instead of step by step
+                    and, if no battery has collective == 1, collective self consumption is calculated with REC_csc_post_pass()
+        processes: int if > 1 locations are simulated by parallel worker processes (see REC_power_simulation_parallel())
+        chunk: None (default) or int number of steps or 'year': streaming mode, the REC is simulated in chunks 
+               and its time series are flushed to the on-disk store at the end of each chunk (see REC_power_simulation_chunked())
+        store: None (default) or str folder of the on-disk store of the streaming mode, 
+               None: a new folder results/store/file_structure_xxxx for each simulation, False: time series are kept in memory
+        checkpoint: None (default) or str folder where the simulation state is saved at the end of each chunk (chunk = 'year' if not specified)
+        resume_from: None (default) or str folder of the checkpoint to resume the simulation from (chunk = 'year' if not specified)
+        steady_state: bool if True the last simulated chunk is copied forward once the technologies reach a cyclic steady state 
+                      (see REC_power_simulation_chunked(), chunk = 'year' if not specified)
+        profile: None (default) or str .csv or .json file: the simulation is profiled and a report with calls and cumulative time of each
+                 step handler, technology use method and logic of each location is written (see profiler.py). 
+                 Profiled simulations run in a single process
+        
         output :
             updating location power balances
             updating REC power balances
         """
-        ### initialise REC electricity balances
-        self.power_balance['electricity']['from electricity grid'] = np.zeros(c.timestep_number) # array of electricity withdrawn from the grid from the whole rec
-        self.power_balance['electricity']['into electricity grid'] = np.zeros(c.timestep_number) # array of electricity withdrawn from the grid
-        self.power_balance['electricity']['collective self consumption'] = np.zeros(c.timestep_number) # array of collective self consumed electricity from the whole rec
-        self.count = []
+        ### profiling: methods are instrumented only for this simulation
+        if profile is not None:
+            profiling = profiler()
+            profiling.instrument_rec(self)
+            start = time.perf_counter()
+            try:
+                self.REC_power_simulation(vectorized,1,chunk,store,checkpoint,resume_from,steady_state)
+            finally:
+                profiling.remove()
+            profiling.write(profile,time.perf_counter()-start,c.timestep_number)
+            return
+        
+        self.initialise_power_balance()
+        self.REC_power_simulation_mode(vectorized,processes,chunk,store,checkpoint,resume_from,steady_state)
+        self.reporting_precision() # balances are simulated in float64 and stored with the reporting precision (see reporting_precision)
+
+    @in_context
+    def REC_power_simulation_mode(self,vectorized,processes,chunk,store,checkpoint,resume_from,steady_state):
+        """
+        Simulate the REC with the mode selected by the parameters of REC_power_simulation (see it)
+        """
+        ### streaming mode: bounded memory, time series stored on disk, checkpoints
+        if chunk is not None or checkpoint is not None or resume_from is not None or steady_state:
+            self.REC_power_simulation_chunked('year' if chunk is None else chunk,store,checkpoint,resume_from,steady_state)
+            return
+        
+        ### parallel mode: locations are simulated by worker processes, grid aggregation and collective self consumption are solved chunk by chunk
+        parallel = processes > 1 and not (vectorized and all(self.locations[location_name].stateless for location_name in self.locations))
+        if parallel:
+            self.REC_power_simulation_parallel(processes)
+        
+        ### array references resolved once, to avoid repeated dictionary lookups inside the simulation core
+        from_grid   = self.power_balance['electricity']['from electricity grid']
+        into_grid   = self.power_balance['electricity']['into electricity grid']
+        csc         = self.power_balance['electricity']['collective self consumption']
+        loc_grid    = {location_name: self.locations[location_name].power_balance['electricity'].get('electricity grid') for location_name in self.locations} # location grid balances (None if the location is not connected)
+        loc_csc     = {location_name: self.locations[location_name].power_balance['electricity']['collective self consumption'] for location_name in self.locations}
+        collective_batteries = [location_name for location_name in self.locations if 'battery' in self.locations[location_name].technologies and self.locations[location_name].technologies['battery'].collective == 1]
+        
+        if parallel:
+            for step in range(c.timestep_number):
+                for location_name in collective_batteries:
+                    self.collective_battery_step(step,location_name,from_grid,into_grid,loc_grid,loc_csc)
+            return
+        
+        ### fast path: if every location is stateless (only PV, wind, demands and grids) the whole horizon is simulated at once
+        if vectorized and self.REC_power_simulation_horizon(from_grid,into_grid,csc,loc_grid,loc_csc):
+            return
+        
+        ### post-pass: without collective batteries the REC does not affect the locations, which are simulated first. 
+        ### Grid aggregation and collective self consumption are then calculated for all the steps at once
+        if vectorized and not collective_batteries:
+            for step in range(c.timestep_number): # step to simulate
+                for location_name in self.locations: # each locations 
+                    self.locations[location_name].loc_power_simulation(step,self.weather) # simulate a single location updating its power balances
+            self.REC_csc_post_pass(from_grid,into_grid,csc,loc_grid,loc_csc)
+            return
         
         ### simulation core
         for step in range(c.timestep_number): # step to simulate
-            for location_name in self.locations: # each locations 
-                self.locations[location_name].loc_power_simulation(step,self.weather) # simulate a single location updating its power balances
+            self.REC_step(step,from_grid,into_grid,csc,loc_grid,loc_csc,collective_batteries)
                 
-            ### solve electricity grid 
-                if 'electricity grid' in self.locations[location_name].power_balance['electricity']:
-                    if self.locations[location_name].power_balance['electricity']['electricity grid'][step] < 0:
-                        self.power_balance['electricity']['into electricity grid'][step] += self.locations[location_name].power_balance['electricity']['electricity grid'][step] # electricity fed into the grid from the whole rec at step step
-                    else:                                                     
-                        self.power_balance['electricity']['from electricity grid'][step] += self.locations[location_name].power_balance['electricity']['electricity grid'][step] # electricity withdrawn from the grid the whole rec at step step
-                          
-            ### calculate collective self consumption and who contributed to it
-            self.power_balance['electricity']['collective self consumption'][step] = min(-self.power_balance['electricity']['into electricity grid'][step],self.power_balance['electricity']['from electricity grid'][step]) # calculate REC collective self consumption how regulation establishes      
+
+    def REC_step(self,step,from_grid,into_grid,csc,loc_grid,loc_csc,collective_batteries):
+        """
+        Simulate the locations and solve the REC at a single step
+        
+        step: int step to simulate
+        from_grid, into_grid, csc: REC electricity balances (arrays)
+        loc_grid, loc_csc: dictionaries location_name: location grid and collective self consumption balances (arrays)
+        collective_batteries: list of the locations with a battery with collective == 1
+        
+        output : updating location and REC power balances at step
+        """
+        for location_name in self.locations: # each locations 
+            self.locations[location_name].loc_power_simulation(step,self.weather) # simulate a single location updating its power balances
             
-            if self.power_balance['electricity']['collective self consumption'][step] > 0:
-                for location_name in self.locations:
-                    if self.locations[location_name].power_balance['electricity']['electricity grid'][step] < 0: # contribution as producer
-                        self.locations[location_name].power_balance['electricity']['collective self consumption'][step] = - self.power_balance['electricity']['collective self consumption'][step] * self.locations[location_name].power_balance['electricity']['electricity grid'][step] / self.power_balance['electricity']['into electricity grid'][step]
-                    else: # contribution as consumer
-                        self.locations[location_name].power_balance['electricity']['collective self consumption'][step] = self.power_balance['electricity']['collective self consumption'][step] * self.locations[location_name].power_balance['electricity']['electricity grid'][step] / self.power_balance['electricity']['from electricity grid'][step]
+        ### solve electricity grid 
+            if loc_grid[location_name] is not None:
+                if loc_grid[location_name][step] < 0:
+                    into_grid[step] += loc_grid[location_name][step] # electricity fed into the grid from the whole rec at step step
+                else:                                                     
+                    from_grid[step] += loc_grid[location_name][step] # electricity withdrawn from the grid the whole rec at step step
+                      
+        ### calculate collective self consumption and who contributed to it
+        csc[step] = min(-into_grid[step],from_grid[step]) # calculate REC collective self consumption how regulation establishes      
+        
+        if csc[step] > 0:
+            for location_name in self.locations:
+                if loc_grid[location_name][step] < 0: # contribution as producer
+                    loc_csc[location_name][step] = - csc[step] * loc_grid[location_name][step] / into_grid[step]
+                else: # contribution as consumer
+                    loc_csc[location_name][step] = csc[step] * loc_grid[location_name][step] / from_grid[step]
 
-            ###################################################################################################################################
-            ### solve smart batteries (only available with timestep == 60)
+        ###################################################################################################################################
+        ### solve smart batteries (only available with timestep == 60)
+        for location_name in collective_batteries:
+            self.collective_battery_step(step,location_name,from_grid,into_grid,loc_grid,loc_csc)
+            
+    def REC_power_simulation_chunked(self,chunk,store,checkpoint=None,resume_from=None,steady_state=False):
+        """
+        Simulate the REC in chunks of consecutive steps (e.g. one year), with its time series stored on disk
+        
+        chunk: int number of steps of each chunk or 'year'
+        store: None, False or str folder of the on-disk store: one binary file (channels, timesteps) of float64 for the REC and for each location,
+               channels.json with the channels (rows) of each file and the scratch store of the other time series ('scratch' in general.json if defined).
+               None: a new folder in results/store, so that simulations running at the same time never share it. False: time series are kept in memory
+        checkpoint: None or str folder where the simulation state is saved at the end of each chunk (see checkpoint.py)
+        resume_from: None or str folder of the checkpoint to resume the simulation from
+        steady_state: bool cyclic steady-state detection (see steadystate.py): if the input series repeat every chunk (e.g. typical year 
+                      weather and demands) and the state of every technology at the end of a chunk is the same as at its beginning, 
+                      the chunk is copied forward until the end of the simulation instead of simulating the following chunks.
+                      Not applied if a technology is ageing
+        
+        Location and REC power balances are memory-mapped on the store files, the other time series (flows between technologies, 
+        technology series as LOC, efficiency and stack histories) are moved to the scratch store, where flows allocated during the simulation
+        are created too (see scratch.py). At the end of each chunk all the time series are flushed to disk and the chunk is released from memory, 
+        so the memory used by the time series depends on chunk instead of the simulation length.
+        Technology states (e.g. battery LOC, tank level, ageing) are carried from one chunk to the next by the technology objects.
+        
+        output :
+            updating location power balances
+            updating REC power balances
+            store files
+            checkpoint files
+        """
+        if chunk == 'year':
+            chunk = int(c.HOURS_YEAR*c.MINUTES_HOUR/c.timestep)
+        
+        ### resume: locations (technologies included) and REC power balances are replaced with the saved ones
+        first_step = 0
+        checkpoints = None
+        if resume_from is not None:
+            first_step,state,checkpoints = load_checkpoint(resume_from,chunk if checkpoint == resume_from else None)
+            self.locations = state['locations']
+            self.balance_tensor = state['balance_tensor']
+            self.power_balance = self.balance_tensor.balances
+        if checkpoint is not None and checkpoints is None:
+            checkpoints = checkpoint_store(checkpoint,chunk)
+        
+        if store is None:
+            if not os.path.exists('results/store'): os.makedirs('results/store')
+            store = tempfile.mkdtemp(prefix=f"{self.file_structure}_",dir='results/store')
+        if store is not False:
+            if not os.path.exists(store): os.makedirs(store)
+            self.balance_tensor.to_store(f"{store}/REC.dat")
+            channels = {'REC': self.balance_tensor.channels}
             for location_name in self.locations:
-                
-                # battery.collective = 1: 
-                # REC tels to location how mutch electricity can be absorbed or supplied by battery every hour, without decreasing the collective-self-consumption
-                
-                if 'battery' in self.locations[location_name].technologies and self.locations[location_name].technologies['battery'].collective == 1:
-                    
-                    if c.timestep != 60:
-                        raise ValueError("Warning! Batteries with strategy collective == 1 only work with timestep == 60 ")
+                self.locations[location_name].to_store(f"{store}/{location_name}.dat")
+                channels[location_name] = self.locations[location_name].balance_tensor.channels
+            with open(f"{store}/channels.json",'w') as f: json.dump({name: [list(channel) for channel in channels[name]] for name in channels},f,indent=1)
+            
+            ### flows and technology series moved to the scratch store, flows allocated during the simulation are created in it too
+            if self.context.scratch is None:
+                self.context.scratch = scratch.scratch_store(store,prefix='series_')
+            self.locations = pickle.loads(scratch.dumps_shared(self.locations,self.context.scratch))
+            gc.collect()    # previous locations (reference cycles through their dispatch plans) and their heap arrays are freed now
+            scratch.release(steadystate.series_arrays([self.locations,self.balance_tensor]),0,c.timestep_number) # series just written released from memory
+        
+        ### array references resolved after the time series have been moved to the store
+        from_grid   = self.power_balance['electricity']['from electricity grid']
+        into_grid   = self.power_balance['electricity']['into electricity grid']
+        csc         = self.power_balance['electricity']['collective self consumption']
+        loc_grid    = {location_name: self.locations[location_name].power_balance['electricity'].get('electricity grid') for location_name in self.locations}
+        loc_csc     = {location_name: self.locations[location_name].power_balance['electricity']['collective self consumption'] for location_name in self.locations}
+        collective_batteries = [location_name for location_name in self.locations if 'battery' in self.locations[location_name].technologies and self.locations[location_name].technologies['battery'].collective == 1]
+        steady_state = steady_state and not any(getattr(self.locations[location_name].technologies[tech_name],'ageing',False) for location_name in self.locations for tech_name in self.locations[location_name].technologies)
+        steady_state = steady_state and steadystate.periodic(steadystate.series_arrays([self.locations,self.balance_tensor,self.weather]),first_step,chunk)
+        
+        for first_step in range(first_step,c.timestep_number,chunk):
+            last_step = min(first_step+chunk,c.timestep_number)
+            if steady_state:
+                start = steadystate.state_vector(self.locations,first_step) # state of the technologies at the beginning of the chunk
+            
+            if collective_batteries: # the REC affects the locations: solved step by step
+                for step in range(first_step,last_step):
+                    self.REC_step(step,from_grid,into_grid,csc,loc_grid,loc_csc,collective_batteries)
+            else: # locations simulated first, grid aggregation and collective self consumption calculated for the whole chunk
+                for step in range(first_step,last_step):
+                    for location_name in self.locations:
+                        self.locations[location_name].loc_power_simulation(step,self.weather)
+                self.REC_csc_post_pass(from_grid[first_step:last_step],into_grid[first_step:last_step],csc[first_step:last_step],
+                                       {location_name: None if loc_grid[location_name] is None else loc_grid[location_name][first_step:last_step] for location_name in loc_grid},
+                                       {location_name: loc_csc[location_name][first_step:last_step] for location_name in loc_csc})
+            
+            ### chunk completed: time series flushed to disk and released from memory
+            scratch.release(steadystate.series_arrays([self.locations,self.balance_tensor]),first_step,last_step)
+            
+            ### cyclic steady state: the following chunks would repeat this one
+            if steady_state and last_step < c.timestep_number and steadystate.converged(start,steadystate.state_vector(self.locations,last_step)):
+                steadystate.copy_forward(steadystate.series_arrays([self.locations,self.balance_tensor,self.weather]),first_step,last_step)
+                for location_name in self.locations: # as at the last timestep of loc_power_simulation
+                    self.locations[location_name].consumption = self.locations[location_name].consumption.clean()
+                    self.locations[location_name].production = self.locations[location_name].production.clean()
+                scratch.release(steadystate.series_arrays([self.locations,self.balance_tensor]),last_step,c.timestep_number)
+                return
+            
+            ### checkpoint: simulation state saved, only the blocks of steps changed since the previous checkpoint are written
+            if checkpoints is not None and last_step < c.timestep_number:
+                checkpoints.save({'locations': self.locations, 'balance_tensor': self.balance_tensor},last_step)
+        
+        ### flow totals of the whole simulation are calculated at the last step (see location.loc_power_simulation): released too
+        scratch.release(steadystate.series_arrays([self.locations,self.balance_tensor]),0,c.timestep_number)
 
-                    # how much energy can be absorbed or supplied by the batteries cause it's not usefull for collective-self-consumption
-                    E = - self.locations[location_name].power_balance['electricity']['electricity grid'][step] + self.locations[location_name].power_balance['electricity']['collective self consumption'][step]
-                      
-                    self.locations[location_name].power_balance['electricity']['battery'][step] = self.locations[location_name].technologies['battery'].use(step,E) # electricity absorbed(-) by battery
-                    self.locations[location_name].power_balance['electricity']['electricity grid'][step] += - self.locations[location_name].power_balance['electricity']['battery'][step] # update grid balance (locatiom)
-                  
-                    if self.locations[location_name].power_balance['electricity']['battery'][step] < 0:
-                        self.power_balance['electricity']['into electricity grid'][step] += - self.locations[location_name].power_balance['electricity']['battery'][step] # update grid balance (rec)
-                    else:
-                        self.power_balance['electricity']['from electricity grid'][step] += - self.locations[location_name].power_balance['electricity']['battery'][step] # update grid balance (rec)
-                
+    def collective_battery_step(self,step,location_name,from_grid,into_grid,loc_grid,loc_csc):
+        """
+        Electricity absorbed or supplied by a battery with collective == 1 of location_name, once the locations have been simulated at step
+        
+        from_grid, into_grid: arrays REC electricity balances (updated)
+        loc_grid, loc_csc: dictionaries of location grid and collective self consumption balances (loc_grid updated)
+        """
+        # battery.collective = 1: 
+        # REC tels to location how mutch electricity can be absorbed or supplied by battery every hour, without decreasing the collective-self-consumption
+        
+        if c.timestep != 60:
+            raise ValueError("Warning! Batteries with strategy collective == 1 only work with timestep == 60 ")
+
+        # how much energy can be absorbed or supplied by the batteries cause it's not usefull for collective-self-consumption
+        E = - loc_grid[location_name][step] + loc_csc[location_name][step]
+          
+        self.locations[location_name].power_balance['electricity']['battery'][step] = self.locations[location_name].technologies['battery'].use(step,E) # electricity absorbed(-) by battery
+        loc_grid[location_name][step] += - self.locations[location_name].power_balance['electricity']['battery'][step] # update grid balance (locatiom)
+      
+        if self.locations[location_name].power_balance['electricity']['battery'][step] < 0:
+            into_grid[step] += - self.locations[location_name].power_balance['electricity']['battery'][step] # update grid balance (rec)
+        else:
+            from_grid[step] += - self.locations[location_name].power_balance['electricity']['battery'][step] # update grid balance (rec)
+
+    def REC_power_simulation_parallel(self,processes):
+        """
+        Simulate the locations in parallel: locations are partitioned across worker processes, which keep them for the whole simulation
+        and advance them one chunk of steps (one year) at a time (locations do not depend on each other)
+        
+        processes: int number of worker processes
+        
+        Locations are sent once to the workers and their time series are shared through the block files of the scratch store 
+        ('scratch' in general.json, or a temporary store deleted at the end, see scratch.share_pickler): the REC reads the grid balances 
+        of each chunk and writes the collective self consumption of the locations in place, without copying the locations.
+        Chunks are released from memory once solved, by the workers and by the REC.
+        
+        output : self.locations replaced by the simulated locations (same order), their time series stay in the scratch store,
+                 or are copied back to the heap before a temporary store is deleted (so that none of its block files stays mapped)
+                 grid exchange and collective self consumption solved, collective batteries are then solved by REC_power_simulation
+        """
+        location_names = list(self.locations)
+        partitions = [location_names[i::processes] for i in range(processes) if location_names[i::processes]] # round-robin partition of the locations
+        
+        store = self.context.scratch
+        temporary = store is None
+        if temporary:
+            store = self.context.scratch = scratch.scratch_store(tempfile.gettempdir(),prefix=f"{self.file_structure}_parallel_")
+        
+        workers = []
+        try:
+            context = pickle.dumps(self.context)
+            for partition in partitions:
+                data = scratch.dumps_shared({location_name: self.locations[location_name] for location_name in partition},store)
+                self.locations.update(pickle.loads(data))   # the REC refers to the shared time series too, heap arrays are released
+                connection,worker_connection = multiprocessing.Pipe()
+                worker = multiprocessing.Process(target=location_worker,args=(worker_connection,context,data,self.weather),daemon=True)
+                worker.start()
+                workers.append((worker,connection))
+            self.REC_power_simulation_workers(workers)
+        finally:
+            for worker,connection in workers:
+                if worker.is_alive():
+                    worker.terminate()
+            if temporary:
+                self.context.scratch = None
+                self.locations = scratch.heap_copy(self.locations,store)
+                store.remove()
+        self.locations = {location_name: self.locations[location_name] for location_name in location_names}
+
+    def REC_power_simulation_workers(self,workers):
+        """
+        Advance the worker processes of REC_power_simulation_parallel one chunk of steps (one year) at a time, 
+        solving grid exchange and collective self consumption of each chunk once the workers have simulated it
+        
+        workers: list of (process, connection) of the worker processes
+        
+        output : self.locations updated with the simulated locations received from the workers
+        """
+        chunk = int(c.HOURS_YEAR*c.MINUTES_HOUR/c.timestep)
+        from_grid   = self.power_balance['electricity']['from electricity grid']
+        into_grid   = self.power_balance['electricity']['into electricity grid']
+        csc         = self.power_balance['electricity']['collective self consumption']
+        loc_grid    = {location_name: self.locations[location_name].power_balance['electricity'].get('electricity grid') for location_name in self.locations}
+        loc_csc     = {location_name: self.locations[location_name].power_balance['electricity']['collective self consumption'] for location_name in self.locations}
+        rows        = [row for row in list(loc_grid.values())+list(loc_csc.values()) if row is not None]
+        
+        for first_step in range(0,c.timestep_number,chunk):
+            last_step = min(first_step+chunk,c.timestep_number)
+            for worker,connection in workers:
+                connection.send((first_step,last_step))
+            for worker,connection in workers:
+                self.worker_reply(connection)
+            self.REC_csc_post_pass(from_grid[first_step:last_step],into_grid[first_step:last_step],csc[first_step:last_step],
+                                   {location_name: None if loc_grid[location_name] is None else loc_grid[location_name][first_step:last_step] for location_name in loc_grid},
+                                   {location_name: loc_csc[location_name][first_step:last_step] for location_name in loc_csc})
+            scratch.release(rows,first_step,last_step)
+        
+        ### simulated locations (technologies included) received by reference to their shared time series
+        for worker,connection in workers:
+            connection.send(None)
+        for worker,connection in workers:
+            self.locations.update(pickle.loads(self.worker_reply(connection)))
+            worker.join()
+
+    def worker_reply(self,connection):
+        """
+        Reply of a worker process of REC_power_simulation_parallel, exceptions raised by the worker are raised again
+        """
+        reply = connection.recv()
+        if isinstance(reply,Exception):
+            raise reply
+        return(reply)
+
+    def REC_power_simulation_horizon(self,from_grid,into_grid,csc,loc_grid,loc_csc):
+        """
+        Simulate the whole horizon of a REC made of stateless locations in a single vectorized pass
+        
+        from_grid, into_grid, csc: arrays REC electricity balances
+        loc_grid, loc_csc: dictionaries of location grid and collective self consumption balances
+        
+        output : True if the REC has been simulated
+                 False if at least one location must be simulated step by step (nothing is modified)
+        """
+        solutions = {}
+        for location_name in self.locations:
+            solutions[location_name] = self.locations[location_name].loc_power_simulation_horizon()
+            if solutions[location_name] is None: # location with technologies with a state or not balanced
+                return(False)
+        
+        for location_name in self.locations:
+            self.locations[location_name].apply_horizon_solution(solutions[location_name])
+        self.REC_csc_post_pass(from_grid,into_grid,csc,loc_grid,loc_csc)
+        
+        return(True)
+
+    def REC_csc_post_pass(self,from_grid,into_grid,csc,loc_grid,loc_csc):
+        """
+        Grid aggregation and collective self consumption of the REC calculated for all the steps in a single vectorized pass,
+        once the locations have been simulated
+        
+        from_grid, into_grid, csc: arrays REC electricity balances (updated)
+        loc_grid, loc_csc: dictionaries of location grid and collective self consumption balances (loc_csc updated)
+        """
+        ### solve electricity grid
+        for location_name in self.locations:
+            if loc_grid[location_name] is not None:
+                into_grid += np.where(loc_grid[location_name] < 0,loc_grid[location_name],0.)  # electricity fed into the grid from the whole rec
+                from_grid += np.where(loc_grid[location_name] < 0,0.,loc_grid[location_name])  # electricity withdrawn from the grid the whole rec
+        
+        ### calculate collective self consumption and who contributed to it
+        csc[:] = np.where(from_grid < -into_grid,from_grid,-into_grid) # same as min(-into_grid,from_grid) of the step by step simulation
+        shared = csc > 0
+        if not shared.any():
+            return
+        
+        for location_name in self.locations:
+            if loc_grid[location_name] is None:
+                raise ValueError(f"Warning: {location_name} is not connected to the electricity grid, collective self consumption can't be allocated")
+            producer = shared & (loc_grid[location_name] < 0)
+            consumer = shared & ~(loc_grid[location_name] < 0)
+            loc_csc[location_name][producer] = - csc[producer] * loc_grid[location_name][producer] / into_grid[producer]   # contribution as producer
+            loc_csc[location_name][consumer] = csc[consumer] * loc_grid[location_name][consumer] / from_grid[consumer]     # contribution as consumer
 
-    def save(self,simulation_name,f,sep=';',dec=','):
+    @in_context
+    def reporting_precision(self):
+        """
+        Convert REC and locations power balances to the reporting precision once the simulation is finished ('precision' in general.json)
+        
+        Power balances are read back by the step handlers, so they are simulated in float64 whatever the precision:
+        the simulation is the same and only the stored results are rounded
+        """
+        self.balance_tensor.astype(c.reporting_dtype)
+        for location_name in self.locations:
+            self.locations[location_name].reporting_precision()
+
+    @in_context
+    def save(self,simulation_name,f,sep=';',dec=',',folder='results'):
         """
         Save REC and each location power balances
         
         simulationa_name : str 
-        f: 'csv' or 'pkl'
+        f: 'csv', 'pkl' or 'memmap'
+            'memmap': the .pkl files are written, but the arrays backed by the scratch store ('scratch' in general.json) are saved as references
+                      to the scratch files and reopened as memory maps when the .pkl files are loaded (see scratch.py)
         using sep and dec you can choose the separator and decima of the .csv format
+        folder: str results folder (default 'results'), e.g. a different folder for each parallel run (see sweep.py)
         
         output: 
-            balances/simulation_name.pkl
-            LOC/simulation_name.pkl
+            folder/pkl/balances_simulation_name.pkl
+            folder/pkl/LOC_simulation_name.pkl
+            ...
+            folder/pkl/general_simulation_name.pkl general.json of the simulation, economics assesses the results with its context
         """
         
         balances = {}
@@ -206,9 +646,12 @@ class REC:
                                                                                 (self.locations[location_name].technologies[tech_name].MaxPowerStack*c.timestep_number))*100
                     if hasattr(self.locations[location_name].technologies[tech_name], 'replacement'):
                         ageing_el = self.locations[location_name].technologies[tech_name].stack
-                        ageing[location_name][tech_name]['ageing 1'] = ageing_el[0]
+                        ageing[location_name][tech_name]['ageing 1'] = dict(ageing_el[0])      # module histories saved as plain dictionaries (see history.py)
+                        ageing[location_name][tech_name]['stack history'] = {'resolution': ageing_el[0].resolution,      # element k of the recorded series refers to step k*interval
+                                                                             'interval': ageing_el[0].interval,
+                                                                             'timestep': self.locations[location_name].technologies[tech_name].timestep}
                         if self.locations[location_name].technologies[tech_name].replacement:
-                            ageing[location_name][tech_name]['ageing 2'] = ageing_el[self.locations[location_name].technologies[tech_name].n_modules+1]  
+                            ageing[location_name][tech_name]['ageing 2'] = dict(ageing_el[self.locations[location_name].technologies[tech_name].n_modules+1])
                             
             tech_name = 'fuel cell'
             if tech_name in self.locations[location_name].technologies:
@@ -233,35 +676,30 @@ class REC:
                     tech_cost[location_name][tech_name] = self.locations[location_name].technologies[tech_name].cost
         
         
-        if f == 'pkl':
-            directory = './results'
-            if not os.path.exists(directory): os.makedirs(directory)
-            directory = './results/pkl'
-            if not os.path.exists(directory): os.makedirs(directory)
-            with open('results/pkl/balances_'+simulation_name+".pkl", 'wb') as f: pickle.dump(balances, f)
-            with open('results/pkl/consumption_'+simulation_name+".pkl", 'wb') as f: pickle.dump(consumption, f)
-            with open('results/pkl/production_'+simulation_name+".pkl", 'wb') as f: pickle.dump(production, f)                                                                                             
-            with open('results/pkl/tech_params_'+simulation_name+".pkl", 'wb') as f: pickle.dump(parameters, f)
-            with open('results/pkl/LOC_'+simulation_name+".pkl", 'wb') as f: pickle.dump(LOC, f)             
-            with open('results/pkl/ageing_'+simulation_name+".pkl", 'wb') as f: pickle.dump(ageing, f)   
-            with open('results/pkl/tech_cost_'+simulation_name+".pkl", 'wb') as f: pickle.dump(tech_cost, f)   
+        if f in ['pkl','memmap']:
+            dump = pickle.dump if f == 'pkl' else scratch.dump
+            directory = os.path.join(folder,'pkl')
+            os.makedirs(directory,exist_ok=True)
+            with open(f'{directory}/balances_'+simulation_name+".pkl", 'wb') as f: dump(balances, f)
+            with open(f'{directory}/consumption_'+simulation_name+".pkl", 'wb') as f: dump(consumption, f)
+            with open(f'{directory}/production_'+simulation_name+".pkl", 'wb') as f: dump(production, f)                                                                                             
+            with open(f'{directory}/tech_params_'+simulation_name+".pkl", 'wb') as f: dump(parameters, f)
+            with open(f'{directory}/LOC_'+simulation_name+".pkl", 'wb') as f: dump(LOC, f)             
+            with open(f'{directory}/ageing_'+simulation_name+".pkl", 'wb') as f: dump(ageing, f)   
+            with open(f'{directory}/tech_cost_'+simulation_name+".pkl", 'wb') as f: dump(tech_cost, f)   
+            with open(f'{directory}/general_'+simulation_name+".pkl", 'wb') as f: pickle.dump(self.general, f)   # simulation context of the results (see economics.results_context)
             
         if f == 'csv':
-            directory = './results'
-            if not os.path.exists(directory): os.makedirs(directory)
-            directory = './results/csv'
-            if not os.path.exists(directory): os.makedirs(directory)
-            balances_csv = {}
-            
-            for loc_name in balances:
-                for carrier in balances[loc_name]:
-                    for tech in balances[loc_name][carrier]:
-                        key = f"{loc_name} - {carrier} - {tech}"
-                        balances_csv[key] = balances[loc_name][carrier][tech]
+            directory = os.path.join(folder,'csv')
+            os.makedirs(directory,exist_ok=True)
+            tensors = {'REC': self.balance_tensor}  # balances are already stored as contiguous 2-D arrays (rows = channels)
+            for location_name in self.locations:
+                tensors[location_name] = self.locations[location_name].balance_tensor
             
-            df = pd.DataFrame(balances_csv)
+            columns = [f"{loc_name} - {carrier} - {tech}" for loc_name in tensors for carrier,tech in tensors[loc_name].channels]
+            df = pd.DataFrame(np.vstack([tensors[loc_name].data for loc_name in tensors]).T, columns=columns)
             df = df.round(4)
-            df.to_csv('results/csv/balances_'+simulation_name+'.csv',index=False,sep=sep,decimal=dec)
+            df.to_csv(f'{directory}/balances_'+simulation_name+'.csv',index=False,sep=sep,decimal=dec)
             
         
     def weather_generation(self,general,path,check,file_general):
@@ -277,14 +715,12 @@ class REC:
         Returns
         -------
         previous_simulation/files.csv
+        weather: dataframe hourly weather of one year (see weather_series)
 
         """                        
         
         if check and os.path.exists(f"{path}/weather/TMY_{file_general}.csv"): # if the prevoius weather series can be used
-            weather = pd.read_csv(f"{path}/weather/TMY_{file_general}.csv")
-            # from hourly values to updated timestep
-            if c.timestep < 60:
-                weather = pd.DataFrame(np.repeat(weather.values, 60/c.timestep, axis=0), columns=weather.columns)
+            weather = pd.read_csv(f"{path}/weather/TMY_{file_general}.csv") # hourly values are expanded to the updated timestep by weather_series
                 
         else: # if new weather data must be downoladed from PV gis
             print('Downolading typical metereological year data from PVGIS for '+file_general)   
@@ -333,11 +769,12 @@ class REC:
                 weather['Local time - DST'] = weather.index
                 weather.set_index('Local time - DST',inplace=True)  
             
-            weather = pd.DataFrame(np.repeat(weather.values, 60/c.timestep, axis=0), columns=weather.columns)
-            weather.to_csv(f"{path}/weather/TMY_{file_general}.csv") 
+            pd.DataFrame(np.repeat(weather.values, 60/c.timestep, axis=0), columns=weather.columns).to_csv(f"{path}/weather/TMY_{file_general}.csv") 
+            weather = pd.DataFrame(weather.values, columns=weather.columns) # hourly values are expanded to the updated timestep by weather_series
             
         return(weather)
    
+    @in_context
     def tech_cost(self,tech_cost):
         for location_name in self.locations:
             for tech_name in self.locations[location_name].technologies:
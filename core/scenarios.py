@@ -0,0 +1,252 @@
+"""
+SCENARIOS MODULE
+
+    Batched simulation of several scenarios of the same REC (e.g. sensitivity analysis on PV size, see run_test_1.py)
+
+    The base REC is created only once (weather, demand and production series are read only once),
+    then only the technologies whose parameters are overridden are created again for each scenario.
+    Inputs that the batched simulation only reads (simulation context, weather, PV and wind objects) are shared by all the scenarios,
+    only the output arrays (balances, flows) and the technologies with a state (battery) are copied.
+    All the scenarios are simulated together: balance and state arrays have a leading scenario dimension (scenarios, steps)
+    and technologies are solved for all the scenarios with a single vectorized operation.
+
+    Supported technologies: PV, wind, battery (collective == 0, without ageing), demands and grids.
+    Other configurations can be simulated one scenario at a time with rec.REC
+"""
+
+import copy
+import numpy as np
+from techs import PV, wind, battery
+from core import rec
+from core import constants as c
+
+
+class scenario_batch:
+
+    def __init__(self,structure,general,file_structure,file_general,path,overrides):
+        """
+        Create a batch of scenarios of the same REC
+
+        structure, general, file_structure, file_general, path: inputs of the base REC (see rec.py)
+        overrides: list of dictionaries, one for each scenario, with the same layout of structure but only the parameters to be changed
+            {location_name: {tech_name: {parameter: value}}}
+            e.g. [{'prosumer': {'PV': {'peakP': pv}}} for pv in range(1,11)]
+
+        output : scenario_batch object able to:
+            simulate all the scenarios together .simulate()
+            give a REC object for each scenario .recs (to be used as usual: .recs[i].tech_cost() .recs[i].save())
+        """
+        base = rec.REC(structure,general,file_structure,file_general,path) # weather and series are read once
+
+        self.context = base.context # simulation context shared by all the scenarios (see constants.py)
+        self.structures = []    # list of the structure of each scenario
+        self.recs = []          # list of the REC of each scenario
+        with c.activate(self.context):
+            self.create_scenarios(base,structure,file_structure,file_general,path,overrides)
+        self.scenario_number = len(self.recs)
+
+    def create_scenarios(self,base,structure,file_structure,file_general,path,overrides):
+        """
+        Create the REC of each scenario copying the base REC and creating again only the overridden technologies
+        """
+        for override in overrides:
+            scenario_structure = copy.deepcopy(structure)
+            scenario = copy.deepcopy(base,self.shared_inputs(base,override)) # copy of the base REC sharing its read-only inputs
+
+            for location_name in override:
+                for tech_name in override[location_name]:
+                    if tech_name not in ['PV','wind','battery']:
+                        raise ValueError(f"Warning! {tech_name} parameters can't be changed in the batched simulation of scenarios. Only PV, wind and battery parameters can be overridden")
+                    scenario_structure[location_name][tech_name].update(override[location_name][tech_name])
+                    parameters = scenario_structure[location_name][tech_name]
+
+                    loc = scenario.locations[location_name]
+                    loc.system[tech_name] = parameters
+                    loc.system = dict(sorted(loc.system.items(), key=lambda item: item[1]['priority'])) # ordered by priority
+                    if tech_name == 'battery':
+                        loc.technologies[tech_name] = battery(parameters)
+                    elif tech_name == 'PV':
+                        loc.technologies[tech_name] = PV(parameters,location_name,path,True,file_structure,file_general)
+                    elif tech_name == 'wind':
+                        loc.technologies[tech_name] = wind(parameters,location_name,path,True,file_structure,file_general)
+
+            for location_name in scenario.locations:
+                self.check_location(scenario.locations[location_name])
+
+            self.structures.append(scenario_structure)
+            self.recs.append(scenario)
+
+    def shared_inputs(self,base,override):
+        """
+        Objects of the base REC shared by a scenario instead of being copied: simulation context, weather, PV and wind objects
+        (only read by the batched simulation) and the batteries overridden by the scenario (replaced by new objects)
+
+        base: REC object
+        override: dictionary of the parameters changed by the scenario (see __init__)
+
+        output: dictionary id(object): object, memo of copy.deepcopy
+        """
+        shared = [base.context,base.weather]
+        for location_name in base.locations:
+            for tech_name,tech in base.locations[location_name].technologies.items():
+                if tech_name in ['PV','wind'] or tech_name in override.get(location_name,{}):
+                    shared.append(tech)
+        return({id(obj): obj for obj in shared})
+
+    def check_location(self,loc):
+        """
+        Check that all the technologies of the location can be simulated in the batched simulation of scenarios
+        """
+        for tech_name in loc.system:
+            if tech_name in ['PV','wind'] or tech_name in [f"{carrier} demand" for carrier in loc.power_balance]+[f"{carrier} grid" for carrier in loc.power_balance]:
+                continue
+            if tech_name == 'battery' and loc.technologies['battery'].collective == 0 and not loc.technologies['battery'].ageing:
+                continue
+            raise ValueError(f"Warning! {tech_name} in {loc.name} location is not supported by the batched simulation of scenarios.\n\
+            Options to fix the problem: \n\
+                (a) - Simulate the scenarios one by one with rec.REC \n\
+                (b) - Only PV, wind, battery (collective: 0, ageing: false), demands and grids can be included in the batched simulation")
+
+    def simulate(self):
+        """
+        Simulate all the scenarios together
+
+        output : updating location and REC power balances of each scenario REC (.recs)
+        """
+        with c.activate(self.context):
+            self.simulate_scenarios()
+
+    def simulate_scenarios(self):
+        """
+        Simulate all the scenarios together, with the simulation context active (see simulate)
+        """
+        for location_name in self.recs[0].locations:
+            self.location_simulation([scenario.locations[location_name] for scenario in self.recs])
+
+        for scenario in self.recs:
+            scenario.initialise_power_balance()
+            loc_grid    = {location_name: scenario.locations[location_name].power_balance['electricity'].get('electricity grid') for location_name in scenario.locations}
+            loc_csc     = {location_name: scenario.locations[location_name].power_balance['electricity']['collective self consumption'] for location_name in scenario.locations}
+            scenario.REC_csc_post_pass(scenario.power_balance['electricity']['from electricity grid'],
+                                       scenario.power_balance['electricity']['into electricity grid'],
+                                       scenario.power_balance['electricity']['collective self consumption'],
+                                       loc_grid,loc_csc)
+
+    def location_simulation(self,locations):
+        """
+        Simulate the same location in all the scenarios
+
+        locations: list of location objects, one for each scenario
+
+        Technologies are solved in order of priority for all the steps and all the scenarios at once:
+        PV, wind, demands and grids do not depend on previous steps, while the battery is advanced step by step on the scenario vector
+
+        output : updating power balances, consumption and production of each location
+        """
+        n = c.timestep_number
+        system = locations[0].system
+        pb = {carrier: np.zeros((self.scenario_number,n)) for carrier in locations[0].power_balance} # power balances [kW] [kg/s] [Sm^3/s] (scenarios, steps)
+        balances = {}
+
+        for tech_name in system: # (which is ordered py priority)
+            if tech_name in ['PV','wind']:
+                balances[('electricity',tech_name)] = np.array([loc.technologies[tech_name].production[:n] for loc in locations],dtype=float) # electricity produced from PV or wind
+                pb['electricity'] += balances[('electricity',tech_name)]
+                continue
+
+            if tech_name == 'battery':
+                balances[('electricity','battery')] = self.battery_simulation([loc.technologies['battery'] for loc in locations],pb['electricity']) # electricity absorbed(-) or supplied(+) by battery
+                pb['electricity'] += balances[('electricity','battery')]
+                continue
+
+            for carrier in pb:
+                if tech_name == f"{carrier} demand":
+                    balances[(carrier,tech_name)] = np.array([loc.power_balance[carrier][tech_name] for loc in locations])
+                    pb[carrier] += balances[(carrier,tech_name)]                # power balance update: energy demand(-)
+                    break
+                if tech_name == f"{carrier} grid":
+                    feed = np.array([loc.system[tech_name]['feed'] for loc in locations])[:,np.newaxis]
+                    draw = np.array([loc.system[tech_name]['draw'] for loc in locations])[:,np.newaxis]
+                    mask = (pb[carrier] > 0) & feed | (pb[carrier] < 0) & draw
+                    balances[(carrier,tech_name)] = np.zeros((self.scenario_number,n))
+                    balances[(carrier,tech_name)][mask] = - pb[carrier][mask]  # energy from grid(+) or into grid(-)
+                    pb[carrier][mask] += balances[(carrier,tech_name)][mask]   # balance update
+                    break
+
+        ### Global check on power balances
+        tol = 0.0001  # [-] tolerance on error
+        for carrier in pb:
+            if carrier == 'heating water' or not pb[carrier].any():
+                continue
+            for i,loc in enumerate(locations):
+                m = max([balances[channel][i].max() for channel in balances if channel[0] == carrier]) # max value among all the carrier balances
+                step = np.argmax(np.abs(pb[carrier][i]))
+                if abs(pb[carrier][i,step]) > abs(m*tol):
+                    raise ValueError(f'Warning: {carrier} balance of {loc.name} in scenario {i} at timestep {step} shows a value of {round(pb[carrier][i,step],2)} \n\
+                    It means there is an overproduction not fed to grid or demand is not satisfied.\n\
+                    Options to fix the problem: \n\
+                        (a) - Include {carrier} grid[\'draw\']: true if negative or {carrier} grid[\'feed\']: true if positive in studycase.json \n\
+                        (b) - Vary components size or demand series in studycase.json')
+
+        for i,loc in enumerate(locations):
+            loc.apply_horizon_solution({channel: balances[channel][i] for channel in balances})
+
+    def battery_simulation(self,batteries,pb):
+        """
+        Battery of all the scenarios advanced step by step with the same logic as battery.use() (see battery.py)
+
+        batteries: list of battery objects, one for each scenario
+        pb: 2-D array electricity balance (scenarios, steps) of the technologies with higher priority than battery [kW]
+
+        output : 2-D array electricity absorbed(-) or supplied(+) by battery (scenarios, steps) [kW]
+                 LOC and used_capacity of each battery object are updated
+        """
+        n = c.timestep_number
+        LOC             = np.array([b.LOC for b in batteries],dtype=float)         # level of charge (scenarios, steps+1) [kJ]
+        used_capacity   = np.array([b.used_capacity for b in batteries],dtype=float)
+        nom_capacity    = np.array([b.nom_capacity for b in batteries])
+        max_capacity    = np.array([b.max_capacity for b in batteries])
+        etaC            = np.array([b.etaC for b in batteries])
+        etaD            = np.array([b.etaD for b in batteries])
+        MpowerC         = np.array([b.MpowerC for b in batteries])
+        MpowerD         = np.array([b.MpowerD for b in batteries])
+        min_LOC         = max_capacity*np.array([b.DoD for b in batteries])
+        self_discharge  = np.array([b.self_discharge for b in batteries])
+        balance = np.zeros((len(batteries),n))
+
+        for step in range(n):
+            LOC[:,step] = LOC[:,step]*(1-self_discharge)
+            p = pb[:,step]
+            charging = p >= 0
+
+            ### charge battery
+            p_charge = np.where(p > MpowerC,MpowerC,p)
+            charge = p_charge*etaC*c.P2E
+            not_full = charge < (max_capacity-LOC[:,step])                                 # battery can't be full charged
+            p_charge = np.where(not_full,p_charge,((max_capacity-LOC[:,step])/etaC)/c.P2E)
+            LOC_charge = np.where(not_full,LOC[:,step]+charge,max_capacity)
+
+            ### discharge battery (the past LOC may be translated, see battery.use)
+            available = LOC[:,step] + (nom_capacity-used_capacity) > min_LOC
+            reached = used_capacity == nom_capacity                                         # the nom_capacity has been reached
+            limit = np.where(reached,(LOC[:,step]-min_LOC)/c.P2E,(LOC[:,step]-min_LOC+max_capacity-used_capacity)/c.P2E)
+            discharge = -p/etaD                                                             # same as min(-p,limit,max_capacity*MpowerD)
+            discharge = np.where(limit < discharge,limit,discharge)
+            discharge = np.where(max_capacity*MpowerD < discharge,max_capacity*MpowerD,discharge)
+            LOC_discharge = np.where(available,LOC[:,step]-discharge*c.P2E,LOC[:,step])
+
+            LOC[:,step+1] = np.where(charging,LOC_charge,LOC_discharge)
+            used_capacity = np.where(charging & (LOC[:,step+1] > used_capacity),LOC[:,step+1],used_capacity) # update used capacity
+            translate = ~charging & available & ~reached & (LOC[:,step+1] < min_LOC)       # the level of charge has become negative
+            if translate.any():
+                shift = min_LOC[translate] - LOC[translate,step+1]
+                used_capacity[translate] += shift
+                LOC[translate,:step+2] += shift[:,np.newaxis]                               # traslate the past LOC array
+
+            balance[:,step] = np.where(charging,-p_charge,np.where(available,discharge*etaD,0.))
+
+        for i,b in enumerate(batteries):
+            b.LOC[:] = LOC[i]
+            b.used_capacity = used_capacity[i]
+
+        return(balance)
@@ -0,0 +1,65 @@
+"""
+SCHEDULE MODULE
+
+    Planned on/off schedules of the technologies ('operational_period' and 'state' in studycase.json, e.g. electrolyzer and fuel cell)
+
+    The schedule is a window of days of the year repeated every simulated year: the technology is turned on ('state': 'on')
+    or off ('state': 'off') from the first to the last day of the window, and the other way round in the rest of the year.
+    operational_state computes the state of every timestep from the position of the window with numpy date arithmetic,
+    writing the steps of the window as slices of the final array: no calendar or intermediate series is built,
+    so the cost does not grow with the number of timesteps of the year (e.g. 525600 at 1-minute timestep).
+"""
+
+import numpy as np
+from core import constants as c
+from core import scratch
+
+reference_year = 1900   # days 'dd-mm' are read in a non-leap year of 365 days, as the simulation years (c.MINUTES_YEAR)
+
+
+def day_of_year(day):
+    """
+    Index of a day of the year (0 for the 1st of January)
+
+    day: str 'dd-mm'
+
+    output: int
+    """
+    try:
+        dd,mm = day.strip().split('-')
+        date = np.datetime64(f"{reference_year}-{int(mm):02d}-{int(dd):02d}",'D')
+    except ValueError:
+        raise ValueError(f"Warning! {day} in 'operational_period' is not a day of the year \n\
+        Options to fix the problem: \n\
+            (a) - Write the first and last day of the period as 'dd-mm,dd-mm' (e.g. '01-04,30-09'), 29-02 is not a valid day")
+    return(int((date - np.datetime64(f"{reference_year}-01-01",'D')).astype(int)))
+
+def operational_state(period,state,timestep,timestep_number):
+    """
+    State of the technology at every timestep of the simulation according to its planned schedule
+
+    period: str 'dd-mm,dd-mm' first and last day (included) of the period of the year ('operational_period' in studycase.json)
+    state: str 'on' the technology is operating only during the period, 'off' the technology is turned off during the period
+    timestep: int [min] simulation timestep
+    timestep_number: int number of timesteps of the simulation
+
+    output: int8 array 1 if the technology can operate at the step, 0 if it is turned off as planned
+            The schedule of a year is repeated for the simulated years: a period whose first day follows the last one is empty
+    """
+    if state not in ['on','off']:
+        raise ValueError(f"Warning! 'state' is {state} \n\
+        Options to fix the problem: \n\
+            (a) - Set 'state': 'on' to operate the technology only during 'operational_period' \n\
+            (b) - Set 'state': 'off' to turn the technology off during 'operational_period'")
+    first,last = [day_of_year(day) for day in period.split(',')]
+    steps_year = c.MINUTES_YEAR//timestep                            # [-] steps of each year: the day of step k is k*timestep//1440
+    years = int(timestep_number*timestep/c.MINUTES_YEAR)             # [-] years of the simulation
+    start = min(-(-first*c.MINUTES_DAY//timestep),steps_year)       # first step of the first day of the period
+    end = min(-(-(last+1)*c.MINUTES_DAY//timestep),steps_year)      # first step after the last day of the period
+
+    inside = 1 if state == 'on' else 0
+    schedule = scratch.full(steps_year*years,1-inside,dtype='int8')
+    if end > start:
+        for year in range(years):
+            schedule[year*steps_year+start:year*steps_year+end] = inside
+    return(schedule)
@@ -0,0 +1,327 @@
+"""
+SCRATCH MODULE
+
+    Memory-mapped backing store of the simulation time series, for horizons that don't fit in RAM ('scratch' in general.json)
+
+    Location and REC power balances, flows exchanged between technologies and the time series of the technologies
+    (LOC, efficiency and ageing histories...) are allocated in binary files of a scratch folder instead of the heap:
+    the simulation writes through to disk and the OS pages the inactive years out of memory.
+    Arrays are packed in block files of several arrays each, so the number of open files stays small.
+
+    Results saved with REC.save(simulation_name,'memmap') refer to the same files: the usual .pkl files are written,
+    but their arrays are references to the scratch files. economics and postprocess load them with pickle as usual
+    and get memory maps of the scratch files, without copying the arrays into and out of the .pkl files.
+    The scratch folder is not deleted at the end of the simulation, as saved results refer to it.
+
+    Block files are also shared by the worker processes of a parallel simulation (see REC.REC_power_simulation_parallel):
+    locations are pickled with share_pickler, their time series are moved to block files and exchanged as references,
+    so worker processes and REC write the same arrays instead of copies.
+"""
+
+import io
+import os
+import mmap
+import shutil
+import pickle
+import ctypes
+import tempfile
+import numpy as np
+from core import constants as c
+
+block_size = 2**27  # [bytes] minimum capacity of a block file, unused capacity takes no disk space on file systems supporting sparse files
+alignment = 64      # [bytes] alignment of the arrays in a block
+
+blocks = {}         # file: block (memory map) of every block created or attached (see attach) by this process, used to save arrays as references (see dump)
+reopened = {}       # file: (size, modification time, block) blocks reopened by load, shared by all the arrays of the same file
+
+
+class scratch_store:
+
+    def __init__(self,folder,prefix='rec_'):
+        """
+        Memory-mapped backing store of the arrays of a simulation
+
+        folder: str scratch folder, a new subfolder is created for each store so that simulations never share files
+        prefix: str prefix of the subfolder (e.g. name of the studycase)
+
+        output : scratch_store object able to:
+            allocate zero arrays backed by its block files .zeros(shape,dtype)
+        """
+        if not os.path.exists(folder): os.makedirs(folder)
+        self.folder = os.path.abspath(tempfile.mkdtemp(prefix=prefix,dir=folder))    # absolute as the file names of memory maps (see reference)
+        self.current = {}   # dtype: [block, bytes used] block being filled for each dtype
+        self.count = 0      # number of block files created
+
+    def __getstate__(self):
+        """
+        Stores are pickled without their blocks (e.g. simulation contexts sent to worker processes):
+        arrays allocated by a worker process are written in new block files of the same folder
+        """
+        return({'folder': self.folder, 'current': {}, 'count': 0})
+
+    def new_block(self,size):
+        """
+        Create a new block file of size bytes
+        """
+        file = os.path.join(self.folder,f"block_{os.getpid()}_{self.count}.dat")
+        self.count += 1
+        block = np.memmap(file,dtype=np.uint8,mode='w+',shape=(size,))
+        blocks[file] = block
+        return(block)
+
+    def zeros(self,shape,dtype='float64'):
+        """
+        Zero array backed by a block file
+
+        shape: int or tuple
+        dtype: dtype of the array
+
+        output: np.memmap view of a block file
+        """
+        dtype = np.dtype(dtype)
+        shape = (shape,) if np.isscalar(shape) else tuple(shape)
+        nbytes = int(np.prod(shape))*dtype.itemsize
+        block,used = self.current.get(dtype.str,(None,0))
+        if block is None or used + nbytes > block.size:
+            block,used = self.new_block(max(block_size,nbytes)),0
+        array = block[used:used+nbytes].view(dtype).reshape(shape)
+        self.current[dtype.str] = [block,used + -(-nbytes//alignment)*alignment]
+        return(array)
+
+    def remove(self):
+        """
+        Delete the folder of a temporary store (e.g. the store of a parallel simulation without 'scratch' in general.json)
+
+        Arrays already mapped stay valid where mapped files can be deleted (POSIX), files still mapped are kept otherwise (Windows):
+        copy the arrays to the heap first (see heap_copy). Arrays of the store are no longer saved as references (see dump)
+        """
+        for file in [file for file in blocks if os.path.dirname(file) == self.folder]:
+            del blocks[file]
+        shutil.rmtree(self.folder,ignore_errors=True)
+
+
+def zeros(shape,dtype='float64'):
+    """
+    Zero array allocated in the scratch store of the active simulation, or in the heap if the simulation has no scratch store
+    (used instead of np.zeros by the containers and technologies for their time series)
+
+    shape: int or tuple
+    dtype: dtype of the array
+    """
+    store = c.scratch
+    if store is None:
+        return(np.zeros(shape,dtype=dtype))
+    return(store.zeros(shape,dtype))
+
+def full(shape,value,dtype='float64'):
+    """
+    Array filled with value, allocated as zeros (see zeros)
+    """
+    array = zeros(shape,dtype)
+    array[...] = value
+    return(array)
+
+def mapping_offset(array):
+    """
+    Position [bytes] of the first element of a memory-mapped array in its memory map
+    (views of a block start inside the map, arrays opened with np.memmap at its beginning)
+    """
+    start = ctypes.addressof(ctypes.c_char.from_buffer(array._mmap))
+    return(array.__array_interface__['data'][0] - start)
+
+def reference(array):
+    """
+    (file, offset, dtype, shape) of an array stored in a block file created by this process, None otherwise
+    """
+    if not isinstance(array,np.memmap) or array.filename not in blocks or not array.flags['C_CONTIGUOUS']:
+        return(None)
+    block = blocks[array.filename]
+    offset = array.__array_interface__['data'][0] - block.__array_interface__['data'][0]
+    if offset < 0 or offset + array.nbytes > block.size:    # not a view of the block (e.g. array built from another map of the same file)
+        return(None)
+    return((array.filename,offset,array.dtype.str,array.shape))
+
+def load(file,offset,dtype,shape):
+    """
+    Reopen an array saved as a reference (see dump): copy-on-write view of its block file,
+    changes made by the reader (e.g. economics) are not written to the scratch files
+    """
+    stat = os.stat(file)
+    size,mtime,block = reopened.get(file,(None,None,None))
+    if (size,mtime) != (stat.st_size,stat.st_mtime_ns):     # block files are opened once, and again only if they have been rewritten
+        block = np.memmap(file,dtype=np.uint8,mode='c')
+        reopened[file] = (stat.st_size,stat.st_mtime_ns,block)
+    nbytes = int(np.prod(shape))*np.dtype(dtype).itemsize
+    return(block[offset:offset+nbytes].view(dtype).reshape(shape))
+
+def attach(file,offset,dtype,shape):
+    """
+    Reopen an array shared as a reference (see share_pickler): read-write view of its block file,
+    changes are seen by every process attached to the same block
+    """
+    if file not in blocks:     # blocks of other processes are opened once and can then be shared again by this process
+        blocks[file] = np.memmap(file,dtype=np.uint8,mode='r+')
+    nbytes = int(np.prod(shape))*np.dtype(dtype).itemsize
+    return(blocks[file][offset:offset+nbytes].view(dtype).reshape(shape))
+
+def release(arrays,first_step,last_step):
+    """
+    Flush the timesteps [first_step,last_step) of time series arrays backed by files and release their memory
+
+    arrays: iterable of arrays, last dimension = timesteps (arrays not backed by files are ignored)
+    first_step, last_step: int steps to release
+
+    Pages are dropped from the process memory once written to disk (where supported by the OS) and are read again only if accessed,
+    so the memory used by the arrays depends on the released steps instead of the simulation length
+    """
+    maps = {}
+    for array in arrays:
+        if isinstance(array,np.memmap) and array._mmap is not None and array.flags['C_CONTIGUOUS']:
+            maps.setdefault(id(array._mmap),(array._mmap,[]))[1].append(array)
+    for mapping,mapped in maps.values():
+        mapping.flush()
+        if not hasattr(mmap,'MADV_DONTNEED'):
+            continue
+        for array in mapped:
+            rows = array.reshape(-1,array.shape[-1])
+            offset = mapping_offset(array)
+            for row in range(rows.shape[0]):
+                start = offset + (row*rows.shape[1] + first_step)*array.itemsize
+                start -= start % mmap.PAGESIZE                      # madvise works on whole pages
+                end = offset + (row*rows.shape[1] + min(last_step,rows.shape[1]))*array.itemsize
+                end -= end % mmap.PAGESIZE
+                if end > start:
+                    mapping.madvise(mmap.MADV_DONTNEED,start,end-start)
+
+class reference_pickler(pickle.Pickler):
+
+    def reducer_override(self,obj):
+        """
+        Arrays stored in block files are pickled as references to their position, every other object as usual
+        """
+        if isinstance(obj,np.memmap):
+            ref = reference(obj)
+            if ref is not None:
+                return(load,ref)
+        return(NotImplemented)
+
+class share_pickler(pickle.Pickler):
+
+    def __init__(self,file,store):
+        """
+        Pickler sharing the time series arrays (last dimension = simulation steps) through the block files of store
+        (e.g. locations sent to the worker processes of a parallel simulation, see REC.REC_power_simulation_parallel)
+
+        Arrays already stored in block files or in other files mapped read-write (e.g. on-disk balances, see balance_tensor.to_store)
+        are pickled as references to them, the other ones are moved to store first.
+        Views of an array (e.g. rows of balance tensors) are moved with it, so unpickled views share memory as the original ones.
+        Unpickled arrays are read-write views of the block files (see attach)
+        """
+        super().__init__(file,pickle.HIGHEST_PROTOCOL)
+        self.store = store
+        self.lengths = (c.timestep_number,c.timestep_number+1)     # length of time series arrays (e.g. LOC arrays have an additional step)
+        self.moved = {}     # id(array): (array, array moved to store), arrays are kept referenced so their id is not reused
+
+    def move(self,array):
+        """
+        Copy of a heap array in a block file of the store (moved once, also if referenced several times)
+        """
+        if id(array) not in self.moved:
+            moved = self.store.zeros(array.shape,array.dtype)
+            moved[...] = array
+            self.moved[id(array)] = (array,moved)
+        return(self.moved[id(array)][1])
+
+    def reducer_override(self,obj):
+        if not isinstance(obj,np.ndarray) or obj.ndim == 0 or obj.shape[-1] not in self.lengths or obj.dtype.hasobject:
+            return(NotImplemented)
+        ref = reference(obj)
+        if ref is None and isinstance(obj,np.memmap) and obj._mmap is not None and obj.offset == 0 and obj.mode in ['r+','w+'] and obj.flags['C_CONTIGUOUS']:
+            ref = (obj.filename,mapping_offset(obj),obj.dtype.str,obj.shape)    # file already shared
+        if ref is None:
+            base = obj
+            while isinstance(base.base,np.ndarray):
+                base = base.base
+            if base is not obj and isinstance(base,np.memmap) or not base.flags['C_CONTIGUOUS'] or not obj.flags['C_CONTIGUOUS']:
+                base = obj      # views that can't be moved with their base are moved as separate arrays
+            ref = reference(self.move(base))
+            if base is not obj:
+                offset = obj.__array_interface__['data'][0] - base.__array_interface__['data'][0]
+                ref = (ref[0],ref[1]+offset,obj.dtype.str,obj.shape)
+        return(attach,ref)
+
+class heap_collector(pickle.Pickler):
+
+    def __init__(self,file,store):
+        """
+        Pickler saving the arrays stored in the block files of store as references, and collecting the bytes they refer to (see heap_copy)
+        """
+        super().__init__(file,pickle.HIGHEST_PROTOCOL)
+        self.store = store
+        self.extents = {}   # file: [(start, end)] bytes of the block file referred to
+
+    def persistent_id(self,obj):
+        if not isinstance(obj,np.memmap):
+            return(None)
+        ref = reference(obj)
+        if ref is None or os.path.dirname(ref[0]) != self.store.folder:
+            return(None)
+        self.extents.setdefault(ref[0],[]).append((ref[1],ref[1]+obj.nbytes))
+        return(ref)
+
+class heap_loader(pickle.Unpickler):
+
+    def __init__(self,file,extents):
+        """
+        Unpickler of heap_collector: referred arrays are views of heap copies of the referred bytes of their block files,
+        overlapping arrays (e.g. rows of balance tensors) are views of the same copy so that they share memory as the original ones
+        """
+        super().__init__(file)
+        self.copies = {}    # file: [(start, heap copy of the bytes start:end)]
+        for file_name,ranges in extents.items():
+            ranges = sorted(ranges)
+            merged = [list(ranges[0])]
+            for start,end in ranges[1:]:
+                if start < merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1],end)
+                else:
+                    merged.append([start,end])
+            self.copies[file_name] = [(start,np.array(blocks[file_name][start:end])) for start,end in merged]
+
+    def persistent_load(self,ref):
+        file,offset,dtype,shape = ref
+        start,copy = [(start,copy) for start,copy in self.copies[file] if start <= offset][-1]
+        nbytes = int(np.prod(shape))*np.dtype(dtype).itemsize
+        return(copy[offset-start:offset-start+nbytes].view(dtype).reshape(shape))
+
+def heap_copy(obj,store):
+    """
+    Copy of obj whose arrays stored in the block files of store are moved to the heap, e.g. locations of a parallel simulation
+    before its temporary store is removed (see REC.REC_power_simulation_parallel), so that no block file stays mapped
+
+    obj: object to be copied (e.g. dictionary of locations)
+    store: scratch_store whose arrays are copied (arrays of other files are copied as usual by pickle)
+    """
+    f = io.BytesIO()
+    collector = heap_collector(f,store)
+    collector.dump(obj)
+    f.seek(0)
+    return(heap_loader(f,collector.extents).load())
+
+def dumps_shared(obj,store):
+    """
+    pickle.dumps sharing the time series arrays of obj through the block files of store (see share_pickler), read with pickle.loads
+    """
+    f = io.BytesIO()
+    share_pickler(f,store).dump(obj)
+    return(f.getvalue())
+
+def dump(obj,f):
+    """
+    pickle.dump saving the arrays stored in block files as references to the block files (see REC.save(simulation_name,'memmap'))
+    The resulting file is read with pickle.load, as long as the scratch folder exists
+
+    obj: object to be pickled (e.g. dictionary of power balances)
+    f: binary file open for writing
+    """
+    reference_pickler(f,pickle.HIGHEST_PROTOCOL).dump(obj)
@@ -0,0 +1,107 @@
+"""
+SERIES MODULE
+
+    Input time series (demand and production .csv files) are kept in memory, so that each file is parsed only once per process.
+    The cache can also be filled with arrays already loaded elsewhere (e.g. shared memory of the sweep runner, see sweep.py),
+    which are then used instead of reading the .csv files again.
+
+    Weather is stored as contiguous arrays of a single year (weather_series), expanded to the simulation timestep and years lazily.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+cache = {} # (file,column): (modification time of the file, array)
+
+
+def read_series(file,column):
+    """
+    Read a column of a .csv time series
+    
+    file: str path of the .csv file
+    column: str name of the column (e.g. 'kW', 'kg/s', 'P')
+    
+    output: read-only array (it can be shared by several locations and technologies, operations must create a new array)
+    
+    The file is parsed again only if it has been modified since it was read
+    """
+    mtime = os.path.getmtime(file)
+    if (file,column) not in cache or cache[(file,column)][0] != mtime:
+        array = pd.read_csv(file)[column].to_numpy()
+        array.flags.writeable = False
+        cache[(file,column)] = (mtime,array)
+    return(cache[(file,column)][1])
+
+
+class weather_column:
+
+    def __init__(self,values,repeat,length):
+        """
+        Weather variable of the whole simulation, expanded lazily from the values of a single year
+
+        values: 1-D array values of one year, converted to a contiguous float array at the first access (see __getattr__)
+        repeat: int number of simulation timesteps for each value (e.g. 4 with hourly values and 15 minutes timestep)
+        length: int number of timesteps of the simulation
+
+        column[step] gives the value at step through index arithmetic: values are neither repeated for each timestep nor for each simulation year
+        """
+        self.raw = values
+        self.repeat = repeat
+        self.length = length
+
+    def __getattr__(self,name):
+        """
+        Float values of the column, converted once at the first access: columns that are not read by any technology
+        (e.g. non-numeric columns of the .csv file) are never converted
+        """
+        if name != 'values' or 'raw' not in self.__dict__:
+            raise AttributeError(name)
+        self.values = np.ascontiguousarray(self.raw,dtype=float)
+        del self.raw
+        return(self.values)
+
+    def __getitem__(self,step):
+        return(self.values[(step//self.repeat) % len(self.values)])  # step can also be an array of steps
+
+    def __len__(self):
+        return(self.length)
+
+    def to_numpy(self):
+        """
+        Values of the whole simulation as an array
+        """
+        return(self[np.arange(self.length)])
+
+
+class weather_series(dict):
+
+    def __init__(self,columns,repeat,length):
+        """
+        Weather of the whole simulation: column name -> weather_column (see REC.__init__)
+
+        columns: dictionary column name: 1-D array values of one year (e.g. typical meteorological year)
+        repeat: int number of simulation timesteps for each value
+        length: int number of timesteps of the simulation
+
+        Technologies receive scalars: weather['temp_air'][step]
+        """
+        super().__init__()
+        self.repeat = repeat
+        self.length = length
+        for column in columns:
+            self[column] = weather_column(columns[column],repeat,length)
+
+    def numeric(self):
+        """
+        Float values of one year of the numeric columns (e.g. shared with the workers of a sweep, see sweep.py)
+
+        output: dictionary column name: 1-D float array, columns that can't be converted to float are left out
+        """
+        arrays = {}
+        for column in self:
+            try:
+                arrays[column] = self[column].values
+            except (ValueError,TypeError):
+                pass
+        return(arrays)
@@ -0,0 +1,126 @@
+"""
+STEADY STATE MODULE
+
+    Cyclic steady-state detection for multi-year simulations (see REC.REC_power_simulation_chunked).
+
+    Weather and demand series of every simulation year are the same typical year: once the state of every technology
+    at the end of a simulated year (e.g. battery and tank LOC, TES temperature) is the same as at its beginning,
+    all the following years would repeat it, so its time series are copied forward instead of being simulated again.
+"""
+
+import numbers
+import pickle
+import numpy as np
+from core import constants as c
+
+
+class discard:
+    """
+    File-like object that discards what is written (see series_collector)
+    """
+    def write(self,data):
+        return(memoryview(data).nbytes)     # data can be a pickle.PickleBuffer (arrays pickled in-band, e.g. one-year weather series)
+
+
+class series_collector(pickle.Pickler):
+
+    def __init__(self):
+        """
+        Pickler collecting the time series arrays (last dimension = simulation steps) referenced by the pickled objects
+        """
+        super().__init__(discard(),protocol=pickle.HIGHEST_PROTOCOL)
+        self.lengths = (c.timestep_number,c.timestep_number+1)  # length of time series arrays (e.g. LOC arrays have an additional step)
+        self.arrays = {}    # id(array): array
+
+    def persistent_id(self,obj):
+        if isinstance(obj,np.ndarray) and obj.ndim > 0 and obj.shape[-1] in self.lengths and not obj.dtype.hasobject:
+            self.arrays[id(obj)] = obj
+            return(id(obj))
+        return(None)
+
+
+def series_arrays(objects):
+    """
+    Time series arrays of the simulation (power balances, flows, technology arrays, weather)
+
+    objects: objects containing the arrays (e.g. [REC.locations, REC.balance_tensor, REC.weather])
+
+    output: list of arrays
+    """
+    collector = series_collector()
+    collector.dump(objects)
+    return(list(collector.arrays.values()))
+
+
+def state_vector(locations,step):
+    """
+    State of the technologies at the beginning of step
+
+    locations: dictionary location_name: location object
+    step: int step
+
+    output: 1-D array numeric attributes of the technologies and values at step of the level of charge arrays (length timestep_number+1)
+    """
+    state = []
+    for location_name in locations:
+        for tech_name in locations[location_name].technologies:
+            for value in getattr(locations[location_name].technologies[tech_name],'__dict__',{}).values():
+                if isinstance(value,numbers.Number):
+                    state.append(value)
+                elif isinstance(value,np.ndarray) and value.ndim == 1 and value.shape[0] == c.timestep_number+1:
+                    state.append(value[step])
+    return(np.array(state,dtype=float))
+
+
+def converged(start,end,tol=1e-9):
+    """
+    True if the state at the end of a period is the same as at its beginning (see state_vector)
+    """
+    return(start.shape == end.shape and np.allclose(start,end,rtol=tol,atol=tol,equal_nan=True))
+
+
+def periodic(arrays,first_step,period):
+    """
+    True if the time series repeat the same period from first_step until the end of the simulation
+
+    arrays: list of time series arrays (see series_arrays), checked before simulating (e.g. weather, demand and PV production,
+            which are not periodic with PV degradation)
+    first_step: int first step to simulate
+    period: int number of steps of the period
+    """
+    for array in arrays:
+        shift = array.shape[-1] - c.timestep_number     # 1 for level of charge arrays, the state at the end of the step is recorded
+        for index in np.ndindex(array.shape[:-1]):      # each row of 2-D arrays (e.g. balance tensors) separately
+            row = array[index][first_step+shift:]
+            for first in range(period,len(row),period):
+                length = min(period,len(row)-first)
+                if not np.array_equal(row[first:first+length],row[:length],equal_nan=True):
+                    return(False)
+    return(True)
+
+
+def copy_forward(arrays,first_step,last_step):
+    """
+    Repeat the period [first_step,last_step) until the end of the simulation
+
+    arrays: list of time series arrays (see series_arrays)
+    first_step, last_step: int period already simulated
+
+    Inputs are periodic (see periodic) and the state of the technologies is the same at the beginning and at the end of the period,
+    so the following periods would give the same results. Read-only arrays (e.g. shared input series) are not modified by the simulation
+    and are already periodic.
+    """
+    period = last_step-first_step
+    for array in arrays:
+        if not array.flags.writeable:
+            continue
+        for index in np.ndindex(array.shape[:-1]):
+            row = array[index]
+            state = row[last_step]                      # level of charge arrays: state at the end of the period, not final yet (e.g. battery self discharge)
+            values = row[first_step:last_step]
+            future = row[last_step:c.timestep_number]
+            for first in range(0,len(future),period):
+                length = min(period,len(future)-first)
+                future[first:first+length] = values[:length]
+            if len(row) > c.timestep_number:
+                row[c.timestep_number] = state          # state at the end of the simulation
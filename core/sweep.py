@@ -0,0 +1,120 @@
+"""
+SWEEP MODULE
+
+    Parallel runner of several simulations of the same REC (e.g. grid search over electrolyzer, H tank and PV sizes built with
+    preprocess_test.change_Elesize, change_Htanksize, change_peakP)
+
+    Weather, demand and production series are loaded once by the main process and shared with the worker processes through shared memory,
+    so workers neither download nor parse them again (see series.py).
+    Each scenario saves its results in its own folder (results/scenario_name/pkl, results/scenario_name/csv), so parallel runs don't overwrite each other.
+"""
+
+import os
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from core import rec
+from core import series
+from core.series import weather_series
+
+worker = {} # inputs and shared arrays of the current worker process (see init_worker)
+
+
+def share_array(array,blocks):
+    """
+    Copy an array into a new shared memory block
+
+    array: numeric array to be shared
+    blocks: list of shared memory blocks of this process (updated)
+
+    output: tuple (block name, shape, dtype) needed to attach the array in the workers
+    """
+    block = shared_memory.SharedMemory(create=True,size=max(array.nbytes,1))
+    np.ndarray(array.shape,dtype=array.dtype,buffer=block.buf)[:] = array
+    blocks.append(block)
+    return((block.name,array.shape,array.dtype.str))
+
+def attach_array(descriptor,blocks):
+    """
+    Zero-copy read-only view of an array shared by the main process
+
+    descriptor: tuple (block name, shape, dtype) returned by share_array
+    blocks: list of shared memory blocks of this process (updated, blocks must stay open while the arrays are used)
+    """
+    name,shape,dtype = descriptor
+    block = shared_memory.SharedMemory(name=name)
+    blocks.append(block)
+    array = np.ndarray(shape,dtype=dtype,buffer=block.buf)
+    array.flags.writeable = False
+    return(array)
+
+def init_worker(shared,inputs):
+    """
+    Attach the shared series and weather in a worker process
+
+    shared: dictionary of shared arrays descriptors {'series': {(file,column): (mtime,descriptor)}, 'weather': {column: descriptor}, 'repeat': int, 'length': int}
+    inputs: dictionary of the inputs common to all the scenarios (see sweep)
+    """
+    worker.update(inputs)
+    worker['blocks'] = []
+    for key,(mtime,descriptor) in shared['series'].items():
+        series.cache[key] = (mtime,attach_array(descriptor,worker['blocks'])) # series are not read again from .csv files
+    worker['weather'] = weather_series({column: attach_array(descriptor,worker['blocks']) for column,descriptor in shared['weather'].items()},shared['repeat'],shared['length'])
+
+def run_scenario(scenario_name,structure):
+    """
+    Simulate a single scenario and save its results in its own folder
+
+    scenario_name: str name of the scenario, used as simulation name and results folder
+    structure: dictionary studycase of the scenario
+
+    output: str results folder of the scenario
+    """
+    sim = rec.REC(structure,worker['general'],worker['file_structure'],worker['file_general'],worker['path'],weather=worker['weather']) # create REC object
+    sim.REC_power_simulation() # simulate REC power balances
+    sim.tech_cost(worker['tech_cost']) # calculate the cost of all technologies
+    folder = os.path.join(worker['results'],scenario_name)
+    for f in worker['formats']:
+        sim.save(scenario_name,f,folder=folder)
+    return(folder)
+
+def sweep(structure,general,file_structure,file_general,path,scenarios,tech_cost,processes=None,results='results/sweep',formats=['pkl']):
+    """
+    Simulate several scenarios of the same REC with a pool of worker processes
+
+    structure, general, file_structure, file_general, path: inputs of the base REC (see rec.py),
+        the base REC is created once to download (if needed) and load weather and series
+    scenarios: dictionary scenario_name: structure of the scenario (same general of the base REC)
+        e.g. {f"Ele {n}": pre.change_Elesize(copy.deepcopy(studycase),'industrial_facility',n) for n in range(1,6)}
+    tech_cost: dictionary tech_cost.json
+    processes: int number of worker processes (default: number of CPUs)
+    results: str folder where the results of each scenario are saved (results/scenario_name)
+    formats: list of formats of the results 'pkl' and/or 'csv' (see REC.save)
+
+    output: dictionary scenario_name: results folder of the scenario
+    """
+    base = rec.REC(structure,general,file_structure,file_general,path) # weather and series are loaded once
+    if processes is None:
+        processes = os.cpu_count()
+    inputs = {'general': general, 'file_structure': file_structure, 'file_general': file_general, 'path': path,
+              'tech_cost': tech_cost, 'results': results, 'formats': formats}
+
+    if processes == 1: # scenarios simulated in this process, series are already in its cache
+        worker.update(inputs)
+        worker['weather'] = base.weather
+        return({scenario_name: run_scenario(scenario_name,scenarios[scenario_name]) for scenario_name in scenarios})
+
+    blocks = []
+    try:
+        shared = {'series':  {key: (mtime,share_array(array,blocks)) for key,(mtime,array) in series.cache.items()},
+                  'weather': {column: share_array(values,blocks) for column,values in base.weather.numeric().items()},
+                  'repeat':  base.weather.repeat,
+                  'length':  base.weather.length}
+        with multiprocessing.Pool(processes,initializer=init_worker,initargs=(shared,inputs)) as pool:
+            folders = pool.starmap(run_scenario,[(scenario_name,scenarios[scenario_name]) for scenario_name in scenarios])
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    return(dict(zip(scenarios,folders)))
@@ -126,6 +126,7 @@ pp.NPV_plot(name_economic)
 
 import numpy as np
 import matplotlib.pyplot as plt
+from core import scenarios
 
 pv_size = np.arange(1,11)
 
@@ -134,12 +135,12 @@ sc = [] # self-consumption
 ss = [] # self-sufficiency
 
 print('\n Sensitivity analysis running:')
-for pv in pv_size:
+# all the PV sizes are simulated together as a batch of scenarios: the REC is created only once and only the PV is changed in each scenario
+batch = scenarios.scenario_batch(studycase,general,file_studycase,file_general,path,[{'prosumer': {'PV': {'peakP': pv}}} for pv in pv_size])
+batch.simulate() # simulate REC enegy balances of all the scenarios
+for pv,cs in zip(pv_size,batch.recs):
     print(pv)
     name_studycase = f"PV size = {pv}"
-    new_studycase = pre.change_peakP(studycase, 'prosumer', pv) # change PV size 
-    cs = rec.REC(new_studycase,general,file_studycase,file_general,path) # create REC object
-    cs.REC_power_simulation() # simulate REC enegy balances
     cs.tech_cost(tech_cost) # calculate the cost of all technologies 
     cs.save(name_studycase,'pkl') # save results in 'name_studycase.pkl'
     
@@ -14,6 +14,7 @@ matplotlib.use('Agg')
 from datetime import datetime
 import io
 import zipfile
+from core import budget
 
 # Set page config
 st.set_page_config(
@@ -69,7 +70,13 @@ def save_config(config_data, config_file):
         return False
 
 def run_simulation():
-    """Run the hybrid plant simulation"""
+    """Run the hybrid plant simulation (refused if its projected arrays exceed the memory budget, see core/budget.py)"""
+    studycase, general = load_config("input_test_4/studycase.json"), load_config("input_test_4/general.json")
+    if studycase and general:
+        try:
+            budget.dry_run(studycase, general, print_=False)
+        except MemoryError as e:
+            return False, "", str(e)
     try:
         result = subprocess.run([sys.executable, "run_test_4.py"], 
                               capture_output=True, text=True, cwd=os.getcwd())
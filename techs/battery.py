@@ -3,6 +3,7 @@ import os
 import sys 
 sys.path.append(os.path.abspath(os.path.join(os.getcwd(),os.path.pardir)))   # temorarily adding constants module path 
 from core import constants as c
+from core import scratch
 
 class battery:    
     
@@ -53,7 +54,7 @@ class battery:
         self.completed_cycles = 0 # float initialise completed_cycles, this parameter is usefull to calculate replacements
         self.replacements = [] # list initialise: h at which replecaments occur
 
-        self.LOC = np.zeros(c.timestep_number+1) # array battery level of Charge 
+        self.LOC = scratch.zeros(c.timestep_number+1) # array battery level of Charge 
         self.used_capacity = 0 # battery used capacity <= max_capacity [kWh]
       
         self.collective = parameters['collective'] # int 0: no collective rules. 1: priority to csc and then charge or discharge the battery.
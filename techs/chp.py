@@ -20,6 +20,7 @@ import matplotlib.pyplot as plt
 
 ## Custom
 from core import constants as c
+from core import scratch
 
 
 def bilinear_interp(_map,v1,v2):
@@ -104,18 +105,18 @@ class Chp:
         self.coproduct      = parameters["Co-product"]      # co-product energy stream
         self.th_out         = parameters["Thermal Output"]  # type of stream into which heat from cobustion is converted/transferred. Steam or hot water
         self.control_param  = parameters["Control Param"]   # control parameters to define operational boundaries of the system
-        self.load           = np.zeros(timestep_number)    # [-] working load of the system 
-        self.q_th           = np.zeros(timestep_number)    # [kWh] thermal output of the chp
-        self.w_el           = np.zeros(timestep_number)    # [kWh] electricity output of the system
-        self.m_fuel         = np.zeros(timestep_number)    # [kg/s] or [Sm3/s] fuel consumption
-        self.l_bound        = np.zeros(timestep_number)    # [-] minimum load producible given working conditions
-        self.u_bound        = np.zeros(timestep_number)    # [-] maximum load producible given working conditions
-        self.steam          = np.zeros(timestep_number)    # [kg/s] steam produced by CHP system
-        self.hot_w          = np.zeros(timestep_number)    # [kWh] hot water produced by CHP system
-        self.shutdown       = np.zeros(timestep_number)    # [0/1] array to keep track of numbers of system shutdowns
+        self.load           = scratch.zeros(timestep_number)    # [-] working load of the system 
+        self.q_th           = scratch.zeros(timestep_number)    # [kWh] thermal output of the chp
+        self.w_el           = scratch.zeros(timestep_number)    # [kWh] electricity output of the system
+        self.m_fuel         = scratch.zeros(timestep_number)    # [kg/s] or [Sm3/s] fuel consumption
+        self.l_bound        = scratch.zeros(timestep_number)    # [-] minimum load producible given working conditions
+        self.u_bound        = scratch.zeros(timestep_number)    # [-] maximum load producible given working conditions
+        self.steam          = scratch.zeros(timestep_number)    # [kg/s] steam produced by CHP system
+        self.hot_w          = scratch.zeros(timestep_number)    # [kWh] hot water produced by CHP system
+        self.shutdown       = scratch.zeros(timestep_number)    # [0/1] array to keep track of numbers of system shutdowns
         self.performances   = {                                                 # performance parameters dictionary. Self-consumption % of the considered energy streams
-                                self.strategy   : np.zeros(timestep_number),
-                                self.coproduct  : np.zeros(timestep_number),
+                                self.strategy   : scratch.zeros(timestep_number),
+                                self.coproduct  : scratch.zeros(timestep_number),
                               }    
 
         if self.fuel == 'gas':
@@ -11,6 +11,7 @@ import os
 import sys 
 sys.path.append(os.path.abspath(os.path.join(os.getcwd(),os.path.pardir)))   # temporarily adding constants module path 
 from core import constants as c
+from core import scratch
 
 class Compressor:
     
@@ -44,7 +45,7 @@ class Compressor:
         self.only_renewables    = parameters['only_renewables']
         self.P_in               = parameters['P_in']
         self.P_out              = parameters['P_out']
-        self.hyd                = np.zeros(timestep_number)             # [kg/s] hydrogen flow rate
+        self.hyd                = scratch.zeros(timestep_number)             # [kg/s] hydrogen flow rate
         self.T_in               = parameters['T_in']                    # [°C] fluid inlet temperature
         self.conversion         = c.kWh2kJ                              # [kJ/kWh]
         self.eta_motor          = 0.95                                  # [-] assumed efficiency of electric motor driving the compressor https://transitionaccelerator.ca/wp-content/uploads/2023/04/TA-Technical-Brief-1.1_TEEA-Hydrogen-Compression_PUBLISHED.pdf
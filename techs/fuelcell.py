@@ -4,11 +4,13 @@ import numpy as np
 import math
 from numpy import log as ln
 from sklearn.linear_model import LinearRegression 
-import pandas as pd
 import os
 import sys 
 sys.path.append(os.path.abspath(os.path.join(os.getcwd(),os.path.pardir)))   # temporarily adding constants module path 
 from core import constants as c
+from core import curves
+from core import schedule
+from core import scratch
 import scipy.fft
 import scipy.optimize
 
@@ -137,217 +139,36 @@ class fuel_cell:
             # The model has then been adapted to scale main parameters as a function of the selected size. Maximum moule size = 1000 kW.
             # Key aspects of the model can be found in Chavan (2017): https://doi.org/10.1016/j.energy.2017.07.070)
             
-            self.EFF                = np.zeros(timestep_number)    # [-]  Keeping track of fuel cell efficiency
-            self.VOLT               = np.zeros(timestep_number)    # [V]  Keeping track of single cell working voltage - necessary for ageing calculations
-            self.CURR_DENS          = np.zeros(timestep_number)    # [A]  Keeping track of single cell working current - necessary for ageing calculations
-            self.EFF_last_module    = np.zeros(timestep_number)    # [-]  Keeping track of the elecrolyzer last module efficiency over the simulation
-            self.n_modules_used     = np.zeros(timestep_number)    # [-]  Number of modules active at each timestep 
+            self.EFF                = scratch.zeros(timestep_number,dtype=c.reporting_dtype)    # [-]  Keeping track of fuel cell efficiency
+            self.VOLT               = scratch.zeros(timestep_number)    # [V]  Keeping track of single cell working voltage - necessary for ageing calculations
+            self.CURR_DENS          = scratch.zeros(timestep_number)    # [A]  Keeping track of single cell working current - necessary for ageing calculations
+            self.EFF_last_module    = scratch.zeros(timestep_number,dtype=c.reporting_dtype)    # [-]  Keeping track of the elecrolyzer last module efficiency over the simulation
+            self.n_modules_used     = scratch.zeros(timestep_number,dtype=c.reporting_dtype)    # [-]  Number of modules active at each timestep 
             
-            "H2 --> 2H+ + 2e" 
-          
-            # FuelCell  Parameters 
-            self.Lambda              = 23                                  # [-]      Cell mositure content
-            self.FC_AnodeCurrDens    = 0.000000009                         # [A/cm^2] Anode current density
-            self.FC_CathodeCurrDens  = 0.001                               # [A/cm^2] Cathode current density
-            self.FC_OperatingTemp    = 273.15 + 62                         # [K]      https://www.google.com/search?q=working+temperature+PEM+fuel+cell&oq=working+temperature+PEM+fuel+cell+&aqs=chrome..69i57j0i512l9.10383j0j7&sourceid=chrome&ie=UTF-8
-            self.FC_FuelPress        = 101325 + 25000                      # [Pa]     Fuel supply pressure (Anode) 
-            self.FC_AirPress         = 101325                              # [Pa]     Air supply pressure (Cathode)
-            self.FC_MinCurrDens      = 0.0001                              # [A/cm^2] FC min. current density      
-            self.CTC                 = 0.4                                 # [-]      Charge Transfer Coefficient  - if Nominal Power < 6 kW: CTC = 0.45
-                                                                           #                                  - if //   //   //  > 6 kW: CTC = 0.4
-            self.MembThickness       = 250                                 # [μm]     Fuel cell membrane thickness - if Nominal Power < 6 kW: MembThickness = 100 
-                                                                           #                                    - if //   //   //  > 6 kW: MembThickness = 145 
-            self.FC_MaxCurrent       = 230                                 # [A]      Value taken from datasheet. Current value at which maximum power is delivered
-        
-            self.MaxPowerStack       = self.n_modules*self.Npower          # [kW]     Stack maximum power output
-         
-            self.nc                  = 90 + int((self.Npower/1000)*(250-90))    # For a power range between 0 kW and 1000 kW the number of cells in the stack varies between 90 and 250 
-            self.FC_MaxCurrDens      = 1.2 + (self.Npower/1000)*(1.3-1.2)       # For a power range between 0 kW and 1000 kW the maximum current density varies between 1.2 and 1.3 A/cm2 
-            
-            # Varying the number of cells, module efficiency remains unchanged
-            
-            # nc = 96 and FC_MaxCurrDens = 1.2 are the values derived from the above-mentioned datasheet 
-            # Such values should be used when implementing a fuel cell of 13.6 kW
-            
-            'POLARIZATION CURVE'
-            
-            Ndatapoints= 1000                    # Number of points used to compute the polarization curve 
-            
-            # Saving different losses contruibutions to be considered in the polarization curve
-            
-            self.OCpotential = []                # [V] Open circuit voltage
-            self.ActLosses   = []                # [V] Activation losses
-            self.OhmLosses   = []                # [V] Ohmic losses
-            self.CellVolt = np.zeros(Ndatapoints)
-            self.CellCurrDensity = np.linspace(self.FC_MinCurrDens,self.FC_MaxCurrDens,Ndatapoints)   
-            
-            'Polarization (V-i) curve calculation'
-            
-            # V is obtained by summing 3 different contributions (concentration losses are considered to be negligible)
-
-            '1- Cell open curcuit voltage'
-            
-            pO2 = (self.FC_AirPress*0.21)/101325  # [atm] accounting for partial pressure of oxigen in air
-            pH2O = 1                              # [atm]
-            pH2 = self.FC_FuelPress/101325        # [atm]
-            
-            Ecell = 1.229 -0.85e-3*(self.FC_OperatingTemp-298.15) + 4.3085e-5*self.FC_OperatingTemp*ln(pH2*(pO2**0.5)/pH2O)  # [V] Open circuit voltage
-            self.OCpotential = [Ecell for i in range(Ndatapoints)]
-                            
-            for i in range(0,Ndatapoints):
-                                                        
-                '2- Activation losses'
-                Vact_cat = -self.Runiv*self.FC_OperatingTemp*np.log10(self.FC_CathodeCurrDens)/(self.CTC*4*self.FaradayConst)+self.Runiv*self.FC_OperatingTemp*np.log10(self.CellCurrDensity[i])/(self.CTC*4*self.FaradayConst) #[V]
-                Vact_an = -self.Runiv*self.FC_OperatingTemp*np.log10(self.FC_AnodeCurrDens)/(self.CTC*2*self.FaradayConst)+self.Runiv*self.FC_OperatingTemp*np.log10(self.CellCurrDensity[i])/(self.CTC*2.*self.FaradayConst)   #[V]
-          
-                Vact = Vact_cat +Vact_an               # [V] Activation losses
-                
-                self.ActLosses.append(Ecell-Vact)
-           
-                '3- Ohmic losses'
-                rho_m = (181.6*(1+0.03*(self.CellCurrDensity[i])+0.062*((self.FC_OperatingTemp/303)**2)*(self.CellCurrDensity[i])**2.5))/ \
-                    ((self.Lambda-0.634-3*(self.CellCurrDensity[i]))*self.eNepero**(4.18*(self.FC_OperatingTemp-303)/self.FC_OperatingTemp))      #[Ohm*cm] specific membrane recistence
-              
-                Rm = rho_m*self.MembThickness/10000    # [Ohm/cm2]  Cell resistance depending on temperature and moisture content (Lambda) 
-         
-                Vohm = self.CellCurrDensity[i]*Rm      # [V] Ohmic losses
-                
-                self.OhmLosses.append(Ecell-Vact-Vohm)
-                
-                'SINGLE CELL VOLTAGE'
-                
-                self.CellVolt[i] = (Ecell-Vact-Vohm)                                  # [V]    Cell Voltage
-            
-            self.Vmin_FC=self.CellVolt[-1]*self.nc                                    # [V]    Minimum value for working voltage
-            self.FC_CellArea=self.Npower*1000/(self.Vmin_FC*self.FC_MaxCurrDens)      # [cm^2] FC cell active area
-
-            'RESULTING MODULE VOLTAGE'
-         
-            self.Voltage = self.CellVolt*self.nc                                      # [V] Module Voltage
-
-            'Interpolation of  polarization curve: defining the fit-function for i-V curve'
-            
-            self.num = Ndatapoints                                                    # [-] number of intervals to be considered for the interpolation
-            self.x = np.linspace(self.CellCurrDensity[0],self.CellCurrDensity[-1],self.num) 
-            
-            # Interpolating functions
-            self.iV1 = interp1d(self.CellCurrDensity,self.Voltage,bounds_error=False,fill_value='extrapolate')    # Linear spline 1-D interpolation - MOdule Voltage
-            self.iV2 = interp1d(self.CellCurrDensity,self.CellVolt,bounds_error=False,fill_value='extrapolate')   # Linear spline 1-D interpolation - Cell Voltage
-            
-            # Creating the reverse curve IP - necessary to define the exact functioning point        
-            self.Current = self.CellCurrDensity*self.FC_CellArea    # [A] Defining the current value: same both for the single cell and the full stack!
-            
-            # Defining Fuel Cell Max Power Generation
-            'Fuel Cell Max Power Output'
-            
-            FC_power = []
-            for i in range(len(self.Current)):
-                pot=self.Current[i]*self.Voltage[i]/1000       # [kW] Power
-                FC_power.append(pot)
-            self.MinPower = min(FC_power)
-            
-            self.IP = interp1d(self.Current,FC_power,bounds_error=False,fill_value='extrapolate')          
-            self.P  = []
-            for i in range(len(self.Current)):
-                power = (self.iV1(self.CellCurrDensity[i])*self.Current[i])/1000     # [kW] Resolving the equation system via interpolation
-                self.P.append(power)                                                 # [kW] Output power values varying current
-                
-            self.PI=interp1d(self.P,self.Current,bounds_error=False,fill_value='extrapolate')  # Interpolating function returning Current if interrogated with Power 
-            self.Pi=interp1d(self.P,self.CellCurrDensity,bounds_error=False,fill_value='extrapolate')  # Interpolating function returning Current density if interrogated with Power 
-            self.PV=interp1d(self.P,self.Voltage,bounds_error=False,fill_value='extrapolate')  # Interpolating function returning Voltage if interrogated with Power 
-            self.Pv=interp1d(self.P,self.CellVolt,bounds_error=False,fill_value='extrapolate')  # Interpolating function returning Voltage if interrogated with Power 
-            
-            'Single module electricity production'
-            
-            # Creation of lists of values required for interpolation functions
-            hydrogen                = []
-            water                   = []
-            electricity_produced    = []
-            self.eta_module         = []
-            FC_Heat_produced        = []
-            
-            for i in range(len(FC_power)):
-               
-                p_required = FC_power[i]                                   # [kW] 
-                FC_CellCurrDensity = self.PI(p_required)/self.FC_CellArea  # [A/cm^2] current density value at which the fuel cell is working 
-                Current = FC_CellCurrDensity*self.FC_CellArea     # [A] FuelCell Stack operating current 
-                
-                FC_Vstack = self.iV1(FC_CellCurrDensity)          # [V] Stack operating voltage
-                V_cell = FC_Vstack/self.nc                        # [V] Single cell operating voltage
-        
-                'Computing FC efficiency and hydrogen energy demand'    
-                
-                pO2 = (self.FC_AirPress*0.21)/101325              # [atm]
-                pH2O = 1                                          # [atm]
-                pH2 = self.FC_FuelPress/101325                    # [atm]  
-                
-                Ecell = 1.229-0.85e-3*(self.FC_OperatingTemp-298.15) + 4.3085e-5*self.FC_OperatingTemp*ln(pH2*(pO2**0.5)/pH2O)   # [V] Open circuit voltage 
-                deltaG = self.deltaG0 - self.Runiv*self.FC_OperatingTemp*ln(pH2*math.sqrt(pO2)/pH2O)/(2*self.FaradayConst)       # [kJ/mol] Gibbs free energy at actual conditions
-              
-                eta_voltage = FC_Vstack/(Ecell*self.nc)           # [-] Voltage efficiency 
-                eta_th = - deltaG/self.HHVh2Mol                   # [-] Thermodynamic efficiency
-             
-                etaFC = eta_th*eta_voltage                        # [-] FC efficiency
-
-                'Hydrogen demand'
-             
-                FC_HydroCons = (Current*self.nc/95719.25)/1000/self.rhoStdh2    # [kg/s]*[Sm3/kg] = [Sm3/s] (Chavan 2017)
-                hyd = FC_HydroCons*self.rhoStdh2                                # [kg/s]
-                FC_deltaHydrogen = - hyd*self.HHVh2*1000                        # [kW]
-                
-                'Water production'
-                # water_produced = (hyd*self.h2oMolMass/self.H2MolMass)/self.rhoStdh2o            # [Sm3/s] stoichiometric amount
-                water_produced = (((p_required*1000/(V_cell*2*self.FaradayConst))*self.h2oMolMass)/self.rhoStdh2o)*self.nc # [Sm3/s] module produced water floe rate https://onlinelibrary.wiley.com/doi/pdf/10.1002/9781118878330.app2
-                
-                'Process heat, that can be recovered'
-              
-                heat_loss = 0.2 * (-FC_deltaHydrogen)      # Assuming 20% of energy losses                                                                            
-                FC_Heat = ((1.481*self.nc)/FC_Vstack-1)*p_required -  heat_loss              # [kW] 
-                    
-                hydrogen.append(hyd)                        # [kg/s]    consumed hydrogen
-                water.append(water_produced)                # [m^3/s]   produced water
-                electricity_produced.append(p_required)     # [kW]      output power
-                self.eta_module.append(etaFC)               # [-]       fc efficiency
-                FC_Heat_produced.append(FC_Heat)            # [kW]      co-product heat
+            curves.cached(self,fuel_cell.curves_PEM_General,{'Npower': self.Npower})     # polarization, consumption and efficiency curves of the module (see curves_PEM_General)
             
-            self.max_h2_module  = max(hydrogen)                         # [kg/s] maximum amount of exploitable hydrogen for the considered module
+            self.MaxPowerStack       = self.n_modules*self.Npower          # [kW]     Stack maximum power output
             self.max_h2_stack   = self.max_h2_module*self.n_modules     # [kg/s] maximum amount of exploitable hydrogen for the considered stack
-            self.maxVolt_module = max(self.Voltage)                     # [V] maximum voltage of the considered module
-            self.minVolt_module = min(self.Voltage)                     # [V] minimum voltage of the considered module
             
-            electric_eff_module = self.eta_module[-1]  # Module electric efficiency
+            electric_eff_module = self.electric_eff_module   # Module electric efficiency
             h2p_eff = (1/(electric_eff_module*c.HHVH2*1000))*3600 # [kg/kWh] kg/h of hydrogen produced per kWh of input power
-            thermal_eff_module = (FC_Heat_produced[-1] / - FC_deltaHydrogen) # Module thermal efficiency
+            thermal_eff_module = self.thermal_eff_module     # Module thermal efficiency
             total_efficiency = electric_eff_module + thermal_eff_module
-
             print(f"\nThe fuel cell electric efficiency of each module is found to be equal to {electric_eff_module*100:.2f}%, which is equivalent to {round(h2p_eff, 3)} kg/kWh (using H2 HHV). "
                   f"The fuel cell thermal efficiency of each module is found to be equal to {thermal_eff_module*100:.2f}% with heat output available for cogeneration at {self.FC_OperatingTemp}K. "
                   f"Thus, the total efficiency is equal to {total_efficiency*100:.2f}%. "
                   f"A fuel cell nominal power of {self.MaxPowerStack:.2f} kW needs to be fed with {self.max_h2_stack*3600:.2f} kg/h of hydrogen.")
-            self.etaFuelCell = interp1d(hydrogen,self.eta_module,bounds_error=False,fill_value='extrapolate')          # Linear spline 1-D interpolation -> H2 consumption - FC efficiency
-            self.h2P         = interp1d(hydrogen,electricity_produced,bounds_error=False,fill_value='extrapolate')  # Linear spline 1-D interpolation -> H2 consumption - produced electricity
-            self.FC_Heat     = interp1d(hydrogen,FC_Heat_produced,bounds_error=False,fill_value='extrapolate')      # Linear spline 1-D interpolation -> H2 consumption - produced heat
-            self.water       = interp1d(hydrogen,water,bounds_error=False,fill_value='extrapolate')                 # Linear spline 1-D interpolation -> H2 consumption - produced water
-            
-            self.iEta   = interp1d(self.CellCurrDensity,self.eta_module,bounds_error=False,fill_value='extrapolate')       # Linear spline 1-D interpolation -> Operating current density - efficiency
-            self.IEta   = interp1d(self.Current,self.eta_module,bounds_error=False,fill_value='extrapolate')       # Linear spline 1-D interpolation -> Operating current density - efficiency
-            self.ihyd   = interp1d(self.CellCurrDensity,hydrogen,bounds_error=False,fill_value='extrapolate')           # Linear spline 1-D interpolation -> Operating current density - H2 consumption
-            self.Ihyd   = interp1d(self.Current,hydrogen,bounds_error=False,fill_value='extrapolate')           # Linear spline 1-D interpolation -> Operating current density - H2 consumption
-            self.iHeat  = interp1d(self.CellCurrDensity,FC_Heat_produced,bounds_error=False,fill_value='extrapolate')   # Linear spline 1-D interpolation -> Operating current density - produced heat            
-            self.IHeat  = interp1d(self.Current,FC_Heat_produced,bounds_error=False,fill_value='extrapolate')   # Linear spline 1-D interpolation -> Operating current density - produced heat            
-            self.iwater = interp1d(self.CellCurrDensity,water,bounds_error=False,fill_value='extrapolate')              # Linear spline 1-D interpolation -> Operating current density - produced water            
-            self.Iwater = interp1d(self.Current,water,bounds_error=False,fill_value='extrapolate')              # Linear spline 1-D interpolation -> Operating current density - produced water            
         
             if self.ageing:             # if ageing effects are being considered
                 self.stack = {
-                                'Activation[-]': np.zeros(timestep_number),                    # Initialize an array to track module activation (1 for on, 0 for off) for each timestep
+                                'Activation[-]': scratch.zeros(timestep_number),                    # Initialize an array to track module activation (1 for on, 0 for off) for each timestep
                                 'Pol_curve_history': [],                                       # Initialize an empty list to keep track of polarization curve shifts during utilization
                                 'Module_efficiency[-]': [],                                    # Initialize an empty list to keep track of module efficiency over time
-                                'Conversion_ratio_op[kWh/kg]': np.zeros(timestep_number),        # Initialize an array to keep track of performance evolution
-                                'Conversion_ratio_rated[kWh/kg]': np.zeros(timestep_number),        # Initialize an array to keep track of performance evolution
-                                'hydrogen_consumption[kg/s]': np.zeros(timestep_number),        # Initialize an array to keep track of hydrogen production
-                                'i_op[A]': np.zeros(timestep_number),                          # Initialize an array to keep track of operating current
-                                'v_op[V]': np.zeros(timestep_number)                           # Initialize an array to keep track of operating voltage
+                                'Conversion_ratio_op[kWh/kg]': scratch.zeros(timestep_number,dtype=c.reporting_dtype),        # Initialize an array to keep track of performance evolution
+                                'Conversion_ratio_rated[kWh/kg]': scratch.zeros(timestep_number,dtype=c.reporting_dtype),        # Initialize an array to keep track of performance evolution
+                                'hydrogen_consumption[kg/s]': scratch.zeros(timestep_number,dtype=c.reporting_dtype),        # Initialize an array to keep track of hydrogen production
+                                'i_op[A]': scratch.zeros(timestep_number),                          # Initialize an array to keep track of operating current
+                                'v_op[V]': scratch.zeros(timestep_number)                           # Initialize an array to keep track of operating voltage
                                 }
                 self.Γ              = (self.Npower)/(self.max_h2_module*3600) # [kWh/kg] ideal coversion ratio
                 # Defining the optimal operating range
@@ -358,248 +179,430 @@ class fuel_cell:
                 admissile_loss  = 20                             # [%] admissible voltage values loss compared to rated performance
                 self.CellVoltage_limit = max(self.Voltage)*(admissile_loss) # [V] cell voltage value requiring replacement of the module at end of life
                 self.polarization_curve_ageing = self.Voltage.copy()  # [V] initialising pol_curve. Considering design performances at first step (before starting degradation computing)
-                self.hydP       = interp1d(hydrogen,self.P)
-                self.hydcons    = hydrogen
+                self.hydP       = interp1d(self.hydcons,self.P)
         
         ####################################   
         if self.model == 'SOFC':
             
-            self.EFF=np.zeros(timestep_number)                    # [-]      keeping track of fuel cell efficiency
-            self.EFF_last_module     = np.zeros(timestep_number)  # [-]      keeping track of the elecrolyzer last active module efficiency over the simulation
-            self.n_modules_used      = np.zeros(timestep_number)  # [-]      Number of modules active at each timestep 
+            self.EFF=scratch.zeros(timestep_number,dtype=c.reporting_dtype)                    # [-]      keeping track of fuel cell efficiency
+            self.EFF_last_module     = scratch.zeros(timestep_number,dtype=c.reporting_dtype)  # [-]      keeping track of the elecrolyzer last active module efficiency over the simulation
+            self.n_modules_used      = scratch.zeros(timestep_number,dtype=c.reporting_dtype)  # [-]      Number of modules active at each timestep 
+            
+            curves.cached(self,fuel_cell.curves_SOFC,{'Npower': self.Npower})     # polarization, consumption and efficiency curves of the module (see curves_SOFC)
             
-            self.FC_OperatingTemp             = 273.15+800         # [K]      Operating temperature
-            self.FC_RefTemp                   = 273.15+750         # [K]      Operating temperature reference
-            self.FC_FuelPress                 = 116000 #506625             # [Pa]     Fuel supply pressure (Anode)  
-            self.FC_AirPress                  = 101325/101325 #444407/101325      # [atm]    Air supply pressure (Cathode)
-            # self.FC_MinCurrDens               = 0.0001              # [A/cm^2] FC min. current density - arbitrary
-            self.FC_MinCurrDens               = 0.04194            # [A/cm^2] FC min. current density - derived from experimental plot
-
-            self.FC_AlfaAnode                 = 0.55               # [-]      Charge transfer coefficient for anode
-            self.FC_AlfaCathode               = 0.33               # [-]      Charge transfer coefficient for cathode 
-            self.FC_ActivationEnergyAnode     = 110                # [kJ/mol] Anonde activation energy  -> ref.:http://dx.doi.org/10.1016/j.desal.2017.02.013
-            self.FC_ActivationEnergyCathode   = 160                # [kJ/mol] Cathode activation energy -> ref.: //        //        //        //        //
-            self.FC_ActivationCoeff           = 10                 # [-]      Activation coefficient 
-            self.FC_ExchangeCurrDensChAn      = 0.530              # [A/cm^2] Exchange current density channel anode 
-            self.FC_ExchangeCurrDensChCat     = 0.200              # [A/cm^2] Exchange current density channel cathode 
-            self.FC_ExchangeCurrDensCathode   = self.FC_ExchangeCurrDensChCat*self.eNepero**(((self.FC_ActivationCoeff*self.FC_ActivationEnergyCathode)\
-                                                /self.Runiv)*((1/self.FC_RefTemp)-(1/self.FC_OperatingTemp)))                                   # [mA/cm^2]
-            self.FC_ModFactor                 = 2                  # [-]      Ohmic losses modification factor 
-            self.ThicknessElectrolyte         = 0.00003 #0.00006            # [m]      Electrolyte thickness
-            self.ElectrolyteCostant           = 50                 # [K/ohm*m]
-            self.ActivationEnergyElectrolyte  = 9*10**(7)          # [kJ/mol] Electrolyte activation energy
-            self.FC_LimitCurrDens             = 6                  # [A/cm^2]
-            self.DiffusionVolumeH20           = 13.1               # [-] 
-            self.DiffusionVolumeH2            = 6.1                # [-]      
-            self.stoichiometriccoeff          = 2                  # [-]    coefficient used to account for working in excess air
-
             self.MaxPowerStack      = self.n_modules*self.Npower       # [kW]     Max power output 
+            self.max_h2_stack   = self.max_h2_module*self.n_modules     # [kg/s] maximum amount of exploitable hydrogen for the considered stack
             
-            self.nc                  = 80 + int((self.Npower/1000)*(250-80))       # For a power range between 0kW and 1000kW the number of cells in the stack varies between 80 and 250 
-            self.FC_MaxCurrDens      = 1.25 + (self.Npower/1000)*(1.25-1.25)          # For a power range between 0kW and 1000kW the maximum current density can be varied between the chosen values A/cm2 
+            electric_eff_module = self.electric_eff_module   # Module electric efficiency
+            h2p_eff = (1/(electric_eff_module*c.HHVH2*1000))*3600 # [kg/kWh] kg/h of hydrogen produced per kWh of input power
+            thermal_eff_module = self.thermal_eff_module     # Module thermal efficiency
+            total_efficiency = electric_eff_module + thermal_eff_module
+            print(f"\nThe fuel cell electric efficiency of each module is found to be equal to {electric_eff_module*100:.2f}%, which is equivalent to {round(h2p_eff, 3)} kg/kWh (using H2 HHV). "
+                  f"The fuel cell thermal efficiency of each module is found to be equal to {thermal_eff_module*100:.2f}% with heat output available for cogeneration at {self.FC_OperatingTemp}K. "
+                  f"Thus, the total efficiency is equal to {total_efficiency*100:.2f}%. "
+                  f"A fuel cell nominal power of {self.MaxPowerStack:.2f} kW needs to be fed with {self.max_h2_stack*3600:.2f} kg/h of hydrogen.")
+
+        ####### Operational period
+        self.state = parameters["state"]                           #on or off
+        self.operational_period = parameters["operational_period"]    #initial and final operational days 'dd-mm,dd-mm'
+        self.operational_state = schedule.operational_state(self.operational_period,self.state,self.timestep,self.timestep_number)   # 1 if operating, 0 if turned off as planned, at each timestep (see schedule.py)
+     
+
+#%%                     
+    def curves_PEM_General(self):
+        """
+        Polarization curve, hydrogen consumption and efficiency of a 'PEM General' module and their interpolating functions
+        They only depend on the module nominal power: constructions with the same 'Npower' load them from the curve cache if enabled (see curves.cached)
+        """
+        "H2 --> 2H+ + 2e" 
+      
+        # FuelCell  Parameters 
+        self.Lambda              = 23                                  # [-]      Cell mositure content
+        self.FC_AnodeCurrDens    = 0.000000009                         # [A/cm^2] Anode current density
+        self.FC_CathodeCurrDens  = 0.001                               # [A/cm^2] Cathode current density
+        self.FC_OperatingTemp    = 273.15 + 62                         # [K]      https://www.google.com/search?q=working+temperature+PEM+fuel+cell&oq=working+temperature+PEM+fuel+cell+&aqs=chrome..69i57j0i512l9.10383j0j7&sourceid=chrome&ie=UTF-8
+        self.FC_FuelPress        = 101325 + 25000                      # [Pa]     Fuel supply pressure (Anode) 
+        self.FC_AirPress         = 101325                              # [Pa]     Air supply pressure (Cathode)
+        self.FC_MinCurrDens      = 0.0001                              # [A/cm^2] FC min. current density      
+        self.CTC                 = 0.4                                 # [-]      Charge Transfer Coefficient  - if Nominal Power < 6 kW: CTC = 0.45
+                                                                       #                                  - if //   //   //  > 6 kW: CTC = 0.4
+        self.MembThickness       = 250                                 # [μm]     Fuel cell membrane thickness - if Nominal Power < 6 kW: MembThickness = 100 
+                                                                       #                                    - if //   //   //  > 6 kW: MembThickness = 145 
+        self.FC_MaxCurrent       = 230                                 # [A]      Value taken from datasheet. Current value at which maximum power is delivered
+    
+     
+        self.nc                  = 90 + int((self.Npower/1000)*(250-90))    # For a power range between 0 kW and 1000 kW the number of cells in the stack varies between 90 and 250 
+        self.FC_MaxCurrDens      = 1.2 + (self.Npower/1000)*(1.3-1.2)       # For a power range between 0 kW and 1000 kW the maximum current density varies between 1.2 and 1.3 A/cm2 
+        
+        # Varying the number of cells, module efficiency remains unchanged
+        
+        # nc = 96 and FC_MaxCurrDens = 1.2 are the values derived from the above-mentioned datasheet 
+        # Such values should be used when implementing a fuel cell of 13.6 kW
+        
+        'POLARIZATION CURVE'
+        
+        Ndatapoints= 1000                    # Number of points used to compute the polarization curve 
+        
+        # Saving different losses contruibutions to be considered in the polarization curve
+        
+        self.OCpotential = []                # [V] Open circuit voltage
+        self.ActLosses   = []                # [V] Activation losses
+        self.OhmLosses   = []                # [V] Ohmic losses
+        self.CellVolt = np.zeros(Ndatapoints)
+        self.CellCurrDensity = np.linspace(self.FC_MinCurrDens,self.FC_MaxCurrDens,Ndatapoints)   
+        
+        'Polarization (V-i) curve calculation'
+        
+        # V is obtained by summing 3 different contributions (concentration losses are considered to be negligible)
+
+        '1- Cell open curcuit voltage'
+        
+        pO2 = (self.FC_AirPress*0.21)/101325  # [atm] accounting for partial pressure of oxigen in air
+        pH2O = 1                              # [atm]
+        pH2 = self.FC_FuelPress/101325        # [atm]
+        
+        Ecell = 1.229 -0.85e-3*(self.FC_OperatingTemp-298.15) + 4.3085e-5*self.FC_OperatingTemp*ln(pH2*(pO2**0.5)/pH2O)  # [V] Open circuit voltage
+        self.OCpotential = [Ecell for i in range(Ndatapoints)]
+                        
+        for i in range(0,Ndatapoints):
+                                                    
+            '2- Activation losses'
+            Vact_cat = -self.Runiv*self.FC_OperatingTemp*np.log10(self.FC_CathodeCurrDens)/(self.CTC*4*self.FaradayConst)+self.Runiv*self.FC_OperatingTemp*np.log10(self.CellCurrDensity[i])/(self.CTC*4*self.FaradayConst) #[V]
+            Vact_an = -self.Runiv*self.FC_OperatingTemp*np.log10(self.FC_AnodeCurrDens)/(self.CTC*2*self.FaradayConst)+self.Runiv*self.FC_OperatingTemp*np.log10(self.CellCurrDensity[i])/(self.CTC*2.*self.FaradayConst)   #[V]
+      
+            Vact = Vact_cat +Vact_an               # [V] Activation losses
             
-            # Varying the number of cells, module efficiency remains unchanged
-            # nc = 77 and FC_MaxCurrDens = 1.54 are derived from the above-mentioned datasheet
+            self.ActLosses.append(Ecell-Vact)
+       
+            '3- Ohmic losses'
+            rho_m = (181.6*(1+0.03*(self.CellCurrDensity[i])+0.062*((self.FC_OperatingTemp/303)**2)*(self.CellCurrDensity[i])**2.5))/ \
+                ((self.Lambda-0.634-3*(self.CellCurrDensity[i]))*self.eNepero**(4.18*(self.FC_OperatingTemp-303)/self.FC_OperatingTemp))      #[Ohm*cm] specific membrane recistence
+          
+            Rm = rho_m*self.MembThickness/10000    # [Ohm/cm2]  Cell resistance depending on temperature and moisture content (Lambda) 
+     
+            Vohm = self.CellCurrDensity[i]*Rm      # [V] Ohmic losses
             
-            'POLARIZATION CURVE'
+            self.OhmLosses.append(Ecell-Vact-Vohm)
             
-            Ndatapoints = 1000                        # Number of points used to compute the polarization curve 
+            'SINGLE CELL VOLTAGE'
             
-            self.DeltaV_ohm = np.zeros(Ndatapoints)   # Ohmic losses
-            self.DeltaV_con = np.zeros(Ndatapoints)   # Concentration losses
-            self.Ecell = []                           # Open circuit voltage
-            self.CellVoltage = np.zeros(Ndatapoints)
-            self.CellCurrDensity = np.linspace(self.FC_MinCurrDens,self.FC_MaxCurrDens,Ndatapoints)  
+            self.CellVolt[i] = (Ecell-Vact-Vohm)                                  # [V]    Cell Voltage
+        
+        self.Vmin_FC=self.CellVolt[-1]*self.nc                                    # [V]    Minimum value for working voltage
+        self.FC_CellArea=self.Npower*1000/(self.Vmin_FC*self.FC_MaxCurrDens)      # [cm^2] FC cell active area
+
+        'RESULTING MODULE VOLTAGE'
+     
+        self.Voltage = self.CellVolt*self.nc                                      # [V] Module Voltage
+
+        'Interpolation of  polarization curve: defining the fit-function for i-V curve'
+        
+        self.num = Ndatapoints                                                    # [-] number of intervals to be considered for the interpolation
+        self.x = np.linspace(self.CellCurrDensity[0],self.CellCurrDensity[-1],self.num) 
+        
+        # Interpolating functions
+        self.iV1 = interp1d(self.CellCurrDensity,self.Voltage,bounds_error=False,fill_value='extrapolate')    # Linear spline 1-D interpolation - MOdule Voltage
+        self.iV2 = interp1d(self.CellCurrDensity,self.CellVolt,bounds_error=False,fill_value='extrapolate')   # Linear spline 1-D interpolation - Cell Voltage
+        
+        # Creating the reverse curve IP - necessary to define the exact functioning point        
+        self.Current = self.CellCurrDensity*self.FC_CellArea    # [A] Defining the current value: same both for the single cell and the full stack!
+        
+        # Defining Fuel Cell Max Power Generation
+        'Fuel Cell Max Power Output'
+        
+        FC_power = []
+        for i in range(len(self.Current)):
+            pot=self.Current[i]*self.Voltage[i]/1000       # [kW] Power
+            FC_power.append(pot)
+        self.MinPower = min(FC_power)
+        
+        self.IP = interp1d(self.Current,FC_power,bounds_error=False,fill_value='extrapolate')          
+        self.P  = []
+        for i in range(len(self.Current)):
+            power = (self.iV1(self.CellCurrDensity[i])*self.Current[i])/1000     # [kW] Resolving the equation system via interpolation
+            self.P.append(power)                                                 # [kW] Output power values varying current
+            
+        self.PI=interp1d(self.P,self.Current,bounds_error=False,fill_value='extrapolate')  # Interpolating function returning Current if interrogated with Power 
+        self.Pi=interp1d(self.P,self.CellCurrDensity,bounds_error=False,fill_value='extrapolate')  # Interpolating function returning Current density if interrogated with Power 
+        self.PV=interp1d(self.P,self.Voltage,bounds_error=False,fill_value='extrapolate')  # Interpolating function returning Voltage if interrogated with Power 
+        self.Pv=interp1d(self.P,self.CellVolt,bounds_error=False,fill_value='extrapolate')  # Interpolating function returning Voltage if interrogated with Power 
+        
+        'Single module electricity production'
+        
+        # Creation of lists of values required for interpolation functions
+        hydrogen                = []
+        water                   = []
+        electricity_produced    = []
+        self.eta_module         = []
+        FC_Heat_produced        = []
+        
+        for i in range(len(FC_power)):
+           
+            p_required = FC_power[i]                                   # [kW] 
+            FC_CellCurrDensity = self.PI(p_required)/self.FC_CellArea  # [A/cm^2] current density value at which the fuel cell is working 
+            Current = FC_CellCurrDensity*self.FC_CellArea     # [A] FuelCell Stack operating current 
             
-            pH2 = self.FC_FuelPress/101325                  # [atm]
-            pH2O = 1                                        # [atm]
-            pO2 = (self.FC_AirPress*0.21*101325)/101325     # [atm]
+            FC_Vstack = self.iV1(FC_CellCurrDensity)          # [V] Stack operating voltage
+            V_cell = FC_Vstack/self.nc                        # [V] Single cell operating voltage
+    
+            'Computing FC efficiency and hydrogen energy demand'    
             
-            # V is obtained by summing 4 different contributions 
-            'Polarization (V-i) curve calculation'
-        
-            '1 - Open circuit potential'                
+            pO2 = (self.FC_AirPress*0.21)/101325              # [atm]
+            pH2O = 1                                          # [atm]
+            pH2 = self.FC_FuelPress/101325                    # [atm]  
             
-            Ecell = 1.19 + ((self.Runiv*self.FC_OperatingTemp)/(2*self.FaradayConst))*ln(pH2*(pO2**0.5)/pH2O)  # [V] Open circuit voltage
-            self.Ecell  = [Ecell for i in range(Ndatapoints)]
+            Ecell = 1.229-0.85e-3*(self.FC_OperatingTemp-298.15) + 4.3085e-5*self.FC_OperatingTemp*ln(pH2*(pO2**0.5)/pH2O)   # [V] Open circuit voltage 
+            deltaG = self.deltaG0 - self.Runiv*self.FC_OperatingTemp*ln(pH2*math.sqrt(pO2)/pH2O)/(2*self.FaradayConst)       # [kJ/mol] Gibbs free energy at actual conditions
+          
+            eta_voltage = FC_Vstack/(Ecell*self.nc)           # [-] Voltage efficiency 
+            eta_th = - deltaG/self.HHVh2Mol                   # [-] Thermodynamic efficiency
+         
+            etaFC = eta_th*eta_voltage                        # [-] FC efficiency
 
-            for i in range(0,Ndatapoints):
-                                
-                '2 - Ohmic losses'
-                
-                self.DeltaV_ohm[i] = (self.CellCurrDensity[i]*self.ThicknessElectrolyte*self.FC_OperatingTemp)/\
-                                     (9000*self.eNepero**(-100000/(self.Runiv*self.FC_OperatingTemp)))                   # [V] (100000 activation energy in [kJ/mol], 9000 electrolyte constant)
-               
-                '3 - Concentration losses'   # Significant losses only for cathode, activation losses (minimal contribution for SOFC) are also present in the following formula
-                
-                self.DeltaV_con[i] = ((self.Runiv*self.FC_OperatingTemp)/(2*self.FaradayConst))*\
-                                     ln((self.CellCurrDensity[i]/(self.FC_ExchangeCurrDensCathode*self.FC_AirPress*(0.21-0.0008*10000*self.CellCurrDensity[i]*self.Runiv*self.FC_OperatingTemp/(4*self.FaradayConst*101325*0.00002)))))        # [V] 
-                
-                '4 - Cell voltage'
-                
-                self.CellVoltage[i] = self.Ecell[i]-self.DeltaV_ohm[i]-self.DeltaV_con[i]
-                
-            self.Vmin_FC_stack = self.CellVoltage[-1]*self.nc                                 # [V]    Minimum value for working voltage
-            self.FC_CellArea = self.Npower*1000/(self.Vmin_FC_stack*self.FC_MaxCurrDens)      # [cm^2] FC cell active area
-            self.FC_Pmax = self.Npower                                                        # [kW] Max output power
+            'Hydrogen demand'
+         
+            FC_HydroCons = (Current*self.nc/95719.25)/1000/self.rhoStdh2    # [kg/s]*[Sm3/kg] = [Sm3/s] (Chavan 2017)
+            hyd = FC_HydroCons*self.rhoStdh2                                # [kg/s]
+            FC_deltaHydrogen = - hyd*self.HHVh2*1000                        # [kW]
             
-            '5- Stack voltage'
+            'Water production'
+            # water_produced = (hyd*self.h2oMolMass/self.H2MolMass)/self.rhoStdh2o            # [Sm3/s] stoichiometric amount
+            water_produced = (((p_required*1000/(V_cell*2*self.FaradayConst))*self.h2oMolMass)/self.rhoStdh2o)*self.nc # [Sm3/s] module produced water floe rate https://onlinelibrary.wiley.com/doi/pdf/10.1002/9781118878330.app2
             
-            self.Voltage = self.nc*self.CellVoltage
-
-            'Interpolation of  polarization curve: defining the fit-function for i-V curve'    
+            'Process heat, that can be recovered'
           
-            self.num = Ndatapoints                                          # [-] number of intervals to be considered for the interpolation
-            self.x = np.linspace(self.CellCurrDensity[0],self.CellCurrDensity[-1],self.num)
-                    
-            # Defining different interpolation methods
-            self.iV1 = interp1d(self.CellCurrDensity,self.Voltage,bounds_error=False,fill_value='extrapolate')          # Linear spline 1-D interpolation
-            
-            # Creating the reverse curve IP - necessary to define the exact functioning point
-            self.Current = self.CellCurrDensity*self.FC_CellArea
+            heat_loss = 0.2 * (-FC_deltaHydrogen)      # Assuming 20% of energy losses                                                                            
+            FC_Heat = ((1.481*self.nc)/FC_Vstack-1)*p_required -  heat_loss              # [kW] 
+                
+            hydrogen.append(hyd)                        # [kg/s]    consumed hydrogen
+            water.append(water_produced)                # [m^3/s]   produced water
+            electricity_produced.append(p_required)     # [kW]      output power
+            self.eta_module.append(etaFC)               # [-]       fc efficiency
+            FC_Heat_produced.append(FC_Heat)            # [kW]      co-product heat
+        
+        self.max_h2_module  = max(hydrogen)                         # [kg/s] maximum amount of exploitable hydrogen for the considered module
+        self.maxVolt_module = max(self.Voltage)                     # [V] maximum voltage of the considered module
+        self.minVolt_module = min(self.Voltage)                     # [V] minimum voltage of the considered module
+        
+        self.electric_eff_module = self.eta_module[-1]  # Module electric efficiency
+        self.thermal_eff_module = (FC_Heat_produced[-1] / - FC_deltaHydrogen) # Module thermal efficiency
+
+        self.etaFuelCell = interp1d(hydrogen,self.eta_module,bounds_error=False,fill_value='extrapolate')          # Linear spline 1-D interpolation -> H2 consumption - FC efficiency
+        self.h2P         = interp1d(hydrogen,electricity_produced,bounds_error=False,fill_value='extrapolate')  # Linear spline 1-D interpolation -> H2 consumption - produced electricity
+        self.FC_Heat     = interp1d(hydrogen,FC_Heat_produced,bounds_error=False,fill_value='extrapolate')      # Linear spline 1-D interpolation -> H2 consumption - produced heat
+        self.water       = interp1d(hydrogen,water,bounds_error=False,fill_value='extrapolate')                 # Linear spline 1-D interpolation -> H2 consumption - produced water
+        
+        self.iEta   = interp1d(self.CellCurrDensity,self.eta_module,bounds_error=False,fill_value='extrapolate')       # Linear spline 1-D interpolation -> Operating current density - efficiency
+        self.IEta   = interp1d(self.Current,self.eta_module,bounds_error=False,fill_value='extrapolate')       # Linear spline 1-D interpolation -> Operating current density - efficiency
+        self.ihyd   = interp1d(self.CellCurrDensity,hydrogen,bounds_error=False,fill_value='extrapolate')           # Linear spline 1-D interpolation -> Operating current density - H2 consumption
+        self.Ihyd   = interp1d(self.Current,hydrogen,bounds_error=False,fill_value='extrapolate')           # Linear spline 1-D interpolation -> Operating current density - H2 consumption
+        self.iHeat  = interp1d(self.CellCurrDensity,FC_Heat_produced,bounds_error=False,fill_value='extrapolate')   # Linear spline 1-D interpolation -> Operating current density - produced heat            
+        self.IHeat  = interp1d(self.Current,FC_Heat_produced,bounds_error=False,fill_value='extrapolate')   # Linear spline 1-D interpolation -> Operating current density - produced heat            
+        self.iwater = interp1d(self.CellCurrDensity,water,bounds_error=False,fill_value='extrapolate')              # Linear spline 1-D interpolation -> Operating current density - produced water            
+        self.Iwater = interp1d(self.Current,water,bounds_error=False,fill_value='extrapolate')              # Linear spline 1-D interpolation -> Operating current density - produced water            
+        self.hydcons = hydrogen                    # [kg/s] hydrogen consumption of the module (see ageing)
+    
+    def curves_SOFC(self):
+        """
+        Polarization curve, hydrogen consumption and efficiency of a 'SOFC' module and their interpolating functions
+        They only depend on the module nominal power: constructions with the same 'Npower' load them from the curve cache if enabled (see curves.cached)
+        """
+        self.FC_OperatingTemp             = 273.15+800         # [K]      Operating temperature
+        self.FC_RefTemp                   = 273.15+750         # [K]      Operating temperature reference
+        self.FC_FuelPress                 = 116000 #506625             # [Pa]     Fuel supply pressure (Anode)  
+        self.FC_AirPress                  = 101325/101325 #444407/101325      # [atm]    Air supply pressure (Cathode)
+        # self.FC_MinCurrDens               = 0.0001              # [A/cm^2] FC min. current density - arbitrary
+        self.FC_MinCurrDens               = 0.04194            # [A/cm^2] FC min. current density - derived from experimental plot
+
+        self.FC_AlfaAnode                 = 0.55               # [-]      Charge transfer coefficient for anode
+        self.FC_AlfaCathode               = 0.33               # [-]      Charge transfer coefficient for cathode 
+        self.FC_ActivationEnergyAnode     = 110                # [kJ/mol] Anonde activation energy  -> ref.:http://dx.doi.org/10.1016/j.desal.2017.02.013
+        self.FC_ActivationEnergyCathode   = 160                # [kJ/mol] Cathode activation energy -> ref.: //        //        //        //        //
+        self.FC_ActivationCoeff           = 10                 # [-]      Activation coefficient 
+        self.FC_ExchangeCurrDensChAn      = 0.530              # [A/cm^2] Exchange current density channel anode 
+        self.FC_ExchangeCurrDensChCat     = 0.200              # [A/cm^2] Exchange current density channel cathode 
+        self.FC_ExchangeCurrDensCathode   = self.FC_ExchangeCurrDensChCat*self.eNepero**(((self.FC_ActivationCoeff*self.FC_ActivationEnergyCathode)\
+                                            /self.Runiv)*((1/self.FC_RefTemp)-(1/self.FC_OperatingTemp)))                                   # [mA/cm^2]
+        self.FC_ModFactor                 = 2                  # [-]      Ohmic losses modification factor 
+        self.ThicknessElectrolyte         = 0.00003 #0.00006            # [m]      Electrolyte thickness
+        self.ElectrolyteCostant           = 50                 # [K/ohm*m]
+        self.ActivationEnergyElectrolyte  = 9*10**(7)          # [kJ/mol] Electrolyte activation energy
+        self.FC_LimitCurrDens             = 6                  # [A/cm^2]
+        self.DiffusionVolumeH20           = 13.1               # [-] 
+        self.DiffusionVolumeH2            = 6.1                # [-]      
+        self.stoichiometriccoeff          = 2                  # [-]    coefficient used to account for working in excess air
 
-            'SOFC Max Power Production'
+        
+        self.nc                  = 80 + int((self.Npower/1000)*(250-80))       # For a power range between 0kW and 1000kW the number of cells in the stack varies between 80 and 250 
+        self.FC_MaxCurrDens      = 1.25 + (self.Npower/1000)*(1.25-1.25)          # For a power range between 0kW and 1000kW the maximum current density can be varied between the chosen values A/cm2 
+        
+        # Varying the number of cells, module efficiency remains unchanged
+        # nc = 77 and FC_MaxCurrDens = 1.54 are derived from the above-mentioned datasheet
+        
+        'POLARIZATION CURVE'
+        
+        Ndatapoints = 1000                        # Number of points used to compute the polarization curve 
+        
+        self.DeltaV_ohm = np.zeros(Ndatapoints)   # Ohmic losses
+        self.DeltaV_con = np.zeros(Ndatapoints)   # Concentration losses
+        self.Ecell = []                           # Open circuit voltage
+        self.CellVoltage = np.zeros(Ndatapoints)
+        self.CellCurrDensity = np.linspace(self.FC_MinCurrDens,self.FC_MaxCurrDens,Ndatapoints)  
+        
+        pH2 = self.FC_FuelPress/101325                  # [atm]
+        pH2O = 1                                        # [atm]
+        pO2 = (self.FC_AirPress*0.21*101325)/101325     # [atm]
+        
+        # V is obtained by summing 4 different contributions 
+        'Polarization (V-i) curve calculation'
+    
+        '1 - Open circuit potential'                
+        
+        Ecell = 1.19 + ((self.Runiv*self.FC_OperatingTemp)/(2*self.FaradayConst))*ln(pH2*(pO2**0.5)/pH2O)  # [V] Open circuit voltage
+        self.Ecell  = [Ecell for i in range(Ndatapoints)]
+
+        for i in range(0,Ndatapoints):
+                            
+            '2 - Ohmic losses'
             
-            FC_power = []
-            for i in range(len(self.Current)):
-                 pot = self.Current[i]*self.Voltage[i]/1000     # [kW] Power
-                 FC_power.append(pot)
-            self.MinPower = min(FC_power)
+            self.DeltaV_ohm[i] = (self.CellCurrDensity[i]*self.ThicknessElectrolyte*self.FC_OperatingTemp)/\
+                                 (9000*self.eNepero**(-100000/(self.Runiv*self.FC_OperatingTemp)))                   # [V] (100000 activation energy in [kJ/mol], 9000 electrolyte constant)
+           
+            '3 - Concentration losses'   # Significant losses only for cathode, activation losses (minimal contribution for SOFC) are also present in the following formula
             
-            self.IP=interp1d(self.Current,FC_power,kind='cubic',bounds_error=False,fill_value='extrapolate') 
-            self.P = np.zeros(Ndatapoints)
+            self.DeltaV_con[i] = ((self.Runiv*self.FC_OperatingTemp)/(2*self.FaradayConst))*\
+                                 ln((self.CellCurrDensity[i]/(self.FC_ExchangeCurrDensCathode*self.FC_AirPress*(0.21-0.0008*10000*self.CellCurrDensity[i]*self.Runiv*self.FC_OperatingTemp/(4*self.FaradayConst*101325*0.00002)))))        # [V] 
             
-            for i in range (len(self.Current)):
-                  self.P[i] = (self.iV1(self.CellCurrDensity[i])*self.Current[i])/1000   # [kW] power output 
+            '4 - Cell voltage'
             
-            self.PI=interp1d(self.P,self.Current,bounds_error=False,fill_value='extrapolate')   # Interpolating function returning Current if interrogated with Power 
-
-            'Single module electricity production'
-            # Creation of lists of values required for interpolation functions
-            hydrogen                = []
-            water                   = []
-            electricity_produced    = []
-            eta_FuelCell            = []
-            FC_Heat_produced        = []
-
-            for i in range(len(FC_power)):
-                
-                p_required = FC_power[i]                                    # [kW] power production               
-                FC_CellCurrDensity = self.PI(p_required)/self.FC_CellArea   # [A/cm^2] current density value at which the fuel cell is working 
-                Current = FC_CellCurrDensity*self.FC_CellArea               # [A] FuelCell Stack operating current
-                FC_Vstack= self.iV1(FC_CellCurrDensity)                     # [V] Stack operating voltage
-    
-                'Computing FC efficiency and hydrogen energy demand'    
-                
-                pO2 = (self.FC_AirPress*0.21*101325)/101325      # [atm]
-                pH2O = 1                                         # [atm]
-                pH2 = self.FC_FuelPress/101325                   # [atm]  
-                
-                Ecell = 1.19 + ((self.Runiv*self.FC_OperatingTemp)/(2*self.FaradayConst))*ln(pH2*(pO2**0.5)/pH2O)
-                DeltaV_OHM = (FC_CellCurrDensity*self.ThicknessElectrolyte*self.FC_OperatingTemp)/\
-                    (9000*self.eNepero**(-100000/(self.Runiv*self.FC_OperatingTemp)))
-                DeltaV_CON = ((self.Runiv*self.FC_OperatingTemp)/(2*self.FaradayConst))\
-                    *ln((FC_CellCurrDensity/(self.FC_ExchangeCurrDensCathode*self.FC_AirPress*(0.21-0.0008*10000*FC_CellCurrDensity*self.Runiv*self.FC_OperatingTemp/(4*self.FaradayConst*101325*0.00002)))))
-                TotalLoss = DeltaV_OHM + DeltaV_CON   # [V]
-                
-                deltaG = self.deltaG0 - self.Runiv*self.FC_OperatingTemp*ln(pH2*math.sqrt(pO2)/pH2O)/(2*self.FaradayConst)    # [kJ/mol] Gibbs free energy at actual conditions
-              
-                eta_voltage = FC_Vstack/(Ecell*self.nc)     # [-] Voltage efficiency 
-                eta_th = self.deltaG0/self.HHVh2Mol         # [-] Thermodynamic efficiency
-                etaFC = -eta_th*eta_voltage                 # [-] FC efficiency
-                
-                'Hydrogen demand'
-                FC_HydroCons = ((Current*self.nc)/(self.FaradayConst*1000))/(self.rhoStdh2)     # [kg/s]*[Sm3/kg] = [Sm3/s] 
-                hyd = FC_HydroCons*self.rhoStdh2                                                # [kg/s]
-                FC_deltaHydrogen = - hyd*self.HHVh2*1000                                        # [kW]
-                
-                'Air demand'     
-                FC_AirCons       = ((self.AirMolMass*1000*p_required/\
-                                     (self.FaradayConst*2*FC_Vstack/self.nc))*self.stoichiometriccoeff)         #[kg/s] air consumption
-                FC_O2Cons        = FC_AirCons*0.2319                                                            #[kg/s] oxygen consumption, taken from the air 
-                
-                'Air exit flow rate'
-                FC_AirExit = FC_AirCons-FC_O2Cons       #[kg/s] hourly outgoing air mass flow rate 
-                
-                'Heat Demand for air and hydrogen'                           
-                Q_air=((FC_AirCons*self.cpAir*(self.FC_OperatingTemp-self.AmbTemp)))    #[kW] Heat needed to rise the temperatura of inlet air during ramp-up   (Q=m*c_p*DT)
-                Q_h2=(hyd*self.cpH2*(self.FC_OperatingTemp-self.AmbTemp))                 #[kW] Heat needed to rise the temperature of inlet hydrogen during ramp-up (Q=m*c_p*DT) 
-         
-                'Water production'
-                water_produced = (hyd*self.h2oMolMass/self.H2MolMass)/self.rhoStdh2o            # [m^3/s] stoichiometric amount
-                # water_produced = ((p_required*1000/(V_cell*2*self.FaradayConst))*self.h2oMolMass)/self.rhoStdh2o # [Sm3/s] of produced water https://onlinelibrary.wiley.com/doi/pdf/10.1002/9781118878330.app2
-                #!!! '[...] if methane is internally reformed, then half the product water is used in the reformation process, thus halving the rate of production https://onlinelibrary.wiley.com/doi/pdf/10.1002/9781118878330.app2
+            self.CellVoltage[i] = self.Ecell[i]-self.DeltaV_ohm[i]-self.DeltaV_con[i]
             
-                'Steam produced'
-                FC_H20Produced = hyd+FC_O2Cons                     #[kg/s] steam produced
-                
-                'Heat Produced by the electrochemical reaction'
-                z = Current/(2*self.FaradayConst)   # [mol/s]
-                DeltaS = -((self.H20MolStdEntropy-(self.O2MolStdEntropy/2)-self.H2MolStdEntropy)+\
-                           (self.Runiv/2)*ln((pH2**2)*pO2/(pH2O**2)))                                   # [J/mol*K]
-                FC_Heat_elec = ((((z*self.FC_OperatingTemp*DeltaS + Current*TotalLoss))*self.nc)/1000)  # [kW] 
-                
-                'Heat contained in anodic and cathodic flow'
-                FC_HeatH20 = FC_H20Produced*self.SteamSH                                    #[kW] heat in the steam flow exiting the anode
-                FC_HeatAir = FC_AirExit*self.cpAir*(self.FC_OperatingTemp-self.AmbTemp)     #[kW] heat in the air flow exiting the cathode
-                FC_Heat    = FC_HeatH20+FC_HeatAir                                          #[kW] net heat available for cogeneration
+        self.Vmin_FC_stack = self.CellVoltage[-1]*self.nc                                 # [V]    Minimum value for working voltage
+        self.FC_CellArea = self.Npower*1000/(self.Vmin_FC_stack*self.FC_MaxCurrDens)      # [cm^2] FC cell active area
+        self.FC_Pmax = self.Npower                                                        # [kW] Max output power
+        
+        '5- Stack voltage'
+        
+        self.Voltage = self.nc*self.CellVoltage
 
-                hydrogen.append(hyd)                       # [kg/s]  produced hydrogen
-                water.append(water_produced)               # [m^3/s] produced water
-                electricity_produced.append(p_required)    # [kW] output power
-                eta_FuelCell.append(etaFC)                 # [-]   fc efficiency
-                FC_Heat_produced.append(FC_Heat)           # [kW] co-product heat
+        'Interpolation of  polarization curve: defining the fit-function for i-V curve'    
+      
+        self.num = Ndatapoints                                          # [-] number of intervals to be considered for the interpolation
+        self.x = np.linspace(self.CellCurrDensity[0],self.CellCurrDensity[-1],self.num)
                 
-            self.max_h2_module = max(hydrogen)                 # [kg/s] maximum amount of exploitable hydrogen for the considered module
-            self.max_h2_stack   = self.max_h2_module*self.n_modules     # [kg/s] maximum amount of exploitable hydrogen for the considered stack
-            
-            electric_eff_module = eta_FuelCell[-1] # Module electric efficiency
-            h2p_eff = (1/(electric_eff_module*c.HHVH2*1000))*3600 # [kg/kWh] kg/h of hydrogen produced per kWh of input power
-            thermal_eff_module = (FC_Heat_produced[-1] / - FC_deltaHydrogen) # Module thermal efficiency
-            total_efficiency = electric_eff_module + thermal_eff_module
-            print(f"\nThe fuel cell electric efficiency of each module is found to be equal to {electric_eff_module*100:.2f}%, which is equivalent to {round(h2p_eff, 3)} kg/kWh (using H2 HHV). "
-                  f"The fuel cell thermal efficiency of each module is found to be equal to {thermal_eff_module*100:.2f}% with heat output available for cogeneration at {self.FC_OperatingTemp}K. "
-                  f"Thus, the total efficiency is equal to {total_efficiency*100:.2f}%. "
-                  f"A fuel cell nominal power of {self.MaxPowerStack:.2f} kW needs to be fed with {self.max_h2_stack*3600:.2f} kg/h of hydrogen.")
+        # Defining different interpolation methods
+        self.iV1 = interp1d(self.CellCurrDensity,self.Voltage,bounds_error=False,fill_value='extrapolate')          # Linear spline 1-D interpolation
+        
+        # Creating the reverse curve IP - necessary to define the exact functioning point
+        self.Current = self.CellCurrDensity*self.FC_CellArea
+
+        'SOFC Max Power Production'
+        
+        FC_power = []
+        for i in range(len(self.Current)):
+             pot = self.Current[i]*self.Voltage[i]/1000     # [kW] Power
+             FC_power.append(pot)
+        self.MinPower = min(FC_power)
+        
+        self.IP=interp1d(self.Current,FC_power,kind='cubic',bounds_error=False,fill_value='extrapolate') 
+        self.P = np.zeros(Ndatapoints)
+        
+        for i in range (len(self.Current)):
+              self.P[i] = (self.iV1(self.CellCurrDensity[i])*self.Current[i])/1000   # [kW] power output 
+        
+        self.PI=interp1d(self.P,self.Current,bounds_error=False,fill_value='extrapolate')   # Interpolating function returning Current if interrogated with Power 
 
-            self.etaFuelCell = interp1d(hydrogen,eta_FuelCell,bounds_error=False,fill_value='extrapolate')          # Linear spline 1-D interpolation -> H2 consumption - FC efficiency
-            self.h2P         = interp1d(hydrogen,electricity_produced,bounds_error=False,fill_value='extrapolate')  # Linear spline 1-D interpolation -> H2 consumption - produced electricity
-            self.FC_Heat     = interp1d(hydrogen,FC_Heat_produced,bounds_error=False,fill_value='extrapolate')      # Linear spline 1-D interpolation -> H2 consumption - produced heat
-            self.water       = interp1d(hydrogen,water,bounds_error=False,fill_value='extrapolate')                 # Linear spline 1-D interpolation -> H2 consumption - produced water
-            
-            self.iEta   = interp1d(self.CellCurrDensity,eta_FuelCell,bounds_error=False,fill_value='extrapolate')       # Linear spline 1-D interpolation -> Operating current density - efficiency
-            self.ihyd   = interp1d(self.CellCurrDensity,hydrogen,bounds_error=False,fill_value='extrapolate')           # Linear spline 1-D interpolation -> Operating current density - H2 consumption
-            self.iHeat  = interp1d(self.CellCurrDensity,FC_Heat_produced,bounds_error=False,fill_value='extrapolate')   # Linear spline 1-D interpolation -> Operating current density - produced heat            
-            self.iwater = interp1d(self.CellCurrDensity,water,bounds_error=False,fill_value='extrapolate')              # Linear spline 1-D interpolation -> Operating current density - produced water            
+        'Single module electricity production'
+        # Creation of lists of values required for interpolation functions
+        hydrogen                = []
+        water                   = []
+        electricity_produced    = []
+        eta_FuelCell            = []
+        FC_Heat_produced        = []
 
-        ####### Operational period
-        self.state = parameters["state"]                           #on or off
-        self.operational_period = parameters["operational_period"]
-        initial_day, final_day = self.operational_period.split(',')    #extract inital and final operational days
-        initial_day = pd.to_datetime(initial_day, format = '%d-%m')
-        final_day = pd.to_datetime(final_day, format = '%d-%m')
-        year = initial_day.year
-        operational_state = [] 
-        
-        for day in pd.date_range(start = pd.Timestamp(year=year,month=1,day=1), end = pd.Timestamp(year=year+1,month=1, day=1)):
-            if self.state == "on":                 
-                value = 0                                         #initialization
-                if day >= initial_day and day <= final_day:
-                    value = 1                                      #update if turned on 
-                operational_state.append((day, value))
-            elif self.state == "off":
-                 value = 1                                         #initialization
-                 if day >= initial_day and day <= final_day:
-                     value = 0                                    #update if turned off
-                 operational_state.append((day, value))
-        operational_state = pd.DataFrame(operational_state, columns=['Day', 'State'])
-        operational_state.set_index('Day', inplace=True)
-        frequency =  f'{self.timestep}min'
-        operational_state_freq = operational_state.resample(frequency).ffill().iloc[:-1,:]  #resample dataframe to simulation timestep
-        self.operational_state = np.tile(np.array(operational_state_freq['State']), int(self.timestep_number*self.timestep/c.MINUTES_YEAR)) #repeat for simulation years
+        for i in range(len(FC_power)):
+            
+            p_required = FC_power[i]                                    # [kW] power production               
+            FC_CellCurrDensity = self.PI(p_required)/self.FC_CellArea   # [A/cm^2] current density value at which the fuel cell is working 
+            Current = FC_CellCurrDensity*self.FC_CellArea               # [A] FuelCell Stack operating current
+            FC_Vstack= self.iV1(FC_CellCurrDensity)                     # [V] Stack operating voltage
+
+            'Computing FC efficiency and hydrogen energy demand'    
+            
+            pO2 = (self.FC_AirPress*0.21*101325)/101325      # [atm]
+            pH2O = 1                                         # [atm]
+            pH2 = self.FC_FuelPress/101325                   # [atm]  
+            
+            Ecell = 1.19 + ((self.Runiv*self.FC_OperatingTemp)/(2*self.FaradayConst))*ln(pH2*(pO2**0.5)/pH2O)
+            DeltaV_OHM = (FC_CellCurrDensity*self.ThicknessElectrolyte*self.FC_OperatingTemp)/\
+                (9000*self.eNepero**(-100000/(self.Runiv*self.FC_OperatingTemp)))
+            DeltaV_CON = ((self.Runiv*self.FC_OperatingTemp)/(2*self.FaradayConst))\
+                *ln((FC_CellCurrDensity/(self.FC_ExchangeCurrDensCathode*self.FC_AirPress*(0.21-0.0008*10000*FC_CellCurrDensity*self.Runiv*self.FC_OperatingTemp/(4*self.FaradayConst*101325*0.00002)))))
+            TotalLoss = DeltaV_OHM + DeltaV_CON   # [V]
+            
+            deltaG = self.deltaG0 - self.Runiv*self.FC_OperatingTemp*ln(pH2*math.sqrt(pO2)/pH2O)/(2*self.FaradayConst)    # [kJ/mol] Gibbs free energy at actual conditions
+          
+            eta_voltage = FC_Vstack/(Ecell*self.nc)     # [-] Voltage efficiency 
+            eta_th = self.deltaG0/self.HHVh2Mol         # [-] Thermodynamic efficiency
+            etaFC = -eta_th*eta_voltage                 # [-] FC efficiency
+            
+            'Hydrogen demand'
+            FC_HydroCons = ((Current*self.nc)/(self.FaradayConst*1000))/(self.rhoStdh2)     # [kg/s]*[Sm3/kg] = [Sm3/s] 
+            hyd = FC_HydroCons*self.rhoStdh2                                                # [kg/s]
+            FC_deltaHydrogen = - hyd*self.HHVh2*1000                                        # [kW]
+            
+            'Air demand'     
+            FC_AirCons       = ((self.AirMolMass*1000*p_required/\
+                                 (self.FaradayConst*2*FC_Vstack/self.nc))*self.stoichiometriccoeff)         #[kg/s] air consumption
+            FC_O2Cons        = FC_AirCons*0.2319                                                            #[kg/s] oxygen consumption, taken from the air 
+            
+            'Air exit flow rate'
+            FC_AirExit = FC_AirCons-FC_O2Cons       #[kg/s] hourly outgoing air mass flow rate 
+            
+            'Heat Demand for air and hydrogen'                           
+            Q_air=((FC_AirCons*self.cpAir*(self.FC_OperatingTemp-self.AmbTemp)))    #[kW] Heat needed to rise the temperatura of inlet air during ramp-up   (Q=m*c_p*DT)
+            Q_h2=(hyd*self.cpH2*(self.FC_OperatingTemp-self.AmbTemp))                 #[kW] Heat needed to rise the temperature of inlet hydrogen during ramp-up (Q=m*c_p*DT) 
      
+            'Water production'
+            water_produced = (hyd*self.h2oMolMass/self.H2MolMass)/self.rhoStdh2o            # [m^3/s] stoichiometric amount
+            # water_produced = ((p_required*1000/(V_cell*2*self.FaradayConst))*self.h2oMolMass)/self.rhoStdh2o # [Sm3/s] of produced water https://onlinelibrary.wiley.com/doi/pdf/10.1002/9781118878330.app2
+            #!!! '[...] if methane is internally reformed, then half the product water is used in the reformation process, thus halving the rate of production https://onlinelibrary.wiley.com/doi/pdf/10.1002/9781118878330.app2
+        
+            'Steam produced'
+            FC_H20Produced = hyd+FC_O2Cons                     #[kg/s] steam produced
+            
+            'Heat Produced by the electrochemical reaction'
+            z = Current/(2*self.FaradayConst)   # [mol/s]
+            DeltaS = -((self.H20MolStdEntropy-(self.O2MolStdEntropy/2)-self.H2MolStdEntropy)+\
+                       (self.Runiv/2)*ln((pH2**2)*pO2/(pH2O**2)))                                   # [J/mol*K]
+            FC_Heat_elec = ((((z*self.FC_OperatingTemp*DeltaS + Current*TotalLoss))*self.nc)/1000)  # [kW] 
+            
+            'Heat contained in anodic and cathodic flow'
+            FC_HeatH20 = FC_H20Produced*self.SteamSH                                    #[kW] heat in the steam flow exiting the anode
+            FC_HeatAir = FC_AirExit*self.cpAir*(self.FC_OperatingTemp-self.AmbTemp)     #[kW] heat in the air flow exiting the cathode
+            FC_Heat    = FC_HeatH20+FC_HeatAir                                          #[kW] net heat available for cogeneration
 
-#%%                     
+            hydrogen.append(hyd)                       # [kg/s]  produced hydrogen
+            water.append(water_produced)               # [m^3/s] produced water
+            electricity_produced.append(p_required)    # [kW] output power
+            eta_FuelCell.append(etaFC)                 # [-]   fc efficiency
+            FC_Heat_produced.append(FC_Heat)           # [kW] co-product heat
+            
+        self.max_h2_module = max(hydrogen)                 # [kg/s] maximum amount of exploitable hydrogen for the considered module
+        
+        self.electric_eff_module = eta_FuelCell[-1] # Module electric efficiency
+        self.thermal_eff_module = (FC_Heat_produced[-1] / - FC_deltaHydrogen) # Module thermal efficiency
+
+        self.etaFuelCell = interp1d(hydrogen,eta_FuelCell,bounds_error=False,fill_value='extrapolate')          # Linear spline 1-D interpolation -> H2 consumption - FC efficiency
+        self.h2P         = interp1d(hydrogen,electricity_produced,bounds_error=False,fill_value='extrapolate')  # Linear spline 1-D interpolation -> H2 consumption - produced electricity
+        self.FC_Heat     = interp1d(hydrogen,FC_Heat_produced,bounds_error=False,fill_value='extrapolate')      # Linear spline 1-D interpolation -> H2 consumption - produced heat
+        self.water       = interp1d(hydrogen,water,bounds_error=False,fill_value='extrapolate')                 # Linear spline 1-D interpolation -> H2 consumption - produced water
+        
+        self.iEta   = interp1d(self.CellCurrDensity,eta_FuelCell,bounds_error=False,fill_value='extrapolate')       # Linear spline 1-D interpolation -> Operating current density - efficiency
+        self.ihyd   = interp1d(self.CellCurrDensity,hydrogen,bounds_error=False,fill_value='extrapolate')           # Linear spline 1-D interpolation -> Operating current density - H2 consumption
+        self.iHeat  = interp1d(self.CellCurrDensity,FC_Heat_produced,bounds_error=False,fill_value='extrapolate')   # Linear spline 1-D interpolation -> Operating current density - produced heat            
+        self.iwater = interp1d(self.CellCurrDensity,water,bounds_error=False,fill_value='extrapolate')              # Linear spline 1-D interpolation -> Operating current density - produced water            
+    
     def plot_polarizationpts(self):
          
           if self.model == 'PEM General': 
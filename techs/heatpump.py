@@ -1,5 +1,6 @@
 import numpy as np
 from core import constants as c
+from core import scratch
 from scipy.interpolate import interp1d
 
 class heatpump:
@@ -50,10 +51,10 @@ class heatpump:
             self.i_TES_t = self.t_rad_h # initial temperature C°
             
             ### stories #######################################################
-            self.i_TES_story = np.zeros(c.timestep_number) # T_inertial_TES
-            self.satisfaction_story = np.zeros(c.timestep_number) # 0 no demand, 1 demand satisfied by iTES, 2 demand satisfied, 3 demand satisfied and iTES_T raised, 4 damand satisfied and iTES_T reaches maximum, -1 unsatisfied demand, -2 unsatisfied demand and iTES under minimum -3 t_amb too cold
+            self.i_TES_story = scratch.zeros(c.timestep_number,dtype=c.reporting_dtype) # T_inertial_TES
+            self.satisfaction_story = scratch.zeros(c.timestep_number,dtype=c.reporting_dtype) # 0 no demand, 1 demand satisfied by iTES, 2 demand satisfied, 3 demand satisfied and iTES_T raised, 4 damand satisfied and iTES_T reaches maximum, -1 unsatisfied demand, -2 unsatisfied demand and iTES under minimum -3 t_amb too cold
             
-            self.cop_story = np.full(c.timestep_number,np.nan) # coefficient of performance
+            self.cop_story = scratch.full(c.timestep_number,np.nan,dtype=c.reporting_dtype) # coefficient of performance
             
             #### HP MODEL GU' #################################################
             # danfoss coolselector software available at https://www.danfoss.com/it-it/service-and-support/downloads/dcs/coolselector-2/
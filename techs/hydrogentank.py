@@ -3,6 +3,7 @@ import os
 import sys 
 sys.path.append(os.path.abspath(os.path.join(os.getcwd(),os.path.pardir)))   # temorarily adding constants module path 
 from core import constants as c
+from core import scratch
 from CoolProp.CoolProp import PropsSI
 import matplotlib.pyplot as plt
 
@@ -25,7 +26,7 @@ class H_tank:
         self.cost = False # will be updated with tec_cost()
         self.timestep       = c.timestep                            # [min] selected timestep for simulation
         self.pressure       = parameters['pressure']                # [bar] H tank storage pressure
-        self.LOC            = np.zeros(timestep_number+1)           # [kg] array keeping trak hydrogen tank level of charge 
+        self.LOC            = scratch.zeros(timestep_number+1)           # [kg] array keeping trak hydrogen tank level of charge 
         self.max_capacity   = parameters['max capacity']            # [kg] H tank max capacity 
         self.used_capacity  = 0                                     # [kg] H tank used capacity <= max_capacity 
         temperature         = 273.15 + 15                           # [K] temperature at which hydrogen is stored
@@ -170,7 +171,7 @@ class HPH_tank:
         self.timestep = c.timestep
         
         self.pressure = parameters['pressure']          # H tank storage pressure
-        self.LOC = np.zeros(timestep_number+1)         # array H tank level of Charge 
+        self.LOC = scratch.zeros(timestep_number+1)         # array H tank level of Charge 
         self.max_capacity = parameters['max capacity']  # H tank max capacity [kg]
         self.used_capacity = 0                          # H tank used capacity <= max_capacity [kg]
         temperature         = 273.15 + 15                           # [K] temperature at which hydrogen is stored
@@ -19,6 +19,7 @@ import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.getcwd(),os.path.pardir)))   # temporarily adding constants module path
 from core import constants as c
+from core import scratch
 
 class mhhc_compressor:
 
@@ -94,8 +95,8 @@ class mhhc_compressor:
         
         self.n_compressor = parameters['compressor number']   #[-] number of compressors working at the same time
         self.Q         = 3                                    #[kWh] Heat requested at design point--->equivalent to kW at the equivalent timestep
-        self.n_compressors_used = np.zeros(timestep_number)
-        self.ETA_Polytropic = np.zeros(timestep_number)
+        self.n_compressors_used = scratch.zeros(timestep_number)
+        self.ETA_Polytropic = scratch.zeros(timestep_number)
         
         'abs and des curves are divided into three parts to represent the absorption, transition and desorption phases'
 
@@ -6,6 +6,7 @@ import pickle
 import sys 
 sys.path.append(os.path.abspath(os.path.join(os.getcwd(),os.path.pardir)))   # temorarily adding constants module path 
 from core import constants as c
+from core.series import read_series
 
 class PV:    
     
@@ -61,7 +62,7 @@ class PV:
                                     
             name_serie = f"PV_{parameters['serie']}_{location_name}_{file_general}_{file_structure}.csv"
             if check and os.path.exists(path+'/production/'+name_serie): # if the prevoius pv serie can be used
-                pv = pd.read_csv(path+'/production/'+name_serie)['P'].to_numpy()
+                pv = read_series(path+'/production/'+name_serie,'P')
             
             else: # if a new pv serie must be downoladed from PV gis
                 print(f"Downolading a new PV serie from PVgis for {location_name}_{file_general}_{file_structure}") 
@@ -145,7 +146,7 @@ class PV:
         else:
             # read a specific production serie expressed as kW/kWpeak
             self.peakP = parameters['peakP']
-            pv = pd.read_csv(path+'/production/'+parameters['serie'])['P'].to_numpy()
+            pv = read_series(path+'/production/'+parameters['serie'],'P')
             pv = pv * (1-parameters['losses']/100)      # add losses if to be added
             pv = pv*self.peakP                          # kWh
             self.production = np.tile(pv,int(c.timestep_number*c.timestep/60/8760))
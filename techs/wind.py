@@ -8,6 +8,7 @@ import pvlib
 import pickle    
 sys.path.append(os.path.abspath(os.path.join(os.getcwd(),os.path.pardir)))   # temorarily adding constants module path 
 from core import constants as c
+from core.series import read_series
 import matplotlib.pyplot as plt
 
 class wind:    
@@ -132,7 +133,7 @@ class wind:
 
             name_serie = f"Wind_{self.parameters['serie']}_{location_name}_{file_general}_{file_structure}.csv"
             if check and os.path.exists(path + '/production/' + name_serie):  # If previous wind series can be used
-                wind_data = pd.read_csv(path + '/production/' + name_serie)['P'].to_numpy()
+                wind_data = read_series(path + '/production/' + name_serie,'P')
                 
                 if self.model == 'power curve':
                     wind_data = wind_data * self.Npower
@@ -307,7 +308,7 @@ class wind:
              
         else:
             # read a specific production serie expressed as kW/kWpeak
-            wind_data = pd.read_csv(path+'/production/'+self.parameters['serie'])['P'].to_numpy()
+            wind_data = read_series(path+'/production/'+self.parameters['serie'],'P')
             wind_data = wind_data * self.Npower                          # kWh
             self.production = np.tile(wind_data,int(c.timestep_number*c.timestep/60/8760))
             if len(self.production) != c.timestep_number:
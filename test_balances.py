@@ -0,0 +1,60 @@
+"""
+Tests of the balance containers (see core/balances.py)
+"""
+
+import pickle
+import numpy as np
+from core.balances import balance_tensor, flow_allocation
+
+
+def test_balance_tensor_views():
+    """Balances are zero-copy views of the rows of the tensor"""
+    balances = {'electricity': {'demand': np.arange(4.), 'grid': None}, 'hydrogen': {'tank': None}}
+    tensor = balance_tensor(balances,4)
+    assert tensor.channels == [('electricity','demand'),('electricity','grid'),('hydrogen','tank')]
+    assert np.array_equal(tensor.row('electricity','demand'),np.arange(4.))
+    balances['hydrogen']['tank'][2] = 5.
+    assert tensor.data[2,2] == 5.
+    assert tensor.totals()['hydrogen']['tank'] == 5.
+
+
+def test_balance_tensor_pickling():
+    """Unpickled tensors (e.g. locations of worker processes and checkpoints) keep their balances as views of the rows"""
+    balances = {'electricity': {'demand': np.arange(4.), 'grid': None}}
+    tensor = pickle.loads(pickle.dumps(balance_tensor(balances,4)))
+    assert all(np.shares_memory(tensor.balances[carrier][tech],tensor.data) for carrier,tech in tensor.channels)
+    tensor.balances['electricity']['grid'][1] = -2.
+    assert tensor.data[1,1] == -2.
+    assert np.array_equal(tensor.balances['electricity']['demand'],np.arange(4.))
+
+
+def test_flow_allocation_lazy():
+    """Flows are allocated only when assigned, clean keeps the non-zero flows and their total"""
+    flows = flow_allocation(['electricity','hydrogen'],['PV','battery','grid'],3)
+    assert flows['electricity']['PV'].get('battery') is None
+    flows['electricity']['PV']['battery'][0] = 1.
+    flows['electricity']['PV']['grid'][1] = 2.
+    flows['electricity']['battery']['grid'][1] = 0.
+    cleaned = flows.clean()
+    assert list(cleaned) == ['electricity']
+    assert list(cleaned['electricity']) == ['PV']
+    assert np.array_equal(cleaned['electricity']['PV']['Tot'],[1.,2.,0.])
+
+
+def test_location_allocates_used_flows(make_rec,monkeypatch):
+    """A simulated location allocates only the flows its technologies exchange, instead of one array for each pair of technologies"""
+    allocated = {}  # id(cleaned flows): flows allocated during the simulation
+    clean = flow_allocation.clean
+    def recording_clean(flows):
+        cleaned = clean(flows)
+        allocated[id(cleaned)] = {(carrier,tech_name,tech) for carrier in flows for tech_name in flows[carrier] for tech in flows[carrier][tech_name]}
+        return(cleaned)
+    monkeypatch.setattr(flow_allocation,'clean',recording_clean)
+    rec = make_rec('input_test_1')
+    rec.REC_power_simulation()
+
+    for location in rec.locations.values():
+        for flows in [location.consumption,location.production]:
+            used = {(carrier,tech_name,tech) for carrier in flows for tech_name in flows[carrier] for tech in flows[carrier][tech_name] if tech != 'Tot'}
+            assert allocated[id(flows)] == used
+    assert len(allocated[id(rec.locations['consumer 1'].consumption)]) == 1     # the demand fed by the grid
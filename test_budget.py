@@ -0,0 +1,67 @@
+"""
+Tests of the memory estimate of a simulation before creating the REC (see core/budget.py)
+"""
+
+import io
+import json
+import pickle
+import numpy as np
+import pytest
+from conftest import root
+from core import budget
+
+
+class array_collector(pickle.Pickler):
+    """Pickler collecting the arrays (their bases) reachable from the objects dumped, without writing them"""
+    def __init__(self):
+        super().__init__(io.BytesIO())
+        self.bases = {}
+
+    def persistent_id(self,obj):
+        if isinstance(obj,np.ndarray) and obj.ndim > 0 and not obj.dtype.hasobject:
+            base = obj
+            while isinstance(base.base,np.ndarray):
+                base = base.base
+            self.bases[id(base)] = base
+            return(id(obj))
+        return(None)
+
+
+def allocated(*objects):
+    """Bytes of the time series arrays reachable from objects, views counted once"""
+    collector = array_collector()
+    for obj in objects:
+        collector.dump(obj)
+    return(sum(base.nbytes for base in collector.bases.values()))
+
+
+@pytest.mark.parametrize('case,file_structure',[('input_test_1','studycase'),('input_test_3','refcase')])
+def test_estimate_bounds_allocation(make_rec,case,file_structure):
+    """The estimate is an upper bound of the arrays allocated by a simulated REC, tight within 30%, and exact for the technologies"""
+    with open(f"{root}/{case}/{file_structure}.json") as f: structure = json.load(f)
+    with open(f"{root}/{case}/general.json") as f: general = json.load(f)
+    projection = budget.estimate(structure,general)
+    rec = make_rec(case,file_structure=file_structure)
+    rec.REC_power_simulation()
+
+    actual = allocated(rec.locations,rec.weather,rec.balance_tensor)
+    assert actual <= projection['bytes'] <= 1.3*actual     # flows and weather columns are upper bounds: only the ones used are allocated
+    for location_name,location in rec.locations.items():
+        for tech_name,tech in location.technologies.items():
+            expected = sum(item['bytes'] for item in projection['items'] if item['location'] == location_name and item['tech'] == tech_name)
+            assert allocated(tech) == expected
+
+
+def test_budget_refuses_rec(make_rec):
+    """A REC exceeding 'memory budget' is refused before allocating anything, one within it is created"""
+    with pytest.raises(MemoryError,match='memory budget'):
+        make_rec('input_test_1',memory_budget=1)
+    assert make_rec('input_test_1',memory_budget=100).locations
+
+
+def test_available_memory(tmp_path):
+    """Available memory is MemAvailable (free plus reclaimable memory), None where meminfo doesn't exist"""
+    meminfo = tmp_path/'meminfo'
+    meminfo.write_text("MemTotal:       16384000 kB\nMemFree:          512000 kB\nMemAvailable:    8192000 kB\n")
+    assert budget.available_memory(str(meminfo)) == 8000
+    assert budget.available_memory(str(tmp_path/'missing')) is None
@@ -0,0 +1,34 @@
+"""
+Tests of checkpoint and resume of long simulations (see core/checkpoint.py)
+"""
+
+import numpy as np
+import pytest
+from core import checkpoint
+
+
+def test_resume_same_as_uninterrupted(make_rec,monkeypatch):
+    """A simulation resumed from the latest checkpoint gives the same results as the uninterrupted one"""
+    whole = make_rec('input_test_1',simulation_years=3)
+    whole.REC_power_simulation(chunk='year')
+
+    save = checkpoint.checkpoint_store.save
+    def crash(self,state,step):
+        save(self,state,step)
+        if step > 8760:
+            raise RuntimeError('crash')     # simulation interrupted after the second checkpoint
+    monkeypatch.setattr(checkpoint.checkpoint_store,'save',crash)
+    interrupted = make_rec('input_test_1',simulation_years=3)
+    with pytest.raises(RuntimeError):
+        interrupted.REC_power_simulation(checkpoint='ckpt')
+    monkeypatch.setattr(checkpoint.checkpoint_store,'save',save)
+
+    step,state,store = checkpoint.load_checkpoint('ckpt')
+    assert step == 2*8760 and store is None
+
+    resumed = make_rec('input_test_1',simulation_years=3)
+    resumed.REC_power_simulation(checkpoint='ckpt',resume_from='ckpt')
+    for location_name in whole.locations:
+        assert np.array_equal(whole.locations[location_name].balance_tensor.data,resumed.locations[location_name].balance_tensor.data)
+    assert np.array_equal(whole.balance_tensor.data,resumed.balance_tensor.data)
+    assert np.array_equal(whole.locations['prosumer'].technologies['battery'].LOC,resumed.locations['prosumer'].technologies['battery'].LOC)
@@ -0,0 +1,75 @@
+"""
+Tests of the lookup tables of the performance curves (see core/curves.py)
+"""
+
+import numpy as np
+import pytest
+from scipy.interpolate import interp1d
+from core import curves
+
+
+def points(seed):
+    """Uneven curve with steep segments at low values and a repeated point, as the electrolyzer curves"""
+    rng = np.random.default_rng(seed)
+    x = np.concatenate([np.geomspace(1e-3,1,20),np.sort(rng.uniform(1,100,60)),[50.]])
+    y = np.sqrt(x)*100 + rng.normal(0,1,len(x))
+    return(x,y)
+
+
+@pytest.mark.parametrize('extrapolate',[True,False])
+def test_lookup_table_same_as_interp1d(extrapolate):
+    """Tables give the values of interp1d for scalars and arrays, inside and outside the range of the points"""
+    x,y = points(0)
+    table = curves.lookup_table(x,y,extrapolate)
+    reference = interp1d(x,y,bounds_error=False,fill_value='extrapolate' if extrapolate else np.nan)
+    values = np.concatenate([x,np.random.default_rng(1).uniform(-10,120,2000),[0.,100.,120.]])
+    assert np.allclose(table(values),reference(values),rtol=1e-12,atol=1e-12,equal_nan=True)
+    assert np.allclose([table(float(value)) for value in values],reference(values),rtol=1e-12,atol=1e-12,equal_nan=True)
+    assert np.isnan(table(np.nan))
+
+
+def test_interpolator():
+    """interpolator gives a table when it reproduces interp1d"""
+    x,y = points(2)
+    function = curves.interpolator(x,y)
+    assert isinstance(function,curves.lookup_table)
+    assert np.allclose(function(x[::-1]),interp1d(x,y,fill_value='extrapolate')(x[::-1]),rtol=1e-12,atol=1e-12)
+
+
+class technology:
+
+    def curves(self):
+        """Curves of a technology with the kinds of attributes set by the technologies: arrays, scalars, lists, dictionaries and functions"""
+        self.x,self.y = points(3)
+        self.peak = np.float64(self.y.max())
+        self.n = len(self.x)
+        self.points = list(self.y[:5])
+        self.coefficients = {'a': 1.5, 'b': [np.int64(2),None]}
+        self.table = curves.interpolator(self.x,self.y)
+        self.spline = interp1d(np.arange(5.),np.arange(5.)**2,kind='cubic',bounds_error=False,fill_value='extrapolate')
+        self.bounded = interp1d(self.x,self.y)
+
+
+def test_curve_cache(tmp_path,monkeypatch):
+    """Cached curves are loaded from arrays with the same attributes and functions, unreadable files are computed again"""
+    monkeypatch.setitem(curves.c.fallback,'curve_cache',str(tmp_path))
+    built,cached = technology(),technology()
+    built.curves()
+    curves.cached(cached,technology.curves,{})
+    file, = tmp_path.glob('*.npz')
+    loaded = technology()
+    curves.cached(loaded,technology.curves,{})
+    assert [type(value) for value in vars(loaded).values()] == [type(value) for value in vars(built).values()]
+    assert np.array_equal(loaded.x,built.x) and loaded.peak == built.peak and loaded.points == built.points
+    assert loaded.coefficients == built.coefficients and type(loaded.coefficients['b'][0]) is np.int64
+    values = np.linspace(-10,120,1000)
+    for name in ['table','spline']:
+        assert np.array_equal(getattr(loaded,name)(values),getattr(built,name)(values),equal_nan=True)
+    with pytest.raises(ValueError):
+        loaded.bounded(-10.)
+
+    file.write_bytes(file.read_bytes()[:100])      # truncated
+    rebuilt = technology()
+    curves.cached(rebuilt,technology.curves,{})
+    assert np.array_equal(rebuilt.table(values),built.table(values),equal_nan=True)
+    assert np.load(file,allow_pickle=False)['attributes'].size == 1
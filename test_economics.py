@@ -0,0 +1,78 @@
+"""
+Tests of the economic assessments (see core/economics.py)
+"""
+
+import os
+import json
+import pickle
+import numpy as np
+from conftest import root
+from core import economics
+from core import constants as c
+
+
+def test_npv_context_of_results(make_rec):
+    """NPV assesses the results with the context saved with them, not with the one of the last REC created"""
+    with open(f"{root}/input_test_1/tech_cost.json") as f: tech_cost = json.load(f)
+    with open(f"{root}/input_test_1/energy_market.json") as f: energy_market = json.load(f)
+    for file_structure,name in (('studycase','Post'),('refcase','Pre')):
+        sim = make_rec('input_test_1',file_structure=file_structure)
+        sim.REC_power_simulation()
+        sim.tech_cost(tech_cost)
+        sim.save(name,'pkl')
+    os.symlink('results','Results')     # NPV reads some files from 'Results/pkl'
+
+    def assessment():
+        economics.NPV('studycase','refcase','Post','Pre',energy_market,f"{root}/input_test_1",'Post vs Pre','pkl')
+        with open('results/pkl/economic_assessment_Post vs Pre.pkl','rb') as f: return(pickle.load(f))
+
+    expected = assessment()
+    make_rec('input_test_2',timestep=15)   # the module fallback is now the 15 minutes timestep of the last REC
+    assert c.timestep == 15
+    assert pickle.dumps(assessment()) == pickle.dumps(expected)
+    assert economics.results_context('Post').timestep == 60
+
+
+def test_explicit_context(make_rec):
+    """The context of the results can be given explicitly (e.g. REC.context)"""
+    sim = make_rec('input_test_2',timestep=15)
+    probe = economics.in_results_context(lambda name_studycase: (c.timestep,c.timestep_number))
+    assert probe('missing',context=sim.context) == (15,4*8760)
+
+
+def leaves(value):
+    """Numbers of a nested result as a flat float array"""
+    if isinstance(value,dict):
+        return(np.concatenate([leaves(item) for item in value.values()] or [np.zeros(0)]))
+    return(np.atleast_1d(np.asarray(value,dtype=float)).ravel())
+
+
+def assessment(make_rec,name,f='pkl',**general):
+    """NPV of the studycase vs refcase of input_test_1 simulated with general and saved in format f, as a flat float array"""
+    with open(f"{root}/input_test_1/tech_cost.json") as file: tech_cost = json.load(file)
+    with open(f"{root}/input_test_1/energy_market.json") as file: energy_market = json.load(file)
+    if not os.path.exists('Results'):
+        os.symlink('results','Results')     # NPV reads some files from 'Results/pkl'
+    for file_structure in ('studycase','refcase'):
+        sim = make_rec('input_test_1',file_structure=file_structure,**general)
+        sim.REC_power_simulation()
+        sim.tech_cost(tech_cost)
+        sim.save(f"{name} {file_structure}",f)
+    economics.NPV('studycase','refcase',f"{name} studycase",f"{name} refcase",energy_market,f"{root}/input_test_1",name,'pkl')
+    with open(f"results/pkl/economic_assessment_{name}.pkl",'rb') as file: return(leaves(pickle.load(file)))
+
+
+def test_npv_float32(make_rec):
+    """Results simulated with 'precision': 'float32' are assessed in float64 (see economics.upcast) and differ by rounding only"""
+    expected = assessment(make_rec,'float64')
+    assert np.allclose(assessment(make_rec,'float32',precision='float32'),expected,rtol=1e-6,atol=1e-4,equal_nan=True)
+
+
+def test_npv_memmap(make_rec):
+    """Results saved as references to the scratch store reload as np.memmap and give the same NPV of .pkl results"""
+    expected = assessment(make_rec,'pkl')
+    memmap = assessment(make_rec,'memmap','memmap',scratch='scratch')
+    with open('results/pkl/balances_memmap studycase.pkl','rb') as f: balances = pickle.load(f)
+    assert isinstance(balances['prosumer']['electricity']['PV'],np.memmap)
+    assert isinstance(balances['REC']['electricity']['collective self consumption'],np.memmap)
+    assert np.array_equal(memmap,expected,equal_nan=True)
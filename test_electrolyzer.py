@@ -0,0 +1,129 @@
+"""
+Tests of the electrolyzer model: module dispatch and ageing (see techs/electrolyzer.py)
+"""
+
+import io
+import json
+import contextlib
+import numpy as np
+import pytest
+from conftest import root
+from core import constants as c
+from techs.electrolyzer import electrolyzer
+
+
+@pytest.fixture
+def context():
+    """Simulation context of one year at hourly timestep (input_test_1/general.json)"""
+    with open(f"{root}/input_test_1/general.json") as f: general = json.load(f)
+    general.update({'timestep': 60, 'simulation years': 1})
+    with c.activate(c.simulation_context(general)) as active:
+        yield(active)
+
+
+def stack(model,distribution,n_modules=5,minimum_load=0.2,**parameters):
+    """Electrolyzer stack of n_modules modules of 1 MW (Alkaline 500 kW)"""
+    parameters = {'Npower': 1000 if model == 'PEM General' else 500, 'number of modules': n_modules, 'stack model': model,
+                  'strategy': 'hydrogen-first', 'only_renewables': False, 'minimum_load': minimum_load, 'min power module': 0.1,
+                  'power distribution': distribution, 'operational_period': '01-01,31-12', 'state': 'on', 'ageing': False} | parameters
+    with contextlib.redirect_stdout(io.StringIO()):
+        return(electrolyzer(parameters,c.timestep_number,c.timestep))
+
+
+def loop_module(el,hyd_module,hyd_max,n_modules):
+    """Module at partial load found comparing the production of every number of modules, as use did before partial_load_module"""
+    hyd_11 = np.zeros(n_modules+1)
+    for i in range(n_modules+1):
+        hyd_11[i] = hyd_module*i
+        if hyd_11[i] > hyd_max and hyd_11[i-1] < hyd_max:
+            return(i)
+    return(None)
+
+
+def test_partial_load_module():
+    """The closed-form module count is the one of the loop, also for exact multiples of the module production"""
+    for hyd_module in [0.,1e-3,0.0173,1/3]:
+        for n_modules in [1,2,7,100]:
+            targets = np.concatenate([hyd_module*np.arange(n_modules+2),hyd_module*np.arange(n_modules+2)*(1+1e-15),
+                                      np.nextafter(hyd_module*np.arange(n_modules+2),-1),np.linspace(-1e-3,hyd_module*(n_modules+1),97)])
+            for hyd_max in targets:
+                assert electrolyzer.partial_load_module(None,hyd_module,hyd_max,n_modules) == loop_module(None,hyd_module,hyd_max,n_modules)
+
+
+@pytest.mark.parametrize('model',['PEM General','Alkaline'])
+@pytest.mark.parametrize('distribution',['series','parallel'])
+@pytest.mark.parametrize('minimum_load',[0,0.2])
+def test_dispatch_same_as_loop(context,monkeypatch,model,distribution,minimum_load):
+    """Power, hydrogen and modules used by the stack are the same of the loop dispatch, at the minimum load, minimum input and full load edges"""
+    def dispatch():
+        el = stack(model,distribution,minimum_load=minimum_load)
+        module = el.Npower if model == 'PEM General' else el.MaxPowerModule
+        powers = [0.,el.MinInputPower,np.nextafter(el.MinInputPower,0),el.min_partial_load,np.nextafter(el.min_partial_load,np.inf)]
+        powers += [module*k for k in range(1,7)] + [module*k+1e-9 for k in range(1,6)] + [module*2.5,module*4.37]
+        hydrogen = [el.maxh2prod*k for k in [0.05,0.5,1,1.5,2,3,4.99,5]] + [el.maxh2prod_stack,el.maxh2prod_stack*2]
+        storable = [1e12] + [el.maxh2prod*k*c.P2E for k in [1,2,2.5,3,4.6]]
+        results,step = [],0
+        for p in powers:
+            for storable_hydrogen in storable:
+                results.append(el.use(step,storable_hydrogen=storable_hydrogen,p=p))
+                step += 1
+        for hydrog in hydrogen:
+            try:
+                results.append(el.use(step,hydrog=hydrog))
+            except UnboundLocalError:   # series: requests that are exact multiples of the module production fail as in the loop dispatch
+                results.append([np.nan]*4)
+            step += 1
+        return(np.array(results,dtype=float),el.n_modules_used[:step].copy(),el.EFF_last_module[:step].copy())
+
+    closed_form = dispatch()
+    monkeypatch.setattr(electrolyzer,'partial_load_module',loop_module)
+    loop = dispatch()
+    for computed,expected in zip(closed_form,loop):
+        assert np.array_equal(computed,expected,equal_nan=True)
+
+
+def aged_stack(distribution):
+    """Alkaline stack of 3 modules with ageing, operated for 300 steps at varying power (off at some steps) and storable hydrogen"""
+    el = stack('Alkaline',distribution,n_modules=3,ageing=True)
+    rng = np.random.default_rng(0)
+    powers = rng.uniform(0,el.Npower,300)
+    powers[::7] = 0.
+    storable = np.where(rng.uniform(size=300) < 0.3,rng.uniform(0,el.maxh2prod_stack*c.P2E,300),1e12)   # hydrogen storage full at some steps
+    with contextlib.redirect_stdout(io.StringIO()):
+        for step,(p,storable_hydrogen) in enumerate(zip(powers,storable)):
+            el.use(step,storable_hydrogen=storable_hydrogen,p=p,Text=15.)
+    return(el,len(powers))
+
+
+@pytest.mark.parametrize('distribution',['series','parallel'])
+def test_operation_time_counter(context,distribution):
+    """Operating time counter and time degradation of each module are the ones recomputed from its activation history"""
+    el,steps = aged_stack(distribution)
+    V_time = (3*1e-6)/60*el.timestep*el.nc     # [V] time degradation of one step of operation (see ageing)
+    assert any(module['Operation_time[steps]'] for module in el.stack.values())
+    for module in el.stack.values():
+        assert module['Operation_time[steps]'] == np.sum(module['Activation[-]'][:steps])
+        assert module['Time_degradation[V]'] == V_time*np.sum(module['Activation[-]'][:steps])
+
+
+@pytest.mark.parametrize('distribution',['series','parallel'])
+def test_aged_voltage(context,distribution):
+    """Operating voltage is the one of the aged polarization curve (design curve shifted by time and thermal degradation) at the operating current"""
+    el,steps = aged_stack(distribution)
+    V_time = (3*1e-6)/60*el.timestep*el.nc     # [V] time degradation of one step of operation (see ageing)
+    checked = 0
+    for module in el.stack.values():
+        if not len(module['V_op[V]']):
+            continue
+        degraded = module if distribution == 'series' else el.stack[0]     # parallel modules copy the voltage of the first one
+        activation = degraded['Activation[-]'][:steps]
+        operation_time = np.concatenate([[0],np.cumsum(activation[:-1])])  # steps of operation before each step
+        for step in range(1,steps):
+            if module['V_op[V]'][step] == 0:
+                continue
+            V_thermal = 5*1e-3*((el.design_T-273.15)-module['T[°C]'][step])*el.nc
+            # the current step is included if the module was already activated by a previous dispatch of the same step (storable hydrogen exceeded)
+            voltages = [np.interp(module['I_op[A]'][step],el.Current,el.Voltage + V_time*time + V_thermal) for time in {operation_time[step],operation_time[step]+activation[step]}]
+            assert any(module['V_op[V]'][step] == pytest.approx(voltage,rel=1e-12) for voltage in voltages)
+            checked += 1
+    assert checked >= steps-1
@@ -0,0 +1,46 @@
+"""
+Tests of the module histories of the stacks with ageing (see core/history.py)
+"""
+
+import numpy as np
+import pytest
+from core.history import module_history
+
+
+def written(history,values,first=0):
+    """Write values of 'x[-]' from step first on, activating the module at every step"""
+    for step,value in enumerate(values,first):
+        history.set('x[-]',step,value)
+        history.activate(step,1)
+
+
+@pytest.mark.parametrize('resolution',['full','subsample','summary','none'])
+def test_keys_before_activation(resolution):
+    """Activation[-] and the recorded series are present (zero-length) before the first activation and with 'none'"""
+    history = module_history(10,{'x[-]': 'float64'},resolution,4,{'count': 0})
+    assert set(history) == {'count','Activation[-]','x[-]'}
+    assert len(history['Activation[-]']) == len(history['x[-]']) == 0
+    written(history,np.arange(10.))
+    assert len(history['Activation[-]']) == 10
+    assert len(history['x[-]']) == {'full': 10, 'subsample': 3, 'summary': 3, 'none': 0}[resolution]
+
+
+def test_summary_mean():
+    """'summary' records the mean of every interval, also when a step is written more than once"""
+    values = np.random.default_rng(0).uniform(size=10)
+    history = module_history(10,{'x[-]': 'float64'},'summary',4)
+    for step,value in enumerate(values):
+        history.set('x[-]',step,value+1.)     # overwritten at the same step
+        history.set('x[-]',step,value)
+        history.activate(step,1)
+    assert np.allclose(history['x[-]'],[values[0:4].mean(),values[4:8].mean(),values[8:].mean()])
+
+
+def test_subsample_and_late_activation():
+    """'subsample' records the first step of every interval, steps before the first activation are zero"""
+    history = module_history(10,{'x[-]': 'float64'},'subsample',4)
+    history.set('x[-]',0,5.)
+    written(history,np.arange(4.,10.),4)
+    assert np.array_equal(history['x[-]'],[0.,4.,8.])
+    assert np.array_equal(history['Activation[-]'],[False]*4+[True]*6)
+    assert history.value('x[-]',9) == 9. and history.value('x[-]',8) == 8.
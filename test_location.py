@@ -0,0 +1,51 @@
+"""
+Tests of the location dispatch plan (see core/location.py)
+"""
+
+import copy
+import json
+import pickle
+import numpy as np
+from conftest import root
+
+
+def handler_name(handler):
+    """Technology simulated by a step handler of the dispatch plan"""
+    if hasattr(handler,'func'):     # partial of PV, wind, inverter, demand and grid handlers
+        return(handler.keywords.get('tech_name',handler.func.__name__[:-len('_step')]))
+    return(handler.__name__[:-len('_step')].replace('_',' '))
+
+
+def test_dispatch_plan_priority(make_rec):
+    """Handlers follow the priority of studycase.json, not the order of its keys, and write the rows of the balance tensor"""
+    with open(f"{root}/input_test_1/studycase.json") as f: structure = json.load(f)
+    structure = copy.deepcopy(structure)
+    prosumer = structure['prosumer']
+    structure['prosumer'] = {tech_name: prosumer[tech_name] for tech_name in reversed(list(prosumer))}
+    rec = make_rec('input_test_1',structure=structure)
+
+    location = rec.locations['prosumer']
+    assert [handler_name(handler) for handler in location.dispatch_plan] == sorted(prosumer,key=lambda tech_name: prosumer[tech_name]['priority'])
+    for handler in location.dispatch_plan:
+        if hasattr(handler,'func'):
+            assert np.shares_memory(handler.keywords['balance'],location.balance_tensor.data)
+
+
+def test_dispatch_plan_after_unpickling(make_rec):
+    """Unpickled locations (worker processes, checkpoints) rebuild their plan on their own balances and simulate as the original ones"""
+    rec = make_rec('input_test_1')
+    unpickled = pickle.loads(pickle.dumps(rec))
+    for location_name,location in unpickled.locations.items():
+        assert [handler_name(handler) for handler in location.dispatch_plan] == [handler_name(handler) for handler in rec.locations[location_name].dispatch_plan]
+        for handler in location.dispatch_plan:
+            method = handler.func if hasattr(handler,'func') else handler
+            assert method.__self__ is location
+            if hasattr(handler,'func'):
+                assert np.shares_memory(handler.keywords['balance'],location.balance_tensor.data)
+                assert not np.shares_memory(handler.keywords['balance'],rec.locations[location_name].balance_tensor.data)
+
+    rec.REC_power_simulation()
+    unpickled.REC_power_simulation()
+    assert np.array_equal(unpickled.balance_tensor.data,rec.balance_tensor.data)
+    for location_name in rec.locations:
+        assert np.array_equal(unpickled.locations[location_name].balance_tensor.data,rec.locations[location_name].balance_tensor.data)
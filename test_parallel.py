@@ -0,0 +1,64 @@
+"""
+Tests of the parallel simulation of the locations (see REC.REC_power_simulation_parallel)
+"""
+
+import multiprocessing
+import numpy as np
+import pytest
+from core import scratch
+
+
+def simulated_balances(rec):
+    return({location_name: rec.locations[location_name].balance_tensor.data.copy() for location_name in rec.locations} | {'REC': rec.balance_tensor.data.copy()})
+
+
+@pytest.mark.parametrize('general',[{},{'scratch': 'scratch'}])
+def test_parallel_same_as_serial(make_rec,general):
+    """Locations simulated by worker processes give the same balances, flows and technology series as the serial simulation"""
+    serial = make_rec('input_test_1',**general)
+    serial.REC_power_simulation()
+    parallel = make_rec('input_test_1',**general)
+    parallel.REC_power_simulation(processes=2)
+
+    expected,balances = simulated_balances(serial),simulated_balances(parallel)
+    assert all(np.array_equal(expected[name],balances[name]) for name in expected)
+    assert np.array_equal(serial.locations['prosumer'].technologies['battery'].LOC,parallel.locations['prosumer'].technologies['battery'].LOC)
+    flows = parallel.locations['prosumer'].production['electricity']['PV']
+    assert all(np.array_equal(serial.locations['prosumer'].production['electricity']['PV'][tech],flows[tech]) for tech in flows)
+
+
+def test_parallel_shares_series(make_rec):
+    """Time series of the locations are shared with the worker processes through the block files of the scratch store"""
+    rec = make_rec('input_test_1',scratch='scratch')
+    rec.REC_power_simulation(processes=2)
+    assert scratch.reference(rec.locations['prosumer'].balance_tensor.data) is not None
+    assert scratch.reference(rec.locations['prosumer'].technologies['battery'].LOC) is not None
+
+
+def test_parallel_spawn(make_rec,monkeypatch):
+    """Worker processes also work when started with spawn (default start method on Windows and macOS)"""
+    serial = make_rec('input_test_1')
+    serial.REC_power_simulation()
+    monkeypatch.setattr(multiprocessing,'Process',multiprocessing.get_context('spawn').Process)
+    monkeypatch.setattr(multiprocessing,'Pipe',multiprocessing.get_context('spawn').Pipe)
+    parallel = make_rec('input_test_1')
+    parallel.REC_power_simulation(processes=2)
+    expected,balances = simulated_balances(serial),simulated_balances(parallel)
+    assert all(np.array_equal(expected[name],balances[name]) for name in expected)
+
+
+def test_parallel_temporary_store_removed(make_rec,monkeypatch,tmp_path):
+    """Without 'scratch' the series of the locations are copied back to the heap and the temporary store is deleted, so no block file stays mapped"""
+    monkeypatch.setattr(scratch.tempfile,'tempdir',str(tmp_path/'temporary'))
+    serial = make_rec('input_test_1')
+    serial.REC_power_simulation()
+    parallel = make_rec('input_test_1')
+    parallel.REC_power_simulation(processes=2)
+
+    assert not any((tmp_path/'temporary').iterdir())
+    assert not any(file.startswith(str(tmp_path)) for file in scratch.blocks)
+    prosumer = parallel.locations['prosumer']
+    assert not isinstance(prosumer.balance_tensor.data,np.memmap) and not isinstance(prosumer.technologies['battery'].LOC,np.memmap)
+    assert np.shares_memory(prosumer.balance_tensor.data,prosumer.power_balance['electricity']['collective self consumption'])
+    expected,balances = simulated_balances(serial),simulated_balances(parallel)
+    assert all(np.array_equal(expected[name],balances[name]) for name in expected)
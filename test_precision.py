@@ -0,0 +1,58 @@
+"""
+Tests of the precision of the reporting series ('precision' in general.json, see constants.py)
+"""
+
+import io
+import copy
+import json
+import contextlib
+import numpy as np
+import pytest
+from conftest import root
+from core import constants as c
+from techs.electrolyzer import electrolyzer
+
+
+def test_float32_keeps_state_in_float64(make_rec):
+    """With 'precision': 'float32' balances and flows are float32, storage levels and ageing accumulators stay float64"""
+    with open(f"{root}/input_test_1/studycase.json") as f: structure = json.load(f)
+    structure = copy.deepcopy(structure)
+    structure['prosumer']['battery']['ageing'] = True
+    expected = make_rec('input_test_1',structure=structure)
+    expected.REC_power_simulation()
+    rec = make_rec('input_test_1',structure=structure,precision='float32')
+    rec.REC_power_simulation()
+
+    prosumer,battery = rec.locations['prosumer'],rec.locations['prosumer'].technologies['battery']
+    assert rec.balance_tensor.data.dtype == prosumer.balance_tensor.data.dtype == np.float32
+    assert all(flow.dtype == np.float32 for flow in prosumer.production['electricity']['PV'].values())
+    assert battery.LOC.dtype == np.float64
+    assert all(getattr(battery,name).dtype == np.float64 for name in ['SOH','SOH_cal','SOH_cyc','D_cal','D_cyc','D_tot'])
+    assert np.array_equal(battery.LOC,expected.locations['prosumer'].technologies['battery'].LOC)   # same dispatch, only results are rounded
+    assert np.array_equal(battery.SOH,expected.locations['prosumer'].technologies['battery'].SOH)
+    assert np.allclose(prosumer.balance_tensor.data,expected.locations['prosumer'].balance_tensor.data,rtol=1e-6,atol=1e-6)
+
+
+def test_float32_electrolyzer_stack():
+    """Stack series read back by the ageing model stay float64, conversion factors are reported in float32"""
+    with open(f"{root}/input_test_1/general.json") as f: general = json.load(f)
+    general.update({'timestep': 60, 'simulation years': 1, 'precision': 'float32'})
+    parameters = {'Npower': 500, 'number of modules': 2, 'stack model': 'Alkaline', 'strategy': 'hydrogen-first', 'only_renewables': False,
+                  'minimum_load': 0.2, 'min power module': 0.1, 'power distribution': 'series', 'operational_period': '01-01,31-12',
+                  'state': 'on', 'ageing': True}
+    with c.activate(c.simulation_context(general)), contextlib.redirect_stdout(io.StringIO()):
+        el = electrolyzer(parameters,c.timestep_number,c.timestep)
+        for step in range(24):
+            el.use(step,storable_hydrogen=1e12,p=700.,Text=15.)
+    module = el.stack[0]
+    assert el.EFF.dtype == np.float32
+    assert module['Conversion_factor_op[kg/MWh]'].dtype == module['Conversion_factor_rated[kg/MWh]'].dtype == np.float32
+    assert all(module[name].dtype == np.float64 for name in ['T[°C]','hydrogen_production[kg/s]','I_op[A]','V_op[V]'])
+    assert isinstance(module['Time_degradation[V]'],float) and module['Operation_time[steps]'] == 24
+
+
+@pytest.mark.parametrize('precision',['float16','double',32])
+def test_invalid_precision(make_rec,precision):
+    """Precisions other than float64 and float32 are rejected when the REC is created"""
+    with pytest.raises(ValueError,match='precision'):
+        make_rec('input_test_1',precision=precision)
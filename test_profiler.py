@@ -0,0 +1,44 @@
+"""
+Tests of the profiling of a REC simulation (see core/profiler.py)
+"""
+
+import csv
+import json
+import numpy as np
+from core.profiler import timed_call
+
+
+def test_profile_csv(make_rec,tmp_path):
+    """A profiled run writes calls and times of handlers and technologies, with the results of a run without profiling"""
+    expected = make_rec('input_test_1')
+    expected.REC_power_simulation()
+    rec = make_rec('input_test_1')
+    rec.REC_power_simulation(profile=str(tmp_path/'profile.csv'))
+
+    with open(tmp_path/'profile.csv',newline='') as f: rows = {(row['location'],row['name']): row for row in csv.DictReader(f)}
+    steps = len(expected.balance_tensor.data[0])
+    assert int(rows[('REC','REC_power_simulation')]['calls']) == 1
+    assert int(rows[('prosumer','battery.use')]['calls']) == steps
+    assert rows[('prosumer','battery.use')]['kind'] == 'technology'
+    for location_name in rec.locations:
+        assert int(rows[(location_name,'demand_step (electricity demand)')]['calls']) == steps
+        assert rows[(location_name,'demand_step (electricity demand)')]['kind'] == 'handler'
+        assert float(rows[(location_name,'loc_power_simulation')]['steps/s']) > 0
+    assert np.array_equal(rec.balance_tensor.data,expected.balance_tensor.data)
+    for location_name in rec.locations:
+        assert np.array_equal(rec.locations[location_name].balance_tensor.data,expected.locations[location_name].balance_tensor.data)
+
+
+def test_profile_restores_methods(make_rec,tmp_path):
+    """Instrumented methods and dispatch plans are restored after the profiled run, also in a .json report"""
+    rec = make_rec('input_test_1')
+    rec.REC_power_simulation(profile=str(tmp_path/'profile.json'))
+
+    with open(tmp_path/'profile.json') as f: report = json.load(f)
+    assert report['steps'] == len(rec.balance_tensor.data[0])
+    assert any(record['name'] == 'battery.use' for record in report['records'])
+    assert not any(isinstance(value,timed_call) for value in vars(rec).values())
+    for location in rec.locations.values():
+        assert not any(isinstance(value,timed_call) for value in vars(location).values())
+        assert not any(isinstance(handler,timed_call) for handler in location.dispatch_plan)
+        assert all('use' not in vars(tech) for tech in location.technologies.values())
@@ -0,0 +1,89 @@
+"""
+Tests of the REC simulation paths: vectorized horizon of stateless RECs and collective self consumption post-pass (see core/rec.py)
+"""
+
+import copy
+import json
+import numpy as np
+from conftest import root
+from core.location import location
+from core.rec import REC
+
+
+def same_flows(flows,expected):
+    """Nested flow dictionaries with the same keys and arrays"""
+    if isinstance(expected,dict):
+        return(list(flows) == list(expected) and all(same_flows(flows[key],expected[key]) for key in expected))
+    return(np.array_equal(flows,expected))
+
+
+def same_results(rec,expected):
+    """REC and location balances equal to the expected ones (sign of zeros included), and the same flows between technologies"""
+    arrays = [(rec.balance_tensor.data,expected.balance_tensor.data)]
+    arrays += [(rec.locations[name].balance_tensor.data,expected.locations[name].balance_tensor.data) for name in expected.locations]
+    return(all(np.array_equal(data,expected_data) and np.array_equal(np.signbit(data),np.signbit(expected_data)) for data,expected_data in arrays)
+           and all(same_flows(rec.locations[name].consumption,expected.locations[name].consumption) and
+                   same_flows(rec.locations[name].production,expected.locations[name].production) for name in expected.locations))
+
+
+def count_calls(monkeypatch,cls,name):
+    """Count the calls of method name of cls"""
+    calls = []
+    method = getattr(cls,name)
+    def counted(self,*args,**kwargs):
+        calls.append(getattr(self,'name',None))
+        return(method(self,*args,**kwargs))
+    monkeypatch.setattr(cls,name,counted)
+    return(calls)
+
+
+def test_horizon_same_as_steps(make_rec,monkeypatch):
+    """A REC of stateless locations (PV, wind, demands and grids) is solved in one pass, with the results of REC_step"""
+    with open(f"{root}/input_test_1/studycase.json") as f: structure = json.load(f)
+    structure = copy.deepcopy(structure)
+    del structure['prosumer']['battery']
+    expected = make_rec('input_test_1',structure=structure)
+    expected.REC_power_simulation(vectorized=False)
+
+    steps = count_calls(monkeypatch,location,'loc_power_simulation')
+    solutions = count_calls(monkeypatch,location,'apply_horizon_solution')
+    rec = make_rec('input_test_1',structure=structure)
+    rec.REC_power_simulation()
+    assert all(rec.locations[name].stateless for name in rec.locations)
+    assert not steps and sorted(solutions) == sorted(rec.locations)
+    assert same_results(rec,expected)
+
+
+def test_horizon_only_stateless(make_rec,monkeypatch):
+    """A location with a state (battery) makes the whole REC simulated step by step"""
+    solutions = count_calls(monkeypatch,location,'apply_horizon_solution')
+    rec = make_rec('input_test_1')
+    rec.REC_power_simulation()
+    assert not rec.locations['prosumer'].stateless and rec.locations['consumer 1'].stateless
+    assert not solutions
+
+
+def test_csc_post_pass_same_as_steps(make_rec,monkeypatch):
+    """Without collective batteries grid exchange and collective self consumption are solved after the locations, as REC_step does every step"""
+    expected = make_rec('input_test_1')
+    expected.REC_power_simulation(vectorized=False)
+
+    steps = count_calls(monkeypatch,REC,'REC_step')
+    post_passes = count_calls(monkeypatch,REC,'REC_csc_post_pass')
+    rec = make_rec('input_test_1')
+    rec.REC_power_simulation()
+    assert not steps and len(post_passes) == 1
+    assert rec.power_balance['electricity']['collective self consumption'].any()
+    assert all(rec.locations[name].power_balance['electricity']['collective self consumption'].any() for name in rec.locations)
+    assert same_results(rec,expected)
+
+
+def test_collective_battery_steps(make_rec,monkeypatch):
+    """A collective battery depends on the collective self consumption of each step: the REC is simulated step by step"""
+    with open(f"{root}/input_test_1/studycase.json") as f: structure = json.load(f)
+    structure = copy.deepcopy(structure)
+    structure['prosumer']['battery']['collective'] = 1
+    post_passes = count_calls(monkeypatch,REC,'REC_csc_post_pass')
+    rec = make_rec('input_test_1',structure=structure)
+    rec.REC_power_simulation()
+    assert not post_passes
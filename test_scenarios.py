@@ -0,0 +1,32 @@
+"""
+Tests of the batched simulation of scenarios (see core/scenarios.py)
+"""
+
+import copy
+import json
+import numpy as np
+from conftest import root
+from core import scenarios
+
+
+def test_scenarios_share_inputs(make_rec):
+    """Scenarios share the read-only inputs of the base REC and give the same results as the REC simulated alone"""
+    overrides = [{'prosumer': {'PV': {'peakP': peakP}}} for peakP in [2,6]]
+    batch = make_rec('input_test_1',build=lambda *inputs: scenarios.scenario_batch(*inputs,overrides))
+    batch.simulate()
+
+    first,second = batch.recs
+    assert first.weather is second.weather and first.context is second.context
+    assert first.locations['prosumer'].technologies['wind'] is second.locations['prosumer'].technologies['wind']
+    assert first.locations['prosumer'].technologies['PV'] is not second.locations['prosumer'].technologies['PV']
+    assert first.locations['prosumer'].technologies['battery'] is not second.locations['prosumer'].technologies['battery']
+    assert not np.shares_memory(first.locations['prosumer'].balance_tensor.data,second.locations['prosumer'].balance_tensor.data)
+
+    with open(f"{root}/input_test_1/studycase.json") as f: structure = json.load(f)
+    structure = copy.deepcopy(structure)
+    structure['prosumer']['PV']['peakP'] = 6
+    alone = make_rec('input_test_1',structure=structure)
+    alone.REC_power_simulation()
+    for location_name in alone.locations:
+        assert np.allclose(alone.locations[location_name].balance_tensor.data,second.locations[location_name].balance_tensor.data,rtol=1e-9,atol=1e-9)
+    assert np.allclose(alone.balance_tensor.data,second.balance_tensor.data,rtol=1e-9,atol=1e-9)
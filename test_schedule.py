@@ -0,0 +1,40 @@
+"""
+Tests of the planned on/off schedules of the technologies (see core/schedule.py)
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from core import constants as c
+from core import schedule
+
+
+def calendar_state(period,state,timestep,timestep_number):
+    """Schedule built with a daily pandas calendar resampled at the timestep, as the technologies computed it before schedule.py"""
+    initial_day,final_day = [pd.to_datetime(day,format='%d-%m') for day in period.split(',')]
+    year = initial_day.year
+    days = pd.date_range(start=pd.Timestamp(year=year,month=1,day=1),end=pd.Timestamp(year=year+1,month=1,day=1))
+    inside = (days >= initial_day) & (days <= final_day)
+    values = inside.astype(int) if state == 'on' else (~inside).astype(int)
+    operational_state = pd.DataFrame({'State': values},index=days)
+    operational_state = operational_state.resample(f'{timestep}min').ffill().iloc[:-1,:]
+    return(np.tile(np.array(operational_state['State']),int(timestep_number*timestep/c.MINUTES_YEAR)))
+
+
+@pytest.mark.parametrize('timestep',[1,15,45,60,1000])
+@pytest.mark.parametrize('period',['01-01,31-12','01-04,30-09','15-03,15-03','01-11,31-03','28-02,01-03','1-4,3-9'])
+@pytest.mark.parametrize('state',['on','off'])
+def test_same_as_calendar(timestep,period,state):
+    """Schedules are the same of the pandas calendar for timesteps that do or don't divide the day, periods across the end of the year and two years"""
+    timestep_number = int(2*c.MINUTES_YEAR/timestep)
+    expected = calendar_state(period,state,timestep,timestep_number)
+    computed = schedule.operational_state(period,state,timestep,timestep_number)
+    assert computed.shape == expected.shape
+    assert np.array_equal(computed,expected)
+
+
+@pytest.mark.parametrize('period,state',[('29-02,31-03','on'),('01-13,31-12','on'),('01-01','on'),('01-01,31-12','standby')])
+def test_invalid_schedule(period,state):
+    """Days that are not in a year of 365 days and unknown states raise ValueError"""
+    with pytest.raises(ValueError):
+        schedule.operational_state(period,state,60,8760)
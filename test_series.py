@@ -0,0 +1,39 @@
+"""
+Tests of the input series and of the weather expanded to the simulation timestep (see core/series.py)
+"""
+
+import shutil
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import root
+from core.series import weather_series
+
+
+def test_weather_columns():
+    """Weather columns are repeated for each timestep and year, non-numeric columns are only converted if read"""
+    weather = weather_series({'temp_air': [1,2,3], 'notes': np.array(['a','b','c'],dtype=object)},4,24)
+    assert len(weather['temp_air']) == 24
+    assert weather['temp_air'][5] == 2. and weather['temp_air'][13] == 1.
+    assert np.array_equal(weather['temp_air'].to_numpy()[:12],np.repeat([1.,2.,3.],4))
+    assert list(weather.numeric()) == ['temp_air']
+    with pytest.raises(ValueError):
+        weather['notes'][0]
+
+
+def test_rec_with_non_numeric_weather(make_rec,tmp_path):
+    """A non-numeric column of the weather file doesn't change the simulation"""
+    case = tmp_path/'input'
+    shutil.copytree(f"{root}/input_test_1",case)
+    weather = pd.read_csv(case/'weather'/'TMY_general.csv')
+    weather['notes'] = 'measured'
+    weather.to_csv(case/'weather'/'TMY_general.csv',index=False)
+
+    expected = make_rec('input_test_1')
+    expected.REC_power_simulation()
+    rec = make_rec(str(case))
+    rec.REC_power_simulation()
+    assert 'notes' in rec.weather and 'notes' not in rec.weather.numeric()
+    assert np.array_equal(rec.balance_tensor.data,expected.balance_tensor.data)
+    for location_name in rec.locations:
+        assert np.array_equal(rec.locations[location_name].balance_tensor.data,expected.locations[location_name].balance_tensor.data)
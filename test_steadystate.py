@@ -0,0 +1,37 @@
+"""
+Tests of the cyclic steady-state detection (see core/steadystate.py)
+"""
+
+import json
+import numpy as np
+from conftest import root
+from core import steadystate
+from core import constants as c
+
+
+def test_steady_state_same_as_simulated(make_rec,monkeypatch):
+    """Years copied forward once the steady state is reached are the same as the simulated ones (3 years, weather of one year)"""
+    copied = []
+    copy_forward = steadystate.copy_forward
+    monkeypatch.setattr(steadystate,'copy_forward',lambda arrays,first_step,last_step: copied.append(last_step) or copy_forward(arrays,first_step,last_step))
+    with open(f"{root}/input_test_1/studycase.json") as f: structure = json.load(f)
+    del structure['prosumer']['wind']      # wind series of a real year: not periodic
+    whole = make_rec('input_test_1',structure=structure,simulation_years=3)
+    whole.REC_power_simulation(chunk='year')
+    steady = make_rec('input_test_1',structure=structure,simulation_years=3)
+    steady.REC_power_simulation(steady_state=True)
+    assert copied and copied[0] < 3*8760    # at least one year copied forward
+
+    for location_name in whole.locations:
+        assert np.allclose(whole.locations[location_name].balance_tensor.data,steady.locations[location_name].balance_tensor.data,rtol=1e-9,atol=1e-9)
+    assert np.allclose(whole.balance_tensor.data,steady.balance_tensor.data,rtol=1e-9,atol=1e-9)
+    assert np.allclose(whole.locations['prosumer'].technologies['battery'].LOC,steady.locations['prosumer'].technologies['battery'].LOC,rtol=1e-9,atol=1e-9)
+
+
+def test_series_arrays_weather(make_rec):
+    """Weather arrays of one year are pickled in-band by the collector of the time series"""
+    rec = make_rec('input_test_1',simulation_years=3)
+    rec.initialise_power_balance()
+    with c.activate(rec.context):
+        arrays = steadystate.series_arrays([rec.locations,rec.balance_tensor,rec.weather])
+    assert any(array is rec.balance_tensor.data for array in arrays)
@@ -0,0 +1,37 @@
+"""
+Tests of the streaming (chunked) simulation (see REC.REC_power_simulation_chunked)
+"""
+
+import os
+import numpy as np
+from core import scratch
+
+
+def test_chunked_same_as_whole(make_rec):
+    """The chunked simulation gives the same results, with every time series of the locations backed by files of its own store"""
+    whole = make_rec('input_test_1',simulation_years=2)
+    whole.REC_power_simulation()
+    first = make_rec('input_test_1',simulation_years=2)
+    first.REC_power_simulation(chunk=1000)
+    second = make_rec('input_test_1',simulation_years=2)
+    second.REC_power_simulation(chunk='year')
+
+    stores = os.listdir('results/store')
+    assert len(stores) == 2 and all(store.startswith('studycase_') for store in stores)    # a new store for each simulation
+    for location_name in whole.locations:
+        assert np.array_equal(whole.locations[location_name].balance_tensor.data,first.locations[location_name].balance_tensor.data)
+    assert np.array_equal(whole.balance_tensor.data,first.balance_tensor.data)
+
+    battery = first.locations['prosumer'].technologies['battery']
+    assert np.array_equal(whole.locations['prosumer'].technologies['battery'].LOC,battery.LOC)
+    assert scratch.reference(battery.LOC) is not None
+    flows = first.locations['prosumer'].production['electricity']['PV']
+    assert flows and all(isinstance(flows[tech],np.memmap) for tech in flows)
+
+
+def test_chunked_in_memory(make_rec):
+    """store=False keeps the time series in memory"""
+    rec = make_rec('input_test_1')
+    rec.REC_power_simulation(chunk='year',store=False)
+    assert not os.path.exists('results/store')
+    assert not isinstance(rec.locations['prosumer'].balance_tensor.data,np.memmap)
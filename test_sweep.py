@@ -0,0 +1,43 @@
+"""
+Tests of the parallel sweep of scenarios (see core/sweep.py)
+"""
+
+import os
+import copy
+import json
+import pickle
+import numpy as np
+import pytest
+from conftest import root
+from core import sweep
+
+
+def battery_scenarios():
+    """Scenarios of input_test_1 with different battery capacities"""
+    with open(f"{root}/input_test_1/studycase.json") as f: structure = json.load(f)
+    scenarios = {}
+    for capacity in [1,5]:
+        scenarios[f"battery {capacity}"] = copy.deepcopy(structure)
+        scenarios[f"battery {capacity}"]['prosumer']['battery']['nominal capacity'] = capacity
+    return(scenarios)
+
+
+@pytest.mark.parametrize('absolute',[False,True])
+def test_sweep_same_as_single_runs(make_rec,tmp_path,absolute):
+    """Scenarios simulated by 2 worker processes save the results of the same RECs simulated one by one, in relative and absolute folders"""
+    with open(f"{root}/input_test_1/tech_cost.json") as f: tech_cost = json.load(f)
+    scenarios = battery_scenarios()
+    results = str(tmp_path/'sweep'/'results') if absolute else os.path.join('results','sweep')
+    folders = make_rec('input_test_1',build=lambda *inputs: sweep.sweep(*inputs,scenarios,tech_cost,processes=2,results=results))
+    assert not os.path.exists(os.path.join('.',str(tmp_path).lstrip(os.sep)))     # no stray tree in the working directory
+
+    for scenario_name,structure in scenarios.items():
+        assert folders[scenario_name] == os.path.join(results,scenario_name)
+        alone = make_rec('input_test_1',structure=structure)
+        alone.REC_power_simulation()
+        with open(f"{folders[scenario_name]}/pkl/balances_{scenario_name}.pkl",'rb') as f: balances = pickle.load(f)
+        for carrier,tech in alone.balance_tensor.channels:
+            assert np.array_equal(balances['REC'][carrier][tech],alone.power_balance[carrier][tech])
+        for location_name in alone.locations:
+            for carrier,tech in alone.locations[location_name].balance_tensor.channels:
+                assert np.array_equal(balances[location_name][carrier][tech],alone.locations[location_name].power_balance[carrier][tech])